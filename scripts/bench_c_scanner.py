@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""Benchmark the C scanner and the context strippers built on it.
+
+Times brace counting, function finding and the scanner-based strippers
+(the fallbacks used when tree-sitter is unavailable) on a real context, so
+changes to src/hooks/c_scanner.py can be measured against a built ctx.c.
+
+Usage:
+    python scripts/bench_c_scanner.py [CONTEXT] [--repeat N]
+
+Arguments:
+    CONTEXT: Context file to scan (default: melee/build/ctx.c, run
+        `ninja build/ctx.c` in melee/ first)
+    --repeat N: Runs per benchmark; the fastest is reported (default: 5)
+"""
+
+import argparse
+import sys
+import time
+from collections.abc import Callable
+from pathlib import Path
+
+from src.cli._common import DEFAULT_MELEE_ROOT
+from src.cli.extract import (
+    _strip_all_function_bodies,
+    _strip_all_function_bodies_regex,
+    _strip_inline_functions,
+    _strip_target_function,
+)
+from src.hooks.c_scanner import count_braces, function_spans
+
+
+def best_time(func: Callable[[], object], repeat: int) -> float:
+    """Fastest of `repeat` runs, in seconds."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def run(context: str, repeat: int) -> list[tuple[str, float]]:
+    """Time each scanner operation on one context."""
+    spans = function_spans(context)
+    # The last definition is the worst case for a search from the top
+    target = spans[-1].name if spans else "missing_function"
+
+    benchmarks: list[tuple[str, Callable[[], object]]] = [
+        ("count_braces", lambda: count_braces(context)),
+        ("function_spans", lambda: function_spans(context)),
+        ("strip all bodies (scanner)", lambda: _strip_all_function_bodies_regex(context)),
+        ("strip all bodies (default)", lambda: _strip_all_function_bodies(context)),
+        ("strip inline functions", lambda: _strip_inline_functions(context)),
+        (f"strip target ({target})", lambda: _strip_target_function(context, target)),
+    ]
+    return [(name, best_time(func, repeat)) for name, func in benchmarks]
+
+
+def main():
+    """Main entry point."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "context", nargs="?", type=Path, default=DEFAULT_MELEE_ROOT / "build" / "ctx.c"
+    )
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    try:
+        context = args.context.read_text(errors="replace")
+    except OSError as e:
+        print(f"Cannot read context: {e}")
+        sys.exit(1)
+
+    print(f"{args.context}: {len(context):,} bytes, {len(function_spans(context)):,} functions")
+    print(f"Best of {args.repeat} runs:")
+    for name, seconds in run(context, args.repeat):
+        print(f"  {name:<40} {seconds * 1000:9.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
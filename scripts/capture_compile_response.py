@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""Capture a decomp.me /compile response as an asmdiff test fixture.
+
+tests/test_client.py rescores every captured response with the local
+asm-differ port and checks it gets decomp.me's score, so captures must come
+from a real decomp.me instance, never be written by hand.
+
+Usage:
+    python scripts/capture_compile_response.py SLUG [BASE_URL]
+
+Arguments:
+    SLUG: Scratch to compile (its saved source is used)
+    BASE_URL: Optional base URL for the API (default: http://localhost:8000)
+
+Writes tests/fixtures/asmdiff/<scratch name>.compile.json.
+"""
+
+import json
+import sys
+from pathlib import Path
+
+import httpx
+
+FIXTURES = Path(__file__).resolve().parent.parent / "tests" / "fixtures" / "asmdiff"
+
+
+def capture(slug: str, base_url: str = "http://localhost:8000") -> Path:
+    """Compile a scratch and save the raw response."""
+    with httpx.Client(base_url=base_url, timeout=120) as client:
+        scratch = client.get(f"/api/scratch/{slug}")
+        scratch.raise_for_status()
+        response = client.post(f"/api/scratch/{slug}/compile", json={})
+        response.raise_for_status()
+
+    data = response.json()
+    if not data.get("diff_output"):
+        raise ValueError(f"Scratch {slug} did not compile: {data.get('compiler_output', '')}")
+
+    name = scratch.json().get("name") or slug
+    path = FIXTURES / f"{name}.compile.json"
+    path.write_text(json.dumps(data, indent=2) + "\n")
+    return path
+
+
+def main():
+    """Main entry point."""
+    if len(sys.argv) < 2:
+        print(__doc__)
+        sys.exit(2)
+    base_url = sys.argv[2] if len(sys.argv) > 2 else "http://localhost:8000"
+    try:
+        path = capture(sys.argv[1], base_url)
+    except (httpx.HTTPError, ValueError) as e:
+        print(f"Capture failed: {e}")
+        sys.exit(1)
+    print(f"Wrote {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -37,6 +37,7 @@ from .workflow import workflow_app
 from .state import state_app
 from .analytics import analytics_app
 from .setup import setup_app
+from .permute import permute_app
 from .compilers import list_compilers
 
 # Import common utilities for backward compatibility
@@ -69,6 +70,7 @@ app.add_typer(workflow_app, name="workflow")
 app.add_typer(state_app, name="state")
 app.add_typer(analytics_app, name="analytics")
 app.add_typer(setup_app, name="setup")
+app.add_typer(permute_app, name="permute")
 
 # Register standalone commands
 app.command("compilers")(list_compilers)
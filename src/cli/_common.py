@@ -50,7 +50,11 @@ def ensure_dol_in_worktree(worktree_path: Path) -> bool:
             dol_src = wt / "orig" / "GALE01" / "sys" / "main.dol"
             if dol_src.exists() and not dol_src.is_symlink():
                 dol_dst.parent.mkdir(parents=True, exist_ok=True)
-                shutil.copy2(dol_src, dol_dst)
+                # The DOL is never written, so share it rather than copying
+                try:
+                    os.link(dol_src, dol_dst)
+                except OSError:
+                    shutil.copy2(dol_src, dol_dst)
                 return True
 
     return False
@@ -90,45 +94,24 @@ DEFAULT_DECOMP_COMPILER = "mwcc_247_92"
 
 
 def get_compiler_for_source(source_file: str, melee_root: Path) -> str:
-    """Get the decomp.me compiler ID for a source file by parsing build.ninja."""
-    build_ninja = melee_root / "build.ninja"
-    if not build_ninja.exists():
+    """Get the decomp.me compiler ID for a source file from the build.ninja index."""
+    from src.commit.build_index import get_build_unit
+
+    if not (melee_root / "build.ninja").exists():
         console.print(f"[yellow]build.ninja not found, using default compiler[/yellow]")
         return DEFAULT_DECOMP_COMPILER
 
-    if source_file.startswith("src/"):
-        source_rel = source_file
-    else:
-        source_rel = f"src/{source_file}"
-
     try:
-        content = build_ninja.read_text()
-        lines = content.split('\n')
-
-        comment_path = source_rel
-        if comment_path.startswith("src/"):
-            comment_path = comment_path[4:]
-
-        in_target = False
-        for line in lines:
-            if line.startswith(f'# {comment_path}:'):
-                in_target = True
-                continue
-
-            if in_target:
-                if line.startswith('  mw_version = '):
-                    mw_version = line.split('=', 1)[1].strip()
-                    if mw_version in GC_TO_DECOMP_COMPILER:
-                        return GC_TO_DECOMP_COMPILER[mw_version]
-                    else:
-                        console.print(f"[yellow]Unknown compiler version {mw_version}, using default[/yellow]")
-                        return DEFAULT_DECOMP_COMPILER
-                elif line.startswith('# ') and ':' in line:
-                    break
-
+        unit = get_build_unit(melee_root, source_file)
     except Exception as e:
         console.print(f"[yellow]Error parsing build.ninja: {e}[/yellow]")
+        return DEFAULT_DECOMP_COMPILER
 
+    if unit is None or not unit.mw_version:
+        return DEFAULT_DECOMP_COMPILER
+    if unit.mw_version in GC_TO_DECOMP_COMPILER:
+        return GC_TO_DECOMP_COMPILER[unit.mw_version]
+    console.print(f"[yellow]Unknown compiler version {unit.mw_version}, using default[/yellow]")
     return DEFAULT_DECOMP_COMPILER
 
 
@@ -161,6 +144,7 @@ from .tracking import (
     save_match_history,
     record_match_score,
     get_match_history,
+    get_best_match,
     format_match_history,
 )
 
@@ -175,6 +159,9 @@ from .worktree_utils import (
     get_agent_context_file,
     resolve_melee_root,
     get_source_file_from_claim,
+    get_pooled_worktrees,
+    fill_worktree_pool,
+    provision_worktree_build,
     db_upsert_subdirectory,
     db_lock_subdirectory,
     db_unlock_subdirectory,
@@ -357,28 +344,14 @@ def db_upsert_scratch(slug: str, instance: str, base_url: str, **fields) -> bool
         return False
 
 
-def db_record_match_score(
-    scratch_slug: str,
-    score: int,
-    max_score: int,
-    worktree_path: str | None = None,
-    branch: str | None = None,
-) -> bool:
-    """Record match score in state database (non-blocking).
-
-    Args:
-        scratch_slug: The scratch identifier
-        score: Current diff score (0 = perfect match)
-        max_score: Maximum possible score
-        worktree_path: Path to the worktree where work was done
-        branch: Git branch name where work was done
-    """
+def db_record_created_scratches(scratches: list[dict], base_url: str) -> bool:
+    """Record a batch of new local scratches in one transaction (non-blocking)."""
     db = get_state_db()
     if db is None:
         return False
 
     try:
-        db.record_match_score(scratch_slug, score, max_score, worktree_path, branch)
+        db.record_created_scratches(scratches, base_url, agent_id=AGENT_ID)
         return True
     except Exception:
         return False
@@ -398,7 +371,6 @@ def db_record_sync(local_slug: str, production_slug: str, function_name: str | N
 
 
 # Claim renewal for auto-extending claims on activity
-DECOMP_CLAIMS_FILE = os.environ.get("DECOMP_CLAIMS_FILE", "/tmp/decomp_claims.json")
 DECOMP_CLAIM_TIMEOUT = int(os.environ.get("DECOMP_CLAIM_TIMEOUT", "10800"))  # 3 hours
 
 
@@ -415,42 +387,22 @@ def renew_claim_on_activity(function_name: str, agent_id: str | None = None) ->
     Returns:
         True if claim was renewed, False if not (not owned or not claimed)
     """
-    from .utils import file_lock, load_json_safe
-
     agent_id = agent_id or AGENT_ID
-    claims_path = Path(DECOMP_CLAIMS_FILE)
-    lock_path = claims_path.with_suffix(".json.lock")
-
-    if not claims_path.exists():
+    db = get_state_db()
+    if db is None:
         return False
 
     try:
-        with file_lock(lock_path, exclusive=True, timeout=5):
-            claims = load_json_safe(claims_path)
-
-            if function_name not in claims:
-                return False
-
-            claim = claims[function_name]
-            if claim.get("agent_id") != agent_id:
-                return False
-
-            # Renew the claim by updating timestamp
-            claim["timestamp"] = time.time()
+        if not db.renew_claim(function_name, agent_id, DECOMP_CLAIM_TIMEOUT):
+            return False
 
-            # Save updated claims
-            with open(claims_path, "w") as f:
-                json.dump(claims, f, indent=2)
+        # Also renew subdirectory lock if applicable
+        claim = db.get_claim(function_name)
+        subdir_key = claim.get("subdirectory_key") if claim else None
+        if subdir_key:
+            db_lock_subdirectory(subdir_key, agent_id)
 
-            # Also renew subdirectory lock if applicable
-            subdir_key = claim.get("subdirectory")
-            if subdir_key:
-                db_lock_subdirectory(subdir_key, agent_id)
-
-            # Renew in database too
-            db_add_claim(function_name, agent_id)
-
-            return True
-    except (TimeoutError, Exception):
-        # Non-blocking - don't fail if lock unavailable
+        return True
+    except Exception:
+        # Non-blocking - don't fail if the database is busy
         return False
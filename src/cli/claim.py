@@ -1,7 +1,10 @@
 """Claim commands - manage function claims for parallel agents."""
 
+import contextlib
 import json
 import os
+import sqlite3
+import sys
 import time
 from pathlib import Path
 from typing import Annotated, Any
@@ -12,17 +15,17 @@ from rich.table import Table
 from ._common import (
     AGENT_ID,
     console,
-    db_add_claim,
-    db_release_claim,
     db_lock_subdirectory,
     db_unlock_subdirectory,
     db_get_subdirectory_lock,
     get_subdirectory_key,
     get_worktree_for_file,
+    get_subdirectory_worktree,
     get_subdirectory_worktree_path,
+    get_pooled_worktrees,
     DEFAULT_MELEE_ROOT,
 )
-from .utils import file_lock, load_json_with_expiry
+from .storage import migrate_legacy_json_stores
 
 # Maximum broken builds per worktree before blocking claims
 MAX_BROKEN_BUILDS_PER_WORKTREE = 3
@@ -50,33 +53,31 @@ def _lookup_source_file(function_name: str) -> str | None:
         pass  # Silently fail - auto-detection is optional
     return None
 
-# Claims are SHARED and ephemeral (3-hour expiry) - ok in /tmp
-DECOMP_CLAIMS_FILE = os.environ.get("DECOMP_CLAIMS_FILE", "/tmp/decomp_claims.json")
+# Claims are SHARED and ephemeral (3-hour expiry), stored in the state database
 DECOMP_CLAIM_TIMEOUT = int(os.environ.get("DECOMP_CLAIM_TIMEOUT", "10800"))  # 3 hours
 
 
 claim_app = typer.Typer(help="Manage function claims for parallel agents")
 
 
-def _load_claims() -> dict[str, Any]:
-    """Load claims from file, removing stale entries."""
-    return load_json_with_expiry(
-        Path(DECOMP_CLAIMS_FILE),
-        timeout_seconds=DECOMP_CLAIM_TIMEOUT,
-        timestamp_field="timestamp",
-    )
-
+def _load_claims(agent_id: str | None = None) -> dict[str, Any]:
+    """Load active claims from the state database.
 
-def _save_claims(claims: dict[str, Any]) -> None:
-    """Save claims to file.
-
-    Note: Caller must already hold the lock on the claims file.
-    This function writes directly without acquiring a lock to avoid deadlock.
+    Returns the legacy JSON layout:
+    {function: {agent_id, timestamp, source_file, subdirectory}}
     """
-    path = Path(DECOMP_CLAIMS_FILE)
-    path.parent.mkdir(parents=True, exist_ok=True)
-    with open(path, "w") as f:
-        json.dump(claims, f, indent=2)
+    from src.db import get_db
+
+    migrate_legacy_json_stores()
+    return {
+        claim["function_name"]: {
+            "agent_id": claim["agent_id"],
+            "timestamp": claim["claimed_at"],
+            "source_file": claim["source_file_path"],
+            "subdirectory": claim["subdirectory_key"],
+        }
+        for claim in get_db().get_claims(agent_id)
+    }
 
 
 def _check_subdirectory_availability(source_file: str, agent_id: str) -> tuple[bool, str | None, str | None]:
@@ -187,67 +188,221 @@ def claim_add(
                 console.print(f"[dim]Or use 'melee-agent extract list --exclude-subdir {subdir_key}' to find functions elsewhere.[/dim]")
             raise typer.Exit(1)
 
-    claims_path = Path(DECOMP_CLAIMS_FILE)
-    lock_path = claims_path.with_suffix(".json.lock")
+    from src.db import get_db
 
-    try:
-        with file_lock(lock_path, exclusive=True):
-            claims = _load_claims()
-
-            if function_name in claims:
-                existing = claims[function_name]
-                existing_agent = existing.get("agent_id", "unknown")
-                age_mins = (time.time() - existing["timestamp"]) / 60
-                is_self = existing_agent == agent_id
-                if output_json:
-                    print(json.dumps({"success": False, "error": "already_claimed", "by": existing_agent, "age_mins": age_mins, "is_self": is_self}))
-                else:
-                    if is_self:
-                        console.print(f"[yellow]Already claimed by you ({agent_id}) {age_mins:.0f}m ago - claim still active[/yellow]")
-                    else:
-                        console.print(f"[red]CLAIMED BY ANOTHER AGENT: {existing_agent} ({age_mins:.0f}m ago)[/red]")
-                        console.print(f"[red]DO NOT WORK ON THIS FUNCTION - pick a different one[/red]")
-                raise typer.Exit(1)
-
-            claims[function_name] = {
-                "agent_id": agent_id,
-                "timestamp": time.time(),
-                "source_file": source_file,
-                "subdirectory": subdir_key,
-            }
-            _save_claims(claims)
-
-            # Also write to state database (non-blocking)
-            db_add_claim(function_name, agent_id)
-
-            # Lock subdirectory if source file provided
-            worktree_path = None
-            if source_file and subdir_key:
-                db_lock_subdirectory(subdir_key, agent_id)
-                # Get or create the worktree (don't create yet, just get path)
-                from ._common import get_subdirectory_worktree_path
-                worktree_path = str(get_subdirectory_worktree_path(subdir_key))
+    migrate_legacy_json_stores()
+    db = get_db()
 
-            if output_json:
-                result = {"success": True, "function": function_name}
-                if subdir_key:
-                    result["subdirectory"] = subdir_key
-                if worktree_path:
-                    result["worktree"] = worktree_path
-                print(json.dumps(result))
+    # Check-and-insert happens in one DB transaction, so two agents can't both win
+    success, _ = db.add_claim(
+        function_name,
+        agent_id,
+        timeout_seconds=DECOMP_CLAIM_TIMEOUT,
+        source_file_path=source_file,
+        subdirectory_key=subdir_key,
+    )
+
+    if not success:
+        existing = db.get_claim(function_name) or {}
+        existing_agent = existing.get("agent_id", "unknown")
+        age_mins = (time.time() - existing.get("claimed_at", time.time())) / 60
+        is_self = existing_agent == agent_id
+        if output_json:
+            print(json.dumps({"success": False, "error": "already_claimed", "by": existing_agent, "age_mins": age_mins, "is_self": is_self}))
+        else:
+            if is_self:
+                console.print(f"[yellow]Already claimed by you ({agent_id}) {age_mins:.0f}m ago - claim still active[/yellow]")
             else:
-                console.print(f"[green]Claimed:[/green] {function_name}")
-                if subdir_key:
-                    console.print(f"[dim]Subdirectory:[/dim] {subdir_key}")
-                    console.print(f"[dim]Worktree will be at:[/dim] melee-worktrees/dir-{subdir_key}/")
-    except TimeoutError as e:
+                console.print(f"[red]CLAIMED BY ANOTHER AGENT: {existing_agent} ({age_mins:.0f}m ago)[/red]")
+                console.print(f"[red]DO NOT WORK ON THIS FUNCTION - pick a different one[/red]")
+        raise typer.Exit(1)
+
+    # Lock subdirectory if source file provided
+    worktree_path = None
+    if source_file and subdir_key:
+        db_lock_subdirectory(subdir_key, agent_id)
+        worktree = get_subdirectory_worktree_path(subdir_key)
+        if not worktree.exists() and get_pooled_worktrees():
+            # A pre-built worktree is only a checkout away, so hand it out now
+            # (keeping its progress output off stdout for --json callers)
+            with contextlib.redirect_stdout(sys.stderr):
+                get_subdirectory_worktree(subdir_key, validate_build=False)
+        worktree_path = str(worktree)
+
+    if output_json:
+        result = {"success": True, "function": function_name}
+        if subdir_key:
+            result["subdirectory"] = subdir_key
+        if worktree_path:
+            result["worktree"] = worktree_path
+        print(json.dumps(result))
+    else:
+        console.print(f"[green]Claimed:[/green] {function_name}")
+        if subdir_key:
+            console.print(f"[dim]Subdirectory:[/dim] {subdir_key}")
+            console.print(f"[dim]Worktree will be at:[/dim] melee-worktrees/dir-{subdir_key}/")
+
+
+def _refresh_candidates(melee_root: Path, force: bool = False) -> int | None:
+    """Rebuild the candidate queue from report.json if it changed.
+
+    The queue is keyed on report.json's mtime, so only the first agent to see
+    a new report pays for the extraction; everyone else reuses the table.
+
+    Args:
+        melee_root: Path to the melee repo holding build/GALE01/report.json
+        force: Rebuild even if the report hasn't changed
+
+    Returns:
+        Number of candidates stored, or None if the existing queue was reused
+    """
+    import asyncio
+
+    from src.db import get_db
+    from src.extractor import extract_unmatched_functions
+
+    from .extract import _compute_recommendation_score
+
+    db = get_db()
+    report_path = melee_root / "build" / "GALE01" / "report.json"
+    report_mtime = report_path.stat().st_mtime if report_path.exists() else None
+
+    if not force and db.get_candidate_count() > 0:
+        stored = db.get_meta("candidates_report_mtime")
+        if report_mtime is None or stored == str(report_mtime):
+            return None
+
+    result = asyncio.run(extract_unmatched_functions(melee_root, include_asm=False))
+    candidates = [
+        {
+            "function_name": func.name,
+            "source_file_path": func.file_path,
+            "subdirectory_key": get_subdirectory_key(func.file_path),
+            "canonical_address": func.address,
+            "size_bytes": func.size_bytes,
+            "match_percent": func.current_match * 100,
+            "object_status": func.object_status,
+            "recommendation_score": _compute_recommendation_score(func),
+        }
+        for func in result.functions
+        if func.current_match <= 0.99
+    ]
+    return db.replace_candidates(candidates, report_mtime=report_mtime)
+
+
+def _get_unhealthy_subdirectories() -> list[str]:
+    """Get subdirectory keys whose worktree has too many broken builds."""
+    try:
+        from src.db import get_db
+        broken = get_db().get_all_broken_builds()
+    except Exception:
+        return []
+
+    unhealthy = []
+    for worktree_path, funcs in broken.items():
+        name = Path(worktree_path).name
+        if name.startswith("dir-") and len(funcs) >= MAX_BROKEN_BUILDS_PER_WORKTREE:
+            unhealthy.append(name[len("dir-"):])
+    return unhealthy
+
+
+@claim_app.command("next")
+def claim_next(
+    agent_id: Annotated[
+        str, typer.Option("--agent-id", help="Agent identifier")
+    ] = AGENT_ID,
+    melee_root: Annotated[
+        Path, typer.Option("--melee-root", "-m", help="Path to melee repo with report.json")
+    ] = DEFAULT_MELEE_ROOT,
+    module: Annotated[
+        str | None, typer.Option("--module", help="Filter by module path (e.g., ft, lb, gr, it)")
+    ] = None,
+    matching_only: Annotated[
+        bool, typer.Option("--matching-only", "--committable", help="Only functions in Matching files")
+    ] = False,
+    max_size: Annotated[
+        int | None, typer.Option("--max-size", help="Maximum function size in bytes")
+    ] = None,
+    exclude_subdir: Annotated[
+        list[str] | None, typer.Option("--exclude-subdir", help="Skip these subdirectories (can be repeated)")
+    ] = None,
+    refresh: Annotated[
+        bool, typer.Option("--refresh", help="Force rebuilding the candidate queue from report.json")
+    ] = False,
+    output_json: Annotated[
+        bool, typer.Option("--json", help="Output as JSON")
+    ] = False,
+):
+    """Atomically claim the best available function.
+
+    Selects the highest recommendation-score candidate that is unclaimed and whose
+    subdirectory is free (or already held by you), and claims it in a single
+    database transaction. Unlike 'extract list' followed by 'claim add', this
+    can't lose a race to another agent.
+
+    The candidate queue is rebuilt from report.json automatically when the
+    report changes. Use --refresh to force a rebuild.
+    """
+    from src.db import get_db
+
+    try:
+        refreshed = _refresh_candidates(melee_root, force=refresh)
+    except Exception as e:
         if output_json:
-            print(json.dumps({"success": False, "error": "lock_timeout", "message": str(e)}))
+            print(json.dumps({"success": False, "error": "refresh_failed", "message": str(e)}))
         else:
-            console.print(f"[red]Lock timeout: {e}[/red]")
-            console.print("[yellow]Try again in a few seconds, or check for stuck processes.[/yellow]")
+            console.print(f"[red]Failed to refresh candidate queue: {e}[/red]")
         raise typer.Exit(1)
 
+    if refreshed is not None and not output_json:
+        console.print(f"[dim]Refreshed candidate queue: {refreshed} functions[/dim]")
+
+    excluded = list(exclude_subdir or []) + _get_unhealthy_subdirectories()
+    candidate = get_db().claim_next_candidate(
+        agent_id,
+        timeout_seconds=DECOMP_CLAIM_TIMEOUT,
+        module=module,
+        matching_only=matching_only,
+        max_size=max_size,
+        exclude_subdirs=excluded,
+    )
+
+    if candidate is None:
+        if output_json:
+            print(json.dumps({"success": False, "error": "no_candidates"}))
+        else:
+            console.print("[yellow]No unclaimed candidates available with these filters[/yellow]")
+        raise typer.Exit(1)
+
+    function_name = candidate["function_name"]
+    source_file = candidate["source_file_path"]
+    subdir_key = candidate["subdirectory_key"]
+
+    worktree_path = str(get_subdirectory_worktree_path(subdir_key))
+
+    if output_json:
+        print(json.dumps({
+            "success": True,
+            "function": function_name,
+            "source_file": source_file,
+            "address": candidate["canonical_address"],
+            "size_bytes": candidate["size_bytes"],
+            "match_percent": candidate["match_percent"],
+            "score": candidate["recommendation_score"],
+            "subdirectory": subdir_key,
+            "worktree": worktree_path,
+        }))
+    else:
+        console.print(f"[green]Claimed:[/green] {function_name}")
+        console.print(f"[dim]File:[/dim] {source_file}")
+        console.print(
+            f"[dim]Size:[/dim] {candidate['size_bytes']} bytes, "
+            f"[dim]match:[/dim] {candidate['match_percent']:.1f}%, "
+            f"[dim]score:[/dim] {candidate['recommendation_score']:.0f}"
+        )
+        console.print(f"[dim]Subdirectory:[/dim] {subdir_key}")
+        console.print(f"[dim]Worktree will be at:[/dim] melee-worktrees/dir-{subdir_key}/")
+
 
 def _release_claim(function_name: str, release_subdirectory: bool = False) -> tuple[bool, str | None]:
     """Internal function to release a claim.
@@ -259,37 +414,26 @@ def _release_claim(function_name: str, release_subdirectory: bool = False) -> tu
     Returns:
         (released, subdirectory_key) tuple
     """
-    claims_path = Path(DECOMP_CLAIMS_FILE)
-    if not claims_path.exists():
-        # Also release from DB even if JSON doesn't exist
-        db_release_claim(function_name)
-        return False, None
+    from src.db import get_db
 
-    lock_path = claims_path.with_suffix(".json.lock")
+    migrate_legacy_json_stores()
+    db = get_db()
 
-    with file_lock(lock_path, exclusive=True):
-        claims = _load_claims()
-
-        if function_name not in claims:
-            # Also release from DB even if not in JSON
-            db_release_claim(function_name)
-            return False, None
-
-        # Get subdirectory info before deleting
-        claim_info = claims[function_name]
-        subdir_key = claim_info.get("subdirectory")
-
-        del claims[function_name]
-        _save_claims(claims)
+    # Get subdirectory info before deleting
+    claim_info = db.get_claim(function_name)
+    if not claim_info:
+        # Clear any expired leftover row too
+        db.release_claim(function_name)
+        return False, None
 
-        # Also release from state database (non-blocking)
-        db_release_claim(function_name)
+    subdir_key = claim_info.get("subdirectory_key")
+    db.release_claim(function_name)
 
-        # Release subdirectory lock if requested
-        if release_subdirectory and subdir_key:
-            db_unlock_subdirectory(subdir_key)
+    # Release subdirectory lock if requested
+    if release_subdirectory and subdir_key:
+        db_unlock_subdirectory(subdir_key)
 
-        return True, subdir_key
+    return True, subdir_key
 
 
 @claim_app.command("release")
@@ -309,11 +453,11 @@ def claim_release(
     """
     try:
         released, subdir_key = _release_claim(function_name, release_subdirectory)
-    except TimeoutError as e:
+    except sqlite3.OperationalError as e:
         if output_json:
             print(json.dumps({"success": False, "error": "lock_timeout", "message": str(e)}))
         else:
-            console.print(f"[red]Lock timeout: {e}[/red]")
+            console.print(f"[red]Database busy: {e}[/red]")
             console.print("[yellow]Try again in a few seconds, or check for stuck processes.[/yellow]")
         raise typer.Exit(1)
 
@@ -2,7 +2,6 @@
 
 import asyncio
 import os
-import subprocess
 import time
 from pathlib import Path
 from typing import Annotated, Optional
@@ -10,7 +9,7 @@ from typing import Annotated, Optional
 import typer
 from rich.console import Console
 
-from ._common import console, DEFAULT_MELEE_ROOT, DECOMP_CONFIG_DIR, get_local_api_url, resolve_melee_root, AGENT_ID, db_upsert_function, get_source_file_from_claim
+from ._common import console, DEFAULT_MELEE_ROOT, DECOMP_CONFIG_DIR, get_local_api_url, resolve_melee_root, AGENT_ID, db_upsert_function, get_source_file_from_claim, get_state_db
 from .complete import _load_completed, _save_completed, _get_current_branch
 from src.commit.diagnostics import (
     analyze_commit_error,
@@ -148,25 +147,16 @@ def commit_apply(
                         console.print(f"[yellow]If the function stub is missing, run: melee-agent stub add {function_name}[/yellow]")
                         raise typer.Exit(1)
 
-                    # Try to compile
-                    # Run configure.py first
-                    subprocess.run(
-                        ["python", "configure.py"],
-                        cwd=melee_root, capture_output=True
-                    )
-                    # Compile the object file
-                    obj_path = f"build/GALE01/src/{file_path}".replace('.c', '.o')
-                    result = subprocess.run(
-                        ["ninja", obj_path],
-                        cwd=melee_root, capture_output=True, text=True
-                    )
+                    # Try to compile just this object
+                    from src.commit.build import compile_object
+                    compiled, stdout, stderr = await compile_object(melee_root, file_path)
 
-                    if result.returncode == 0:
+                    if compiled:
                         console.print("[green]✓ Compilation successful[/green]")
                     else:
                         console.print("[red]✗ Compilation failed:[/red]")
                         # Show diagnostics with suggestions
-                        full_output = result.stderr + result.stdout
+                        full_output = stderr + stdout
                         diagnostic = analyze_commit_error(
                             full_output,
                             file_path,
@@ -238,6 +228,138 @@ def commit_apply(
         console.print(f"\n[bold]PR created:[/bold] {pr_url}")
 
 
+@commit_app.command("batch")
+def commit_batch(
+    functions: Annotated[
+        Optional[list[str]], typer.Option("--function", "-f", help="Only commit these functions (repeatable)")
+    ] = None,
+    melee_root: Annotated[
+        Optional[Path], typer.Option("--melee-root", "-m", help="Path to melee submodule (auto-detects worktrees if not specified)")
+    ] = None,
+    api_url: Annotated[
+        Optional[str], typer.Option("--api-url", help="Decomp.me API URL (auto-detected)")
+    ] = None,
+    min_match: Annotated[
+        float, typer.Option("--min-match", help="Only commit matches at or above this percentage")
+    ] = 100.0,
+    limit: Annotated[
+        int, typer.Option("--limit", "-n", help="Maximum number of functions to commit")
+    ] = 50,
+    full_code: Annotated[
+        bool, typer.Option("--full-code", help="Use full scratch code (including struct defs)")
+    ] = False,
+    dry_run: Annotated[
+        bool, typer.Option("--dry-run", help="Verify the batch builds, then revert")
+    ] = False,
+):
+    """Commit all pending matches with a single build per worktree.
+
+    Pending matches come from the state database (matched but not yet
+    committed). Every function is applied first and the touched objects are
+    built in one ninja run; only if that fails are files and functions
+    bisected to find the ones that break the build. Each function still gets
+    its own git commit, and report.json is regenerated once at the end.
+    """
+    api_url = api_url or get_local_api_url()
+
+    from src.client import DecompMeAPIClient
+    from src.commit import BatchCommitWorkflow, PendingMatch
+    from src.commit.update import validate_function_code, _extract_function_from_code
+
+    db = get_state_db()
+    if db is None:
+        raise typer.Exit(1)
+
+    pending = [
+        row for row in db.get_uncommitted_matches()
+        if row["local_scratch_slug"] and row["match_percent"] >= min_match
+        and (not functions or row["function_name"] in functions)
+    ][:limit]
+    if not pending:
+        console.print("[dim]No pending matches to commit[/dim]")
+        return
+
+    async def fetch() -> list[PendingMatch]:
+        matches = []
+        async with DecompMeAPIClient(base_url=api_url) as client:
+            for row in pending:
+                name, slug = row["function_name"], row["local_scratch_slug"]
+                try:
+                    scratch = await client.get_scratch(slug)
+                except Exception as e:
+                    console.print(f"[yellow]Skipping {name}: could not fetch scratch {slug}: {e}[/yellow]")
+                    continue
+                source_code = scratch.source_code.strip()
+                if not full_code:
+                    source_code = _extract_function_from_code(source_code, name) or source_code
+                is_valid, msg = validate_function_code(source_code, name)
+                if not is_valid:
+                    console.print(f"[yellow]Skipping {name}: {msg}[/yellow]")
+                    continue
+                matches.append(PendingMatch(
+                    function_name=name,
+                    source_code=source_code,
+                    scratch_url=f"{api_url}/scratch/{slug}",
+                    match_percent=row["match_percent"],
+                ))
+        return matches
+
+    matches = asyncio.run(fetch())
+
+    # One batch per worktree, since each worktree has its own build directory
+    by_root: dict[Path, list[PendingMatch]] = {}
+    for match in matches:
+        source_file = get_source_file_from_claim(match.function_name)
+        root = resolve_melee_root(melee_root, target_file=source_file)
+        by_root.setdefault(root, []).append(match)
+
+    slugs = {row["function_name"]: row["local_scratch_slug"] for row in pending}
+    total_committed = 0
+    total_failed: dict[str, str] = {}
+
+    for root, root_matches in by_root.items():
+        console.print(f"\n[bold]{root}[/bold]: {len(root_matches)} functions")
+        workflow = BatchCommitWorkflow(root)
+        result = asyncio.run(workflow.execute_batch(root_matches, dry_run=dry_run))
+        total_failed.update(result.failed)
+
+        if dry_run:
+            console.print(f"[green]{len(result.committed)} functions build[/green]")
+            continue
+
+        branch = _get_current_branch(root)
+        completed = _load_completed()
+        pct = {m.function_name: m.match_percent for m in root_matches}
+        for name in result.committed:
+            completed[name] = {
+                "match_percent": pct[name],
+                "scratch_slug": slugs[name],
+                "committed": True,
+                "branch": branch,
+                "notes": "committed via commit batch",
+                "timestamp": time.time(),
+            }
+            db_upsert_function(
+                name,
+                match_percent=pct[name],
+                local_scratch_slug=slugs[name],
+                is_committed=True,
+                status='committed',
+                branch=branch,
+                worktree_path=str(root),
+                notes="committed via commit batch",
+            )
+        _save_completed(completed)
+        total_committed += len(result.committed)
+
+    if not dry_run:
+        console.print(f"\n[green]Committed {total_committed} functions[/green]")
+    if total_failed:
+        console.print(f"[yellow]{len(total_failed)} functions not committed:[/yellow]")
+        for name, reason in total_failed.items():
+            console.print(f"  {name}: {reason}")
+
+
 @commit_app.command("format")
 def commit_format(
     melee_root: Annotated[
@@ -1,7 +1,6 @@
 """Complete commands - track completed/attempted functions."""
 
 import json
-import os
 import subprocess
 import time
 from pathlib import Path
@@ -11,29 +10,10 @@ import typer
 from rich.table import Table
 
 from ._common import console, db_upsert_function, db_release_claim
-from .utils import file_lock, load_json_with_expiry, save_json_atomic
-
-# File paths
-DECOMP_CLAIMS_FILE = os.environ.get("DECOMP_CLAIMS_FILE", "/tmp/decomp_claims.json")
-DECOMP_CLAIM_TIMEOUT = int(os.environ.get("DECOMP_CLAIM_TIMEOUT", "10800"))  # 3 hours
 
 complete_app = typer.Typer(help="Track completed/attempted functions")
 
 
-def _load_claims() -> dict[str, Any]:
-    """Load claims from file, removing stale entries."""
-    return load_json_with_expiry(
-        Path(DECOMP_CLAIMS_FILE),
-        timeout_seconds=DECOMP_CLAIM_TIMEOUT,
-        timestamp_field="timestamp",
-    )
-
-
-def _save_claims(claims: dict[str, Any]) -> None:
-    """Save claims to file."""
-    save_json_atomic(Path(DECOMP_CLAIMS_FILE), claims)
-
-
 def _load_completed() -> dict[str, Any]:
     """Load completed functions from database."""
     from ._common import load_completed_functions
@@ -110,17 +90,7 @@ def complete_mark(
         notes=notes or "",
     )
 
-    # Also release any claim
-    claims_path = Path(DECOMP_CLAIMS_FILE)
-    if claims_path.exists():
-        lock_path = claims_path.with_suffix(".json.lock")
-        with file_lock(lock_path, exclusive=True):
-            claims = _load_claims()
-            if function_name in claims:
-                del claims[function_name]
-                _save_claims(claims)
-
-    # Also release from state database (non-blocking)
+    # Also release any claim (non-blocking)
     db_release_claim(function_name)
 
     if output_json:
@@ -0,0 +1,346 @@
+"""Single-pass context preparation for scratches.
+
+A scratch needs two versions of a function's context:
+
+- mwcc: what MWCC compiles against. The target function's definition is
+  removed (to avoid a redefinition error) and, optionally, other function
+  bodies are stripped so -inline auto can't inline them.
+- m2c: what m2c decompiles against. The same text, run through gcc -E
+  (m2c can't handle directives) with the C11 _Static_assert statements that
+  macro expansion produces commented out.
+
+All stages that rewrite function definitions run in one walk of the
+context's (cached) tree-sitter tree instead of each re-parsing the string.
+gcc -E and the _Static_assert pass then run once on the result. Prepared
+contexts are cached by a hash of the input context and stages, in memory
+and, for large contexts, on disk, so creating several scratches from one
+ctx.c only pays for this once.
+"""
+
+import hashlib
+import json
+import os
+import re
+import subprocess
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+
+from src.hooks.c_analyzer import (
+    TREE_SITTER_AVAILABLE,
+    function_prototype,
+    rewrite_function_definitions,
+)
+
+CONTEXT_CACHE_DIR = Path(
+    os.environ.get(
+        "DECOMP_CONTEXT_CACHE_DIR", Path.home() / ".config" / "decomp-me" / "context_cache"
+    )
+)
+
+# Bump when a stage's output changes so old entries are never reused
+CONTEXT_CACHE_VERSION = "1"
+
+# Prepared contexts kept in memory and on disk
+MEMORY_CACHE_SIZE = 8
+DISK_CACHE_SIZE = 16
+
+# Smaller contexts are cheaper to prepare again than to read back
+DISK_CACHE_MIN_BYTES = 64 * 1024
+
+_memory_cache: OrderedDict[str, "PreparedContext"] = OrderedDict()
+
+_DIRECTIVE_RE = re.compile(r"^[ \t\r\f\v]*#", re.MULTILINE)
+_STATIC_ASSERT_LINE_RE = re.compile(r"^[ \t\r\f\v]*_Static_assert", re.MULTILINE)
+
+
+@dataclass
+class PreparedContext:
+    """Both versions of a context, and what each stage changed."""
+    mwcc: str
+    m2c: str | None = None  # None unless requested
+    stripped: dict[str, int] = field(default_factory=dict)  # Stage name -> definitions replaced
+
+
+# =============================================================================
+# Stages
+# =============================================================================
+
+
+class ContextStage(ABC):
+    """One rewrite of function definitions in the shared walk.
+
+    Subclasses implement rewrite(), which sees every named function
+    definition and returns replacement text or None. Stages earlier in the
+    list get first pick of a definition.
+    """
+
+    name = ""
+
+    @property
+    def key(self) -> str:
+        """Identifies the stage and its options in the cache key."""
+        return self.name
+
+    def applies(self, context: str) -> bool:
+        """Cheap check whether the stage could change context at all."""
+        return True
+
+    @abstractmethod
+    def rewrite(self, name: str, node, source: bytes) -> str | None:
+        """Replacement text for one function definition, or None to keep it."""
+
+    def fallback(self, context: str) -> tuple[str, int]:
+        """Text-based version for when tree-sitter isn't available."""
+        return context, 0
+
+
+class StripFunctionBodies(ContextStage):
+    """Turn every function definition into a prototype (prevents auto-inlining)."""
+
+    name = "bodies"
+
+    def __init__(self, keep_functions: set[str] | None = None):
+        self.keep_functions = set(keep_functions or ())
+
+    @property
+    def key(self) -> str:
+        return f"{self.name}:{','.join(sorted(self.keep_functions))}"
+
+    def rewrite(self, name: str, node, source: bytes) -> str | None:
+        if name in self.keep_functions:
+            return None
+        return function_prototype(node, source)
+
+    def fallback(self, context: str) -> tuple[str, int]:
+        from src.cli.extract import _strip_all_function_bodies_regex
+        return _strip_all_function_bodies_regex(context, self.keep_functions)
+
+
+class StripInlineBodies(ContextStage):
+    """Turn only inline function definitions into prototypes."""
+
+    name = "inline"
+
+    def applies(self, context: str) -> bool:
+        return "inline" in context
+
+    def rewrite(self, name: str, node, source: bytes) -> str | None:
+        body = node.child_by_field_name("body")
+        head = source[node.start_byte : body.start_byte if body else node.end_byte]
+        if not re.search(rb"\binline\b", head):
+            return None
+        return function_prototype(node, source, comment="// body stripped")
+
+    def fallback(self, context: str) -> tuple[str, int]:
+        from src.cli.extract import _strip_inline_functions
+        return _strip_inline_functions(context)
+
+
+class StripTargetFunction(ContextStage):
+    """Remove the definition of the function being decompiled."""
+
+    name = "target"
+
+    def __init__(self, func_name: str):
+        self.func_name = func_name
+        self._definition_re = re.compile(rf"\b{re.escape(func_name)}\s*\([^;{{}}]*\)\s*\{{")
+
+    @property
+    def key(self) -> str:
+        return f"{self.name}:{self.func_name}"
+
+    def applies(self, context: str) -> bool:
+        # Usually only a prototype is present, which leaves the context
+        # (and its cache entry) independent of the function
+        return self.func_name in context and self._definition_re.search(context) is not None
+
+    def rewrite(self, name: str, node, source: bytes) -> str | None:
+        if name != self.func_name:
+            return None
+        return f"// {self.func_name} definition stripped"
+
+    def fallback(self, context: str) -> tuple[str, int]:
+        from src.cli.extract import _strip_target_function
+        result = _strip_target_function(context, self.func_name)
+        return result, int(result != context)
+
+
+# =============================================================================
+# m2c preprocessing
+# =============================================================================
+
+
+def strip_static_asserts(context: str) -> str:
+    """Comment out _Static_assert statements, which m2c cannot parse.
+
+    Handles both single-line and multi-line statements:
+        _Static_assert(sizeof(Foo) == 8, "message");
+        _Static_assert((sizeof(struct Bar) == 0x96000), "("
+        "continuation" ") failed");
+
+    Only the lines of each statement are looked at; the rest of the context
+    is copied through in slices. Line count is preserved.
+    """
+    if "_Static_assert" not in context:
+        return context
+
+    parts = []
+    pos = 0
+    for match in _STATIC_ASSERT_LINE_RE.finditer(context):
+        line_start = match.start()
+        if line_start < pos:
+            continue  # Inside a multi-line statement already handled
+        parts.append(context[pos:line_start])
+
+        line_end = context.find("\n", line_start)
+        if line_end < 0:
+            line_end = len(context)
+        line = context[line_start:line_end]
+        depth = line.count("(") - line.count(")")
+        if depth == 0 and ";" in line[line.find("_Static_assert"):]:
+            parts.append(f"/* {line.strip()} - removed for m2c */")
+            pos = line_end
+            continue
+
+        comment = ["/* _Static_assert removed for m2c:"]
+        while line_end < len(context):
+            line_start = line_end + 1
+            line_end = context.find("\n", line_start)
+            if line_end < 0:
+                line_end = len(context)
+            line = context[line_start:line_end]
+            depth += line.count("(") - line.count(")")
+            if depth <= 0 and ";" in line:
+                comment.append(f"   {line.strip()} */")
+                break
+            comment.append(f"   {line.strip()}")
+        parts.append("\n".join(comment))
+        pos = line_end
+
+    parts.append(context[pos:])
+    return "".join(parts)
+
+
+def preprocess_for_m2c(context: str) -> str:
+    """Expand directives with gcc -E and strip _Static_assert.
+
+    Falls back to the unexpanded context if gcc is missing or fails.
+    _Static_assert is stripped after expansion since STATIC_ASSERT macros
+    expand to it.
+    """
+    if not context or not context.strip():
+        return context
+
+    if _DIRECTIVE_RE.search(context):
+        try:
+            # -P removes line markers, -nostdinc avoids system headers
+            result = subprocess.run(
+                ["gcc", "-E", "-P", "-nostdinc", "-x", "c", "-"],
+                input=context,
+                capture_output=True,
+                text=True,
+                timeout=30,
+            )
+            if result.returncode == 0:
+                context = result.stdout
+        except (subprocess.TimeoutExpired, FileNotFoundError, OSError):
+            pass  # Continue with original context
+
+    return strip_static_asserts(context)
+
+
+# =============================================================================
+# Pipeline
+# =============================================================================
+
+
+def _cache_key(context: str, stages: list[ContextStage], m2c: bool) -> str:
+    h = hashlib.sha256()
+    h.update(f"{CONTEXT_CACHE_VERSION}\0{TREE_SITTER_AVAILABLE}\0{m2c}\0".encode())
+    for stage in stages:
+        h.update(stage.key.encode() + b"\0")
+    h.update(context.encode("utf-8", errors="surrogatepass"))
+    return h.hexdigest()
+
+
+def _load_cached(key: str) -> PreparedContext | None:
+    try:
+        with open(CONTEXT_CACHE_DIR / f"{key}.json") as f:
+            return PreparedContext(**json.load(f))
+    except (OSError, json.JSONDecodeError, TypeError):
+        return None
+
+
+def _save_cached(key: str, prepared: PreparedContext) -> None:
+    path = CONTEXT_CACHE_DIR / f"{key}.json"
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    try:
+        CONTEXT_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        tmp.write_text(json.dumps(asdict(prepared)))
+        os.replace(tmp, path)
+
+        entries = sorted(CONTEXT_CACHE_DIR.glob("*.json"), key=lambda p: p.stat().st_mtime)
+        for old in entries[:-DISK_CACHE_SIZE]:
+            old.unlink(missing_ok=True)
+    except OSError:
+        tmp.unlink(missing_ok=True)
+
+
+def prepare_context(
+    context: str,
+    stages: list[ContextStage] | None = None,
+    m2c: bool = True,
+) -> PreparedContext:
+    """Run the stages over a context and derive the m2c version.
+
+    Args:
+        context: Raw context (e.g. ctx.c)
+        stages: Definition rewrites, in order of precedence
+        m2c: Also produce the gcc -E'd version for m2c
+
+    Returns:
+        PreparedContext; cached by context and stages
+    """
+    stages = [stage for stage in (stages or []) if stage.applies(context)]
+    key = _cache_key(context, stages, m2c)
+
+    cached = _memory_cache.get(key)
+    if cached is not None:
+        _memory_cache.move_to_end(key)
+        return cached
+    use_disk = len(context) >= DISK_CACHE_MIN_BYTES
+    cached = _load_cached(key) if use_disk else None
+
+    if cached is None:
+        mwcc = context
+        stripped = {}
+        if stages and TREE_SITTER_AVAILABLE:
+            mwcc, counts = rewrite_function_definitions(
+                context, [stage.rewrite for stage in stages]
+            )
+            stripped = {stage.name: count for stage, count in zip(stages, counts) if count}
+        else:
+            for stage in stages:
+                mwcc, count = stage.fallback(mwcc)
+                if count:
+                    stripped[stage.name] = count
+
+        cached = PreparedContext(
+            mwcc=mwcc,
+            m2c=preprocess_for_m2c(mwcc) if m2c else None,
+            stripped=stripped,
+        )
+        if use_disk:
+            _save_cached(key, cached)
+    elif use_disk:
+        try:
+            (CONTEXT_CACHE_DIR / f"{key}.json").touch()  # Keep it from being trimmed
+        except OSError:
+            pass
+
+    _memory_cache[key] = cached
+    while len(_memory_cache) > MEMORY_CACHE_SIZE:
+        _memory_cache.popitem(last=False)
+    return cached
@@ -21,6 +21,14 @@ from ._common import (
     get_compiler_for_source,
 )
 
+from src.hooks.c_scanner import (
+    FunctionSpan,
+    count_braces,
+    definition_at,
+    function_spans,
+    line_bounds,
+)
+
 # Try to import tree-sitter based functions for better accuracy
 try:
     from src.hooks.c_analyzer import (
@@ -55,34 +63,51 @@ def _count_braces(line: str) -> tuple[int, int]:
     Returns:
         Tuple of (open_count, close_count)
     """
-    # Remove // comments
-    comment_pos = line.find('//')
-    if comment_pos != -1:
-        line = line[:comment_pos]
-
-    # Remove string literals (handle escaped quotes)
-    result = []
-    in_string = False
-    string_char = None
-    i = 0
-    while i < len(line):
-        c = line[i]
-        if in_string:
-            if c == '\\' and i + 1 < len(line):
-                i += 2  # Skip escaped character
-                continue
-            if c == string_char:
-                in_string = False
-        else:
-            if c in '"\'':
-                in_string = True
-                string_char = c
-            else:
-                result.append(c)
-        i += 1
+    return count_braces(line)
+
+
+def _function_signature(context: str, span: FunctionSpan) -> str:
+    """Get a definition's signature as one line, without static/inline.
+
+    Static declarations without bodies cause MWCC to expect '{', and inline
+    is invalid in C89 without a body.
+    """
+    import re
+
+    header = context[span.start:span.body_start]
+    sig = ' '.join(line.strip() for line in header.split('\n')).rstrip()
+    sig = re.sub(r'\bstatic\s+', '', sig)
+    return re.sub(r'\binline\s+', '', sig)
 
-    cleaned = ''.join(result)
-    return cleaned.count('{'), cleaned.count('}')
+
+def _replace_function_lines(context: str, spans: list[FunctionSpan], replace) -> tuple[str, int]:
+    """Replace the lines of each function span with replace(span).
+
+    Spans whose replacement is None, or that don't begin their line, are
+    left alone. The whole last line goes with the function, matching how
+    the line-based strippers behaved.
+
+    Returns:
+        Tuple of (new context, number of spans replaced)
+    """
+    parts = []
+    pos = 0
+    count = 0
+    for span in spans:
+        line_start, line_end = line_bounds(context, span.start, span.end - 1)
+        if line_start < pos or context[line_start:span.start].strip():
+            continue
+        replacement = replace(span)
+        if replacement is None:
+            continue
+        parts.append(context[pos:line_start])
+        parts.append(replacement)
+        pos = line_end
+        count += 1
+    if not count:
+        return context, 0
+    parts.append(context[pos:])
+    return ''.join(parts), count
 
 
 def _strip_inline_functions(context: str) -> tuple[str, int]:
@@ -96,78 +121,26 @@ def _strip_inline_functions(context: str) -> tuple[str, int]:
     """
     import re
 
-    lines = context.split('\n')
-    filtered = []
-    in_inline = False
-    depth = 0
-    stripped_count = 0
-    signature_lines = []
-
-    # Pattern to detect inline function definitions (not declarations ending with ;)
-    inline_pattern = re.compile(r'^(?:static\s+)?inline\s+')
-
-    for line in lines:
-        stripped = line.strip()
-
-        if not in_inline:
-            # Check if this line starts an inline function definition
-            if inline_pattern.match(stripped):
-                # Skip if it's just a declaration (ends with ;)
-                if stripped.endswith(';'):
-                    filtered.append(line)
-                    continue
-
-                # This is a definition - collect the signature
-                in_inline = True
-                signature_lines = [stripped]
-                open_braces, close_braces = _count_braces(line)
-                depth = open_braces - close_braces
-                stripped_count += 1
-
-                # If opening brace is on this line, we have the full signature
-                if open_braces > 0:
-                    # Extract signature up to the brace
-                    sig = stripped[:stripped.find('{')].rstrip()
-                    # Remove 'inline' and 'static' keywords - static declarations without
-                    # bodies cause MWCC to expect '{', and inline is invalid in C89 without body
-                    sig = re.sub(r'\bstatic\s+', '', sig)
-                    sig = re.sub(r'\binline\s+', '', sig)
-                    filtered.append(sig + ';  // body stripped')
-                    signature_lines = []
-
-                    if depth <= 0:
-                        in_inline = False
-                continue
-
-        if in_inline:
-            # Still collecting signature or skipping body
-            open_braces, close_braces = _count_braces(line)
-            if depth == 0 and '{' not in ''.join(signature_lines):
-                # Still in multi-line signature
-                signature_lines.append(stripped)
-                if open_braces > 0:
-                    # Found the opening brace - emit declaration
-                    full_sig = ' '.join(signature_lines)
-                    sig = full_sig[:full_sig.find('{')].rstrip()
-                    # Remove 'inline' and 'static' keywords - static declarations without
-                    # bodies cause MWCC to expect '{', and inline is invalid in C89 without body
-                    sig = re.sub(r'\bstatic\s+', '', sig)
-                    sig = re.sub(r'\binline\s+', '', sig)
-                    filtered.append(sig + ';  // body stripped')
-                    signature_lines = []
-                    depth = open_braces - close_braces
-                    if depth <= 0:
-                        in_inline = False
-                continue
-
-            depth += open_braces - close_braces
-            if depth <= 0:
-                in_inline = False
+    if 'inline' not in context:
+        return context, 0
+
+    # Lines starting with `inline` or `static inline`; only definitions (not
+    # declarations ending with ;) have a span
+    spans = []
+    for match in re.finditer(r'inline\s', context):
+        line_start = context.rfind('\n', 0, match.start()) + 1
+        if spans and line_start < spans[-1].end:
+            continue  # Inside the previous definition
+        if context[line_start:match.start()].split() not in ([], ['static']):
             continue
+        span = definition_at(context, line_start)
+        if span is not None:
+            spans.append(span)
 
-        filtered.append(line)
+    def strip(span: FunctionSpan) -> str:
+        return _function_signature(context, span) + ';  // body stripped'
 
-    return '\n'.join(filtered), stripped_count
+    return _replace_function_lines(context, spans, strip)
 
 
 def _strip_all_function_bodies(context: str, keep_functions: set[str] | None = None) -> tuple[str, int]:
@@ -178,7 +151,7 @@ def _strip_all_function_bodies(context: str, keep_functions: set[str] | None = N
     compiler from auto-inlining functions with -inline auto.
 
     Uses tree-sitter for accurate parsing when available, falling back to
-    regex-based heuristics otherwise. Tree-sitter properly distinguishes
+    a lexical scanner otherwise. Tree-sitter properly distinguishes
     function bodies from struct/union bodies and typedefs.
 
     Args:
@@ -192,127 +165,25 @@ def _strip_all_function_bodies(context: str, keep_functions: set[str] | None = N
     if TREE_SITTER_AVAILABLE and _ts_strip_function_bodies is not None:
         return _ts_strip_function_bodies(context, keep_functions)
 
-    # Fallback to regex-based approach
+    # Fallback to the scanner-based approach
     return _strip_all_function_bodies_regex(context, keep_functions)
 
 
 def _strip_all_function_bodies_regex(context: str, keep_functions: set[str] | None = None) -> tuple[str, int]:
-    """Regex-based function body stripping (fallback when tree-sitter unavailable).
+    """Scanner-based function body stripping (fallback when tree-sitter unavailable).
 
-    WARNING: This can incorrectly strip struct/union bodies in some edge cases.
-    Prefer tree-sitter based stripping when possible.
+    A block only counts as a function body when the text before it ends with
+    a parameter list, so struct/union bodies and initializers are kept. Prefer
+    tree-sitter based stripping when possible, which also copes with macros.
     """
-    import re
+    keep_functions = keep_functions or set()
 
-    if keep_functions is None:
-        keep_functions = set()
-
-    lines = context.split('\n')
-    filtered = []
-    in_func = False
-    in_signature = False
-    depth = 0
-    stripped_count = 0
-    signature_lines = []
-    current_func_name = None
-
-    # Pattern to detect function definitions:
-    # - Starts with optional storage class (static, extern, inline)
-    # - Has a return type (void, int, s32, struct X*, etc.)
-    # - Has a function name followed by (
-    # - Does NOT end with ; (that would be a declaration)
-    # Matches: "void func(", "static int foo(", "struct X* bar(", etc.
-    func_def_pattern = re.compile(
-        r'^(?:static\s+)?(?:inline\s+)?'  # optional static/inline
-        r'(?:(?:const\s+)?'  # optional const
-        r'(?:struct\s+\w+\s*\*?|union\s+\w+\s*\*?|enum\s+\w+|'  # struct/union/enum types
-        r'unsigned\s+\w+|signed\s+\w+|'  # unsigned/signed types
-        r'\w+)\s*\**\s+)'  # other types with optional pointer
-        r'(\w+)\s*\('  # function name and opening paren
-    )
+    def strip(span: FunctionSpan) -> str | None:
+        if span.name in keep_functions:
+            return None
+        return _function_signature(context, span) + ';  /* body stripped: auto-inline prevention */'
 
-    for line in lines:
-        stripped = line.strip()
-
-        if not in_func and not in_signature:
-            # Check if this is a function definition
-            match = func_def_pattern.match(stripped)
-            if match and not stripped.endswith(';'):
-                func_name = match.group(1)
-
-                # Skip if this function should be kept
-                if func_name in keep_functions:
-                    filtered.append(line)
-                    continue
-
-                # Skip if line looks like a declaration or forward ref
-                # (ends with ); after possible multi-line)
-                if stripped.endswith(');'):
-                    filtered.append(line)
-                    continue
-
-                # This is a function definition - start stripping
-                in_signature = True
-                signature_lines = [stripped]
-                current_func_name = func_name
-                stripped_count += 1
-
-                open_braces, close_braces = _count_braces(line)
-                if open_braces > 0:
-                    # Found the opening brace - emit declaration and enter body
-                    sig = stripped[:stripped.find('{')].rstrip()
-                    # Remove 'inline' and 'static' keywords - static declarations without
-                    # bodies cause MWCC to expect '{', and inline is invalid in C89 without body
-                    sig = re.sub(r'\bstatic\s+', '', sig)
-                    sig = re.sub(r'\binline\s+', '', sig)
-                    filtered.append(sig + ';  /* body stripped: auto-inline prevention */')
-                    in_signature = False
-                    in_func = True
-                    depth = open_braces - close_braces
-                    signature_lines = []
-                    if depth <= 0:
-                        in_func = False
-                        current_func_name = None
-                continue
-
-        if in_signature:
-            # Collecting multi-line signature
-            signature_lines.append(stripped)
-            open_braces, close_braces = _count_braces(line)
-            if open_braces > 0:
-                # Found the opening brace - emit declaration
-                full_sig = ' '.join(signature_lines)
-                sig_end = full_sig.find('{')
-                if sig_end > 0:
-                    sig = full_sig[:sig_end].rstrip()
-                else:
-                    sig = full_sig.rstrip()
-                # Remove 'inline' and 'static' keywords - static declarations without
-                # bodies cause MWCC to expect '{', and inline is invalid in C89 without body
-                sig = re.sub(r'\bstatic\s+', '', sig)
-                sig = re.sub(r'\binline\s+', '', sig)
-                filtered.append(sig + ';  /* body stripped: auto-inline prevention */')
-                in_signature = False
-                in_func = True
-                depth = open_braces - close_braces
-                signature_lines = []
-                if depth <= 0:
-                    in_func = False
-                    current_func_name = None
-            continue
-
-        if in_func:
-            # Inside function body - skip lines until we exit
-            open_braces, close_braces = _count_braces(line)
-            depth += open_braces - close_braces
-            if depth <= 0:
-                in_func = False
-                current_func_name = None
-            continue
-
-        filtered.append(line)
-
-    return '\n'.join(filtered), stripped_count
+    return _replace_function_lines(context, function_spans(context), strip)
 
 
 def _strip_target_function(context: str, func_name: str) -> str:
@@ -340,81 +211,22 @@ def _strip_target_function(context: str, func_name: str) -> str:
     if TREE_SITTER_AVAILABLE and _ts_strip_target_function is not None:
         return _ts_strip_target_function(context, func_name)
 
-    lines = context.split('\n')
-    filtered = []
-    in_func = False
-    in_signature = False  # True when we've seen the function name but not yet the opening {
-    depth = 0
-
-    for line in lines:
-        if not in_func and not in_signature and func_name in line and '(' in line:
-            s = line.strip()
-            # Skip comments, control flow
-            if s.startswith('//') or s.startswith('if') or s.startswith('while'):
-                filtered.append(line)
-                continue
-            # Keep declarations (prototypes) - they end with );
-            if s.endswith(';'):
-                filtered.append(line)
-                continue
-            # Check if this is a function CALL vs DEFINITION
-            # A definition has a return type before the function name
-            # A call starts with the function name (possibly with leading whitespace)
-            # Also check for assignment (function pointer) or control flow
-            func_pos = s.find(func_name)
-            if func_pos > 0:
-                before_func = s[:func_pos].rstrip()
-                # If there's only whitespace before the function name, it's a call
-                if not before_func:
-                    filtered.append(line)
-                    continue
-                # If it's inside a block, after operator, or in a call, it's not a definition
-                # { = inside function body, ( = inside call/condition, etc.
-                if before_func.endswith(('=', ',', '(', '{', '!', '&', '|', '?', ':', ';')):
-                    filtered.append(line)
-                    continue
-                # If it ends with a keyword/operator, it's likely a call context
-                if before_func.endswith(('return', 'case')):
-                    filtered.append(line)
-                    continue
-            elif func_pos == 0:
-                # Function name at start of stripped line = likely a call
-                filtered.append(line)
-                continue
-            # This is a function definition (has return type before name)
-            filtered.append(f'// {func_name} definition stripped')
-            open_b, close_b = _count_braces(line)
-            if open_b > 0:
-                # Opening brace on same line - we're in the body
-                in_func = True
-                depth = open_b - close_b
-                if depth <= 0:
-                    in_func = False
-            else:
-                # No brace yet - we're in a multi-line signature
-                in_signature = True
-            continue
-        if in_signature:
-            # Still looking for the opening brace
-            open_b, close_b = _count_braces(line)
-            if open_b > 0:
-                # Found the opening brace - now we're in the body
-                in_signature = False
-                in_func = True
-                depth = open_b - close_b
-                if depth <= 0:
-                    in_func = False
-            # Either way, skip this line (it's part of the signature or opening brace)
-            continue
-        if in_func:
-            open_b, close_b = _count_braces(line)
-            depth += open_b - close_b
-            if depth <= 0:
-                in_func = False
+    import re
+
+    # Only lines mentioning the function can start its definition
+    spans = []
+    for match in re.finditer(rf'\b{re.escape(func_name)}\s*\(', context):
+        line_start = context.rfind('\n', 0, match.start()) + 1
+        if spans and line_start < spans[-1].end:
             continue
-        filtered.append(line)
+        span = definition_at(context, line_start)
+        if span is not None and span.name == func_name:
+            spans.append(span)
+
+    def strip(span: FunctionSpan) -> str:
+        return f'// {func_name} definition stripped'
 
-    return '\n'.join(filtered)
+    return _replace_function_lines(context, spans, strip)[0]
 
 
 extract_app = typer.Typer(help="Extract and list unmatched functions")
@@ -1087,6 +899,7 @@ def extract_get(
 
         # Always rebuild context to pick up header changes
         import subprocess
+        from src.commit.buildd import run_ninja
         # Build the context file - need relative path from melee_root
         try:
             ctx_relative = ctx_path.relative_to(melee_root)
@@ -1106,19 +919,13 @@ def extract_get(
                 raise typer.Exit(1)
 
         try:
-            result = subprocess.run(
-                ["ninja", str(ctx_relative)],
-                cwd=ninja_cwd,
-                capture_output=True,
-                text=True,
-                timeout=120,
-            )
-            if result.returncode != 0:
+            returncode, stdout, stderr = run_ninja(ninja_cwd, [str(ctx_relative)], timeout=120)
+            if returncode != 0:
                 console.print(f"[red]Failed to build context file:[/red]")
-                console.print(result.stderr or result.stdout)
+                console.print(stderr or stdout)
                 raise typer.Exit(1)
             # Only show message if ninja actually did something
-            if "no work to do" not in result.stdout.lower():
+            if "no work to do" not in stdout.lower():
                 console.print(f"[green]Built context file[/green]")
         except subprocess.TimeoutExpired:
             console.print(f"[red]Timeout building context file[/red]")
@@ -1134,21 +941,32 @@ def extract_get(
         melee_context = ctx_path.read_text()
         console.print(f"\n[dim]Loaded {len(melee_context):,} bytes of context[/dim]")
 
-        # Strip function bodies to reduce context pollution
+        # Strip function bodies to reduce context pollution, and the function's
+        # own definition (keeping its declaration) to avoid redefinition errors.
+        # All stages share one parse; the m2c version is derived at the same time.
+        from src.cli.context import (
+            StripFunctionBodies,
+            StripInlineBodies,
+            StripTargetFunction,
+            prepare_context,
+        )
+
+        stages = []
         if strip_all_bodies:
             # Strip ALL function bodies - prevents -inline auto from inlining anything
-            melee_context, body_count = _strip_all_function_bodies(melee_context)
-            if body_count > 0:
-                console.print(f"[dim]Stripped {body_count} function bodies (aggressive mode)[/dim]")
+            stages.append(StripFunctionBodies())
         elif strip_inline:
             # Only strip explicitly inline function bodies
-            melee_context, inline_count = _strip_inline_functions(melee_context)
-            if inline_count > 0:
-                console.print(f"[dim]Stripped {inline_count} inline function bodies[/dim]")
-
-        # Strip function definition (but keep declaration) to avoid redefinition errors
-        if func.name in melee_context:
-            melee_context = _strip_target_function(melee_context, func.name)
+            stages.append(StripInlineBodies())
+        stages.append(StripTargetFunction(func.name))
+
+        prepared = prepare_context(melee_context, stages, m2c=auto_decompile)
+        melee_context = prepared.mwcc
+        if prepared.stripped.get("bodies"):
+            console.print(f"[dim]Stripped {prepared.stripped['bodies']} function bodies (aggressive mode)[/dim]")
+        if prepared.stripped.get("inline"):
+            console.print(f"[dim]Stripped {prepared.stripped['inline']} inline function bodies[/dim]")
+        if prepared.stripped.get("target"):
             console.print(f"[dim]Stripped {func.name} definition from context[/dim]")
 
         # Detect correct compiler for this source file
@@ -1199,8 +1017,9 @@ def extract_get(
                         except Exception:
                             pass
                     # Update forked scratch with fresh context from local build
+                    from src.cli.scratch import _context_fields
                     try:
-                        await client.update_scratch(scratch.slug, ScratchUpdate(context=melee_context))
+                        await client.update_scratch(scratch.slug, ScratchUpdate(**await _context_fields(client, melee_context)))
                         console.print(f"[dim]Updated forked scratch with fresh context[/dim]")
                     except Exception as e:
                         console.print(f"[yellow]Warning: Could not update context: {e}[/yellow]")
@@ -1208,23 +1027,21 @@ def extract_get(
 
                 # No existing scratch found - create new
                 console.print(f"[dim]No existing scratches found, creating new...[/dim]")
+                from src.cli.scratch import _context_fields
 
                 # If auto-decompiling, preprocess context to remove preprocessor directives
                 # that m2c can't handle. Use preprocessed for decompilation, but restore
                 # original context afterward for compilation (compiler handles directives fine)
                 decompile_context = melee_context
-                if auto_decompile and melee_context:
-                    from src.cli.scratch import _preprocess_context
-                    preprocessed, success = _preprocess_context(melee_context)
-                    if success and preprocessed != melee_context:
-                        decompile_context = preprocessed
-                        console.print(f"[dim]Preprocessed context for m2c ({len(melee_context):,} → {len(preprocessed):,} bytes)[/dim]")
+                if auto_decompile and prepared.m2c != melee_context:
+                    decompile_context = prepared.m2c
+                    console.print(f"[dim]Preprocessed context for m2c ({len(melee_context):,} → {len(decompile_context):,} bytes)[/dim]")
 
                 # Build scratch params - omit source_code to trigger auto-decompilation
                 scratch_params = ScratchCreate(
                     name=func.name,
                     target_asm=func.asm,
-                    context=decompile_context if auto_decompile else melee_context,
+                    **await _context_fields(client, decompile_context if auto_decompile else melee_context),
                     compiler=compiler,
                     compiler_flags="-O4,p -nodefaults -fp hard -Cpp_exceptions off -enum int -fp_contract on -inline auto",
                     diff_label=func.name,
@@ -1256,7 +1073,7 @@ def extract_get(
                 # - Assert macro expansions cause type mismatches
                 if auto_decompile and decompile_context != melee_context:
                     try:
-                        await client.update_scratch(scratch.slug, ScratchUpdate(context=melee_context))
+                        await client.update_scratch(scratch.slug, ScratchUpdate(**await _context_fields(client, melee_context)))
                         console.print(f"[dim]Restored original context for MWCC[/dim]")
                     except Exception as e:
                         console.print(f"[yellow]Warning: Could not restore context: {e}[/yellow]")
@@ -0,0 +1,230 @@
+"""Permute commands - run decomp-permuter on scratches."""
+
+import asyncio
+from pathlib import Path
+from typing import Annotated
+
+import typer
+
+from ._common import (
+    DECOMP_CONFIG_DIR,
+    DEFAULT_MELEE_ROOT,
+    console,
+    format_match_history,
+    get_local_api_url,
+    record_match_score,
+)
+
+permute_app = typer.Typer(help="Run decomp-permuter on scratches")
+
+# Permuter directories, one per scratch
+PERMUTER_WORK_DIR = DECOMP_CONFIG_DIR / "permuter"
+
+
+async def _prepare(client, slug: str, melee_root: Path, directory: Path):
+    """Fetch a scratch and write its permuter directory."""
+    from src.client import prepare_permuter_dir
+    from src.client.local import fetch_local_scratch
+
+    local = await fetch_local_scratch(client, slug, melee_root)
+    await prepare_permuter_dir(directory, local, melee_root)
+    return local
+
+
+async def _push_candidate(client, slug: str, source_code: str):
+    """Update the scratch with a candidate and have decomp.me score it.
+
+    Returns:
+        CompilationResult, or None if the scratch couldn't be updated
+    """
+    from src.client import DecompMeAPIError, ScratchUpdate
+
+    from .scratch import _handle_403_error
+
+    try:
+        await client.update_scratch(slug, ScratchUpdate(source_code=source_code))
+    except DecompMeAPIError as e:
+        if "403" not in str(e) or not await _handle_403_error(client, slug, e, "update"):
+            console.print(f"[yellow]Could not update {slug}: {e}[/yellow]")
+            return None
+        await client.update_scratch(slug, ScratchUpdate(source_code=source_code))
+    return await client.compile_scratch(slug, save_score=True)
+
+
+@permute_app.command("prepare")
+def permute_prepare(
+    slug: Annotated[str, typer.Argument(help="Scratch slug/ID")],
+    melee_root: Annotated[
+        Path, typer.Option("--melee-root", "-m", help="Path to melee submodule")
+    ] = DEFAULT_MELEE_ROOT,
+    directory: Annotated[
+        Path | None,
+        typer.Option(
+            "--dir", "-d", help="Permuter directory (default: ~/.config/decomp-me/permuter/<slug>)"
+        ),
+    ] = None,
+    api_url: Annotated[
+        str | None, typer.Option("--api-url", help="Decomp.me API URL (auto-detected)")
+    ] = None,
+):
+    """Write a decomp-permuter directory for a scratch without running it.
+
+    The directory has the scratch's source and context (base.c), the target
+    from the melee build (target.s, target.o), and compile.sh and
+    settings.toml built from permuter_settings.toml.
+    """
+    from src.client import DecompMeAPIClient, DecompMeAPIError, LocalCompileError, PermuterError
+
+    api_url = api_url or get_local_api_url()
+    directory = directory or PERMUTER_WORK_DIR / slug
+
+    async def prepare():
+        async with DecompMeAPIClient(base_url=api_url) as client:
+            return await _prepare(client, slug, melee_root, directory)
+
+    try:
+        asyncio.run(prepare())
+    except (DecompMeAPIError, LocalCompileError, PermuterError) as e:
+        console.print(f"[red]Error: {e}[/red]")
+        raise typer.Exit(1)
+
+    console.print(f"[green]Prepared[/green] {directory}")
+    console.print(f"[dim]Run: melee-agent permute run {slug} --dir {directory}[/dim]")
+
+
+@permute_app.command("run")
+def permute_run(
+    slug: Annotated[str, typer.Argument(help="Scratch slug/ID")],
+    melee_root: Annotated[
+        Path, typer.Option("--melee-root", "-m", help="Path to melee submodule")
+    ] = DEFAULT_MELEE_ROOT,
+    directory: Annotated[
+        Path | None,
+        typer.Option(
+            "--dir", "-d", help="Permuter directory (default: ~/.config/decomp-me/permuter/<slug>)"
+        ),
+    ] = None,
+    jobs: Annotated[
+        int | None, typer.Option("--jobs", "-j", help="Permuter threads (default: CPU count)")
+    ] = None,
+    remote: Annotated[
+        bool, typer.Option("--remote", "-J", help="Also use permuter@home workers on other hosts")
+    ] = False,
+    budget: Annotated[
+        int, typer.Option("--budget", "-b", help="Seconds to run before stopping")
+    ] = 1800,
+    push: Annotated[
+        bool,
+        typer.Option(
+            "--push/--no-push", help="Update the scratch with candidates decomp.me scores better"
+        ),
+    ] = False,
+    permuter_dir: Annotated[
+        Path | None,
+        typer.Option("--permuter", help="decomp-permuter checkout (default: $DECOMP_PERMUTER_DIR)"),
+    ] = None,
+    api_url: Annotated[
+        str | None, typer.Option("--api-url", help="Decomp.me API URL (auto-detected)")
+    ] = None,
+):
+    """Run decomp-permuter on a scratch until it matches or the budget runs out.
+
+    Prepares the permuter directory (as `permute prepare` does), runs the
+    permuter across --jobs cores, and records each new best score in the
+    match history. Candidates are left in output-*/source.c.
+
+    With --push, each new best candidate's version of the function replaces
+    the one in the scratch source and decomp.me rescores it. The candidate
+    is kept only if decomp.me's score beats the scratch's previous score;
+    otherwise the previous source is put back.
+
+    Examples:
+        melee-agent permute run abc12 -j 16 --budget 3600
+
+        # Update the scratch as better candidates come in
+        melee-agent permute run abc12 --push
+    """
+    from contextlib import aclosing
+
+    from src.client import (
+        DecompMeAPIClient,
+        DecompMeAPIError,
+        LocalCompileError,
+        Permuter,
+        PermuterError,
+    )
+    from src.client.asmdiff import PENALTY_DELETION, parse_target_asm
+    from src.client.permuter import apply_candidate
+
+    api_url = api_url or get_local_api_url()
+    directory = directory or PERMUTER_WORK_DIR / slug
+
+    async def run():
+        async with DecompMeAPIClient(base_url=api_url) as client:
+            scratch = await client.get_scratch(slug)
+            local = await _prepare(client, slug, melee_root, directory)
+            if scratch.score == 0:
+                console.print("[green]Scratch already matches[/green]")
+                return None
+
+            target = parse_target_asm(local.target_asm)
+            max_score = len(target) * PENALTY_DELETION if target else scratch.max_score
+            best_score = scratch.score if scratch.score > 0 else None
+            console.print(
+                f"[bold]Permuting {local.function_name}[/bold] "
+                f"(score {scratch.score}, budget {budget}s) in {directory}"
+            )
+
+            permuter = Permuter(directory, jobs=jobs, remote=remote, permuter_dir=permuter_dir)
+            best = None
+            # What decomp.me has for the scratch; only replaced by a better-scoring push
+            kept_source, kept_score = scratch.source_code, scratch.score
+            improvements = permuter.improvements(best_score, time_budget=budget)
+            async with aclosing(improvements):
+                async for candidate in improvements:
+                    best = candidate
+                    console.print(
+                        f"[green]New best: {candidate.score}[/green] [dim]{candidate.path}[/dim]"
+                    )
+                    source = apply_candidate(candidate.source, kept_source, local.function_name)
+                    if not push or source == kept_source:
+                        record_match_score(slug, candidate.score, max_score)
+                        continue
+
+                    result = await _push_candidate(client, slug, source)
+                    diff = result.diff_output if result is not None and result.success else None
+                    if diff is not None and (kept_score < 0 or diff.current_score < kept_score):
+                        kept_source, kept_score = source, diff.current_score
+                        record_match_score(slug, diff.current_score, diff.max_score)
+                        console.print(f"[dim]Pushed to {slug}: decomp.me score {kept_score}[/dim]")
+                        continue
+
+                    record_match_score(slug, candidate.score, max_score)
+                    if result is not None:
+                        await _push_candidate(client, slug, kept_source)
+                        scored = diff.current_score if diff is not None else "a failed compile"
+                        console.print(
+                            f"[yellow]decomp.me scored the candidate {scored}, not better than "
+                            f"{kept_score}; restored the previous source[/yellow]"
+                        )
+            return best
+
+    try:
+        best = asyncio.run(run())
+    except (DecompMeAPIError, LocalCompileError, PermuterError) as e:
+        console.print(f"[red]Error: {e}[/red]")
+        raise typer.Exit(1)
+    except KeyboardInterrupt:
+        console.print("[yellow]Stopped[/yellow]")
+        raise typer.Exit(130)
+
+    if best is None:
+        console.print("[yellow]No improvement found[/yellow]")
+        return
+    if best.score == 0:
+        console.print(f"[bold green]Perfect match![/bold green] {best.path / 'source.c'}")
+    else:
+        console.print(f"Best score {best.score}: {best.path / 'source.c'}")
+    history_str = format_match_history(slug)
+    if history_str:
+        console.print(f"[dim]History: {history_str}[/dim]")
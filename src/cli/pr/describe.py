@@ -11,6 +11,8 @@ import typer
 from rich.panel import Panel
 from rich.table import Table
 
+from src.commit.buildd import run_ninja
+
 from .._common import (
     console,
     DEFAULT_MELEE_ROOT,
@@ -223,13 +225,7 @@ def _build_baseline_report(melee_root: Path, target_commit: str) -> Path | None:
             text=True,
         )
 
-        build_result = subprocess.run(
-            ["ninja", "-k0"],
-            cwd=melee_root,
-            capture_output=True,
-            text=True,
-            timeout=300,
-        )
+        run_ninja(melee_root, ["-k0"], timeout=300)
 
         report_path = melee_root / "build" / "GALE01" / "report.json"
         if report_path.exists():
@@ -324,11 +320,7 @@ def describe_command(
             cwd=melee_root,
             capture_output=True,
         )
-        subprocess.run(
-            ["ninja"],
-            cwd=melee_root,
-            capture_output=True,
-        )
+        run_ninja(melee_root)
 
     if not current_report.exists():
         console.print("[red]report.json not found after build[/red]")
@@ -14,33 +14,24 @@ import typer
 from rich.table import Table
 
 from ._common import (
-    console,
+    AGENT_ID,
     DEFAULT_MELEE_ROOT,
-    DECOMP_CONFIG_DIR,
+    console,
+    db_upsert_function,
+    db_upsert_scratch,
+    format_match_history,
+    get_best_match,
+    get_compiler_for_source,
     get_context_file,
-    detect_local_api_url,
     get_local_api_url,
     record_match_score,
-    format_match_history,
-    db_upsert_scratch,
-    db_record_match_score,
-    db_upsert_function,
-    get_compiler_for_source,
     renew_claim_on_activity,
-    AGENT_ID,
 )
 from .complete import _get_current_branch
-from .utils import file_lock, load_json_safe
-
-# Shared scratch tokens file - all agents use the same file
-# Tokens are keyed by scratch slug, so no conflicts between agents
-DECOMP_SCRATCH_TOKENS_FILE = os.environ.get(
-    "DECOMP_SCRATCH_TOKENS_FILE",
-    str(DECOMP_CONFIG_DIR / "scratch_tokens.json")
-)
+from .storage import migrate_legacy_json_stores
 
-# Lock file for token operations
-_TOKENS_LOCK_FILE = DECOMP_CONFIG_DIR / "scratch_tokens.lock"
+# First line of a context cut down by _slice_context
+SLICED_CONTEXT_HEADER = "/* melee-agent sliced context"
 
 # Context file override from environment
 _context_env = os.environ.get("DECOMP_CONTEXT_FILE", "")
@@ -59,26 +50,24 @@ def _get_context_file(source_file: str | None = None) -> Path:
 scratch_app = typer.Typer(help="Manage decomp.me scratches")
 
 
-def _load_scratch_tokens() -> dict[str, str]:
-    """Load scratch claim tokens from file."""
-    tokens_path = Path(DECOMP_SCRATCH_TOKENS_FILE)
-    return load_json_safe(tokens_path)
+def _get_scratch_token(slug: str) -> str | None:
+    """Look up a scratch claim token in the state database."""
+    try:
+        from src.db import get_db
+        migrate_legacy_json_stores()
+        return get_db().get_scratch_token(slug)
+    except Exception:
+        return None
 
 
 def _save_scratch_token(slug: str, token: str) -> None:
-    """Save a scratch claim token with locking.
+    """Save a scratch claim token.
 
-    Uses exclusive lock to prevent race conditions when multiple
-    agents create scratches simultaneously.
+    Tokens are keyed by slug in the state database, so concurrent
+    scratch creation by multiple agents only touches its own row.
     """
-    tokens_path = Path(DECOMP_SCRATCH_TOKENS_FILE)
-    tokens_path.parent.mkdir(parents=True, exist_ok=True)
-
-    with file_lock(_TOKENS_LOCK_FILE, exclusive=True):
-        tokens = load_json_safe(tokens_path)
-        tokens[slug] = token
-        with open(tokens_path, "w") as f:
-            json.dump(tokens, f, indent=2)
+    from src.db import get_db
+    get_db().set_scratch_token(slug, token)
 
 
 async def _handle_403_error(client, slug: str, error: Exception, operation: str = "update") -> bool:
@@ -88,7 +77,7 @@ async def _handle_403_error(client, slug: str, error: Exception, operation: str
     """
     from src.client import DecompMeAPIError
 
-    tokens = _load_scratch_tokens()
+    token = _get_scratch_token(slug)
 
     # Try to get scratch info to understand the ownership situation
     try:
@@ -102,10 +91,10 @@ async def _handle_403_error(client, slug: str, error: Exception, operation: str
 
     console.print(f"\n[red]403 Forbidden:[/red] Cannot {operation} scratch '{slug}' ({owner_info})")
 
-    if slug in tokens:
+    if token:
         console.print("[dim]Found saved token, attempting to re-claim...[/dim]")
         try:
-            success = await client.claim_scratch(slug, tokens[slug])
+            success = await client.claim_scratch(slug, token)
             if success:
                 console.print("[green]Re-claimed successfully![/green]")
                 return True
@@ -131,9 +120,7 @@ async def _verify_scratch_ownership(client, slug: str) -> tuple[bool, str]:
 
     Returns (can_update, reason) tuple.
     """
-    tokens = _load_scratch_tokens()
-
-    if slug not in tokens:
+    if not _get_scratch_token(slug):
         return False, "No saved token for this scratch"
 
     try:
@@ -150,6 +137,336 @@ async def _verify_scratch_ownership(client, slug: str) -> tuple[bool, str]:
         return False, f"Could not verify: {e}"
 
 
+def _ninja_target(ctx_path: Path, melee_root: Path) -> tuple[Path, Path] | None:
+    """Get the directory to run ninja in and the target that builds ctx_path."""
+    try:
+        return melee_root, ctx_path.relative_to(melee_root)
+    except ValueError:
+        # ctx_path might be in a worktree, find the melee root for that worktree
+        # The ctx_path looks like: .../melee-worktrees/<name>/build/GALE01/src/...
+        # We need to run ninja from the worktree root
+        parts = ctx_path.parts
+        for i, part in enumerate(parts):
+            if part == "build" and i > 0:
+                return Path(*parts[:i]), Path(*parts[i:])
+        return None
+
+
+def _build_context_files(ctx_paths: list[Path], melee_root: Path) -> None:
+    """Rebuild context files to pick up header changes.
+
+    Runs ninja once per build directory, however many files there are.
+    Exits on failure.
+    """
+    import subprocess
+
+    from src.commit.buildd import run_ninja
+
+    targets: dict[Path, list[str]] = {}
+    for ctx_path in ctx_paths:
+        target = _ninja_target(ctx_path, melee_root)
+        if target is None:
+            console.print(f"[red]Cannot determine ninja target for: {ctx_path}[/red]")
+            raise typer.Exit(1)
+        targets.setdefault(target[0], []).append(str(target[1]))
+
+    for ninja_cwd, ctx_targets in targets.items():
+        try:
+            returncode, stdout, stderr = run_ninja(ninja_cwd, ctx_targets, timeout=120)
+            if returncode != 0:
+                console.print("[red]Failed to build context file:[/red]")
+                console.print(stderr or stdout)
+                raise typer.Exit(1)
+            # Only show message if ninja actually did something
+            if "no work to do" not in stdout.lower():
+                plural = "s" if len(ctx_targets) > 1 else ""
+                console.print(f"[green]Built context file{plural}[/green]")
+        except subprocess.TimeoutExpired:
+            console.print("[red]Timeout building context file[/red]")
+            raise typer.Exit(1)
+        except FileNotFoundError:
+            console.print("[red]ninja not found - please install it[/red]")
+            raise typer.Exit(1)
+
+    for ctx_path in ctx_paths:
+        if not ctx_path.exists():
+            console.print(f"[red]Context file not found after build: {ctx_path}[/red]")
+            raise typer.Exit(1)
+
+
+async def _create_scratch(
+    client,
+    func,
+    prepared,
+    compiler: str,
+    auto_decompile: bool,
+    slice_ctx: bool,
+    note=console.print,
+    claim: bool = True,
+):
+    """Create and claim a scratch for an extracted function.
+
+    The claim token is not saved; the caller records it.
+
+    Args:
+        client: Open DecompMeAPIClient
+        func: FunctionInfo with asm
+        prepared: PreparedContext with the target function stripped
+        compiler: decomp.me compiler ID
+        auto_decompile: Let m2c write the initial code
+        slice_ctx: Keep only the declarations the decompiled code needs
+        note: Where progress messages go
+        claim: Claim the scratch and set its final context. Without it the
+            claim token stays unused for whoever takes the scratch over,
+            who then calls _finish_scratch_context()
+
+    Returns:
+        The created Scratch
+    """
+    from src.client import ScratchCreate
+
+    melee_context = prepared.mwcc
+
+    # If auto-decompiling, preprocess context to remove preprocessor directives
+    # that m2c can't handle. Use preprocessed for decompilation, but store
+    # original context in scratch for compilation (compiler handles directives fine)
+    decompile_context = melee_context
+    if auto_decompile and prepared.m2c != melee_context:
+        decompile_context = prepared.m2c
+        note(
+            f"[dim]Preprocessed context for m2c "
+            f"({len(melee_context):,} → {len(decompile_context):,} bytes)[/dim]"
+        )
+
+    # Build scratch params - omit source_code to trigger auto-decompilation
+    create_context = decompile_context if auto_decompile else melee_context
+    scratch_params = ScratchCreate(
+        name=func.name,
+        target_asm=func.asm,
+        **await _context_fields(client, create_context),
+        compiler=compiler,
+        compiler_flags=(
+            "-O4,p -nodefaults -fp hard -Cpp_exceptions off -enum int -fp_contract on -inline auto"
+        ),
+        diff_label=func.name,
+    )
+
+    # Only set source_code if NOT auto-decompiling
+    if not auto_decompile:
+        scratch_params.source_code = "// TODO: Decompile this function\n"
+
+    scratch = await client.create_scratch(scratch_params)
+    if not claim:
+        return scratch
+
+    # Claim ownership first (needed for subsequent updates)
+    if scratch.claim_token:
+        try:
+            await client.claim_scratch(scratch.slug, scratch.claim_token)
+            note("[dim]Claimed ownership of scratch[/dim]")
+        except Exception as e:
+            console.print(f"[yellow]Warning: Could not claim scratch for {func.name}: {e}[/yellow]")
+
+    await _finish_scratch_context(
+        client, scratch, func.name, prepared, auto_decompile, slice_ctx, note=note
+    )
+    return scratch
+
+
+async def _finish_scratch_context(
+    client,
+    scratch,
+    function_name: str,
+    prepared,
+    auto_decompile: bool,
+    slice_ctx: bool,
+    note=console.print,
+) -> None:
+    """Give a claimed scratch the context MWCC compiles it with.
+
+    The scratch was created with the m2c context; this slices it to what the
+    decompiled code needs (if that compiles) or restores the full one.
+    """
+    melee_context = prepared.mwcc
+    create_context = prepared.m2c if auto_decompile else melee_context
+
+    # Compile against only the declarations the decompiled code needs,
+    # as long as that builds
+    mwcc_context = melee_context
+    if slice_ctx and auto_decompile and scratch.source_code:
+        sliced = _slice_context(melee_context, scratch.source_code, function_name)
+        if sliced:
+            from src.client import CompileRequest
+            try:
+                result = await client.compile_scratch(scratch.slug, CompileRequest(context=sliced))
+            except Exception:
+                result = None
+            if result is not None and result.success:
+                mwcc_context = sliced
+                note(f"[dim]Sliced context ({len(melee_context):,} → {len(sliced):,} bytes)[/dim]")
+            else:
+                note("[dim]Sliced context does not compile, keeping full context[/dim]")
+
+    # Restore original context (with preprocessor directives) for MWCC compilation.
+    # The preprocessed context was only needed for m2c decompilation.
+    # MWCC needs the original because gcc -E introduces incompatible features:
+    # - __attribute__((noreturn)) not supported by MWCC
+    # - _Static_assert is C11, not supported by MWCC
+    # - Assert macro expansions cause type mismatches
+    if mwcc_context != create_context:
+        from src.client import ScratchUpdate
+        try:
+            # The sliced context is specific to this function, so it isn't shared
+            fields = (
+                {"context": mwcc_context} if mwcc_context != melee_context
+                else await _context_fields(client, mwcc_context)
+            )
+            await client.update_scratch(scratch.slug, ScratchUpdate(**fields))
+            note("[dim]Restored original context for MWCC[/dim]")
+        except Exception as e:
+            console.print(
+                f"[yellow]Warning: Could not restore context for {function_name}: {e}[/yellow]"
+            )
+
+
+def _create_scratches(
+    funcs: dict,
+    melee_root: Path,
+    api_url: str,
+    auto_decompile: bool,
+    slice_ctx: bool,
+    jobs: int,
+    claim: bool = True,
+) -> list[dict]:
+    """Create and claim scratches for extracted functions, jobs at a time.
+
+    Each source file's context is built, read and prepared once, and its
+    compiler looked up once. Nothing is written to the state database.
+
+    Args:
+        funcs: Function name -> FunctionInfo with asm
+        claim: Claim them (see _create_scratch); off for scratches made
+            for other agents
+
+    Returns:
+        Dicts with slug, function_name, claim_token and context_hash (of the
+        ctx file) for each scratch created
+    """
+    import hashlib
+
+    from src.cli.context import StripTargetFunction, prepare_context
+    from src.client import DecompMeAPIClient
+
+    # One context build, read and compiler lookup per source file
+    ctx_paths = {
+        name: _get_context_file(source_file=func.file_path) for name, func in funcs.items()
+    }
+    _build_context_files(list(dict.fromkeys(ctx_paths.values())), melee_root)
+    contexts = {path: path.read_text() for path in set(ctx_paths.values())}
+    context_hashes = {
+        path: hashlib.sha256(text.encode()).hexdigest() for path, text in contexts.items()
+    }
+    compilers: dict[str, str] = {}
+    for func in funcs.values():
+        if func.file_path not in compilers:
+            compilers[func.file_path] = get_compiler_for_source(func.file_path, melee_root)
+
+    # The target stage rarely applies, so functions in one file share a cache entry
+    prepared = {
+        name: prepare_context(
+            contexts[ctx_paths[name]], [StripTargetFunction(name)], m2c=auto_decompile
+        )
+        for name in funcs
+    }
+    console.print(
+        f"[dim]Prepared {len(contexts)} context{'s' if len(contexts) != 1 else ''} "
+        f"for {len(funcs)} function{'s' if len(funcs) != 1 else ''}[/dim]"
+    )
+
+    async def create_all():
+        semaphore = asyncio.Semaphore(max(jobs, 1))
+
+        async def create_one(name):
+            async with semaphore:
+                func = funcs[name]
+                try:
+                    scratch = await _create_scratch(
+                        client, func, prepared[name], compilers[func.file_path],
+                        auto_decompile, slice_ctx, note=lambda message: None, claim=claim,
+                    )
+                except Exception as e:
+                    console.print(f"[red]✗ {name}:[/red] {e}")
+                    return name, None
+                console.print(f"[green]✓ {name}[/green] {api_url}/scratch/{scratch.slug}")
+                return name, scratch
+
+        async with DecompMeAPIClient(base_url=api_url) as client:
+            return await asyncio.gather(*(create_one(name) for name in funcs))
+
+    return [
+        {
+            "slug": scratch.slug,
+            "function_name": name,
+            "claim_token": scratch.claim_token,
+            "context_hash": context_hashes[ctx_paths[name]],
+        }
+        for name, scratch in asyncio.run(create_all()) if scratch is not None
+    ]
+
+
+def _take_prefetched_scratch(function_name: str, api_url: str, context: str) -> dict | None:
+    """Take the scratch `scratch prefetch` made for a function, if still current.
+
+    One made from a different ctx file is dropped rather than returned, since
+    its context and m2c output may be out of date.
+    """
+    import hashlib
+
+    try:
+        from src.db import get_db
+        prefetched = get_db().take_prefetched_scratch(function_name, api_url)
+    except Exception:
+        return None
+
+    if prefetched and prefetched["context_hash"] != hashlib.sha256(context.encode()).hexdigest():
+        console.print(
+            "[dim]Prefetched scratch was made from an older context, creating a new one[/dim]"
+        )
+        return None
+    return prefetched
+
+
+def _hand_over_prefetched(prefetched: dict, api_url: str, prepared, slice_ctx: bool) -> dict | None:
+    """Claim a prefetched scratch for this agent and give it its MWCC context.
+
+    `scratch prefetch` leaves the claim token unused, since claiming binds the
+    scratch to the claimer's session.
+
+    Returns:
+        prefetched, or None if the scratch couldn't be claimed
+    """
+    from src.client import DecompMeAPIClient
+
+    slug, claim_token = prefetched["slug"], prefetched["claim_token"]
+
+    async def hand_over():
+        async with DecompMeAPIClient(base_url=api_url) as client:
+            await client.claim_scratch(slug, claim_token)
+            scratch = await client.get_scratch(slug)
+            await _finish_scratch_context(
+                client, scratch, prefetched["function_name"], prepared, True, slice_ctx
+            )
+
+    try:
+        asyncio.run(hand_over())
+    except Exception as e:
+        console.print(
+            f"[yellow]Could not claim prefetched scratch {slug}, creating a new one: {e}[/yellow]"
+        )
+        return None
+    return prefetched
+
+
 @scratch_app.command("create")
 def scratch_create(
     function_name: Annotated[str, typer.Argument(help="Name of the function")],
@@ -165,18 +482,38 @@ def scratch_create(
     auto_decompile: Annotated[
         bool, typer.Option("--decompile", "-d", help="Run m2c decompiler for initial code (recommended)")
     ] = True,
+    slice_ctx: Annotated[
+        bool,
+        typer.Option(
+            "--slice-context/--full-context",
+            help="Keep only the declarations the decompiled code needs",
+        ),
+    ] = True,
+    use_prefetched: Annotated[
+        bool,
+        typer.Option(
+            "--prefetched/--fresh", help="Take a scratch made by `scratch prefetch` if there is one"
+        ),
+    ] = True,
 ):
     """Create a new scratch for a function on decomp.me.
 
     By default, runs the m2c decompiler to generate initial C code.
     Use --no-decompile to skip auto-decompilation and start with an empty stub.
+
+    After decompiling, the scratch context is cut down to the declarations the
+    m2c output transitively needs, if that still compiles. `scratch compile`
+    restores the full context when a later edit needs more.
+
+    If `scratch prefetch` already made a scratch for the function from the
+    current context file, that one is handed over instead, with no wait for m2c.
     """
     api_url = api_url or get_local_api_url()
     from src.client import DecompMeAPIClient
     from src.extractor import extract_function
 
     # Extract function first to get source file path for context
-    func = asyncio.run(extract_function(melee_root, function_name))
+    func = asyncio.run(extract_function(melee_root, function_name, include_context=False))
     if func is None:
         console.print(f"[red]Function '{function_name}' not found[/red]")
         raise typer.Exit(1)
@@ -185,168 +522,224 @@ def scratch_create(
     ctx_path = context_file or _get_context_file(source_file=func.file_path)
 
     # Always rebuild context to pick up header changes
-    import subprocess
-    # Build the context file - need relative path from melee_root
-    try:
-        ctx_relative = ctx_path.relative_to(melee_root)
-        ninja_cwd = melee_root
-    except ValueError:
-        # ctx_path might be in a worktree, find the melee root for that worktree
-        # The ctx_path looks like: .../melee-worktrees/<name>/build/GALE01/src/...
-        # We need to run ninja from the worktree root
-        parts = ctx_path.parts
-        ninja_cwd = None
-        for i, part in enumerate(parts):
-            if part == "build" and i > 0:
-                ninja_cwd = Path(*parts[:i])
-                ctx_relative = Path(*parts[i:])
-                break
-        if ninja_cwd is None:
-            console.print(f"[red]Cannot determine ninja target for: {ctx_path}[/red]")
-            raise typer.Exit(1)
-
-    try:
-        result = subprocess.run(
-            ["ninja", str(ctx_relative)],
-            cwd=ninja_cwd,
-            capture_output=True,
-            text=True,
-            timeout=120,
-        )
-        if result.returncode != 0:
-            console.print(f"[red]Failed to build context file:[/red]")
-            console.print(result.stderr or result.stdout)
-            raise typer.Exit(1)
-        # Only show message if ninja actually did something
-        if "no work to do" not in result.stdout.lower():
-            console.print(f"[green]Built context file[/green]")
-    except subprocess.TimeoutExpired:
-        console.print(f"[red]Timeout building context file[/red]")
-        raise typer.Exit(1)
-    except FileNotFoundError:
-        console.print(f"[red]ninja not found - please install it[/red]")
-        raise typer.Exit(1)
-
-    if not ctx_path.exists():
-        console.print(f"[red]Context file not found after build: {ctx_path}[/red]")
-        raise typer.Exit(1)
+    _build_context_files([ctx_path], melee_root)
 
     melee_context = ctx_path.read_text()
     console.print(f"[dim]Loaded {len(melee_context):,} bytes of context from {ctx_path.name}[/dim]")
 
-    # Strip function definition (but keep declaration) to avoid redefinition errors
-    if function_name in melee_context:
-        lines = melee_context.split('\n')
-        filtered = []
-        in_func = False
-        depth = 0
-        for line in lines:
-            if not in_func and function_name in line and '(' in line:
-                s = line.strip()
-                # Skip comments, control flow
-                if s.startswith('//') or s.startswith('if') or s.startswith('while'):
-                    filtered.append(line)
-                    continue
-                # Keep declarations (prototypes) - they end with );
-                if s.endswith(';'):
-                    filtered.append(line)
-                    continue
-                # This is a function definition
-                in_func = True
-                depth = line.count('{') - line.count('}')
-                filtered.append(f'// {function_name} definition stripped')
-                if '{' not in line:
-                    depth = 0
-                elif depth <= 0:
-                    in_func = False
-                continue
-            if in_func:
-                depth += line.count('{') - line.count('}')
-                if depth <= 0:
-                    in_func = False
-                continue
-            filtered.append(line)
-        melee_context = '\n'.join(filtered)
-        console.print(f"[dim]Stripped {function_name} definition from context[/dim]")
-
-    # Detect correct compiler for this source file
-    compiler = get_compiler_for_source(func.file_path, melee_root)
-    console.print(f"[dim]Using compiler: {compiler}[/dim]")
-
-    async def create():
+    prefetched = None
+    if use_prefetched and context_file is None and auto_decompile:
+        prefetched = _take_prefetched_scratch(function_name, api_url, melee_context)
 
-        async with DecompMeAPIClient(base_url=api_url) as client:
-            from src.client import ScratchCreate
-
-            # If auto-decompiling, preprocess context to remove preprocessor directives
-            # that m2c can't handle. Use preprocessed for decompilation, but store
-            # original context in scratch for compilation (compiler handles directives fine)
-            decompile_context = melee_context
-            if auto_decompile and melee_context:
-                preprocessed, success = _preprocess_context(melee_context)
-                if success and preprocessed != melee_context:
-                    decompile_context = preprocessed
-                    console.print(f"[dim]Preprocessed context for m2c ({len(melee_context):,} → {len(preprocessed):,} bytes)[/dim]")
-
-            # Build scratch params - omit source_code to trigger auto-decompilation
-            scratch_params = ScratchCreate(
-                name=func.name,
-                target_asm=func.asm,
-                context=decompile_context if auto_decompile else melee_context,
-                compiler=compiler,
-                compiler_flags="-O4,p -nodefaults -fp hard -Cpp_exceptions off -enum int -fp_contract on -inline auto",
-                diff_label=func.name,
-            )
+    # Strip function definition (but keep declaration) to avoid redefinition
+    # errors, and derive the m2c version in the same pass
+    from src.cli.context import StripTargetFunction, prepare_context
 
-            # Only set source_code if NOT auto-decompiling
-            if not auto_decompile:
-                scratch_params.source_code = "// TODO: Decompile this function\n"
+    prepared = prepare_context(
+        melee_context, [StripTargetFunction(function_name)], m2c=auto_decompile
+    )
+    if prepared.stripped:
+        console.print(f"[dim]Stripped {function_name} definition from context[/dim]")
 
-            scratch = await client.create_scratch(scratch_params)
+    if prefetched:
+        prefetched = _hand_over_prefetched(prefetched, api_url, prepared, slice_ctx)
 
-            # Claim ownership first (needed for subsequent updates)
-            if scratch.claim_token:
-                _save_scratch_token(scratch.slug, scratch.claim_token)
-                try:
-                    await client.claim_scratch(scratch.slug, scratch.claim_token)
-                    console.print(f"[dim]Claimed ownership of scratch[/dim]")
-                except Exception as e:
-                    console.print(f"[yellow]Warning: Could not claim scratch: {e}[/yellow]")
-
-            # Restore original context (with preprocessor directives) for MWCC compilation.
-            # The preprocessed context was only needed for m2c decompilation.
-            # MWCC needs the original because gcc -E introduces incompatible features:
-            # - __attribute__((noreturn)) not supported by MWCC
-            # - _Static_assert is C11, not supported by MWCC
-            # - Assert macro expansions cause type mismatches
-            if auto_decompile and decompile_context != melee_context:
-                from src.client import ScratchUpdate
-                try:
-                    await client.update_scratch(scratch.slug, ScratchUpdate(context=melee_context))
-                    console.print(f"[dim]Restored original context for MWCC[/dim]")
-                except Exception as e:
-                    console.print(f"[yellow]Warning: Could not restore context: {e}[/yellow]")
+    if prefetched:
+        slug, claim_token = prefetched["slug"], prefetched["claim_token"]
+        console.print(f"[dim]Using scratch prefetched for {function_name}[/dim]")
+    else:
+        # Detect correct compiler for this source file
+        compiler = get_compiler_for_source(func.file_path, melee_root)
+        console.print(f"[dim]Using compiler: {compiler}[/dim]")
+
+        async def create():
+            async with DecompMeAPIClient(base_url=api_url) as client:
+                return await _create_scratch(
+                    client, func, prepared, compiler, auto_decompile, slice_ctx
+                )
 
-        return scratch
+        scratch = asyncio.run(create())
+        slug, claim_token = scratch.slug, scratch.claim_token
 
-    scratch = asyncio.run(create())
-    console.print(f"[green]Created scratch:[/green] {api_url}/scratch/{scratch.slug}")
+    if claim_token:
+        _save_scratch_token(slug, claim_token)
+    console.print(f"[green]Created scratch:[/green] {api_url}/scratch/{slug}")
 
     # Write to state database (non-blocking)
     db_upsert_scratch(
-        scratch.slug,
+        slug,
         instance='local',
         base_url=api_url,
         function_name=function_name,
-        claim_token=scratch.claim_token,
+        claim_token=claim_token,
     )
     db_upsert_function(
         function_name,
-        local_scratch_slug=scratch.slug,
+        local_scratch_slug=slug,
         status='in_progress',
     )
 
 
+@scratch_app.command("create-batch")
+def scratch_create_batch(
+    function_names: Annotated[
+        Optional[list[str]], typer.Argument(help="Names of the functions")
+    ] = None,
+    functions_file: Annotated[
+        Optional[Path],
+        typer.Option("--file", "-f", help="Read function names from a file (one per line)"),
+    ] = None,
+    melee_root: Annotated[
+        Path, typer.Option("--melee-root", "-m", help="Path to melee submodule")
+    ] = DEFAULT_MELEE_ROOT,
+    api_url: Annotated[
+        Optional[str], typer.Option("--api-url", help="Decomp.me API URL (auto-detected)")
+    ] = None,
+    auto_decompile: Annotated[
+        bool, typer.Option("--decompile", "-d", help="Run m2c decompiler for initial code (recommended)")
+    ] = True,
+    slice_ctx: Annotated[
+        bool,
+        typer.Option(
+            "--slice-context/--full-context",
+            help="Keep only the declarations the decompiled code needs",
+        ),
+    ] = True,
+    jobs: Annotated[
+        int, typer.Option("--jobs", "-j", help="Scratches to create at once")
+    ] = 4,
+):
+    """Create scratches for many functions at once.
+
+    Does what `scratch create` does for each function, but extracts them all
+    with one extractor, builds and prepares each source file's context once,
+    and creates and claims up to --jobs scratches concurrently. The state
+    database is updated in a single transaction at the end.
+
+    Examples:
+        melee-agent scratch create-batch ftCo_800C4E5C ftCo_800C4F2C
+
+        # Seed a module from a list
+        melee-agent scratch create-batch -f functions.txt -j 8
+    """
+    api_url = api_url or get_local_api_url()
+    from src.extractor import extract_functions
+
+    from ._common import db_record_created_scratches
+
+    names = list(function_names or [])
+    if functions_file is not None:
+        if not functions_file.exists():
+            console.print(f"[red]File not found: {functions_file}[/red]")
+            raise typer.Exit(1)
+        names += [
+            line.strip() for line in functions_file.read_text().splitlines()
+            if line.strip() and not line.lstrip().startswith("#")
+        ]
+    names = list(dict.fromkeys(names))
+    if not names:
+        console.print("[red]No functions given[/red]")
+        raise typer.Exit(1)
+
+    funcs = asyncio.run(extract_functions(melee_root, names, include_context=False))
+    missing = [name for name, func in funcs.items() if func is None]
+    if missing:
+        console.print(f"[yellow]Not found ({len(missing)}):[/yellow] {', '.join(missing)}")
+    funcs = {name: func for name, func in funcs.items() if func is not None}
+    if not funcs:
+        raise typer.Exit(1)
+
+    created = _create_scratches(funcs, melee_root, api_url, auto_decompile, slice_ctx, jobs)
+
+    # Write to state database (non-blocking)
+    db_record_created_scratches(created, api_url)
+
+    failed = len(funcs) - len(created)
+    console.print(f"\n[bold]Created {len(created)}/{len(funcs)} scratches[/bold]")
+    if failed or missing:
+        raise typer.Exit(1)
+
+
+@scratch_app.command("prefetch")
+def scratch_prefetch(
+    count: Annotated[
+        int, typer.Option("--count", "-n", help="Keep this many of the best candidates warm")
+    ] = 8,
+    melee_root: Annotated[
+        Path, typer.Option("--melee-root", "-m", help="Path to melee submodule")
+    ] = DEFAULT_MELEE_ROOT,
+    api_url: Annotated[
+        Optional[str], typer.Option("--api-url", help="Decomp.me API URL (auto-detected)")
+    ] = None,
+    slice_ctx: Annotated[
+        bool,
+        typer.Option(
+            "--slice-context/--full-context",
+            help="Keep only the declarations the decompiled code needs",
+        ),
+    ] = True,
+    jobs: Annotated[
+        int, typer.Option("--jobs", "-j", help="Scratches to create at once")
+    ] = 4,
+    watch: Annotated[
+        bool, typer.Option("--watch", "-w", help="Keep running and top the queue up")
+    ] = False,
+    interval: Annotated[
+        int, typer.Option("--interval", help="Seconds between top-ups with --watch")
+    ] = 60,
+):
+    """Create scratches ahead of time for the functions agents will claim next.
+
+    Takes the best --count candidates from the `claim next` queue that are
+    unclaimed and have no scratch, and creates their scratches (with m2c
+    output) the way `scratch create` would, keeping their claim tokens in the
+    state database. The next `scratch create` for one of these functions takes
+    its scratch over instantly instead of waiting on m2c.
+
+    Examples:
+        melee-agent scratch prefetch -n 16
+
+        # Run alongside agents, topping up every 2 minutes
+        melee-agent scratch prefetch --watch --interval 120 &
+    """
+    import time
+
+    from src.db import get_db
+    from src.extractor import extract_functions
+
+    from .claim import _refresh_candidates
+
+    api_url = api_url or get_local_api_url()
+    # Functions that couldn't be extracted or created, skipped for the rest of the run
+    failed: set[str] = set()
+
+    while True:
+        try:
+            _refresh_candidates(melee_root)
+            candidates = get_db().get_prefetch_candidates(count + len(failed))
+            names = [c["function_name"] for c in candidates if c["function_name"] not in failed]
+        except Exception as e:
+            console.print(f"[red]Failed to read candidate queue: {e}[/red]")
+            raise typer.Exit(1)
+
+        if names:
+            funcs = asyncio.run(extract_functions(melee_root, names, include_context=False))
+            funcs = {name: func for name, func in funcs.items() if func is not None and func.asm}
+            created = (
+                _create_scratches(funcs, melee_root, api_url, True, slice_ctx, jobs, claim=False)
+                if funcs else []
+            )
+            get_db().add_prefetched_scratches(created, api_url)
+            failed.update(set(names) - {row["function_name"] for row in created})
+            console.print(f"[bold]Prefetched {len(created)}/{len(names)} scratches[/bold]")
+        elif not watch:
+            console.print(f"[dim]The top {count} candidates are already prefetched[/dim]")
+
+        if not watch:
+            return
+        time.sleep(interval)
+
+
 def _extract_text(text_data) -> str:
     """Extract plain text from diff text data (list of dicts or string)."""
     if isinstance(text_data, str):
@@ -362,7 +755,7 @@ def _format_diff_output(diff_output, max_lines: int = 0) -> None:
         console.print("[dim]No diff rows available[/dim]")
         return
 
-    console.print(f"\n[bold]Instruction Diff:[/bold] (target | current)\n")
+    console.print("\n[bold]Instruction Diff:[/bold] (target | current)\n")
 
     diff_count = 0
     shown = 0
@@ -441,7 +834,7 @@ def scratch_compile(
     If --refresh-context is provided, rebuilds the context file from the repo before compiling.
     """
     api_url = api_url or get_local_api_url()
-    from src.client import DecompMeAPIClient, ScratchUpdate, DecompMeAPIError
+    from src.client import DecompMeAPIClient, DecompMeAPIError, ScratchUpdate
 
     # Validate mutually exclusive options
     options_count = sum([source_file is not None, code is not None, from_stdin])
@@ -480,41 +873,29 @@ def scratch_compile(
                 func_name = scratch.name
                 console.print(f"[dim]Refreshing context for {func_name}...[/dim]")
 
-                # Try to find source file from database
-                src_file = None
-                from src.db import get_db
-                try:
-                    db = get_db()
-                    func_info = db.get_function(func_name)
-                    if func_info and func_info.get('source_file'):
-                        src_file = func_info['source_file']
-                except Exception:
-                    pass
-
-                # If not in DB, try extractor
-                if not src_file:
-                    from src.extractor import extract_function
-                    try:
-                        func = await extract_function(melee_root, func_name)
-                        if func and func.file_path:
-                            src_file = func.file_path
-                    except Exception:
-                        pass
+                src_file = await _find_source_file(func_name, melee_root)
 
                 # Build fresh context
                 context, ctx_path = await _build_fresh_context(func_name, src_file, melee_root)
                 if context:
-                    try:
-                        await client.update_scratch(slug, ScratchUpdate(context=context))
-                        console.print(f"[dim]Updated context ({len(context):,} bytes)[/dim]")
-                    except DecompMeAPIError as e:
-                        if "403" in str(e):
-                            if await _handle_403_error(client, slug, e, "update context"):
-                                await client.update_scratch(slug, ScratchUpdate(context=context))
+                    code = source_code if source_code is not None else scratch.source_code
+                    skip_reason, hashes = _check_context_refresh(slug, context, code, func_name)
+                    if skip_reason:
+                        console.print(f"[dim]Not uploading context: {skip_reason}[/dim]")
+                    else:
+                        context_update = ScratchUpdate(**await _context_fields(client, context))
+                        try:
+                            await client.update_scratch(slug, context_update)
+                            console.print(f"[dim]Updated context ({len(context):,} bytes)[/dim]")
+                        except DecompMeAPIError as e:
+                            if "403" in str(e):
+                                if await _handle_403_error(client, slug, e, "update context"):
+                                    await client.update_scratch(slug, context_update)
+                                else:
+                                    raise typer.Exit(1)
                             else:
-                                raise typer.Exit(1)
-                        else:
-                            raise
+                                raise
+                        _record_context_upload(slug, api_url, hashes)
                 else:
                     console.print("[yellow]Warning: Could not refresh context[/yellow]")
 
@@ -532,7 +913,14 @@ def scratch_compile(
                             raise typer.Exit(1)
                     else:
                         raise
-            return await client.compile_scratch(slug)
+
+            result = await client.compile_scratch(slug)
+            if not result.success:
+                # A sliced context may lack what the new code uses
+                retried = await _compile_with_full_context(client, slug, melee_root)
+                if retried is not None:
+                    result = retried
+            return result
 
     result = asyncio.run(compile_scratch())
 
@@ -542,23 +930,16 @@ def scratch_compile(
             else (1.0 - result.diff_output.current_score / result.diff_output.max_score) * 100
         )
 
-        # Record match score for history tracking
-        record_match_score(slug, result.diff_output.current_score, result.diff_output.max_score)
-
-        # Detect current worktree and branch for tracking
-        current_worktree = str(Path.cwd())
-        current_branch = _get_current_branch()
-
-        # Also record to state database (non-blocking) with worktree/branch info
-        db_record_match_score(
+        # Record match score for history tracking, with worktree/branch info
+        record_match_score(
             slug,
             result.diff_output.current_score,
             result.diff_output.max_score,
-            worktree_path=current_worktree,
-            branch=current_branch,
+            worktree_path=str(Path.cwd()),
+            branch=_get_current_branch(),
         )
 
-        console.print(f"[green]Compiled successfully![/green]")
+        console.print("[green]Compiled successfully![/green]")
         console.print(f"Match: {match_pct:.1f}%")
         console.print(f"Score: {result.diff_output.current_score}/{result.diff_output.max_score}")
 
@@ -567,15 +948,22 @@ def scratch_compile(
         if history_str:
             console.print(f"[dim]History: {history_str}[/dim]")
 
+        # Point out regressions from the best version seen so far
+        best = get_best_match(slug)
+        if best and best["best_score"] < result.diff_output.current_score:
+            console.print(
+                f"[yellow]Best so far: {best['best_match_pct']}% "
+                f"(score {best['best_score']})[/yellow]"
+            )
+
         # Renew claim to prevent expiry during long sessions
         try:
             from src.db import get_db
-            db = get_db()
             # Query function name from scratches table
-            cursor = db.conn.execute(
-                "SELECT function_name FROM scratches WHERE slug = ?", (slug,)
-            )
-            row = cursor.fetchone()
+            with get_db().connection() as conn:
+                row = conn.execute(
+                    "SELECT function_name FROM scratches WHERE slug = ?", (slug,)
+                ).fetchone()
             if row and row[0]:
                 renew_claim_on_activity(row[0])
         except Exception:
@@ -584,7 +972,7 @@ def scratch_compile(
         if show_diff and result.diff_output:
             _format_diff_output(result.diff_output, max_lines)
     else:
-        console.print(f"[red]Compilation failed[/red]")
+        console.print("[red]Compilation failed[/red]")
         console.print(result.compiler_output)
 
 
@@ -598,7 +986,7 @@ def scratch_update(
 ):
     """Update a scratch's source code from a file."""
     api_url = api_url or get_local_api_url()
-    from src.client import DecompMeAPIClient, ScratchUpdate, DecompMeAPIError
+    from src.client import DecompMeAPIClient, DecompMeAPIError, ScratchUpdate
 
     source_code = source_file.read_text()
 
@@ -643,7 +1031,7 @@ def scratch_update(
         if history_str:
             console.print(f"[dim]History: {history_str}[/dim]")
     else:
-        console.print(f"[yellow]Updated but compilation failed[/yellow]")
+        console.print("[yellow]Updated but compilation failed[/yellow]")
 
 
 @scratch_app.command("get")
@@ -768,7 +1156,7 @@ def scratch_get(
                 console.print(f"\n[green]Wrote source code to:[/green] {output_file}")
                 console.print(f"[dim]{len(scratch.source_code):,} bytes[/dim]")
             else:
-                console.print(f"\n[bold]Source Code:[/bold]")
+                console.print("\n[bold]Source Code:[/bold]")
                 # Use markup=False to prevent Rich from interpreting brackets like [t0] as tags
                 source_display = scratch.source_code[:2000] if len(scratch.source_code) > 2000 else scratch.source_code
                 console.print(source_display, markup=False)
@@ -820,82 +1208,6 @@ def scratch_search(
         console.print(table)
 
 
-def _strip_static_assert(context: str) -> str:
-    """Remove _Static_assert statements from C context.
-
-    _Static_assert is a C11 feature that m2c decompiler cannot parse.
-    This function removes these statements while preserving the rest of the code.
-
-    Handles both single-line and multi-line _Static_assert statements:
-        _Static_assert(sizeof(Foo) == 8, "message");
-        _Static_assert((sizeof(struct Bar) == 0x96000), "("
-        "continuation" ") failed");
-
-    Args:
-        context: C context that may contain _Static_assert statements
-
-    Returns:
-        Context with _Static_assert statements removed
-    """
-    import re
-
-    if '_Static_assert' not in context:
-        return context
-
-    # Match _Static_assert(...); including multi-line variants
-    # This regex handles:
-    # - Nested parentheses in the expression
-    # - String literals that may span lines (with "" continuation)
-    # - Whitespace variations
-    lines = context.split('\n')
-    result_lines = []
-    in_static_assert = False
-    paren_depth = 0
-
-    for line in lines:
-        if not in_static_assert:
-            # Check if this line starts a _Static_assert
-            stripped = line.lstrip()
-            if stripped.startswith('_Static_assert'):
-                in_static_assert = True
-                # Count parentheses to track nesting
-                paren_depth = 0
-                for char in line:
-                    if char == '(':
-                        paren_depth += 1
-                    elif char == ')':
-                        paren_depth -= 1
-
-                # Check if statement ends on this line
-                if paren_depth == 0 and ';' in line[line.find('_Static_assert'):]:
-                    in_static_assert = False
-                    # Skip this line entirely (or add a comment)
-                    result_lines.append(f'/* {stripped.rstrip()} - removed for m2c */')
-                else:
-                    # Multi-line, start skipping
-                    result_lines.append(f'/* _Static_assert removed for m2c:')
-                continue
-            else:
-                result_lines.append(line)
-        else:
-            # Inside a multi-line _Static_assert
-            for char in line:
-                if char == '(':
-                    paren_depth += 1
-                elif char == ')':
-                    paren_depth -= 1
-
-            if paren_depth <= 0 and ';' in line:
-                # End of _Static_assert
-                in_static_assert = False
-                result_lines.append(f'   {line.strip()} */')
-            else:
-                # Still inside, add as comment
-                result_lines.append(f'   {line.strip()}')
-
-    return '\n'.join(result_lines)
-
-
 def _preprocess_context(context: str) -> tuple[str, bool]:
     """Preprocess C context for m2c decompiler compatibility.
 
@@ -903,9 +1215,8 @@ def _preprocess_context(context: str) -> tuple[str, bool]:
     - Preprocessor directives (#include, #define, #ifdef, etc.)
     - C11 features like _Static_assert
 
-    This function handles both by:
-    1. Running gcc -E to expand macros and remove directives (if present)
-    2. Stripping _Static_assert statements (which may be introduced by macro expansion)
+    See src.cli.context.preprocess_for_m2c. Results are cached by context
+    hash.
 
     Args:
         context: Raw C context that may contain incompatible features
@@ -913,46 +1224,9 @@ def _preprocess_context(context: str) -> tuple[str, bool]:
     Returns:
         Tuple of (preprocessed context, success)
     """
-    import subprocess
-    import tempfile
-
-    if not context or not context.strip():
-        return context, True
+    from src.cli.context import prepare_context
 
-    # Check if context has preprocessor directives
-    has_directives = any(line.strip().startswith('#') for line in context.split('\n'))
-
-    if has_directives:
-        try:
-            with tempfile.NamedTemporaryFile(mode='w', suffix='.c', delete=False) as f:
-                f.write(context)
-                temp_path = f.name
-
-            # Run gcc -E to preprocess (expand macros, remove directives)
-            # -P removes line markers, -nostdinc avoids system headers
-            result = subprocess.run(
-                ['gcc', '-E', '-P', '-nostdinc', '-x', 'c', temp_path],
-                capture_output=True,
-                text=True,
-                timeout=30,
-            )
-
-            # Clean up temp file
-            import os
-            os.unlink(temp_path)
-
-            if result.returncode == 0:
-                context = result.stdout
-            # If preprocessing failed, continue with original context
-
-        except (subprocess.TimeoutExpired, FileNotFoundError, OSError):
-            pass  # Continue with original context
-
-    # Always strip _Static_assert AFTER macro expansion
-    # (STATIC_ASSERT macros expand to _Static_assert)
-    context = _strip_static_assert(context)
-
-    return context, True
+    return prepare_context(context).m2c, True
 
 
 @scratch_app.command("decompile")
@@ -999,7 +1273,7 @@ def scratch_decompile(
         melee-agent scratch decompile abc123 --no-context
     """
     api_url = api_url or get_local_api_url()
-    from src.client import DecompMeAPIClient, ScratchUpdate, DecompMeAPIError
+    from src.client import DecompMeAPIClient, DecompMeAPIError, ScratchUpdate
 
     # Extract slug from URL if needed
     if slug.startswith("http"):
@@ -1022,7 +1296,7 @@ def scratch_decompile(
             decompile_context = None
             if no_context:
                 decompile_context = ""
-                console.print(f"[dim]Decompiling without context[/dim]")
+                console.print("[dim]Decompiling without context[/dim]")
             elif scratch.context:
                 # Preprocess context to remove preprocessor directives
                 preprocessed, success = _preprocess_context(scratch.context)
@@ -1030,7 +1304,9 @@ def scratch_decompile(
                     decompile_context = preprocessed
                     console.print(f"[dim]Preprocessed context ({len(scratch.context):,} → {len(preprocessed):,} bytes)[/dim]")
                 elif not success:
-                    console.print(f"[yellow]Warning: Context preprocessing failed, using raw context[/yellow]")
+                    console.print(
+                        "[yellow]Warning: Context preprocessing failed, using raw context[/yellow]"
+                    )
 
             # Run decompilation with preprocessed context
             result = await client.decompile_scratch(slug, context=decompile_context)
@@ -1061,11 +1337,11 @@ def scratch_decompile(
         console.print(f"[green]Wrote to:[/green] {output_file}")
 
     if apply:
-        console.print(f"[green]Applied to scratch source code[/green]")
+        console.print("[green]Applied to scratch source code[/green]")
         console.print(f"[dim]Compile to see match: melee-agent scratch compile {slug}[/dim]")
 
     if show_source:
-        console.print(f"\n[bold]Decompiled Code:[/bold]")
+        console.print("\n[bold]Decompiled Code:[/bold]")
         console.print(decompiled, markup=False)
 
 
@@ -1130,6 +1406,162 @@ def scratch_search_context(
             console.print(f"[dim]... and {len(matches) - 5} more matches[/dim]")
 
 
+async def _find_source_file(func_name: str, melee_root: Path) -> str | None:
+    """Find a function's source file from the database, or the extractor."""
+    from src.db import get_db
+    try:
+        db = get_db()
+        func_info = db.get_function(func_name)
+        if func_info and func_info.get('source_file'):
+            return func_info['source_file']
+    except Exception:
+        pass
+
+    # If not in DB, try extractor
+    from src.extractor import extract_function
+    try:
+        func = await extract_function(melee_root, func_name)
+        if func and func.file_path:
+            return func.file_path
+    except Exception:
+        pass
+    return None
+
+
+def _slice_context(context: str, code: str, func_name: str) -> str | None:
+    """Cut a context down to the declarations code needs.
+
+    Returns:
+        Sliced context starting with SLICED_CONTEXT_HEADER, or None if
+        tree-sitter is unavailable or slicing removes nothing
+    """
+    try:
+        from src.hooks.c_analyzer import TREE_SITTER_AVAILABLE, slice_context
+    except ImportError:
+        return None
+    if not TREE_SITTER_AVAILABLE:
+        return None
+
+    roots = set(re.findall(r"\b[A-Za-z_]\w*\b", code)) | {func_name}
+    sliced, kept, total = slice_context(context, roots)
+    if not total or kept == total:
+        return None
+    return (
+        f"{SLICED_CONTEXT_HEADER}: {kept} of {total} declarations, "
+        f"the full context is restored if compiling fails */\n" + sliced
+    )
+
+
+def _context_slice_hash(context: str, code: str | None, func_name: str) -> str | None:
+    """Hash the declarations of context that code (and func_name) use.
+
+    Returns:
+        Hex digest, or None without tree-sitter or code to slice by
+    """
+    import hashlib
+
+    if not code:
+        return None
+    try:
+        from src.hooks.c_analyzer import TREE_SITTER_AVAILABLE, slice_context
+    except ImportError:
+        return None
+    if not TREE_SITTER_AVAILABLE:
+        return None
+    roots = set(re.findall(r"\b[A-Za-z_]\w*\b", code)) | {func_name}
+    sliced, _, _ = slice_context(context, roots)
+    return hashlib.sha256(sliced.encode()).hexdigest()
+
+
+def _check_context_refresh(
+    slug: str, context: str, code: str | None, func_name: str
+) -> tuple[str | None, tuple[str, str | None]]:
+    """Decide whether a rebuilt context needs uploading to a scratch.
+
+    Compares against the hashes recorded at the last upload: the whole
+    context first, then (only if that changed) the slice the function's code
+    uses, so an unrelated header change doesn't cause an upload.
+
+    Returns:
+        Tuple of (reason to skip the upload or None, hashes to record after uploading)
+    """
+    import hashlib
+
+    context_hash = hashlib.sha256(context.encode()).hexdigest()
+    try:
+        from src.db import get_db
+        stored = get_db().get_scratch_context_hashes(slug)
+    except Exception:
+        stored = None
+
+    if stored and stored["context_hash"] == context_hash:
+        return "context unchanged", (context_hash, stored["context_slice_hash"])
+
+    slice_hash = _context_slice_hash(context, code, func_name)
+    if stored and slice_hash and stored["context_slice_hash"] == slice_hash:
+        return "no declarations the function uses changed", (context_hash, slice_hash)
+    return None, (context_hash, slice_hash)
+
+
+def _record_context_upload(slug: str, base_url: str, hashes: tuple[str, str | None]) -> None:
+    """Remember what was uploaded, for _check_context_refresh (non-blocking)."""
+    try:
+        from src.db import get_db
+        get_db().set_scratch_context_hashes(slug, base_url, *hashes)
+    except Exception:
+        pass
+
+
+async def _context_fields(client, context: str) -> dict[str, str]:
+    """Get the scratch fields that carry a context.
+
+    On instances with shared contexts, the context is uploaded once (by
+    hash) and referenced, so every scratch for functions in one file points
+    at the same blob. Otherwise, or if the upload fails, it is sent inline.
+
+    Returns:
+        {"context_hash": ...} or {"context": ...}, for ScratchCreate/ScratchUpdate
+    """
+    import httpx
+
+    from src.client import DecompMeAPIError
+
+    try:
+        context_hash = await client.register_context(context)
+    except (DecompMeAPIError, httpx.HTTPError) as e:
+        console.print(f"[dim]Could not share context, sending it inline: {e}[/dim]")
+        context_hash = None
+    if context_hash:
+        return {"context_hash": context_hash}
+    return {"context": context}
+
+
+async def _compile_with_full_context(client, slug: str, melee_root: Path):
+    """Swap a sliced scratch context for the full one and compile again.
+
+    Returns:
+        The new compilation result, or None if the scratch context isn't
+        sliced or the full context couldn't be built
+    """
+    from src.client import ScratchUpdate
+
+    scratch = await client.get_scratch(slug)
+    if not scratch.context.startswith(SLICED_CONTEXT_HEADER):
+        return None
+
+    console.print("[dim]Compile failed with a sliced context, restoring the full context...[/dim]")
+    src_file = await _find_source_file(scratch.name, melee_root)
+    context, _ = await _build_fresh_context(scratch.name, src_file, melee_root)
+    if not context:
+        return None
+    try:
+        await client.update_scratch(slug, ScratchUpdate(**await _context_fields(client, context)))
+    except Exception as e:
+        console.print(f"[yellow]Warning: Could not restore context: {e}[/yellow]")
+        return None
+    return await client.compile_scratch(slug)
+
+
 async def _build_fresh_context(
     func_name: str,
     source_file: str | None = None,
@@ -1146,48 +1578,34 @@ async def _build_fresh_context(
         Tuple of (context_content, context_path) or (None, None) if failed
     """
     import subprocess
+
     from src.cli.extract import _strip_target_function
+    from src.commit.buildd import run_ninja
 
     # Determine context file path
     ctx_path = get_context_file(source_file=source_file, melee_root=melee_root)
 
     # Build the context file with ninja
-    try:
-        ctx_relative = ctx_path.relative_to(melee_root)
-        ninja_cwd = melee_root
-    except ValueError:
-        # ctx_path might be in a worktree, find the melee root for that worktree
-        parts = ctx_path.parts
-        ninja_cwd = None
-        for i, part in enumerate(parts):
-            if part == "build" and i > 0:
-                ninja_cwd = Path(*parts[:i])
-                ctx_relative = Path(*parts[i:])
-                break
-        if ninja_cwd is None:
-            console.print(f"[red]Cannot determine ninja target for: {ctx_path}[/red]")
-            return None, None
+    target = _ninja_target(ctx_path, melee_root)
+    if target is None:
+        console.print(f"[red]Cannot determine ninja target for: {ctx_path}[/red]")
+        return None, None
+    ninja_cwd, ctx_relative = target
 
     try:
-        result = subprocess.run(
-            ["ninja", str(ctx_relative)],
-            cwd=ninja_cwd,
-            capture_output=True,
-            text=True,
-            timeout=120,
-        )
-        if result.returncode != 0:
-            console.print(f"[red]Failed to build context file:[/red]")
-            console.print(result.stderr or result.stdout)
+        returncode, stdout, stderr = run_ninja(ninja_cwd, [str(ctx_relative)], timeout=120)
+        if returncode != 0:
+            console.print("[red]Failed to build context file:[/red]")
+            console.print(stderr or stdout)
             return None, None
         # Only show message if ninja actually did something
-        if "no work to do" not in result.stdout.lower():
-            console.print(f"[dim]Built context file[/dim]")
+        if "no work to do" not in stdout.lower():
+            console.print("[dim]Built context file[/dim]")
     except subprocess.TimeoutExpired:
-        console.print(f"[red]Timeout building context file[/red]")
+        console.print("[red]Timeout building context file[/red]")
         return None, None
     except FileNotFoundError:
-        console.print(f"[red]ninja not found - please install it[/red]")
+        console.print("[red]ninja not found - please install it[/red]")
         return None, None
 
     if not ctx_path.exists():
@@ -1224,11 +1642,16 @@ def scratch_update_context(
     compile_after: Annotated[
         bool, typer.Option("--compile", "-c", help="Compile after updating context")
     ] = False,
+    force: Annotated[
+        bool, typer.Option("--force", help="Upload even if nothing the function uses changed")
+    ] = False,
 ):
     """Update a scratch's context from the repo.
 
     Rebuilds the context file with ninja and updates the scratch.
-    Useful when headers or dependencies have changed.
+    Useful when headers or dependencies have changed. The upload (and
+    --compile) is skipped when the context is unchanged since the last
+    update, or none of the declarations the scratch's code uses changed.
 
     Examples:
         # Update context (auto-detect source file from scratch name)
@@ -1244,7 +1667,7 @@ def scratch_update_context(
         melee-agent scratch update-context abc123 --compile
     """
     api_url = api_url or get_local_api_url()
-    from src.client import DecompMeAPIClient, ScratchUpdate, DecompMeAPIError
+    from src.client import DecompMeAPIClient, DecompMeAPIError, ScratchUpdate
 
     # Extract slug from URL if needed
     if slug.startswith("http"):
@@ -1265,28 +1688,11 @@ def scratch_update_context(
             # Determine source file path
             src_file = str(source_file) if source_file else None
 
-            # If not specified, try to find from database
-            if not src_file:
-                from src.db import get_db
-                try:
-                    db = get_db()
-                    func_info = db.get_function(func_name)
-                    if func_info and func_info.get('source_file'):
-                        src_file = func_info['source_file']
-                        console.print(f"[dim]Found source file in DB: {src_file}[/dim]")
-                except Exception:
-                    pass  # DB lookup failed, will try without source file
-
-            # If still not found, try to find from extractor
+            # If not specified, look it up in the database, then the extractor
             if not src_file:
-                from src.extractor import extract_function
-                try:
-                    func = await extract_function(melee_root, func_name)
-                    if func and func.file_path:
-                        src_file = func.file_path
-                        console.print(f"[dim]Found source file from extractor: {src_file}[/dim]")
-                except Exception:
-                    pass  # Extractor failed
+                src_file = await _find_source_file(func_name, melee_root)
+                if src_file:
+                    console.print(f"[dim]Found source file: {src_file}[/dim]")
 
             # Get fresh context
             if context_file:
@@ -1305,22 +1711,34 @@ def scratch_update_context(
                     console.print("[red]Failed to build context[/red]")
                     raise typer.Exit(1)
 
+            skip_reason, hashes = _check_context_refresh(
+                slug, context, scratch.source_code, func_name
+            )
+            if skip_reason and not force:
+                console.print(
+                    f"[green]Context is up to date[/green] "
+                    f"({skip_reason}, use --force to upload anyway)"
+                )
+                return scratch
+
             # Verify ownership
             can_update, reason = await _verify_scratch_ownership(client, slug)
             if not can_update:
                 console.print(f"[yellow]Warning:[/yellow] {reason}")
 
             # Update scratch
+            context_update = ScratchUpdate(**await _context_fields(client, context))
             try:
-                await client.update_scratch(slug, ScratchUpdate(context=context))
+                await client.update_scratch(slug, context_update)
             except DecompMeAPIError as e:
                 if "403" in str(e):
                     if await _handle_403_error(client, slug, e, "update context"):
-                        await client.update_scratch(slug, ScratchUpdate(context=context))
+                        await client.update_scratch(slug, context_update)
                     else:
                         raise typer.Exit(1)
                 else:
                     raise
+            _record_context_upload(slug, api_url, hashes)
 
             console.print(f"[green]Updated context![/green] ({len(context):,} bytes)")
 
@@ -1335,7 +1753,7 @@ def scratch_update_context(
                     console.print(f"Match: {match_pct:.1f}%")
                     record_match_score(slug, result.diff_output.current_score, result.diff_output.max_score)
                 elif not result.success:
-                    console.print(f"[red]Compilation failed[/red]")
+                    console.print("[red]Compilation failed[/red]")
                     console.print(result.compiler_output)
 
             return scratch
@@ -1362,9 +1780,10 @@ def scratch_sync_from_repo(
     Example: melee-agent scratch sync-from-repo ft_8008A1FC
     """
     api_url = api_url or get_local_api_url()
-    from src.client import DecompMeAPIClient, ScratchUpdate, DecompMeAPIError
+    from src.client import DecompMeAPIClient, DecompMeAPIError, ScratchUpdate
     from src.commit.configure import get_file_path_from_function
     from src.commit.update import _extract_function_from_code
+
     from ._common import load_completed_functions
 
     # Look up the scratch slug from the DB
@@ -1416,39 +1835,8 @@ def scratch_sync_from_repo(
             original_len = len(fresh_context)
 
             # Strip function definition (but keep declaration) to avoid redefinition
-            if function_name in fresh_context:
-                lines = fresh_context.split('\n')
-                filtered_lines = []
-                in_function = False
-                brace_depth = 0
-                for line in lines:
-                    if not in_function and function_name in line and '(' in line:
-                        s = line.strip()
-                        # Skip comments, control flow, and declarations (end with ;)
-                        if s.startswith('//') or s.startswith('if') or s.startswith('while'):
-                            filtered_lines.append(line)
-                            continue
-                        # Keep declarations (prototypes) - they end with );
-                        if s.endswith(';'):
-                            filtered_lines.append(line)
-                            continue
-                        # This is a function definition
-                        in_function = True
-                        brace_depth = line.count('{') - line.count('}')
-                        filtered_lines.append(f'// {function_name} definition stripped')
-                        # If no brace on this line, wait for it
-                        if '{' not in line:
-                            brace_depth = 0
-                        elif brace_depth <= 0:
-                            in_function = False
-                        continue
-                    if in_function:
-                        brace_depth += line.count('{') - line.count('}')
-                        if brace_depth <= 0:
-                            in_function = False
-                        continue
-                    filtered_lines.append(line)
-                fresh_context = '\n'.join(filtered_lines)
+            from src.cli.extract import _strip_target_function
+            fresh_context = _strip_target_function(fresh_context, function_name)
 
             stripped_bytes = original_len - len(fresh_context)
             console.print(f"[dim]Loaded fresh context ({len(fresh_context):,} bytes, stripped {stripped_bytes:,})[/dim]")
@@ -1523,4 +1911,4 @@ def scratch_sync_from_repo(
         if match_pct >= 100:
             console.print("[green]Function is now 100% - ready to sync to production[/green]")
     else:
-        console.print(f"[yellow]Updated but compilation failed[/yellow]")
+        console.print("[yellow]Updated but compilation failed[/yellow]")
@@ -6,7 +6,7 @@ from .status import status_command, urls_command, history_command
 from .agents import agents_command, stale_command
 from .validate import validate_command
 from .prs import prs_command, refresh_prs_command
-from .cleanup import cleanup_command, rebuild_command, export_command
+from .cleanup import cleanup_command, rebuild_command, export_command, compact_history_command
 from .sync_report import populate_addresses_command, sync_report_command
 from .diff_remotes import diff_remotes_command
 
@@ -24,6 +24,7 @@ state_app.command("refresh-prs")(refresh_prs_command)
 state_app.command("cleanup")(cleanup_command)
 state_app.command("rebuild")(rebuild_command)
 state_app.command("export")(export_command)
+state_app.command("compact-history")(compact_history_command)
 state_app.command("populate-addresses")(populate_addresses_command)
 state_app.command("sync-report")(sync_report_command)
 state_app.command("diff-remotes")(diff_remotes_command)
@@ -2,7 +2,6 @@
 
 import asyncio
 import json
-import os
 import time
 from pathlib import Path
 from typing import Annotated, Any
@@ -11,7 +10,6 @@ import typer
 
 from .._common import (
     AGENT_ID,
-    DECOMP_CONFIG_DIR,
     PRODUCTION_DECOMP_ME,
     console,
     detect_local_api_url,
@@ -340,40 +338,14 @@ def rebuild_command(
         console.print(f"  Migrated {stats['scratches_migrated']} scratches")
         console.print(f"  Migrated {stats['syncs_migrated']} sync mappings")
 
-        # 3. scratch_tokens.json
-        tokens_file = DECOMP_CONFIG_DIR / "scratch_tokens.json"
-        if tokens_file.exists():
-            try:
-                with open(tokens_file) as f:
-                    tokens = json.load(f)
-                for slug, token in tokens.items():
-                    if not dry_run:
-                        with db.connection() as conn:
-                            conn.execute(
-                                "UPDATE scratches SET claim_token = ? WHERE slug = ?",
-                                (token, slug)
-                            )
-                console.print(f"  Migrated {len(tokens)} scratch tokens")
-            except (json.JSONDecodeError, IOError) as e:
-                stats["errors"].append(f"scratch_tokens.json: {e}")
-
-        # 4. Current claims
-        claims_file = Path(os.environ.get("DECOMP_CLAIMS_FILE", "/tmp/decomp_claims.json"))
-        if claims_file.exists():
-            try:
-                with open(claims_file) as f:
-                    claims = json.load(f)
-                now = time.time()
-                for func_name, info in claims.items():
-                    if now - info.get('timestamp', 0) < 3600:  # Not expired
-                        if verbose:
-                            console.print(f"  Claim: {func_name}")
-                        if not dry_run:
-                            db.add_claim(func_name, info.get('agent_id', 'unknown'))
-                        stats["claims_migrated"] += 1
-                console.print(f"  Migrated {stats['claims_migrated']} active claims")
-            except (json.JSONDecodeError, IOError) as e:
-                stats["errors"].append(f"decomp_claims.json: {e}")
+        # 3. Legacy JSON side-stores (claims, scratch tokens, match history)
+        if not dry_run:
+            from ..storage import migrate_legacy_json_stores
+            counts = migrate_legacy_json_stores(force=True) or {}
+            stats["claims_migrated"] = counts.get("claims", 0)
+            console.print(f"  Migrated {counts.get('tokens', 0)} scratch tokens")
+            console.print(f"  Migrated {stats['claims_migrated']} active claims")
+            console.print(f"  Migrated {counts.get('history', 0)} match history entries")
 
         # Update metadata
         if not dry_run:
@@ -456,3 +428,33 @@ def export_command(
     console.print(f"  Claims: {len(export_data['claims'])}")
     if include_audit:
         console.print(f"  Audit entries: {len(export_data.get('audit_log', []))}")
+
+
+def compact_history_command(
+    older_than_days: Annotated[
+        float, typer.Option("--older-than", help="Only thin out points older than this many days")
+    ] = 7.0,
+    dry_run: Annotated[
+        bool, typer.Option("--dry-run", help="Show current history size without deleting")
+    ] = False,
+):
+    """Downsample old match-score history.
+
+    Keeps each scratch's first and latest point, every new best score and
+    one point per hour. Per-hour compile counts are kept in the rollups.
+    """
+    db = get_db()
+
+    with db.connection() as conn:
+        total = conn.execute("SELECT COUNT(*) as cnt FROM match_history").fetchone()['cnt']
+        rollups = conn.execute("SELECT COUNT(*) as cnt FROM match_history_rollups").fetchone()['cnt']
+
+    console.print(f"History points: {total}")
+    console.print(f"Hourly rollups: {rollups}")
+
+    if dry_run:
+        console.print("\n[dim]Dry run - no changes made[/dim]")
+        return
+
+    deleted = db.downsample_match_history(older_than_seconds=older_than_days * 86400)
+    console.print(f"[green]Removed {deleted} redundant points[/green] ({total - deleted} remaining)")
@@ -9,6 +9,8 @@ import typer
 from rich.table import Table
 
 from .._common import console, ensure_dol_in_worktree
+from src.commit.buildd import run_ninja
+from src.commit.objcache import install_object_cache
 from src.db import get_db
 
 
@@ -173,24 +175,22 @@ def _build_ref_and_get_all_functions(repo_path: Path, ref: str, clean: bool = Fa
                 console.print(f"  [red]{line}[/red]")
         return {}
 
+    # Reuse objects already compiled by the agent worktrees
+    install_object_cache(worktree_path)
+
     # Run ninja
     console.print(f"[bold]Building {ref}... (this may take a few minutes)[/bold]")
-    result = subprocess.run(
-        ["ninja"],
-        cwd=worktree_path,
-        capture_output=True,
-        text=True,
-    )
-    if result.returncode != 0:
-        console.print(f"[red]ninja build failed for {ref} (exit code {result.returncode}):[/red]")
+    returncode, stdout, stderr = run_ninja(worktree_path)
+    if returncode != 0:
+        console.print(f"[red]ninja build failed for {ref} (exit code {returncode}):[/red]")
         # Show last lines of both stdout and stderr
-        if result.stdout.strip():
+        if stdout.strip():
             console.print(f"[dim]stdout (last 20 lines):[/dim]")
-            for line in result.stdout.strip().split('\n')[-20:]:
+            for line in stdout.strip().split('\n')[-20:]:
                 console.print(f"  {line}")
-        if result.stderr.strip():
+        if stderr.strip():
             console.print(f"[dim]stderr (last 20 lines):[/dim]")
-            for line in result.stderr.strip().split('\n')[-20:]:
+            for line in stderr.strip().split('\n')[-20:]:
                 console.print(f"  [red]{line}[/red]")
         return {}
 
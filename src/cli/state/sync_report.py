@@ -1,5 +1,6 @@
 """Sync report commands - sync state from report.json and symbols.txt."""
 
+import asyncio
 import time
 from pathlib import Path
 from typing import Annotated, Optional
@@ -144,6 +145,12 @@ def sync_report_command(
     detect_renames: Annotated[
         bool, typer.Option("--detect-renames/--no-detect-renames", help="Detect renamed functions via address")
     ] = True,
+    changed_files: Annotated[
+        Optional[list[str]], typer.Option(
+            "--file", "-f",
+            help="Only re-diff the units for these source files (e.g. melee/lb/lbcommand.c)",
+        )
+    ] = None,
     update_status: Annotated[
         bool, typer.Option("--update-status/--no-update-status", help="Update function status based on match %")
     ] = True,
@@ -167,10 +174,15 @@ def sync_report_command(
     - local: Use current build/GALE01/report.json
     - upstream: Checkout upstream/master and build report (slow)
 
+    With --file, only the units for those source files are rebuilt and
+    re-diffed, and only functions whose match changed are updated. Rename
+    detection and missing-function checks need the full report and are
+    skipped.
+
     The sync process:
     1. Parse report.json for function match percentages
     2. For each function, look up by name first
-    3. If not found by name but address exists, look up by address (rename detection)
+    3. Detect renames by joining report addresses against tracked functions and aliases
     4. Update match_percent in database
     5. Optionally update status based on match %
     """
@@ -204,9 +216,26 @@ def sync_report_command(
         console.print(f"[red]Unknown source: {source}[/red]")
         raise typer.Exit(1)
 
+    # Incremental mode: re-diff only the changed units
+    deltas = None
+    if changed_files:
+        from src.commit.build import update_report_units
+
+        console.print(f"[dim]Re-diffing {len(changed_files)} unit(s)...[/dim]")
+        deltas = asyncio.run(update_report_units(melee_root, changed_files))
+        if deltas is None:
+            console.print("[red]Incremental update unavailable (missing objdiff-cli, unknown unit or build failure)[/red]")
+            console.print("[dim]Run without --file to sync from the full report[/dim]")
+            raise typer.Exit(1)
+        detect_renames = False
+
     # Get function matches from report
     report_matches = parser.get_function_matches()
-    console.print(f"[green]Found {len(report_matches)} functions in report.json[/green]")
+    if deltas is not None:
+        report_matches = {name: m for name, m in report_matches.items() if name in deltas}
+        console.print(f"[green]{len(report_matches)} functions changed in re-diffed units[/green]")
+    else:
+        console.print(f"[green]Found {len(report_matches)} functions in report.json[/green]")
 
     # Get current database state
     with db.connection() as conn:
@@ -218,13 +247,6 @@ def sync_report_command(
         )
         db_functions = {row['function_name']: dict(row) for row in cursor.fetchall()}
 
-    # Build address-to-name lookup from database
-    addr_to_name: dict[str, str] = {}
-    for func_name, func_data in db_functions.items():
-        addr = func_data.get('canonical_address')
-        if addr:
-            addr_to_name[addr] = func_name
-
     # Track changes
     changes = {
         'match_updates': [],       # (name, old_pct, new_pct)
@@ -234,10 +256,16 @@ def sync_report_command(
         'missing_in_report': [],   # in DB but not in report
     }
 
+    # Rename detection runs as one SQL join over the whole report
+    if detect_renames:
+        changes['renames_detected'] = db.detect_renames(
+            {name: match.address for name, match in report_matches.items()}
+        )
+    renamed_to = {new_name for _, new_name, _ in changes['renames_detected']}
+
     # Process each function in report
     for report_name, match in report_matches.items():
         report_pct = match.fuzzy_match_percent
-        report_addr = match.address
 
         # Try to find in database
         db_func = db_functions.get(report_name)
@@ -255,21 +283,16 @@ def sync_report_command(
                 if new_status and new_status != current_status:
                     changes['status_updates'].append((report_name, current_status, new_status))
 
-        elif detect_renames and report_addr:
-            # Not found by name - try address lookup
-            normalized_addr = db._normalize_address(report_addr)
-            if normalized_addr and normalized_addr in addr_to_name:
-                old_name = addr_to_name[normalized_addr]
-                changes['renames_detected'].append((old_name, report_name, normalized_addr))
-        else:
+        elif report_name not in renamed_to:
             # New function not in database
             changes['new_functions'].append(report_name)
 
     # Find functions in DB but not in report
-    report_names = set(report_matches.keys())
-    for db_name in db_functions.keys():
-        if db_name not in report_names:
-            changes['missing_in_report'].append(db_name)
+    if deltas is None:
+        report_names = set(report_matches.keys())
+        for db_name in db_functions.keys():
+            if db_name not in report_names:
+                changes['missing_in_report'].append(db_name)
 
     # Output results
     if output_json:
@@ -3,10 +3,12 @@
 Provides utilities for:
 - Loading/saving completed functions from the database
 - Loading/saving slug mappings (local to production)
+- One-shot migration of legacy JSON side-stores into the database
 - Context file resolution
 """
 
 import json
+import os
 from pathlib import Path
 
 from src.client.api import _get_agent_id
@@ -25,6 +27,77 @@ PRODUCTION_COOKIES_FILE = DECOMP_CONFIG_DIR / "production_cookies.json"
 # Get agent ID
 AGENT_ID = _get_agent_id()
 
+# Legacy JSON side-stores, now kept in the state database
+LEGACY_CLAIMS_FILE = Path(os.environ.get("DECOMP_CLAIMS_FILE", "/tmp/decomp_claims.json"))
+LEGACY_SCRATCH_TOKENS_FILE = Path(os.environ.get(
+    "DECOMP_SCRATCH_TOKENS_FILE",
+    str(DECOMP_CONFIG_DIR / "scratch_tokens.json")
+))
+DECOMP_CLAIM_TIMEOUT = int(os.environ.get("DECOMP_CLAIM_TIMEOUT", "10800"))  # 3 hours
+
+_legacy_migration_checked = False
+
+
+def _read_legacy_json(path: Path):
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except (json.JSONDecodeError, IOError):
+        return None
+
+
+def migrate_legacy_json_stores(force: bool = False) -> dict[str, int] | None:
+    """Import claims, scratch tokens and match history from legacy JSON files.
+
+    Runs once per database (tracked in db_meta) and once per process. Imported
+    files are renamed to *.migrated so they are never read again.
+
+    Args:
+        force: Re-run even if the database says the migration already happened
+
+    Returns:
+        Import counts, or None if the migration was skipped
+    """
+    global _legacy_migration_checked
+    if _legacy_migration_checked and not force:
+        return None
+    _legacy_migration_checked = True
+
+    from src.db import get_db
+    db = get_db()
+    if not force and db.get_meta("legacy_json_migrated"):
+        return None
+
+    history_files = sorted(DECOMP_CONFIG_DIR.glob("match_history*.json"))
+    sources = [LEGACY_CLAIMS_FILE, LEGACY_SCRATCH_TOKENS_FILE, *history_files]
+    existing = [p for p in sources if p.exists()]
+
+    counts = {"claims": 0, "tokens": 0, "history": 0}
+    if existing:
+        match_history: dict[str, list] = {}
+        for path in history_files:
+            for slug, entries in (_read_legacy_json(path) or {}).items():
+                match_history.setdefault(slug, []).extend(entries)
+
+        counts = db.import_legacy_stores(
+            claims=_read_legacy_json(LEGACY_CLAIMS_FILE) if LEGACY_CLAIMS_FILE.exists() else None,
+            tokens=(
+                _read_legacy_json(LEGACY_SCRATCH_TOKENS_FILE)
+                if LEGACY_SCRATCH_TOKENS_FILE.exists() else None
+            ),
+            match_history=match_history,
+            claim_timeout_seconds=DECOMP_CLAIM_TIMEOUT,
+        )
+
+        for path in existing:
+            try:
+                path.rename(path.with_name(path.name + ".migrated"))
+            except OSError:
+                pass  # Another agent may have migrated it already
+
+    db.set_meta("legacy_json_migrated", "1")
+    return counts
+
 
 def load_completed_functions() -> dict:
     """Load completed functions from the SQLite database.
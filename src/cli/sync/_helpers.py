@@ -9,6 +9,7 @@ from .._common import (
     console,
     PRODUCTION_COOKIES_FILE,
 )
+from ..utils import save_json_atomic
 
 # Rate limiting configuration for production API
 RATE_LIMIT_DELAY = 1.0  # Base delay between requests (seconds)
@@ -79,6 +80,4 @@ def load_production_cookies() -> dict[str, str]:
 
 def save_production_cookies(cookies: dict[str, str]) -> None:
     """Save production cookies to cache file."""
-    PRODUCTION_COOKIES_FILE.parent.mkdir(parents=True, exist_ok=True)
-    with open(PRODUCTION_COOKIES_FILE, 'w') as f:
-        json.dump(cookies, f, indent=2)
+    save_json_atomic(PRODUCTION_COOKIES_FILE, cookies)
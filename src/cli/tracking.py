@@ -1,25 +1,13 @@
 """Match history tracking utilities.
 
 Provides utilities for tracking match score progression over time.
+History lives in the state database's match_history table.
 """
 
-import json
 import time
-from pathlib import Path
-
-from src.client.api import _get_agent_id
-
-# Config directory
-DECOMP_CONFIG_DIR = Path.home() / ".config" / "decomp-me"
-DECOMP_CONFIG_DIR.mkdir(parents=True, exist_ok=True)
-
-# Get agent ID for file isolation
-AGENT_ID = _get_agent_id()
-
-# Match history file (per-agent for isolation)
-_history_suffix = f"_{AGENT_ID}" if AGENT_ID else ""
-MATCH_HISTORY_FILE = DECOMP_CONFIG_DIR / f"match_history{_history_suffix}.json"
 
+# Maximum entries returned per scratch
+MAX_HISTORY_ENTRIES = 50
 
 
 # =============================================================================
@@ -27,42 +15,72 @@ MATCH_HISTORY_FILE = DECOMP_CONFIG_DIR / f"match_history{_history_suffix}.json"
 # =============================================================================
 
 
+def _entry_from_row(row: dict) -> dict:
+    return {
+        "score": row["score"],
+        "max_score": row["max_score"],
+        "match_pct": round(row["match_percent"], 1),
+        "timestamp": row["timestamp"],
+    }
+
+
 def load_match_history() -> dict:
     """Load match history for all scratches.
 
     Returns dict of slug -> list of {score, max_score, match_pct, timestamp}
     """
-    if not MATCH_HISTORY_FILE.exists():
-        return {}
-    try:
-        with open(MATCH_HISTORY_FILE, "r") as f:
-            return json.load(f)
-    except (json.JSONDecodeError, IOError):
-        return {}
+    from src.db import get_db
+    from .storage import migrate_legacy_json_stores
+
+    migrate_legacy_json_stores()
+    history: dict[str, list] = {}
+    with get_db().connection() as conn:
+        cursor = conn.execute(
+            """
+            SELECT scratch_slug, score, max_score, match_percent, timestamp
+            FROM match_history
+            ORDER BY scratch_slug, timestamp
+            """
+        )
+        for row in cursor.fetchall():
+            history.setdefault(row["scratch_slug"], []).append(_entry_from_row(row))
+    return history
 
 
 def save_match_history(data: dict) -> None:
-    """Save match history."""
-    MATCH_HISTORY_FILE.parent.mkdir(parents=True, exist_ok=True)
-    with open(MATCH_HISTORY_FILE, "w") as f:
-        json.dump(data, f, indent=2)
-
+    """Import match history entries into the database.
 
-def record_match_score(slug: str, score: int, max_score: int) -> dict:
+    Accepts the legacy {slug: [entries]} format. Scratches that already
+    have history in the database are left untouched.
+    """
+    from src.db import get_db
+    get_db().import_legacy_stores(match_history=data)
+
+
+def record_match_score(
+    slug: str,
+    score: int,
+    max_score: int,
+    worktree_path: str | None = None,
+    branch: str | None = None,
+    agent_id: str | None = None,
+) -> dict:
     """Record a new match score for a scratch.
 
+    Unchanged scores are only sampled periodically in the history; every
+    compile is still counted in the hourly rollups.
+
     Args:
         slug: Scratch slug
         score: Current diff score (0 = perfect match)
         max_score: Maximum possible score
+        worktree_path: Path to the worktree where work was done
+        branch: Git branch name where work was done
+        agent_id: Agent that compiled (defaults to the current agent)
 
     Returns:
         History entry that was added
     """
-    history = load_match_history()
-    if slug not in history:
-        history[slug] = []
-
     match_pct = 100.0 if score == 0 else (1.0 - score / max_score) * 100 if max_score > 0 else 0.0
 
     entry = {
@@ -72,19 +90,17 @@ def record_match_score(slug: str, score: int, max_score: int) -> dict:
         "timestamp": time.time(),
     }
 
-    # Only record if score changed from last entry
-    if history[slug]:
-        last = history[slug][-1]
-        if last["score"] == score and last["max_score"] == max_score:
-            return entry  # No change, don't record duplicate
-
-    history[slug].append(entry)
-
-    # Keep only last 50 entries per scratch
-    if len(history[slug]) > 50:
-        history[slug] = history[slug][-50:]
+    try:
+        from src.db import get_db
+        if agent_id is None:
+            from ._common import AGENT_ID
+            agent_id = AGENT_ID
+        get_db().record_match_score(
+            slug, score, max_score, worktree_path, branch, agent_id=agent_id
+        )
+    except Exception:
+        pass  # Non-blocking - history is best-effort
 
-    save_match_history(history)
     return entry
 
 
@@ -93,8 +109,33 @@ def get_match_history(slug: str) -> list:
 
     Returns list of {score, max_score, match_pct, timestamp}
     """
-    history = load_match_history()
-    return history.get(slug, [])
+    try:
+        from src.db import get_db
+        from .storage import migrate_legacy_json_stores
+
+        migrate_legacy_json_stores()
+        rows = get_db().get_match_history(slug, limit=MAX_HISTORY_ENTRIES)
+    except Exception:
+        return []
+    return [_entry_from_row(row) for row in rows]
+
+
+def get_best_match(slug: str) -> dict | None:
+    """Get the best score seen so far for a scratch.
+
+    Returns {best_score, best_match_pct} or None if there is no history.
+    """
+    try:
+        from src.db import get_db
+        best = get_db().get_best_match(slug)
+    except Exception:
+        return None
+    if best is None:
+        return None
+    return {
+        "best_score": best["best_score"],
+        "best_match_pct": round(best["best_match_percent"] or 0.0, 1),
+    }
 
 
 def format_match_history(slug: str, max_entries: int = 10) -> str:
@@ -10,6 +10,8 @@ from .json_storage import (
     load_json_with_expiry,
     save_json_atomic,
     load_json_safe,
+    update_json_atomic,
+    delete_json_key_atomic,
 )
 
 __all__ = [
@@ -18,4 +20,6 @@ __all__ = [
     "load_json_with_expiry",
     "save_json_atomic",
     "load_json_safe",
+    "update_json_atomic",
+    "delete_json_key_atomic",
 ]
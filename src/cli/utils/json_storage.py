@@ -2,17 +2,22 @@
 
 Provides utilities for loading and saving JSON files with:
 - Automatic expiry of stale entries
-- Atomic writes to prevent corruption
+- Atomic writes to prevent corruption (temp file + fsync + rename)
 - Safe loading with error handling
 """
 
 import json
+import os
+import tempfile
 import time
 from pathlib import Path
 from typing import Any
 
 from .locking import file_lock
 
+# Files with more top-level entries than this are written without indentation.
+# Pretty-printing large maps roughly doubles their size and parse time.
+COMPACT_THRESHOLD = 500
 
 def load_json_safe(path: Path) -> dict[str, Any]:
     """Load a JSON file safely, returning empty dict on errors.
@@ -33,6 +38,55 @@ def load_json_safe(path: Path) -> dict[str, Any]:
         return {}
 
 
+def _write_json_file(path: Path, data: dict[str, Any], compact: bool | None = None) -> None:
+    """Write JSON so readers only ever see the old or the new contents.
+
+    Data is written to a temp file in the same directory, fsynced, then
+    renamed over the target. A process killed mid-write leaves the
+    previous file intact instead of a truncated one.
+    """
+    if compact is None:
+        compact = len(data) > COMPACT_THRESHOLD
+    if compact:
+        payload = json.dumps(data, separators=(",", ":"))
+    else:
+        payload = json.dumps(data, indent=2)
+
+    try:
+        mode = os.stat(path).st_mode & 0o777
+    except OSError:
+        mode = 0o644
+
+    fd, tmp_name = tempfile.mkstemp(
+        dir=path.parent, prefix=f".{path.name}.", suffix=".tmp"
+    )
+    try:
+        os.fchmod(fd, mode)
+        with os.fdopen(fd, "w") as f:
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_name, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_name)
+        except OSError:
+            pass
+        raise
+
+    # Make the rename itself durable
+    try:
+        dir_fd = os.open(path.parent, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(dir_fd)
+    except OSError:
+        pass
+    finally:
+        os.close(dir_fd)
+
+
 def load_json_with_expiry(
     path: Path,
     timeout_seconds: int,
@@ -68,17 +122,21 @@ def save_json_atomic(
     path: Path,
     data: dict[str, Any],
     lock_path: Path | None = None,
+    compact: bool | None = None,
 ) -> None:
     """Save JSON data atomically with file locking.
 
     Uses a lock file to prevent race conditions when multiple processes
-    write to the same file.
+    write to the same file, and a temp-file rename so a crash never
+    leaves a truncated file behind.
 
     Args:
         path: Path to the JSON file
         data: Data to save
         lock_path: Optional separate lock file path. If not provided,
                    uses path.with_suffix('.lock')
+        compact: Write without indentation. Defaults to compact only for
+                 files with more than COMPACT_THRESHOLD entries.
     """
     path.parent.mkdir(parents=True, exist_ok=True)
 
@@ -86,8 +144,7 @@ def save_json_atomic(
         lock_path = path.with_suffix(path.suffix + ".lock")
 
     with file_lock(lock_path, exclusive=True):
-        with open(path, "w") as f:
-            json.dump(data, f, indent=2)
+        _write_json_file(path, data, compact)
 
 
 def update_json_atomic(
@@ -114,8 +171,7 @@ def update_json_atomic(
     with file_lock(lock_path, exclusive=True):
         data = load_json_safe(path)
         data[key] = value
-        with open(path, "w") as f:
-            json.dump(data, f, indent=2)
+        _write_json_file(path, data)
 
 
 def delete_json_key_atomic(
@@ -144,6 +200,5 @@ def delete_json_key_atomic(
         if key not in data:
             return False
         del data[key]
-        with open(path, "w") as f:
-            json.dump(data, f, indent=2)
+        _write_json_file(path, data)
         return True
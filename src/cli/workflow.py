@@ -130,6 +130,7 @@ def workflow_finish(
 
     from src.client import DecompMeAPIClient
     from src.commit import auto_detect_and_commit
+    from src.commit.build import compile_object
     from src.commit.configure import get_file_path_from_function
     from src.commit.update import validate_function_code, _extract_function_from_code
     from src.commit.diagnostics import (
@@ -140,7 +141,6 @@ def workflow_finish(
         format_caller_updates_needed,
         get_header_fix_suggestion,
     )
-    import subprocess
 
     async def finish():
         async with DecompMeAPIClient(base_url=api_url) as client:
@@ -231,16 +231,12 @@ def workflow_finish(
                     raise typer.Exit(1)
 
                 if not force:
-                    # Configure and compile
-                    subprocess.run(["python", "configure.py"], cwd=melee_root, capture_output=True)
-                    obj_path = f"build/GALE01/src/{file_path}".replace('.c', '.o')
-                    result = subprocess.run(
-                        ["ninja", obj_path], cwd=melee_root, capture_output=True, text=True
-                    )
+                    # Compile just this object; the commit step reuses the result
+                    compiled, stdout, stderr = await compile_object(melee_root, file_path)
 
-                    if result.returncode != 0:
+                    if not compiled:
                         console.print("  [red]Compilation failed:[/red]")
-                        full_output = result.stderr + result.stdout
+                        full_output = stderr + stdout
                         diagnostic = analyze_commit_error(
                             full_output,
                             file_path,
@@ -21,12 +21,12 @@ from ._common import (
     db_unlock_subdirectory,
     db_get_subdirectory_lock,
     get_subdirectory_worktree_path,
+    get_pooled_worktrees,
+    fill_worktree_pool,
 )
 from src.db import get_db
-from .utils import load_json_with_expiry
 
 # Claims file location and timeout (matches claim.py)
-DECOMP_CLAIMS_FILE = os.environ.get("DECOMP_CLAIMS_FILE", "/tmp/decomp_claims.json")
 DECOMP_CLAIM_TIMEOUT = int(os.environ.get("DECOMP_CLAIM_TIMEOUT", "10800"))  # 3 hours
 
 
@@ -652,23 +652,9 @@ def worktree_current(
     Example:
         melee-agent worktree current
     """
-    # Load claims from JSON file
-    claims_path = Path(DECOMP_CLAIMS_FILE)
-    if claims_path.exists():
-        all_claims = load_json_with_expiry(
-            claims_path,
-            timeout_seconds=DECOMP_CLAIM_TIMEOUT,
-            timestamp_field="timestamp",
-        )
-    else:
-        all_claims = {}
-
-    # Filter to this agent's claims
-    my_claims = {
-        func_name: info
-        for func_name, info in all_claims.items()
-        if info.get("agent_id") == AGENT_ID
-    }
+    # Load this agent's claims from the state database
+    from .claim import _load_claims
+    my_claims = _load_claims(AGENT_ID)
 
     # Get scratch info from database for each claimed function
     db = get_db()
@@ -957,6 +943,30 @@ def worktree_status(
         console.print(f"\n  [dim]Lock status:[/dim] not tracked")
 
 
+@worktree_app.command("pool")
+def worktree_pool(
+    size: Annotated[
+        int, typer.Option("--size", "-s", help="Number of idle pre-built worktrees to keep")
+    ] = 0,
+):
+    """Show or refill the pool of pre-built worktrees.
+
+    Pooled worktrees are checked out at upstream/master with a build cloned
+    from main, so a claim for a subdirectory without a worktree adopts one
+    with a branch checkout instead of a full build. Run with --size N
+    (e.g. from cron) to top the pool up.
+    """
+    if size > 0:
+        console.print(f"[dim]Filling worktree pool to {size}...[/dim]")
+        created = fill_worktree_pool(size)
+        console.print(f"[green]Created {created} pooled worktrees[/green]")
+
+    pooled = get_pooled_worktrees()
+    console.print(f"\n[bold]Worktree pool:[/bold] {len(pooled)} idle")
+    for path in pooled:
+        console.print(f"  [dim]{path}[/dim]")
+
+
 @worktree_app.command("health")
 def worktree_health(
     subdirectory_key: Annotated[
@@ -21,6 +21,9 @@ from rich.console import Console
 
 from src.client.api import _get_agent_id
 from src.cli._common import ensure_dol_in_worktree
+from src.commit.build import needs_configure
+from src.commit.buildd import ensure_build_daemon, get_worktree_tree_hash, run_ninja
+from src.commit.objcache import install_object_cache
 
 # Console for rich output
 console = Console()
@@ -167,32 +170,24 @@ def db_get_subdirectory_lock(subdir_key: str) -> dict | None:
 # =============================================================================
 
 
-def _validate_worktree_build(worktree_path: Path, max_age_minutes: int = 30) -> bool:
-    """Check if a worktree builds successfully."""
-    marker_file = worktree_path / ".build_validated"
-
-    if marker_file.exists():
-        marker_age = time.time() - marker_file.stat().st_mtime
-        if marker_age < max_age_minutes * 60:
-            src_dir = worktree_path / "src"
-            marker_mtime = marker_file.stat().st_mtime
-            needs_revalidation = False
-
-            for check_dir in [src_dir / "melee" / "lb", src_dir / "melee" / "ft"]:
-                if check_dir.exists():
-                    for pattern in ["*.c", "*.h"]:
-                        for f in check_dir.rglob(pattern):
-                            if f.stat().st_mtime > marker_mtime:
-                                needs_revalidation = True
-                                break
-                        if needs_revalidation:
-                            break
-                    if needs_revalidation:
-                        break
-
-            if not needs_revalidation:
-                console.print(f"[dim]Build validated {int(marker_age / 60)}m ago[/dim]")
-                return True
+def _validate_worktree_build(worktree_path: Path) -> bool:
+    """Check if a worktree builds successfully.
+
+    The build is skipped when the worktree's tree hash matches its last
+    successful build recorded in the state database.
+    """
+    tree_hash = get_worktree_tree_hash(worktree_path)
+    db = _get_state_db()
+
+    if tree_hash and db is not None:
+        try:
+            validation = db.get_build_validation(str(worktree_path))
+        except Exception:
+            validation = None
+        if validation and validation["tree_hash"] == tree_hash:
+            age = time.time() - validation["validated_at"]
+            console.print(f"[dim]Build validated {int(age / 60)}m ago (no changes since)[/dim]")
+            return True
 
     console.print(f"[dim]Running build validation (this may take a minute)...[/dim]")
 
@@ -211,21 +206,26 @@ def _validate_worktree_build(worktree_path: Path, max_age_minutes: int = 30) ->
                 console.print(f"[dim]{result.stdout[:500]}[/dim]")
             return False
 
-        result = subprocess.run(
-            ["ninja"],
-            cwd=worktree_path,
-            capture_output=True, text=True,
-            timeout=300
-        )
+        # Reuse objects already compiled by other worktrees
+        install_object_cache(worktree_path)
 
-        if result.returncode == 0:
-            marker_file.touch()
+        returncode, stdout, stderr = run_ninja(worktree_path, timeout=300)
+
+        if returncode == 0:
+            if tree_hash and db is not None:
+                try:
+                    db.record_build_validation(str(worktree_path), tree_hash)
+                except Exception:
+                    pass
             return True
         else:
-            if marker_file.exists():
-                marker_file.unlink()
+            if db is not None:
+                try:
+                    db.clear_build_validation(str(worktree_path))
+                except Exception:
+                    pass
             console.print(f"[red]Build failed:[/red]")
-            error_output = result.stderr or result.stdout or "Unknown error"
+            error_output = stderr or stdout or "Unknown error"
             lines = error_output.split('\n')
             error_lines = [l for l in lines if 'error:' in l.lower() or 'Error:' in l]
             if error_lines:
@@ -248,6 +248,150 @@ def _validate_worktree_build(worktree_path: Path, max_age_minutes: int = 30) ->
         return False
 
 
+# =============================================================================
+# Build Directory Provisioning
+# =============================================================================
+
+# Generated files copied from main alongside build/ so configure.py can be skipped
+_GENERATED_ROOT_FILES = ("build.ninja", "objdiff.json")
+
+# Per-worktree bookkeeping that must not be cloned
+_BUILD_CLONE_IGNORE = (
+    ".report_worker.pid", ".report_worker.lock", ".report_requested", "report_worker.log", "*.tmp",
+)
+
+
+def _clone_tree(src: Path, dst: Path) -> None:
+    """Copy a directory, sharing extents with copy-on-write where supported.
+
+    `cp --reflink=auto` clones files on btrfs/XFS/APFS-style filesystems and
+    falls back to a normal copy elsewhere. Hardlinks are not used: MWCC
+    rewrites objects in place, which would corrupt main's build.
+    """
+    try:
+        result = subprocess.run(
+            ["cp", "-a", "--reflink=auto", str(src), str(dst)],
+            capture_output=True, text=True,
+        )
+        if result.returncode == 0:
+            for pattern in _BUILD_CLONE_IGNORE:
+                for f in dst.rglob(pattern):
+                    f.unlink(missing_ok=True)
+            return
+    except FileNotFoundError:
+        pass
+    shutil.rmtree(dst, ignore_errors=True)
+    shutil.copytree(src, dst, symlinks=True, ignore=shutil.ignore_patterns(*_BUILD_CLONE_IGNORE))
+
+
+def _copy_compile_commands(source_root: Path, worktree_path: Path) -> bool:
+    """Copy main's compile_commands.json with its paths moved to the worktree.
+
+    Entries name absolute directories, files and include paths, which would
+    otherwise point tools run in the worktree back at main's sources.
+
+    Returns:
+        True if the file was written
+    """
+    try:
+        entries = json.loads((source_root / "compile_commands.json").read_text())
+    except (OSError, json.JSONDecodeError):
+        return False
+
+    old_prefix = str(source_root.resolve())
+    new_prefix = str(worktree_path.resolve())
+
+    def rewrite(value):
+        if isinstance(value, str):
+            if value == old_prefix:
+                return new_prefix
+            return value.replace(old_prefix + os.sep, new_prefix + os.sep)
+        if isinstance(value, list):
+            return [rewrite(v) for v in value]
+        if isinstance(value, dict):
+            return {k: rewrite(v) for k, v in value.items()}
+        return value
+
+    (worktree_path / "compile_commands.json").write_text(json.dumps(rewrite(entries), indent=2))
+    return True
+
+
+def _sync_source_mtimes(source_root: Path, worktree_path: Path) -> int:
+    """Give unchanged tracked files the same mtime they have in source_root.
+
+    A fresh checkout stamps every file with the current time, which makes
+    ninja consider every object in a cloned build directory stale. Files
+    whose content matches source_root (same blob at HEAD, not dirty there)
+    take its mtime, so only genuinely different units are rebuilt.
+
+    Returns:
+        Number of files updated
+    """
+    def git(args: list[str], cwd: Path) -> list[str] | None:
+        result = subprocess.run(["git", *args], cwd=cwd, capture_output=True, text=True)
+        if result.returncode != 0:
+            return None
+        return [line for line in result.stdout.split("\n") if line]
+
+    source_head = git(["rev-parse", "HEAD"], source_root)
+    tracked = git(["ls-files"], worktree_path)
+    if not source_head or tracked is None:
+        return 0
+    differing = git(["diff", "--name-only", source_head[0], "HEAD"], worktree_path)
+    dirty = git(["diff", "--name-only", "HEAD"], source_root)
+    if differing is None or dirty is None:
+        return 0
+    skip = set(differing) | set(dirty)
+
+    updated = 0
+    for rel in tracked:
+        if rel in skip:
+            continue
+        try:
+            src_mtime = (source_root / rel).stat().st_mtime_ns
+            dst = worktree_path / rel
+            os.utime(dst, ns=(dst.stat().st_atime_ns, src_mtime), follow_symlinks=False)
+            updated += 1
+        except (OSError, NotImplementedError):
+            continue
+    return updated
+
+
+def provision_worktree_build(worktree_path: Path, source_root: Path = DEFAULT_MELEE_ROOT) -> bool:
+    """Seed a new worktree's build directory from an existing build.
+
+    Clones source_root's build/ and generated ninja files, then aligns
+    source mtimes so ninja only rebuilds units that actually differ. The
+    object cache is installed in source_root first: ninja's log records each
+    object's command line, so the clone must carry the same commands the
+    worktree's build.ninja will use.
+
+    Returns:
+        True if a build directory was cloned
+    """
+    src_build = source_root / "build"
+    if not (source_root / "build.ninja").exists() or not src_build.is_dir():
+        return False
+
+    install_object_cache(source_root)
+
+    dst_build = worktree_path / "build"
+    if dst_build.exists():
+        # Keep anything already there (e.g. ctx.c) by cloning into a fresh dir
+        shutil.rmtree(dst_build)
+    _clone_tree(src_build, dst_build)
+
+    for name in _GENERATED_ROOT_FILES:
+        src_file = source_root / name
+        if src_file.exists():
+            shutil.copy2(src_file, worktree_path / name)
+    _copy_compile_commands(source_root, worktree_path)
+
+    _sync_source_mtimes(source_root, worktree_path)
+    install_object_cache(worktree_path)
+    return True
+
+
 # =============================================================================
 # Worktree Creation and Management
 # =============================================================================
@@ -277,44 +421,50 @@ def _create_subdirectory_worktree(subdir_key: str, worktree_path: Path) -> Path:
     branch_exists = bool(result.stdout.strip())
 
     try:
-        if branch_exists:
-            subprocess.run(
-                ["git", "worktree", "add", str(worktree_path), branch_name],
-                cwd=DEFAULT_MELEE_ROOT,
-                capture_output=True, text=True, check=True
-            )
-        else:
-            subprocess.run(
-                ["git", "worktree", "add", "-b", branch_name, str(worktree_path), "upstream/master"],
-                cwd=DEFAULT_MELEE_ROOT,
-                capture_output=True, text=True, check=True
-            )
+        pooled = _take_pooled_worktree(worktree_path, branch_name, branch_exists)
+        if not pooled:
+            if branch_exists:
+                subprocess.run(
+                    ["git", "worktree", "add", str(worktree_path), branch_name],
+                    cwd=DEFAULT_MELEE_ROOT,
+                    capture_output=True, text=True, check=True
+                )
+            else:
+                subprocess.run(
+                    ["git", "worktree", "add", "-b", branch_name, str(worktree_path), "upstream/master"],
+                    cwd=DEFAULT_MELEE_ROOT,
+                    capture_output=True, text=True, check=True
+                )
 
-        # Symlink orig/ directory
-        orig_src = DEFAULT_MELEE_ROOT / "orig"
-        orig_dst = worktree_path / "orig"
-        if orig_src.exists():
-            if orig_dst.exists() and not orig_dst.is_symlink():
-                shutil.rmtree(orig_dst)
-            if not orig_dst.exists():
-                orig_dst.symlink_to(orig_src.resolve())
-
-        # Ensure base DOL exists (required for builds)
-        if not ensure_dol_in_worktree(worktree_path):
-            console.print("[yellow]Warning: Base DOL not found. Run 'melee-agent setup dol --auto' to configure.[/yellow]")
-
-        # Copy ctx.c from main melee
-        main_ctx = DEFAULT_MELEE_ROOT / "build" / "ctx.c"
-        if main_ctx.exists():
-            (worktree_path / "build").mkdir(exist_ok=True)
-            worktree_ctx = worktree_path / "build" / "ctx.c"
-            shutil.copy2(main_ctx, worktree_ctx)
+            # Symlink orig/ directory
+            orig_src = DEFAULT_MELEE_ROOT / "orig"
+            orig_dst = worktree_path / "orig"
+            if orig_src.exists():
+                if orig_dst.exists() and not orig_dst.is_symlink():
+                    shutil.rmtree(orig_dst)
+                if not orig_dst.exists():
+                    orig_dst.symlink_to(orig_src.resolve())
+
+            # Ensure base DOL exists (required for builds)
+            if not ensure_dol_in_worktree(worktree_path):
+                console.print("[yellow]Warning: Base DOL not found. Run 'melee-agent setup dol --auto' to configure.[/yellow]")
+
+            # Start from main's build so ninja only rebuilds what differs
+            if not provision_worktree_build(worktree_path):
+                # Copy ctx.c from main melee
+                main_ctx = DEFAULT_MELEE_ROOT / "build" / "ctx.c"
+                if main_ctx.exists():
+                    (worktree_path / "build").mkdir(exist_ok=True)
+                    worktree_ctx = worktree_path / "build" / "ctx.c"
+                    shutil.copy2(main_ctx, worktree_ctx)
 
         console.print(f"\n[bold cyan]SUBDIRECTORY WORKTREE CREATED[/bold cyan]")
         console.print(f"  [dim]Subdirectory:[/dim] {subdir_key}")
         console.print(f"  [dim]Path:[/dim]   {worktree_path}")
         console.print(f"  [dim]Branch:[/dim] {branch_name}")
         console.print(f"  [dim]Base:[/dim]   upstream/master")
+        if pooled:
+            console.print(f"  [dim]Source:[/dim] pre-built worktree pool")
 
         db_upsert_subdirectory(subdir_key, str(worktree_path), branch_name)
 
@@ -323,21 +473,21 @@ def _create_subdirectory_worktree(subdir_key: str, worktree_path: Path) -> Path:
         if configure_py.exists():
             console.print(f"\n[dim]Running initial build to generate report.json...[/dim]")
             try:
-                subprocess.run(
-                    ["python", "configure.py"],
-                    cwd=worktree_path,
-                    capture_output=True, text=True, check=True
-                )
-                result = subprocess.run(
-                    ["ninja", "build/GALE01/report.json"],
-                    cwd=worktree_path,
-                    capture_output=True, text=True,
-                    timeout=300,
+                if needs_configure(worktree_path):
+                    subprocess.run(
+                        ["python", "configure.py"],
+                        cwd=worktree_path,
+                        capture_output=True, text=True, check=True
+                    )
+                install_object_cache(worktree_path)
+                ensure_build_daemon(worktree_path)
+                returncode, _, stderr = run_ninja(
+                    worktree_path, ["build/GALE01/report.json"], timeout=300
                 )
-                if result.returncode == 0:
+                if returncode == 0:
                     console.print(f"[green]Build complete - report.json generated[/green]")
                 else:
-                    console.print(f"[yellow]Build had issues: {result.stderr[:200]}[/yellow]")
+                    console.print(f"[yellow]Build had issues: {stderr[:200]}[/yellow]")
             except subprocess.TimeoutExpired:
                 console.print(f"[yellow]Build timed out - run 'ninja' manually in worktree[/yellow]")
             except subprocess.CalledProcessError as e:
@@ -353,6 +503,97 @@ def _create_subdirectory_worktree(subdir_key: str, worktree_path: Path) -> Path:
         return DEFAULT_MELEE_ROOT
 
 
+# =============================================================================
+# Pre-built Worktree Pool
+# =============================================================================
+
+WORKTREE_POOL_DIR = MELEE_WORKTREES_DIR / ".pool"
+
+
+def get_pooled_worktrees() -> list[Path]:
+    """List idle pre-built worktrees, oldest first."""
+    if not WORKTREE_POOL_DIR.exists():
+        return []
+    return sorted(
+        (p for p in WORKTREE_POOL_DIR.iterdir() if p.is_dir() and (p / ".git").exists()),
+        key=lambda p: p.name,
+    )
+
+
+def fill_worktree_pool(size: int) -> int:
+    """Create pre-built detached worktrees until the pool holds `size`.
+
+    Each one is checked out at upstream/master with a build directory cloned
+    from main and brought up to date, so handing it out later only costs a
+    branch checkout and an incremental ninja run.
+
+    Returns:
+        Number of worktrees created
+    """
+    WORKTREE_POOL_DIR.mkdir(parents=True, exist_ok=True)
+    created = 0
+    while len(get_pooled_worktrees()) < size:
+        pool_path = WORKTREE_POOL_DIR / f"pool-{time.time_ns()}"
+        result = subprocess.run(
+            ["git", "worktree", "add", "--detach", str(pool_path), "upstream/master"],
+            cwd=DEFAULT_MELEE_ROOT,
+            capture_output=True, text=True,
+        )
+        if result.returncode != 0:
+            console.print(f"[yellow]Could not create pooled worktree: {result.stderr.strip()}[/yellow]")
+            break
+
+        orig_src = DEFAULT_MELEE_ROOT / "orig"
+        if orig_src.exists() and not (pool_path / "orig").exists():
+            (pool_path / "orig").symlink_to(orig_src.resolve())
+        ensure_dol_in_worktree(pool_path)
+        provision_worktree_build(pool_path)
+
+        try:
+            if needs_configure(pool_path):
+                subprocess.run(["python", "configure.py"], cwd=pool_path, capture_output=True, timeout=60)
+            install_object_cache(pool_path)
+            run_ninja(pool_path, ["build/GALE01/report.json"], timeout=600)
+        except (subprocess.TimeoutExpired, FileNotFoundError):
+            pass  # Still usable; the adopting agent's build finishes the job
+        created += 1
+    return created
+
+
+def _take_pooled_worktree(worktree_path: Path, branch_name: str, branch_exists: bool) -> bool:
+    """Move an idle pooled worktree into place and check out the branch.
+
+    Returns:
+        True if a pooled worktree was adopted
+    """
+    for pool_path in get_pooled_worktrees():
+        # git worktree move fails if another agent took this one first
+        result = subprocess.run(
+            ["git", "worktree", "move", str(pool_path), str(worktree_path)],
+            cwd=DEFAULT_MELEE_ROOT,
+            capture_output=True, text=True,
+        )
+        if result.returncode != 0:
+            continue
+
+        if branch_exists:
+            checkout = ["git", "checkout", branch_name]
+        else:
+            checkout = ["git", "checkout", "-b", branch_name, "upstream/master"]
+        result = subprocess.run(checkout, cwd=worktree_path, capture_output=True, text=True)
+        if result.returncode == 0:
+            return True
+
+        console.print(f"[yellow]Pooled worktree checkout failed: {result.stderr.strip()}[/yellow]")
+        subprocess.run(
+            ["git", "worktree", "remove", "--force", str(worktree_path)],
+            cwd=DEFAULT_MELEE_ROOT,
+            capture_output=True, text=True,
+        )
+        return False
+    return False
+
+
 def get_subdirectory_worktree(
     subdir_key: str,
     create_if_missing: bool = True,
@@ -362,6 +603,7 @@ def get_subdirectory_worktree(
     worktree_path = get_subdirectory_worktree_path(subdir_key)
 
     if worktree_path.exists() and (worktree_path / "src").exists():
+        ensure_build_daemon(worktree_path)
         if validate_build:
             console.print(f"[dim]Validating worktree build: {worktree_path}[/dim]")
             if _validate_worktree_build(worktree_path):
@@ -463,37 +705,26 @@ def get_source_file_from_claim(function_name: str) -> str | None:
     """Look up the source file from a function's claim.
 
     Checks in order:
-    1. Active claim in claims file
+    1. Active claim
     2. Database function record
 
     Returns:
         Source file path (e.g., "melee/lb/lbcollision.c") or None if not found.
     """
-    # First try the claims file
-    claims_file = Path("/tmp/decomp_claims.json")
-    if claims_file.exists():
-        try:
-            with open(claims_file, 'r') as f:
-                claims = json.load(f)
-
-            if function_name in claims:
-                claim = claims[function_name]
-                # Use configured timeout instead of hardcoded value
-                if time.time() - claim.get("timestamp", 0) < DECOMP_CLAIM_TIMEOUT:
-                    source_file = claim.get("source_file")
-                    if source_file:
-                        return source_file
-        except (json.JSONDecodeError, IOError):
-            pass  # Fall through to database check
-
-    # Fallback: check database for source file
     db = _get_state_db()
-    if db:
-        try:
-            func_info = db.get_function(function_name)
-            if func_info and func_info.get('source_file'):
-                return func_info['source_file']
-        except Exception:
-            pass  # Non-blocking - don't fail if DB unavailable
+    if db is None:
+        return None
+
+    try:
+        claim = db.get_claim(function_name)
+        if claim and claim.get('source_file_path'):
+            return claim['source_file_path']
+
+        # Fallback: function record
+        func_info = db.get_function(function_name)
+        if func_info and func_info.get('source_file_path'):
+            return func_info['source_file_path']
+    except Exception:
+        pass  # Non-blocking - don't fail if DB unavailable
 
     return None
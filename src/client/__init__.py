@@ -43,6 +43,7 @@ Example:
 """
 
 from .api import DecompMeAPIClient, DecompMeAPIError
+from .local import LocalCompileBackend, LocalCompileError, LocalCompiler, LocalScratch, Toolchain
 from .models import (
     CompilationResult,
     CompileRequest,
@@ -59,6 +60,7 @@ from .models import (
     ScratchUpdate,
     TerseScratch,
 )
+from .permuter import Candidate, Permuter, PermuterError, prepare_permuter_dir
 from .scratch import ScratchManager
 
 __all__ = [
@@ -67,6 +69,17 @@ __all__ = [
     "DecompMeAPIError",
     # High-level Manager
     "ScratchManager",
+    # Local compilation
+    "LocalCompiler",
+    "LocalCompileBackend",
+    "LocalCompileError",
+    "LocalScratch",
+    "Toolchain",
+    # Permuter
+    "Permuter",
+    "PermuterError",
+    "Candidate",
+    "prepare_permuter_dir",
     # Models - Request
     "ScratchCreate",
     "ScratchUpdate",
@@ -1,6 +1,7 @@
 """Async HTTP client for the decomp.me REST API."""
 
 import fcntl
+import hashlib
 import json
 import logging
 import os
@@ -13,6 +14,11 @@ from pydantic import TypeAdapter
 # Persistent config directory
 DECOMP_CONFIG_DIR = Path.home() / ".config" / "decomp-me"
 
+# Per-process memo of which instances have the shared context endpoint, and
+# which context blobs each already holds
+_shared_context_support: dict[str, bool] = {}
+_registered_contexts: set[tuple[str, str]] = set()
+
 
 def _get_agent_id() -> str:
     """Get agent ID for worktree isolation.
@@ -147,9 +153,14 @@ def _save_cookies(cookies: dict[str, str], preserve_sessionid: bool = True) -> N
             # Merge new cookies into existing
             existing.update(cookies)
 
-            # Write atomically
-            with open(cookies_path, 'w') as f:
+            # Write atomically: temp file + rename so a killed process
+            # can't leave a truncated cookie file behind
+            tmp_path = cookies_path.with_name(f".{cookies_path.name}.{os.getpid()}.tmp")
+            with open(tmp_path, 'w') as f:
                 json.dump(existing, f, indent=2)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, cookies_path)
         finally:
             fcntl.flock(lock_f.fileno(), fcntl.LOCK_UN)
 
@@ -501,6 +512,59 @@ class DecompMeAPIClient:
         data = self._handle_response(response)
         return DecompilationResult.model_validate(data)
 
+    # Shared Contexts
+
+    async def supports_shared_context(self) -> bool:
+        """Check whether the instance can store contexts by hash.
+
+        Only our self-hosted backend has /api/context. The answer is
+        remembered per base URL for the rest of the process. Set
+        DECOMP_SHARED_CONTEXT=0 to never use it.
+        """
+        if os.environ.get("DECOMP_SHARED_CONTEXT", "1") == "0":
+            return False
+        supported = _shared_context_support.get(self.base_url)
+        if supported is None:
+            try:
+                response = await self._client.get("/api/context")
+                supported = response.status_code == 200
+            except httpx.HTTPError:
+                supported = False
+            _shared_context_support[self.base_url] = supported
+        return supported
+
+    async def register_context(self, context: str) -> str | None:
+        """Upload a context blob once and get the hash scratches refer to it by.
+
+        Args:
+            context: Context text
+
+        Returns:
+            SHA-256 hex digest of the context, or None if the instance has no
+            shared context support (send the context inline instead)
+
+        Raises:
+            DecompMeAPIError: If the upload fails
+        """
+        if not context or not await self.supports_shared_context():
+            return None
+
+        context_hash = hashlib.sha256(context.encode("utf-8")).hexdigest()
+        if (self.base_url, context_hash) in _registered_contexts:
+            return context_hash
+
+        response = await self._client.head(f"/api/context/{context_hash}")
+        if response.status_code != 200:
+            logger.info(f"Uploading shared context {context_hash[:12]} ({len(context):,} bytes)")
+            response = await self._client.post(
+                "/api/context",
+                json={"hash": context_hash, "context": context},
+            )
+            self._handle_response(response)
+
+        _registered_contexts.add((self.base_url, context_hash))
+        return context_hash
+
     # Scratch Management
 
     async def fork_scratch(self, slug: str, fork_params: ForkRequest | None = None) -> Scratch:
@@ -0,0 +1,407 @@
+"""Instruction diffing and scoring for locally compiled objects.
+
+Parses `objdump -dr` output for one function (or the function's .s from
+build/GALE01/asm, without assembling it) and scores it against a target the
+way decomp.me does (decomp.me uses asm-differ, whose scorer comes from
+decomp-permuter):
+
+- Instructions are aligned on their mnemonics with a Levenshtein edit script
+  (difflib when the Levenshtein package isn't installed; the two can pick
+  different alignments for the same edit distance, so scores may then be
+  off by a reordering here and there).
+- Aligned instructions with the same mnemonic cost PENALTY_STACKDIFF per
+  byte of stack offset difference and PENALTY_REGALLOC per other differing
+  or missing operand (`off(reg)` counts as two).
+- Unaligned instructions cost PENALTY_INSERTION / PENALTY_DELETION, or
+  PENALTY_REORDERING for each one that was inserted in one place and
+  deleted from another.
+- max_score is PENALTY_DELETION per target instruction.
+
+Relocations are folded into the operands (`bl 0 <fn+0x8>` with an
+R_PPC_REL24 to foo becomes `bl foo`) and branch targets within the function
+become offsets from its start, so two objects compare equal regardless of
+where the function sits in its section. Operands are normalized so objdump
+and dtk spellings of the same instruction compare equal (`li r3, 0x10` and
+`li r3,16`, `subi` and `addi` with a negated immediate, `4*cr1+eq` and 6).
+
+AsmScorer keeps one target's encoding and scores many candidates against it,
+for ranking variants without a compile server round trip.
+"""
+
+import difflib
+import re
+from collections import Counter
+from dataclasses import dataclass, field
+
+from .models import DiffOutput, DiffRow
+
+try:
+    import Levenshtein
+except ImportError:
+    Levenshtein = None
+
+PENALTY_STACKDIFF = 1
+PENALTY_REGALLOC = 5
+PENALTY_REORDERING = 60
+PENALTY_INSERTION = 100
+PENALTY_DELETION = 100
+
+_SYMBOL_RE = re.compile(r"^([0-9a-f]+) <(.+)>:$")
+_INSN_RE = re.compile(r"^\s*([0-9a-f]+):\t(?:[0-9a-f]{2} ?){4}\s*\t(\S+)\s*(.*)$")
+_RELOC_RE = re.compile(r"^\s*([0-9a-f]+): (R_PPC_\w+)\s+(\S+)$")
+_LOCAL_TARGET_RE = re.compile(r"(?:0x)?([0-9a-f]+) <([^>+]+)(?:\+0x([0-9a-f]+))?>$")
+_LAST_IMM_RE = re.compile(r"(?<![\w.])-?(?:0x[0-9a-f]+|\d+)(?=(?:\(r\d+\))?$)")
+_SPREL_RE = re.compile(r"(?<=,)(-?(?:0x[0-9a-f]+|\d+))\(r1\)$")
+# Where asm-differ splits `off(reg)` into two fields (not after %lo( etc.)
+_PAREN_RE = re.compile(r"(?<!%hi)(?<!%lo)(?<!%got)(?<!%call16)(?<!%gp_rel)\(")
+
+# dtk's .s output: `/* 80003100 000000C0  7C 08 02 A6 */\tmflr r0`
+_ASM_INSN_RE = re.compile(
+    r"^\s*/\*\s*([0-9A-Fa-f]{8})\s+[0-9A-Fa-f]+\s+(?:[0-9A-Fa-f]{2}\s?){4}\s*\*/\s*(\S+)\s*(.*?)\s*$"
+)
+_DIFF_ADDRESS_RE = re.compile(r"^\s*([0-9a-f]+):\s*")
+_ASM_LABEL_RE = re.compile(r"^\s*([.\w$@]+):\s*$")
+
+# Immediates not part of a symbol or a `.+0x1c` branch target
+_NUMBER_RE = re.compile(r"(?<![\w.@+$])(-?)(0x[0-9a-fA-F]+|\d+)(?![\w$])")
+_CR_BIT_RE = re.compile(r"4\*cr([0-7])\+(lt|gt|eq|so|un)")
+_CR_BITS = {"lt": 0, "gt": 1, "eq": 2, "so": 3, "un": 3}
+
+# dtk writes these where objdump writes addi/addis/addic(.) with a negated value
+_SUBTRACT_IMMEDIATE = {"subi": "addi", "subis": "addis", "subic": "addic", "subic.": "addic."}
+
+# Take a sign-extended 16-bit immediate, which dtk prints unsigned
+_SIGNED_HIGH_HALF = frozenset({"lis", "addis"})
+
+# How each relocation type shows up in the operand it patches
+_RELOC_SUFFIX = {
+    "R_PPC_ADDR16_HA": "@ha",
+    "R_PPC_ADDR16_HI": "@h",
+    "R_PPC_ADDR16_LO": "@l",
+    "R_PPC_EMB_SDA21": "@sda21",
+}
+
+
+@dataclass
+class Instruction:
+    """One disassembled instruction, normalized for comparison."""
+    offset: int  # From the start of the function
+    mnemonic: str
+    args: str
+    reloc: str | None = None  # Symbol the instruction refers to
+
+    @property
+    def text(self) -> str:
+        """The scorable form of the instruction."""
+        return f"{self.mnemonic} {self.args}" if self.args else self.mnemonic
+
+
+@dataclass
+class AsmDiff:
+    """Aligned target/current instructions and their score."""
+    score: int
+    max_score: int
+    rows: list[tuple[Instruction | None, Instruction | None]] = field(default_factory=list)
+
+    def to_diff_output(self) -> DiffOutput:
+        """Convert to the shape decomp.me returns from /compile."""
+        def side(insn: Instruction | None) -> dict | None:
+            if insn is None:
+                return None
+            return {"text": [{"text": f"{insn.offset:x}: {insn.text}"}]}
+
+        return DiffOutput(
+            arch_str="ppc",
+            current_score=self.score,
+            max_score=self.max_score,
+            rows=[
+                DiffRow(key=str(i), base=side(base), current=side(current))
+                for i, (base, current) in enumerate(self.rows)
+            ],
+        )
+
+
+def _normalize(mnemonic: str, args: str) -> tuple[str, str]:
+    """Spell an instruction the same way whether it came from objdump or dtk."""
+    args = ",".join(part.strip() for part in args.replace('"', "").split(",")) if args else ""
+    if "*cr" in args:
+        args = _CR_BIT_RE.sub(lambda m: str(4 * int(m.group(1)) + _CR_BITS[m.group(2)]), args)
+
+    negate = mnemonic in _SUBTRACT_IMMEDIATE
+    if negate:
+        mnemonic = _SUBTRACT_IMMEDIATE[mnemonic]
+
+    def number(match: re.Match) -> str:
+        value = int(match.group(2), 0)
+        if match.group(1):
+            value = -value
+        if mnemonic in _SIGNED_HIGH_HALF and 0x8000 <= value <= 0xFFFF:
+            value -= 0x10000
+        return str(value)
+
+    args = _NUMBER_RE.sub(number, args)
+    if negate:
+        head, sep, last = args.rpartition(",")
+        if last.lstrip("-").isdigit():
+            args = f"{head}{sep}{-int(last)}"
+    return mnemonic, args
+
+
+def _apply_reloc(args: str, reloc_type: str, symbol: str) -> str:
+    """Replace the operand a relocation patches with the symbol it points to."""
+    if reloc_type in ("R_PPC_REL24", "R_PPC_REL14", "R_PPC_ADDR24", "R_PPC_ADDR14"):
+        # Branch: the target is the last operand, e.g. `bne cr1,.+0x1c`
+        head, sep, _ = args.rpartition(",")
+        return f"{head}{sep}{symbol}"
+    operand = symbol + _RELOC_SUFFIX.get(reloc_type, "")
+    replaced, count = _LAST_IMM_RE.subn(operand, args, count=1)
+    if count:
+        return replaced
+    if "(" in args:
+        # objdump can omit a zero displacement: `lwz r3,(r13)`
+        return args.replace("(", f"{operand}(", 1)
+    return f"{args},{operand}" if args else operand
+
+
+def parse_objdump(output: str, function_name: str) -> list[Instruction] | None:
+    """Get a function's instructions from `objdump -dr` output.
+
+    Returns:
+        Normalized instructions, or None if the function isn't in the output
+    """
+    insns: list[Instruction] = []
+    start = None
+    for line in output.splitlines():
+        match = _SYMBOL_RE.match(line)
+        if match:
+            if start is not None:
+                break  # Next symbol
+            if match.group(2) == function_name:
+                start = int(match.group(1), 16)
+            continue
+        if start is None:
+            continue
+
+        match = _INSN_RE.match(line)
+        if match:
+            offset = int(match.group(1), 16) - start
+            mnemonic, args = match.group(2), match.group(3).strip()
+            # A branch within the function: `b 1c <fn+0x1c>` -> `b .+0x1c`
+            head, sep, last = args.rpartition(",")
+            target = _LOCAL_TARGET_RE.match(last.strip())
+            if target and target.group(2) == function_name:
+                branch = f".+0x{int(target.group(3) or '0', 16):x}"
+                mnemonic, head = _normalize(mnemonic, head)
+                args = f"{head}{sep}{branch}"
+            else:
+                mnemonic, args = _normalize(mnemonic, args)
+            insns.append(Instruction(offset, mnemonic, args))
+            continue
+
+        match = _RELOC_RE.match(line)
+        if match and insns:
+            insn = insns[-1]
+            symbol = match.group(3)
+            insn.reloc = symbol
+            insn.args = _apply_reloc(insn.args, match.group(2), symbol)
+
+    return insns if start is not None else None
+
+
+def parse_target_asm(asm: str) -> list[Instruction] | None:
+    """Get a function's instructions from its dtk assembly.
+
+    Takes the text AsmExtractor returns for one function. Branches to labels
+    inside it become offsets from its start, as in parse_objdump().
+
+    Returns:
+        Normalized instructions, or None if the text has no instructions
+    """
+    raw: list[tuple[int, str, str]] = []
+    labels: dict[str, int] = {}
+    pending: list[str] = []  # Labels waiting for the instruction they mark
+    for line in asm.splitlines():
+        match = _ASM_INSN_RE.match(line)
+        if match:
+            address = int(match.group(1), 16)
+            for label in pending:
+                labels[label] = address
+            pending = []
+            raw.append((address, match.group(2), match.group(3)))
+            continue
+        match = _ASM_LABEL_RE.match(line)
+        if match:
+            pending.append(match.group(1))
+
+    if not raw:
+        return None
+    start = raw[0][0]
+    insns = []
+    for address, mnemonic, args in raw:
+        head, sep, last = args.rpartition(",")
+        target = labels.get(last.strip())
+        if target is not None and mnemonic.startswith("b"):
+            mnemonic, head = _normalize(mnemonic, head)
+            args = f"{head}{sep}.+0x{target - start:x}"
+        else:
+            mnemonic, args = _normalize(mnemonic, args)
+        insns.append(Instruction(address - start, mnemonic, args))
+    return insns
+
+
+def parse_diff_output(diff: DiffOutput) -> tuple[list[Instruction], list[Instruction]]:
+    """Get the target and current instructions back out of a DiffOutput.
+
+    For checking local scores against the ones decomp.me reported: scoring
+    the result with diff_instructions() should give diff.current_score.
+    """
+    def side(cell: dict | None, index: int) -> Instruction | None:
+        if not cell or not cell.get("text"):
+            return None
+        text = "".join(part.get("text", "") for part in cell["text"])
+        match = _DIFF_ADDRESS_RE.match(text)
+        offset = int(match.group(1), 16) if match else index * 4
+        if match:
+            text = text[match.end():]
+        # Branch arrows asm-differ draws around the line
+        parts = [part for part in text.replace("~>", " ").split() if part != ">"]
+        if not parts:
+            return None
+        mnemonic, args = _normalize(parts[0], "".join(parts[1:]))
+        return Instruction(offset, mnemonic, args)
+
+    target: list[Instruction] = []
+    current: list[Instruction] = []
+    for row in diff.rows:
+        base = side(row.base, len(target))
+        if base:
+            target.append(base)
+        cur = side(row.current, len(current))
+        if cur:
+            current.append(cur)
+    return target, current
+
+
+def _sameline_penalty(old: str, new: str) -> int:
+    """Cost of two aligned instructions with the same mnemonic.
+
+    Follows asm-differ's score_diff_lines: a trailing `off(reg)` operand is
+    compared as two fields (unless it was scored as a stack offset), and
+    each operand only one side has costs PENALTY_REGALLOC.
+    """
+    if old == new:
+        return 0
+    penalty = 0
+    ignore_last_field = False
+    old_sp = _SPREL_RE.search(old)
+    new_sp = _SPREL_RE.search(new)
+    if old_sp and new_sp:
+        penalty += abs(int(old_sp.group(1), 0) - int(new_sp.group(1), 0)) * PENALTY_STACKDIFF
+        ignore_last_field = True
+
+    def fields(text: str) -> list[str]:
+        parts = text.split(None, 1)
+        args = parts[1].split(",") if len(parts) > 1 else []
+        if not args or ignore_last_field:
+            return args[:-1]
+        return args[:-1] + _PAREN_RE.split(args[-1])
+
+    old_fields, new_fields = fields(old), fields(new)
+    regalloc = sum(o != n for o, n in zip(old_fields, new_fields))
+    regalloc += abs(len(old_fields) - len(new_fields))
+    return penalty + regalloc * PENALTY_REGALLOC
+
+
+def _opcodes(target: str, current: str) -> list[tuple[str, int, int, int, int]]:
+    """Align two encoded mnemonic sequences the way asm-differ does."""
+    if Levenshtein is not None:
+        return Levenshtein.opcodes(target, current)
+    return difflib.SequenceMatcher(a=target, b=current, autojunk=False).get_opcodes()
+
+
+class AsmScorer:
+    """Scores candidates against one target.
+
+    Mnemonics are encoded as one character each (like asm-differ does before
+    handing them to Levenshtein), with the target's encoding and text kept
+    between candidates, so scoring a candidate is one alignment over short
+    strings plus a pass over the rows. A candidate identical to the target
+    skips the alignment.
+
+    Example:
+        >>> scorer = AsmScorer(parse_target_asm(target_asm))
+        >>> best = min(candidates, key=scorer.score)
+    """
+
+    def __init__(self, target: list[Instruction]):
+        self.target = target
+        self.max_score = len(target) * PENALTY_DELETION
+        self._ids: dict[str, str] = {}
+        self._encoded = self._encode(target)
+        self._texts = [insn.text for insn in target]
+
+    def _encode(self, insns: list[Instruction]) -> str:
+        ids = self._ids
+        chars = []
+        for insn in insns:
+            char = ids.get(insn.mnemonic)
+            if char is None:
+                char = ids[insn.mnemonic] = chr(len(ids))
+            chars.append(char)
+        return "".join(chars)
+
+    def _rows(
+        self, current: list[Instruction]
+    ) -> list[tuple[Instruction | None, Instruction | None]]:
+        target = self.target
+        rows: list[tuple[Instruction | None, Instruction | None]] = []
+        for tag, i1, i2, j1, j2 in _opcodes(self._encoded, self._encode(current)):
+            if tag == "equal":
+                rows.extend(zip(target[i1:i2], current[j1:j2]))
+                continue
+            for k in range(max(i2 - i1, j2 - j1)):
+                rows.append((
+                    target[i1 + k] if i1 + k < i2 else None,
+                    current[j1 + k] if j1 + k < j2 else None,
+                ))
+        return rows
+
+    def score(self, current: list[Instruction]) -> int:
+        """Score current against the target (0 is a match)."""
+        if len(current) == len(self._texts) and [insn.text for insn in current] == self._texts:
+            return 0
+        return _score_rows(self._rows(current))
+
+    def diff(self, current: list[Instruction]) -> AsmDiff:
+        """Align and score current against the target."""
+        rows = self._rows(current)
+        return AsmDiff(score=_score_rows(rows), max_score=self.max_score, rows=rows)
+
+
+def _score_rows(rows: list[tuple[Instruction | None, Instruction | None]]) -> int:
+    score = 0
+    deletions: Counter[str] = Counter()
+    insertions: Counter[str] = Counter()
+    for base, cur in rows:
+        if base and cur and base.mnemonic == cur.mnemonic:
+            score += _sameline_penalty(base.text, cur.text)
+            continue
+        if base:
+            deletions[base.text] += 1
+        if cur:
+            insertions[cur.text] += 1
+
+    for text in insertions.keys() | deletions.keys():
+        ins, dels = insertions[text], deletions[text]
+        common = min(ins, dels)
+        score += (
+            (ins - common) * PENALTY_INSERTION
+            + (dels - common) * PENALTY_DELETION
+            + common * PENALTY_REORDERING
+        )
+    return score
+
+
+def diff_instructions(target: list[Instruction], current: list[Instruction]) -> AsmDiff:
+    """Align and score current against target."""
+    return AsmScorer(target).diff(current)
@@ -0,0 +1,423 @@
+"""Local compilation backend: MWCC and objdump without decomp.me.
+
+permuter_settings.toml holds the same wine + mwcceppc command the melee
+build uses, the devkitPPC assembler and objdump. LocalCompiler runs those
+directly and scores the result with asmdiff, returning a CompilationResult
+shaped like decomp.me's, so an iteration costs one compiler process instead
+of an HTTP round trip through Django and the decomp.me compiler sandbox.
+
+- Compiles run in a fixed pool of worker directories (one per concurrent
+  compile), reused between compiles.
+- A persistent wineserver is started once, so each wine launch attaches to
+  a warm server instead of booting one.
+- Targets are parsed straight from their dtk assembly (assembled and
+  disassembled only when that fails), once per function.
+
+LocalCompileBackend wraps a LocalCompiler in the compile_scratch() interface
+of DecompMeAPIClient, so it can be handed to ScratchManager.
+"""
+
+import asyncio
+import hashlib
+import logging
+import os
+import re
+import shlex
+import shutil
+import tempfile
+import tomllib
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from .asmdiff import AsmScorer, Instruction, parse_objdump, parse_target_asm
+from .models import CompilationResult, CompileRequest
+
+logger = logging.getLogger(__name__)
+
+SETTINGS_FILE = Path(__file__).resolve().parents[2] / "permuter_settings.toml"
+
+# Seconds the wineserver stays up after the last wine process exits
+WINESERVER_LINGER = 600
+
+_COMPILER_PATH_RE = re.compile(r"(build/compilers/)[^/]+/[^/]+(/mwcceppc\.exe)$")
+
+# Options whose value is a path or define rather than a codegen setting
+_PATH_OPTIONS = ("-i", "-I", "-D", "-U", "-ir", "-prefix", "-include")
+
+
+class LocalCompileError(Exception):
+    """The local toolchain is missing or misconfigured."""
+
+
+@dataclass
+class Toolchain:
+    """The commands for compiling, assembling and disassembling locally.
+
+    Paths in the commands are relative to the melee checkout.
+    """
+    compiler: list[str]  # Launcher and executable, e.g. ["wine", ".../mwcceppc.exe"]
+    compiler_flags: list[str]  # Codegen options (replaced by a scratch's flags)
+    compiler_paths: list[str]  # Include paths and defines (always passed)
+    assembler: list[str]
+    objdump: list[str]
+    asm_prelude: str | None = None
+
+    @classmethod
+    def from_settings(cls, path: Path = SETTINGS_FILE) -> "Toolchain":
+        """Read the toolchain from a decomp-permuter settings file."""
+        try:
+            with open(path, "rb") as f:
+                settings = tomllib.load(f)
+        except (OSError, tomllib.TOMLDecodeError) as e:
+            raise LocalCompileError(f"Cannot read {path}: {e}") from e
+
+        missing = [
+            key for key in ("compiler_command", "assembler_command", "objdump_command")
+            if key not in settings
+        ]
+        if missing:
+            raise LocalCompileError(f"{path} has no {', '.join(missing)}")
+
+        command = shlex.split(settings["compiler_command"])
+        exe = next((i for i, arg in enumerate(command) if arg.lower().endswith(".exe")), 0)
+        flags: list[str] = []
+        paths: list[str] = []
+        args = iter(command[exe + 1:])
+        for arg in args:
+            if arg == "-c":
+                continue
+            if arg in _PATH_OPTIONS:
+                paths += [arg, next(args, "")]
+            elif arg.startswith(("-D", "-U")):
+                paths.append(arg)
+            else:
+                flags.append(arg)
+
+        return cls(
+            compiler=command[: exe + 1],
+            compiler_flags=flags,
+            compiler_paths=paths,
+            assembler=shlex.split(settings["assembler_command"]),
+            objdump=shlex.split(settings["objdump_command"]),
+            asm_prelude=settings.get("asm_prelude_file"),
+        )
+
+    @property
+    def uses_wine(self) -> bool:
+        return Path(self.compiler[0]).name.startswith("wine")
+
+    def compile_command(
+        self,
+        source: Path,
+        output: Path,
+        mw_version: str | None = None,
+        flags: str | None = None,
+    ) -> list[str]:
+        """Build the compiler command line.
+
+        Args:
+            source: C file to compile
+            output: Object file to write
+            mw_version: Compiler version directory, e.g. "GC/1.2.5n" (default: the settings')
+            flags: Codegen flags replacing the settings' (e.g. a scratch's compiler_flags)
+        """
+        compiler = list(self.compiler)
+        if mw_version:
+            compiler[-1] = _COMPILER_PATH_RE.sub(rf"\g<1>{mw_version}\g<2>", compiler[-1])
+        if flags is None:
+            codegen = self.compiler_flags
+        else:
+            codegen = shlex.split(flags)
+            if "-proc" not in codegen:
+                codegen = ["-proc", "gekko", *codegen]  # decomp.me adds this for mwcc
+        return [*compiler, *codegen, *self.compiler_paths, "-c", "-o", str(output), str(source)]
+
+
+class LocalCompiler:
+    """Compiles and scores functions locally on a pool of workers.
+
+    Args:
+        melee_root: Melee checkout the toolchain's paths are relative to
+        toolchain: Commands to run (default: read from permuter_settings.toml)
+        workers: Compiles to run at once (default: CPU count)
+        timeout: Seconds before a compile is abandoned
+
+    Example:
+        >>> async with LocalCompiler(Path("melee")) as compiler:
+        ...     result = await compiler.compile(code, context, "fn_80001234", target_asm)
+        ...     print(f"Score: {result.score}/{result.max_score}")
+    """
+
+    def __init__(
+        self,
+        melee_root: Path,
+        toolchain: Toolchain | None = None,
+        workers: int | None = None,
+        timeout: float = 60.0,
+    ):
+        self.melee_root = Path(melee_root).resolve()
+        self.toolchain = toolchain or Toolchain.from_settings()
+        self.workers = max(workers or os.cpu_count() or 1, 1)
+        self.timeout = timeout
+        self._dirs: list[Path] = []
+        self._free: asyncio.Queue[Path] | None = None
+        self._targets: dict[tuple[str, str], AsmScorer] = {}
+        self._env = {**os.environ, "WINEDEBUG": os.environ.get("WINEDEBUG", "-all")}
+
+    async def __aenter__(self) -> "LocalCompiler":
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.close()
+
+    async def start(self) -> None:
+        """Create the worker directories and warm up wine (idempotent)."""
+        if self._free is not None:
+            return
+        self._free = asyncio.Queue()
+        for i in range(self.workers):
+            path = Path(tempfile.mkdtemp(prefix=f"mwcc-worker{i}-"))
+            self._dirs.append(path)
+            self._free.put_nowait(path)
+
+        if self.toolchain.uses_wine:
+            # Already running is fine; it keeps serving this prefix
+            wineserver = shutil.which("wineserver") or "wineserver"
+            try:
+                await self._run([wineserver, f"-p{WINESERVER_LINGER}"], self.melee_root)
+            except (TimeoutError, OSError) as e:
+                logger.warning(f"Could not start a persistent wineserver: {e}")
+
+    async def close(self) -> None:
+        """Remove the worker directories."""
+        for path in self._dirs:
+            shutil.rmtree(path, ignore_errors=True)
+        self._dirs = []
+        self._free = None
+
+    async def _run(self, args: list[str], cwd: Path) -> tuple[int, str, str]:
+        """Run a command, killing it after the timeout."""
+        process = await asyncio.create_subprocess_exec(
+            *args,
+            cwd=cwd,
+            env=self._env,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+        )
+        try:
+            stdout, stderr = await asyncio.wait_for(process.communicate(), self.timeout)
+        except TimeoutError:
+            process.kill()
+            await process.wait()
+            raise
+        return (
+            process.returncode,
+            stdout.decode(errors="replace"),
+            stderr.decode(errors="replace"),
+        )
+
+    async def _disassemble(self, obj: Path, function_name: str) -> list[Instruction] | None:
+        returncode, stdout, stderr = await self._run(
+            [*self.toolchain.objdump, str(obj)], self.melee_root
+        )
+        if returncode != 0:
+            raise LocalCompileError(f"objdump failed: {stderr or stdout}")
+        return parse_objdump(stdout, function_name)
+
+    async def _target(self, workdir: Path, function_name: str, target_asm: str) -> AsmScorer:
+        """Get a scorer for the target, once per function and asm."""
+        key = (function_name, hashlib.sha256(target_asm.encode()).hexdigest())
+        cached = self._targets.get(key)
+        if cached is not None:
+            return cached
+
+        target = parse_target_asm(target_asm)
+        if target is None:
+            target = await self._assemble_target(workdir, function_name, target_asm)
+        scorer = self._targets[key] = AsmScorer(target)
+        return scorer
+
+    async def _assemble_target(
+        self, workdir: Path, function_name: str, target_asm: str
+    ) -> list[Instruction]:
+        """Assemble and disassemble target asm that isn't in dtk's format."""
+        source = workdir / "target.s"
+        obj = workdir / "target.o"
+        prelude = ""
+        if self.toolchain.asm_prelude:
+            prelude = f'.include "{self.melee_root / self.toolchain.asm_prelude}"\n'
+        # Extracted functions don't carry the section directive of their file
+        source.write_text(f'{prelude}.section .text, "ax"\n{target_asm}\n')
+
+        returncode, stdout, stderr = await self._run(
+            [*self.toolchain.assembler, "-o", str(obj), str(source)], self.melee_root
+        )
+        if returncode != 0:
+            raise LocalCompileError(
+                f"Could not assemble target for {function_name}: {stderr or stdout}"
+            )
+        target = await self._disassemble(obj, function_name)
+        if target is None:
+            raise LocalCompileError(f"{function_name} not found in the assembled target")
+        return target
+
+    async def compile(
+        self,
+        source_code: str,
+        context: str,
+        function_name: str,
+        target_asm: str,
+        compiler_flags: str | None = None,
+        source_file: str | None = None,
+    ) -> CompilationResult:
+        """Compile source_code against context and diff it with the target.
+
+        Args:
+            source_code: The function (and anything else the scratch defines)
+            context: Declarations it needs, as in a scratch's context
+            function_name: Symbol to diff
+            target_asm: Target assembly, as in build/GALE01/asm
+            compiler_flags: Codegen flags (default: the melee build's)
+            source_file: Melee source file, to use its compiler version
+
+        Returns:
+            CompilationResult with compiler_output and diff_output like decomp.me's
+        """
+        await self.start()
+        mw_version = get_mw_version(self.melee_root, source_file)
+
+        workdir = await self._free.get()
+        try:
+            scorer = await self._target(workdir, function_name, target_asm)
+
+            source = workdir / "code.c"
+            obj = workdir / "code.o"
+            obj.unlink(missing_ok=True)
+            source.write_text(f"{context}\n{source_code}\n")
+
+            command = self.toolchain.compile_command(source, obj, mw_version, compiler_flags)
+            try:
+                returncode, stdout, stderr = await self._run(command, self.melee_root)
+            except TimeoutError:
+                return CompilationResult(success=False, compiler_output="Compilation timed out")
+            compiler_output = (stdout + stderr).strip()
+            if returncode != 0 or not obj.exists():
+                return CompilationResult(success=False, compiler_output=compiler_output)
+
+            current = await self._disassemble(obj, function_name)
+        finally:
+            self._free.put_nowait(workdir)
+
+        if current is None:
+            missing = f"{function_name} not found in compiled object"
+            return CompilationResult(
+                success=False,
+                compiler_output=f"{compiler_output}\n{missing}".strip(),
+            )
+        return CompilationResult(
+            success=True,
+            compiler_output=compiler_output,
+            diff_output=scorer.diff(current).to_diff_output(),
+        )
+
+
+def get_mw_version(melee_root: Path, source_file: str | None) -> str | None:
+    """Get the compiler version the melee build uses for source_file."""
+    if not source_file:
+        return None
+    from src.commit.build_index import get_build_unit
+    unit = get_build_unit(melee_root, source_file)
+    return unit.mw_version if unit else None
+
+
+@dataclass
+class LocalScratch:
+    """What a local compile of a scratch needs."""
+    function_name: str
+    target_asm: str
+    source_code: str = ""
+    context: str = ""
+    compiler_flags: str | None = None
+    source_file: str | None = None
+
+
+async def fetch_local_scratch(client, slug: str, melee_root: Path) -> LocalScratch:
+    """Get a scratch's source, context and flags, with target asm from the melee build.
+
+    Args:
+        client: DecompMeAPIClient to fetch the scratch with
+        slug: Scratch slug/ID
+        melee_root: Melee checkout whose build has the target asm
+
+    Raises:
+        LocalCompileError: If the function has no asm in the build
+    """
+    scratch = await client.get_scratch(slug)
+    function_name = scratch.diff_label or scratch.name
+
+    from src.extractor import extract_function
+    func = await extract_function(melee_root, function_name, include_context=False)
+    if func is None or not func.asm:
+        raise LocalCompileError(f"No target asm for {function_name} in the melee build")
+
+    return LocalScratch(
+        function_name=function_name,
+        target_asm=func.asm,
+        source_code=scratch.source_code,
+        context=scratch.context,
+        compiler_flags=scratch.compiler_flags or None,
+        source_file=func.file_path,
+    )
+
+
+@dataclass
+class LocalCompileBackend:
+    """Serves compile_scratch() from a LocalCompiler instead of decomp.me.
+
+    Scratches are either registered up front or looked up once through the
+    client (source, context, flags) and the melee build (target asm). Scores
+    are not saved to the scratch.
+
+    Example:
+        >>> backend = LocalCompileBackend(LocalCompiler(melee_root), client)
+        >>> manager = ScratchManager(client, compile_backend=backend)
+        >>> results = await manager.batch_compile(scratch, variants)
+    """
+    compiler: LocalCompiler
+    client: object | None = None  # DecompMeAPIClient, for unregistered scratches
+    scratches: dict[str, LocalScratch] = field(default_factory=dict)
+
+    def register(self, slug: str, scratch: LocalScratch) -> None:
+        """Provide a scratch's compile inputs directly."""
+        self.scratches[slug] = scratch
+
+    async def _lookup(self, slug: str) -> LocalScratch:
+        if slug in self.scratches:
+            return self.scratches[slug]
+        if self.client is None:
+            raise LocalCompileError(f"Scratch {slug} is not registered")
+
+        local = await fetch_local_scratch(self.client, slug, self.compiler.melee_root)
+        self.scratches[slug] = local
+        return local
+
+    async def compile_scratch(
+        self,
+        slug: str,
+        overrides: CompileRequest | None = None,
+        save_score: bool = False,
+    ) -> CompilationResult:
+        """Compile a scratch locally; same signature as DecompMeAPIClient's."""
+        scratch = await self._lookup(slug)
+        overrides = overrides or CompileRequest()
+        source_code = overrides.source_code
+        context = overrides.context
+        return await self.compiler.compile(
+            source_code=source_code if source_code is not None else scratch.source_code,
+            context=context if context is not None else scratch.context,
+            function_name=overrides.diff_label or scratch.function_name,
+            target_asm=scratch.target_asm,
+            compiler_flags=overrides.compiler_flags or scratch.compiler_flags,
+            source_file=scratch.source_file,
+        )
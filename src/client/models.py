@@ -37,6 +37,7 @@ class ScratchCreate(BaseModel):
     source_code: str | None = None
     target_asm: str = ""
     context: str = ""
+    context_hash: str | None = None  # Shared context (see register_context), replaces context
     diff_label: str = ""  # Function name
     libraries: list[dict[str, str]] = Field(default_factory=list)
 
@@ -182,6 +183,7 @@ class ScratchUpdate(BaseModel):
     diff_flags: list[str] | None = None
     source_code: str | None = None
     context: str | None = None
+    context_hash: str | None = None  # Shared context (see register_context), replaces context
     diff_label: str | None = None
     libraries: list[dict[str, str]] | None = None
     match_override: bool | None = None
@@ -0,0 +1,281 @@
+"""decomp-permuter driver.
+
+Turns a scratch into a permuter directory (base.c, target.s/target.o,
+compile.sh, settings.toml, the layout decomp-permuter's import.py makes) and
+runs decomp-permuter on it, reporting each new best candidate as it lands.
+
+- The compile command and objdump come from permuter_settings.toml (see
+  Toolchain), with the scratch's flags and the compiler version its melee
+  source file builds with.
+- decomp-permuter spreads the search across cores itself (-j); with
+  permuter@home enabled (-J) it also farms candidates out to other hosts.
+- The permuter writes each candidate it keeps to output-<score>-<n>/source.c.
+  Permuter.improvements() polls for those, so it works the same whether the
+  candidate came from this host or a remote one.
+"""
+
+import asyncio
+import contextlib
+import json
+import os
+import re
+import shlex
+import shutil
+import sys
+import time
+from collections.abc import AsyncIterator
+from dataclasses import dataclass
+from pathlib import Path
+
+from .local import LocalScratch, Toolchain, get_mw_version
+
+PERMUTER_DIR = Path(os.environ.get("DECOMP_PERMUTER_DIR", Path.home() / "code" / "decomp-permuter"))
+
+_OUTPUT_RE = re.compile(r"^output-(\d+)-(\d+)$")
+
+
+class PermuterError(Exception):
+    """The permuter directory could not be prepared or the permuter not run."""
+
+
+@dataclass
+class Candidate:
+    """A permuter output."""
+    score: int
+    path: Path  # The output-<score>-<n> directory
+    source: str  # Whole file, context included
+
+
+async def _run(args: list[str], cwd: Path, input: str | None = None) -> tuple[int, str, str]:
+    process = await asyncio.create_subprocess_exec(
+        *args,
+        cwd=cwd,
+        stdin=asyncio.subprocess.PIPE if input is not None else asyncio.subprocess.DEVNULL,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+    )
+    stdout, stderr = await process.communicate(input.encode() if input is not None else None)
+    return process.returncode, stdout.decode(errors="replace"), stderr.decode(errors="replace")
+
+
+async def _preprocess(text: str, cwd: Path) -> str:
+    """Strip comments and directives, which the permuter's C parser can't read.
+
+    Returns text unchanged if cpp isn't installed or fails.
+    """
+    cpp = shutil.which("cpp")
+    if cpp is None:
+        return text
+    returncode, stdout, _ = await _run(
+        [cpp, "-P", "-nostdinc", "-undef", "-D__MWERKS__", "-D__PPCGEKKO__"], cwd, input=text
+    )
+    return stdout if returncode == 0 else text
+
+
+def _compile_script(melee_root: Path, toolchain: Toolchain, scratch: LocalScratch) -> str:
+    command = toolchain.compile_command(
+        Path("__INPUT__"),
+        Path("__OUTPUT__"),
+        get_mw_version(melee_root, scratch.source_file),
+        scratch.compiler_flags,
+    )
+    line = shlex.join(command).replace("__INPUT__", '"$INPUT"').replace("__OUTPUT__", '"$OUTPUT"')
+    # decomp-permuter runs `compile.sh input.c -o output.o`
+    return (
+        "#!/usr/bin/env bash\n"
+        'INPUT="$(realpath -m "$1")"\n'
+        'OUTPUT="$(realpath -m "$3")"\n'
+        f"cd {shlex.quote(str(melee_root))}\n"
+        f"exec {line}\n"
+    )
+
+
+async def prepare_permuter_dir(
+    directory: Path,
+    scratch: LocalScratch,
+    melee_root: Path,
+    toolchain: Toolchain | None = None,
+) -> Path:
+    """Write a permuter directory for a scratch.
+
+    Outputs of an earlier run in the same directory are removed.
+
+    Args:
+        directory: Where to write it (created if missing)
+        scratch: Source, context and target asm
+        melee_root: Melee checkout the toolchain's paths are relative to
+        toolchain: Commands to use (default: read from permuter_settings.toml)
+
+    Raises:
+        PermuterError: If the target doesn't assemble
+    """
+    melee_root = Path(melee_root).resolve()
+    toolchain = toolchain or Toolchain.from_settings()
+    directory = Path(directory).resolve()
+    directory.mkdir(parents=True, exist_ok=True)
+    for path in directory.glob("output-*"):
+        shutil.rmtree(path, ignore_errors=True)
+
+    base = await _preprocess(f"{scratch.context}\n{scratch.source_code}\n", directory)
+    (directory / "base.c").write_text(base)
+
+    prelude = ""
+    if toolchain.asm_prelude:
+        prelude = f'.include "{melee_root / toolchain.asm_prelude}"\n'
+    (directory / "target.s").write_text(f'{prelude}.section .text, "ax"\n{scratch.target_asm}\n')
+    returncode, stdout, stderr = await _run(
+        [*toolchain.assembler, "-o", str(directory / "target.o"), str(directory / "target.s")],
+        melee_root,
+    )
+    if returncode != 0:
+        raise PermuterError(
+            f"Could not assemble target for {scratch.function_name}: {stderr or stdout}"
+        )
+
+    script = directory / "compile.sh"
+    script.write_text(_compile_script(melee_root, toolchain, scratch))
+    script.chmod(0o755)
+
+    (directory / "settings.toml").write_text(
+        f"func_name = {json.dumps(scratch.function_name)}\n"
+        'compiler_type = "mwcc"\n'
+        f"objdump_command = {json.dumps(shlex.join(toolchain.objdump))}\n"
+    )
+    return directory
+
+
+def apply_candidate(candidate: str, original: str, function_name: str) -> str:
+    """Put a permuter candidate's version of the target function into the scratch source.
+
+    Candidates are the whole base.c (context included) after cpp, so only
+    the permuted function is taken from them; the scratch's statics,
+    helpers and macros stay as they were. Returns original unchanged if
+    either side doesn't define the function.
+    """
+    from src.hooks.c_scanner import function_spans
+
+    new = next((s for s in function_spans(candidate) if s.name == function_name), None)
+    old = next((s for s in function_spans(original) if s.name == function_name), None)
+    if new is None or old is None:
+        return original
+    return original[: old.start] + candidate[new.start : new.end] + original[old.end :]
+
+
+class Permuter:
+    """Runs decomp-permuter on a prepared directory.
+
+    Args:
+        directory: A directory from prepare_permuter_dir()
+        jobs: Permuter threads on this host (default: CPU count)
+        remote: Also use permuter@home workers (-J)
+        permuter_dir: decomp-permuter checkout (default: $DECOMP_PERMUTER_DIR
+            or ~/code/decomp-permuter)
+        poll_interval: Seconds between checks for new outputs
+
+    Example:
+        >>> permuter = Permuter(directory, jobs=8)
+        >>> async for candidate in permuter.improvements(best_score=420, time_budget=600):
+        ...     print(f"New best: {candidate.score}")
+    """
+
+    def __init__(
+        self,
+        directory: Path,
+        jobs: int | None = None,
+        remote: bool = False,
+        permuter_dir: Path | None = None,
+        poll_interval: float = 1.0,
+    ):
+        self.directory = Path(directory)
+        self.jobs = max(jobs or os.cpu_count() or 1, 1)
+        self.remote = remote
+        self.permuter_dir = Path(permuter_dir or PERMUTER_DIR)
+        self.poll_interval = poll_interval
+
+    def command(self) -> list[str]:
+        """The permuter command line."""
+        script = self.permuter_dir / "permuter.py"
+        args = [
+            sys.executable, str(script), str(self.directory),
+            "-j", str(self.jobs), "--stop-on-zero", "--best-only",
+        ]
+        if self.remote:
+            args.append("-J")
+        return args
+
+    def _outputs(self) -> list[tuple[int, Path]]:
+        """Finished outputs, best first."""
+        found = []
+        for path in self.directory.glob("output-*"):
+            match = _OUTPUT_RE.match(path.name)
+            # The directory shows up before the permuter has written source.c
+            if match and (path / "source.c").exists():
+                found.append((int(match.group(1)), path))
+        return sorted(found)
+
+    async def improvements(
+        self,
+        best_score: int | None = None,
+        time_budget: float | None = None,
+    ) -> AsyncIterator[Candidate]:
+        """Run the permuter and yield each candidate that beats the best so far.
+
+        Stops after a perfect candidate, when time_budget seconds have passed,
+        or when the permuter exits. The permuter is stopped on the way out.
+
+        Args:
+            best_score: Score to beat (default: yield the first output)
+            time_budget: Seconds to run for (default: until the permuter exits)
+
+        Raises:
+            PermuterError: If decomp-permuter isn't installed or exits with an error
+        """
+        if not (self.permuter_dir / "permuter.py").exists():
+            raise PermuterError(
+                f"decomp-permuter not found at {self.permuter_dir} (set DECOMP_PERMUTER_DIR)"
+            )
+
+        seen = {path for _, path in self._outputs()}
+        deadline = time.monotonic() + time_budget if time_budget is not None else None
+        log_path = self.directory / "permuter.log"
+        stopped = False
+        with open(log_path, "wb") as log:
+            process = await asyncio.create_subprocess_exec(
+                *self.command(),
+                cwd=self.permuter_dir,
+                stdin=asyncio.subprocess.DEVNULL,
+                stdout=log,
+                stderr=asyncio.subprocess.STDOUT,
+            )
+            try:
+                while True:
+                    exited = process.returncode is not None
+                    for score, path in self._outputs():
+                        if path in seen:
+                            continue
+                        seen.add(path)
+                        if best_score is not None and score >= best_score:
+                            continue
+                        best_score = score
+                        yield Candidate(score, path, (path / "source.c").read_text())
+                    if best_score == 0 or exited:
+                        break
+                    if deadline is not None and time.monotonic() >= deadline:
+                        break
+                    with contextlib.suppress(asyncio.TimeoutError):
+                        await asyncio.wait_for(process.wait(), self.poll_interval)
+            finally:
+                if process.returncode is None:
+                    stopped = True
+                    process.terminate()
+                    try:
+                        await asyncio.wait_for(process.wait(), 10)
+                    except TimeoutError:
+                        process.kill()
+                        await process.wait()
+
+        if not stopped and process.returncode != 0:
+            tail = log_path.read_text(errors="replace").strip().splitlines()[-5:]
+            raise PermuterError(
+                f"decomp-permuter exited with {process.returncode}: " + "\n".join(tail)
+            )
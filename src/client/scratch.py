@@ -8,6 +8,7 @@ import logging
 from typing import Any
 
 from .api import DecompMeAPIClient
+from .local import LocalCompileBackend
 from .models import (
     CompilationResult,
     CompileRequest,
@@ -29,6 +30,8 @@ class ScratchManager:
         client: DecompMeAPIClient instance
         default_compiler: Default compiler to use (default: mwcc_247_92 for Melee)
         default_flags: Default compiler flags
+        compile_backend: Where unsaved compiles run (default: the client). Pass a
+            LocalCompileBackend to compile and score on this machine instead.
     """
 
     def __init__(
@@ -36,8 +39,10 @@ class ScratchManager:
         client: DecompMeAPIClient,
         default_compiler: str = "mwcc_247_92",
         default_flags: str = "-O4,p -inline auto -nodefaults",
+        compile_backend: "DecompMeAPIClient | LocalCompileBackend | None" = None,
     ):
         self.client = client
+        self.compile_backend = compile_backend or client
         self.default_compiler = default_compiler
         self.default_flags = default_flags
 
@@ -137,7 +142,7 @@ class ScratchManager:
             )
         else:
             logger.info(f"Compiling scratch {scratch.slug} with temporary changes")
-            return await self.client.compile_scratch(
+            return await self.compile_backend.compile_scratch(
                 scratch.slug,
                 CompileRequest(source_code=new_source),
                 save_score=False,
@@ -185,7 +190,7 @@ class ScratchManager:
 
         if source_code:
             compile_req = CompileRequest(source_code=source_code)
-            result = await self.client.compile_scratch(
+            result = await self.compile_backend.compile_scratch(
                 scratch.slug,
                 compile_req,
                 save_score=False,
@@ -309,7 +314,7 @@ class ScratchManager:
         results: list[tuple[str, CompilationResult]] = []
         for i, source in enumerate(source_variants, 1):
             logger.debug(f"Compiling variant {i}/{len(source_variants)}")
-            result = await self.client.compile_scratch(
+            result = await self.compile_backend.compile_scratch(
                 scratch.slug,
                 CompileRequest(source_code=source),
                 save_score=False,
@@ -345,7 +350,7 @@ class ScratchManager:
 
         for flags in flag_variants:
             logger.debug(f"Testing flags: {flags}")
-            result = await self.client.compile_scratch(
+            result = await self.compile_backend.compile_scratch(
                 scratch.slug,
                 CompileRequest(compiler_flags=flags),
                 save_score=False,
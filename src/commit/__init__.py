@@ -13,6 +13,10 @@ from .pr import (
     switch_to_branch
 )
 from .workflow import CommitWorkflow, auto_detect_and_commit
+from .build import compile_object, compile_objects, schedule_report_regeneration
+from .batch import BatchCommitWorkflow, BatchResult, PendingMatch
+from .buildd import ensure_build_daemon, run_ninja, run_ninja_async
+from .build_index import BuildUnit, get_build_index, get_build_unit
 from .diagnostics import (
     # Error dataclasses
     CompilerError,
@@ -55,6 +59,19 @@ __all__ = [
     # Workflow
     "CommitWorkflow",
     "auto_detect_and_commit",
+    "BatchCommitWorkflow",
+    "BatchResult",
+    "PendingMatch",
+    # Build functions
+    "compile_object",
+    "compile_objects",
+    "schedule_report_regeneration",
+    "ensure_build_daemon",
+    "run_ninja",
+    "run_ninja_async",
+    "BuildUnit",
+    "get_build_index",
+    "get_build_unit",
     # Diagnostics - error types
     "CompilerError",
     "DiagnosticResult",
@@ -0,0 +1,264 @@
+"""Batch commit workflow for many matched functions.
+
+Applying matches one at a time pays for a compile check, configure.py,
+formatting and a report rebuild per function. The batch workflow applies
+every pending match first, builds all touched objects in one ninja run and
+regenerates the report once. Only when that build fails does it bisect
+(per file, then per function) to find the matches that break it. The
+survivors are still committed one function per commit.
+"""
+
+import asyncio
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from .build import compile_object, compile_objects
+from .configure import get_file_path_from_function, should_mark_as_matching, update_configure_py
+from .format import format_files, verify_clang_format_available
+from .update import update_source_file
+from .workflow import CommitWorkflow
+
+
+@dataclass
+class PendingMatch:
+    """A matched function waiting to be committed."""
+    function_name: str
+    source_code: str  # Exactly what should be inserted into the file
+    scratch_url: str
+    match_percent: float = 100.0
+    file_path: str | None = None  # Relative to src/, resolved if not given
+
+
+@dataclass
+class BatchResult:
+    """Outcome of a batch commit."""
+    committed: list[str] = field(default_factory=list)
+    failed: dict[str, str] = field(default_factory=dict)  # function -> reason
+    files_marked_matching: list[str] = field(default_factory=list)
+
+
+class BatchCommitWorkflow(CommitWorkflow):
+    """Commits many matched functions on a single build."""
+
+    async def execute_batch(
+        self,
+        matches: list[PendingMatch],
+        dry_run: bool = False,
+    ) -> BatchResult:
+        """Apply, build and commit a batch of matched functions.
+
+        Args:
+            matches: Matched functions to commit
+            dry_run: Verify that everything builds, then restore all files
+
+        Returns:
+            BatchResult listing committed and failed functions
+        """
+        result = BatchResult()
+
+        # Group by source file, keeping the caller's order within each file
+        by_file: dict[str, list[PendingMatch]] = {}
+        for match in matches:
+            if not match.file_path:
+                match.file_path = await get_file_path_from_function(
+                    match.function_name, self.melee_root
+                )
+            if not match.file_path:
+                result.failed[match.function_name] = "source file not found"
+                continue
+            by_file.setdefault(match.file_path, []).append(match)
+
+        if not by_file:
+            return result
+
+        print(f"Batch: {sum(len(m) for m in by_file.values())} functions in {len(by_file)} files")
+
+        originals = {
+            fp: (self.melee_root / "src" / fp).read_text(encoding="utf-8") for fp in by_file
+        }
+        # What to put back if anything fails: the originals, or each file as of
+        # its last successful commit
+        restore = {self.melee_root / "src" / fp: content for fp, content in originals.items()}
+        configure_py = self.melee_root / "configure.py"
+        if configure_py.exists():
+            restore[configure_py] = configure_py.read_text(encoding="utf-8")
+
+        try:
+            # Step 1: Apply everything
+            good: dict[str, list[PendingMatch]] = {}
+            for file_path, file_matches in by_file.items():
+                good[file_path] = await self._apply_all(file_path, file_matches, result)
+
+            # Step 2: One build for all touched objects
+            files = [fp for fp, fm in good.items() if fm]
+            print(f"[build] Compiling {len(files)} objects...")
+            compiled, _, _ = await compile_objects(self.melee_root, files)
+            if not compiled:
+                print("  Batch build failed, bisecting...")
+                for file_path in files:
+                    good[file_path] = await self._bisect_file(
+                        file_path, originals[file_path], good[file_path], result
+                    )
+            print("✓ Build complete\n")
+
+            if dry_run:
+                result.committed = [m.function_name for fm in good.values() for m in fm]
+                return result
+
+            # Step 3: Per-function commits, replayed onto the original files
+            await self._commit_each(good, originals, result, restore)
+
+        except BaseException:
+            for path, content in restore.items():
+                if path.read_text(encoding="utf-8") != content:
+                    path.write_text(content, encoding="utf-8")
+            raise
+
+        finally:
+            if dry_run:
+                for file_path, content in originals.items():
+                    (self.melee_root / "src" / file_path).write_text(content, encoding="utf-8")
+
+        # Step 4: One report regeneration for the whole batch
+        self.files_changed = [f"src/{fp}" for fp, fm in good.items() if fm]
+        if self.files_changed:
+            await self._regenerate_report()
+
+        return result
+
+    async def _undo_failed_commit(self, restore: dict[Path, str]) -> None:
+        """Put the files of a commit that failed back to the last commit.
+
+        Otherwise the function would ride along in the next commit of its
+        file. Whatever the failed commit staged is unstaged as well.
+        """
+        for changed in self.files_changed:
+            path = self.melee_root / changed
+            if path in restore:
+                path.write_text(restore[path], encoding="utf-8")
+        proc = await asyncio.create_subprocess_exec(
+            "git", "reset", "-q", "--", *self.files_changed,
+            cwd=self.melee_root,
+            stdout=asyncio.subprocess.DEVNULL,
+            stderr=asyncio.subprocess.DEVNULL,
+        )
+        await proc.wait()
+
+    async def _apply_all(
+        self,
+        file_path: str,
+        file_matches: list[PendingMatch],
+        result: BatchResult,
+    ) -> list[PendingMatch]:
+        """Apply every match for one file, dropping ones that can't be inserted."""
+        applied = []
+        for match in file_matches:
+            if await update_source_file(
+                file_path, match.function_name, match.source_code, self.melee_root,
+                extract_function_only=False,
+            ):
+                applied.append(match)
+            else:
+                result.failed[match.function_name] = "could not apply code to source file"
+        return applied
+
+    async def _write_and_compile(
+        self,
+        file_path: str,
+        original: str,
+        file_matches: list[PendingMatch],
+    ) -> bool:
+        (self.melee_root / "src" / file_path).write_text(original, encoding="utf-8")
+        for match in file_matches:
+            await update_source_file(
+                file_path, match.function_name, match.source_code, self.melee_root,
+                extract_function_only=False,
+            )
+        compiled, _, _ = await compile_object(self.melee_root, file_path)
+        return compiled
+
+    async def _bisect_file(
+        self,
+        file_path: str,
+        original: str,
+        file_matches: list[PendingMatch],
+        result: BatchResult,
+    ) -> list[PendingMatch]:
+        """Find the largest set of matches in a file that still builds.
+
+        Leaves the file containing exactly the returned matches.
+        """
+        if not file_matches:
+            return []
+        if await self._write_and_compile(file_path, original, file_matches):
+            return file_matches
+
+        async def narrow(base: list[PendingMatch], candidates: list[PendingMatch]) -> list[PendingMatch]:
+            if await self._write_and_compile(file_path, original, base + candidates):
+                return candidates
+            if len(candidates) == 1:
+                result.failed[candidates[0].function_name] = "does not compile"
+                return []
+            mid = len(candidates) // 2
+            left = await narrow(base, candidates[:mid])
+            right = await narrow(base + left, candidates[mid:])
+            return left + right
+
+        mid = len(file_matches) // 2
+        left = await narrow([], file_matches[:mid])
+        right = await narrow(left, file_matches[mid:])
+        survivors = left + right
+        print(f"  {file_path}: {len(survivors)}/{len(file_matches)} functions build")
+
+        # Leave the file in the surviving state
+        await self._write_and_compile(file_path, original, survivors)
+        return survivors
+
+    async def _commit_each(
+        self,
+        good: dict[str, list[PendingMatch]],
+        originals: dict[str, str],
+        result: BatchResult,
+        restore: dict[Path, str],
+    ) -> None:
+        """Replay the surviving edits one function at a time, committing each.
+
+        restore is updated with each file's content after each commit.
+        """
+        can_format = await verify_clang_format_available()
+
+        for file_path, file_matches in good.items():
+            if not file_matches:
+                continue
+            full_path = self.melee_root / "src" / file_path
+            full_path.write_text(originals[file_path], encoding="utf-8")
+
+            for i, match in enumerate(file_matches):
+                await update_source_file(
+                    file_path, match.function_name, match.source_code, self.melee_root,
+                    extract_function_only=False,
+                )
+                self.files_changed = [f"src/{file_path}"]
+                if can_format:
+                    await format_files(self.files_changed, self.melee_root)
+
+                # configure.py goes in with the file's last function
+                if i == len(file_matches) - 1:
+                    should_mark, _ = await should_mark_as_matching(file_path, self.melee_root)
+                    if should_mark and await update_configure_py(file_path, self.melee_root):
+                        self.files_changed.append("configure.py")
+                        result.files_marked_matching.append(file_path)
+
+                if await self._create_git_commit(
+                    match.function_name, match.scratch_url, match.match_percent
+                ):
+                    result.committed.append(match.function_name)
+                    for changed in self.files_changed:
+                        path = self.melee_root / changed
+                        restore[path] = path.read_text(encoding="utf-8")
+                    print(f"✓ Committed {match.function_name}")
+                else:
+                    result.failed[match.function_name] = "git commit failed"
+                    await self._undo_failed_commit(restore)
+                    if "configure.py" in self.files_changed:
+                        result.files_marked_matching.remove(file_path)
@@ -0,0 +1,473 @@
+"""Fast single-object compile checks for the commit workflow.
+
+Checking one edited .c file doesn't need configure.py or a full build:
+build.ninja regenerates itself when its inputs change, and ninja only
+rebuilds the requested object. Regenerating report.json depends on every
+object in the project, so it is deferred to a single background worker that
+coalesces requests from back-to-back commits.
+
+When only a few .c files changed, diff_report_units() re-diffs just their
+units with objdiff-cli against a baseline report, so callers can read
+per-function deltas without waiting for the full build.
+update_report_units() (the commit workflow) also patches the cached
+report.json with the new numbers.
+
+Regression checks compare against a baseline snapshotted per HEAD commit
+(load_report_baseline()), never against report.json itself: that file is
+patched and rebuilt by the checks and the workflow, so a retried commit
+would otherwise be compared with its own regressed numbers.
+"""
+
+import asyncio
+import fcntl
+import json
+import os
+import shutil
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+from .build_index import get_build_index
+from .buildd import run_ninja, run_ninja_async
+from .objcache import install_object_cache
+
+BUILD_DIR = "build/GALE01"
+REPORT_TARGET = f"{BUILD_DIR}/report.json"
+OBJDIFF_CLI = "build/tools/objdiff-cli"
+
+# Copies of report.json taken before anything at a HEAD commit touched it
+REPORT_BASELINE_DIR = f"{BUILD_DIR}/.report_baselines"
+REPORT_BASELINES_KEPT = 4
+
+# Background report worker bookkeeping
+REPORT_REQUEST_FILE = f"{BUILD_DIR}/.report_requested"
+REPORT_PID_FILE = f"{BUILD_DIR}/.report_worker.pid"
+REPORT_LOG_FILE = f"{BUILD_DIR}/report_worker.log"
+REPORT_LOCK_FILE = f"{BUILD_DIR}/.report_worker.lock"
+
+# Directory containing the `src` package, for launching the worker
+_PROJECT_ROOT = Path(__file__).resolve().parents[2]
+
+
+def get_object_path(file_path: str) -> str:
+    """Get the ninja object target for a source file.
+
+    Args:
+        file_path: Path relative to src/ (e.g., "melee/lb/lbcommand.c")
+
+    Returns:
+        Object path relative to melee root (e.g., "build/GALE01/src/melee/lb/lbcommand.o")
+    """
+    return f"{BUILD_DIR}/src/{Path(file_path).with_suffix('.o').as_posix()}"
+
+
+def needs_configure(melee_root: Path) -> bool:
+    """Check whether configure.py must run before building.
+
+    Only needed when build.ninja is missing or older than configure.py.
+    """
+    build_ninja = melee_root / "build.ninja"
+    if not build_ninja.exists():
+        return True
+    configure_py = melee_root / "configure.py"
+    if configure_py.exists():
+        return configure_py.stat().st_mtime > build_ninja.stat().st_mtime
+    return False
+
+
+async def _run(cmd: list[str], cwd: Path) -> tuple[int, str, str]:
+    proc = await asyncio.create_subprocess_exec(
+        *cmd,
+        cwd=cwd,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+    )
+    stdout, stderr = await proc.communicate()
+    return proc.returncode, stdout.decode(errors="replace"), stderr.decode(errors="replace")
+
+
+async def _ninja(melee_root: Path, targets: list[str]) -> tuple[int, str, str]:
+    """Run ninja through the worktree's build daemon if one is up."""
+    return await run_ninja_async(melee_root, targets)
+
+
+async def _configure(melee_root: Path) -> tuple[bool, str, str]:
+    """Run configure.py if build.ninja is stale, then wrap its compiles in the object cache.
+
+    Returns:
+        Tuple of (success, stdout, stderr) of configure.py (success if it didn't need to run)
+    """
+    if needs_configure(melee_root):
+        returncode, stdout, stderr = await _run([sys.executable, "configure.py"], melee_root)
+        if returncode != 0:
+            return False, stdout, f"configure.py failed (exit {returncode})\n{stderr}"
+    install_object_cache(melee_root)
+    return True, "", ""
+
+
+async def compile_object(melee_root: Path, file_path: str) -> tuple[bool, str, str]:
+    """Compile the single object for a source file.
+
+    Runs configure.py only when build.ninja is stale, then asks ninja for
+    just this object. ninja decides whether it is up to date (source,
+    headers, flags and build.ninja itself are all dependencies).
+
+    Args:
+        melee_root: Path to the melee project root
+        file_path: Path relative to src/ (e.g., "melee/lb/lbcommand.c")
+
+    Returns:
+        Tuple of (success, stdout, stderr)
+
+    Raises:
+        FileNotFoundError: If ninja (or python for configure.py) isn't available
+    """
+    melee_root = Path(melee_root)
+
+    configured = await _configure(melee_root)
+    if not configured[0]:
+        return configured
+
+    index = get_build_index(melee_root)
+    if index and file_path not in index:
+        return False, "", f"{file_path} is not a compile unit in build.ninja"
+
+    returncode, stdout, stderr = await _ninja(melee_root, [get_object_path(file_path)])
+    return returncode == 0, stdout, stderr
+
+
+async def compile_objects(melee_root: Path, file_paths: list[str]) -> tuple[bool, str, str]:
+    """Compile the objects for several source files in one ninja run.
+
+    On failure the caller can narrow things down with compile_object() per
+    file.
+
+    Returns:
+        Tuple of (success, stdout, stderr)
+    """
+    melee_root = Path(melee_root)
+    if not file_paths:
+        return True, "", ""
+
+    configured = await _configure(melee_root)
+    if not configured[0]:
+        return configured
+
+    returncode, stdout, stderr = await _ninja(
+        melee_root, [get_object_path(fp) for fp in dict.fromkeys(file_paths)]
+    )
+    return returncode == 0, stdout, stderr
+
+
+# =============================================================================
+# Per-unit report updates
+# =============================================================================
+
+
+def _find_unit(units: dict[str, dict], file_path: str) -> dict | None:
+    """Find the report unit for a source file (e.g. "main/melee/lb/lbcommand")."""
+    stem = Path(file_path).with_suffix("").as_posix()
+    unit = units.get(f"main/{stem}")
+    if unit is not None:
+        return unit
+    for name, unit in units.items():
+        if name.endswith(f"/{stem}"):
+            return unit
+    return None
+
+
+def _symbol_match_percents(diff: dict) -> dict[str, float]:
+    """Extract {symbol_name: match_percent} from objdiff-cli diff JSON output.
+
+    The right-hand side is the object built from our source; the left is the
+    target split from the original DOL.
+    """
+    side = diff.get("right") or diff.get("left") or {}
+    percents: dict[str, float] = {}
+    for entry in side.get("symbols", []):
+        info = entry.get("symbol", entry)
+        name = info.get("name")
+        pct = entry.get("match_percent")
+        if name and pct is not None:
+            percents[name] = float(pct)
+    return percents
+
+
+async def diff_unit(melee_root: Path, unit_name: str) -> dict[str, float] | None:
+    """Diff a single unit with objdiff-cli.
+
+    Returns:
+        Mapping of symbol name to match percent, or None if objdiff-cli is
+        unavailable or fails
+    """
+    objdiff_cli = Path(melee_root) / OBJDIFF_CLI
+    if not objdiff_cli.exists():
+        return None
+
+    returncode, stdout, _ = await _run(
+        [str(objdiff_cli), "diff", "-p", str(melee_root), "-u", unit_name,
+         "-o", "-", "--format", "json"],
+        melee_root,
+    )
+    if returncode != 0:
+        return None
+    try:
+        return _symbol_match_percents(json.loads(stdout))
+    except (json.JSONDecodeError, AttributeError):
+        return None
+
+
+def _head_commit(melee_root: Path) -> str | None:
+    try:
+        result = subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=melee_root, capture_output=True, text=True
+        )
+    except FileNotFoundError:
+        return None
+    return result.stdout.strip() if result.returncode == 0 else None
+
+
+def snapshot_report_baseline(melee_root: Path) -> Path | None:
+    """Copy report.json as the regression baseline for HEAD, unless one exists.
+
+    The first snapshot at a commit wins, so a baseline is never replaced by
+    numbers a later check or patch produced.
+
+    Returns:
+        Path of the baseline, or None if there is no report.json or no git HEAD
+    """
+    melee_root = Path(melee_root)
+    head = _head_commit(melee_root)
+    report_path = melee_root / REPORT_TARGET
+    if head is None or not report_path.exists():
+        return None
+
+    baseline_dir = melee_root / REPORT_BASELINE_DIR
+    baseline = baseline_dir / f"{head}.json"
+    if baseline.exists():
+        return baseline
+
+    baseline_dir.mkdir(parents=True, exist_ok=True)
+    tmp_path = baseline.with_name(f"{baseline.name}.{os.getpid()}.tmp")
+    shutil.copyfile(report_path, tmp_path)
+    os.replace(tmp_path, baseline)
+
+    old = sorted(baseline_dir.glob("*.json"), key=lambda p: p.stat().st_mtime, reverse=True)
+    for path in old[REPORT_BASELINES_KEPT:]:
+        path.unlink(missing_ok=True)
+    return baseline
+
+
+def load_report_baseline(melee_root: Path) -> dict | None:
+    """Load the regression baseline for HEAD, snapshotting report.json if needed.
+
+    Returns:
+        The baseline report, or None if there isn't one
+    """
+    try:
+        baseline = snapshot_report_baseline(melee_root)
+        if baseline is None:
+            return None
+        with open(baseline, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+
+
+async def diff_report_units(
+    melee_root: Path,
+    file_paths: list[str],
+    report: dict,
+) -> dict[str, tuple[float, float | None]] | None:
+    """Rebuild and re-diff only the units for the given files.
+
+    Args:
+        melee_root: Path to the melee project root
+        file_paths: Changed .c files relative to src/ (e.g., "melee/lb/lbcommand.c")
+        report: Report to compare against (not modified)
+
+    Returns:
+        {function_name: (old_percent, new_percent)} for functions whose match
+        changed, with new_percent None for functions missing from the new
+        object. None if an incremental diff isn't possible and the caller
+        should fall back to a full build.
+    """
+    melee_root = Path(melee_root)
+    units = {unit.get("name"): unit for unit in report.get("units", [])}
+    deltas: dict[str, tuple[float, float | None]] = {}
+
+    for file_path in file_paths:
+        unit = _find_unit(units, file_path)
+        if unit is None:
+            return None
+
+        compiled, _, _ = await compile_object(melee_root, file_path)
+        if not compiled:
+            return None
+
+        percents = await diff_unit(melee_root, unit["name"])
+        if percents is None:
+            return None
+
+        for func in unit.get("functions", []):
+            name = func.get("name")
+            if not name:
+                continue
+            old_pct = func.get("fuzzy_match_percent") or 0.0
+            new_pct = percents.get(name)
+            if new_pct is None or abs(old_pct - new_pct) > 1e-6:
+                deltas[name] = (old_pct, new_pct)
+
+    return deltas
+
+
+async def update_report_units(
+    melee_root: Path,
+    file_paths: list[str],
+) -> dict[str, tuple[float, float | None]] | None:
+    """Re-diff the units for the given files and patch report.json.
+
+    The regression baseline for HEAD is snapshotted first, so the patched
+    numbers never become what a later check compares against. New
+    percentages are merged into the cached report.json with its mtime left
+    unchanged, so ninja still regenerates the full report (unit and overall
+    measures included) later.
+
+    Returns:
+        Same as diff_report_units()
+    """
+    melee_root = Path(melee_root)
+    report_path = melee_root / REPORT_TARGET
+    try:
+        st = report_path.stat()
+        with open(report_path, encoding="utf-8") as f:
+            report = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+    snapshot_report_baseline(melee_root)
+
+    deltas = await diff_report_units(melee_root, file_paths, report)
+    if not deltas:
+        return deltas
+
+    changed = {name: new for name, (_, new) in deltas.items() if new is not None}
+    for unit in report.get("units", []):
+        for func in unit.get("functions", []):
+            if func.get("name") in changed:
+                func["fuzzy_match_percent"] = changed[func["name"]]
+
+    tmp_path = report_path.with_name(f"{report_path.name}.{os.getpid()}.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, separators=(",", ":"))
+    os.replace(tmp_path, report_path)
+    os.utime(report_path, ns=(st.st_atime_ns, st.st_mtime_ns))
+    return deltas
+
+
+# =============================================================================
+# Deferred report regeneration
+# =============================================================================
+
+
+def _worker_running(pid_file: Path) -> bool:
+    try:
+        pid = int(pid_file.read_text().strip())
+        os.kill(pid, 0)
+        return True
+    except (OSError, ValueError):
+        return False
+
+
+@contextmanager
+def _report_lock(melee_root: Path):
+    """Serialize starting and retiring report workers.
+
+    Held around the worker check and spawn, and around a worker's final
+    look at the request file, so no request is left without a worker.
+    """
+    with open(melee_root / REPORT_LOCK_FILE, "a") as f:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+def schedule_report_regeneration(melee_root: Path) -> bool:
+    """Request a background rebuild of report.json.
+
+    Requests made while a worker is running are picked up by that worker
+    once its current build finishes, so a burst of commits costs at most
+    two report builds.
+
+    Returns:
+        True if a new worker was started, False if one was already running
+    """
+    melee_root = Path(melee_root).resolve()
+    build_dir = melee_root / BUILD_DIR
+    build_dir.mkdir(parents=True, exist_ok=True)
+    pid_file = melee_root / REPORT_PID_FILE
+    with _report_lock(melee_root):
+        (melee_root / REPORT_REQUEST_FILE).write_text(str(time.time()))
+        if _worker_running(pid_file):
+            return False
+
+        with open(melee_root / REPORT_LOG_FILE, "a") as log:
+            proc = subprocess.Popen(
+                [sys.executable, "-m", "src.commit.build", "regenerate-report", str(melee_root)],
+                cwd=_PROJECT_ROOT,
+                stdout=log,
+                stderr=subprocess.STDOUT,
+                stdin=subprocess.DEVNULL,
+                start_new_session=True,
+            )
+        pid_file.write_text(str(proc.pid))
+    return True
+
+
+def run_report_worker(melee_root: Path) -> int:
+    """Rebuild report.json until no new requests arrive during a build."""
+    melee_root = Path(melee_root)
+    request_file = melee_root / REPORT_REQUEST_FILE
+    pid_file = melee_root / REPORT_PID_FILE
+    pid_file.write_text(str(os.getpid()))
+
+    returncode = 0
+    try:
+        while True:
+            try:
+                requested = request_file.read_text()
+            except OSError:
+                requested = ""
+
+            print(f"[{time.strftime('%H:%M:%S')}] ninja {REPORT_TARGET}", flush=True)
+            try:
+                returncode, stdout, stderr = run_ninja(melee_root, [REPORT_TARGET])
+            except FileNotFoundError as e:
+                returncode, stdout, stderr = 127, "", f"{e}\n"
+            print(stdout + stderr, end="", flush=True)
+
+            with _report_lock(melee_root):
+                try:
+                    latest = request_file.read_text()
+                except OSError:
+                    latest = ""
+                if latest == requested:
+                    pid_file.unlink(missing_ok=True)
+                    break
+    finally:
+        pid_file.unlink(missing_ok=True)
+    return returncode
+
+
+def main() -> int:
+    if len(sys.argv) == 3 and sys.argv[1] == "regenerate-report":
+        return run_report_worker(Path(sys.argv[2]))
+    print("Usage: python -m src.commit.build regenerate-report <melee_root>")
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
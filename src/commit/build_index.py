@@ -0,0 +1,144 @@
+"""Cached index of the compile units in build.ninja.
+
+build.ninja is several MB. Looking up one unit's compiler version by
+scanning the whole file on every scratch create adds up, so it is parsed
+once into a {source: BuildUnit} index. The index is saved next to the
+build and reused until build.ninja's mtime or size changes. It is also
+memoized per process.
+"""
+
+import json
+import os
+from dataclasses import asdict, dataclass
+from pathlib import Path
+
+BUILD_INDEX_FILE = "build/.build_index.json"
+
+# Bump when BuildUnit or the parser changes
+BUILD_INDEX_VERSION = 1
+
+_memo: dict[Path, tuple[tuple[int, int], dict]] = {}
+
+
+@dataclass
+class BuildUnit:
+    """One compiled translation unit from build.ninja."""
+    source: str  # Relative to src/, e.g. "melee/lb/lbcommand.c"
+    object_path: str  # e.g. "build/GALE01/src/melee/lb/lbcommand.o"
+    rule: str  # e.g. "mwcc_sjis"
+    mw_version: str | None = None  # e.g. "GC/1.2.5n"
+    cflags: str | None = None
+
+
+def _strip_src(path: str) -> str:
+    return path[4:] if path.startswith("src/") else path
+
+
+def parse_build_ninja(content: str) -> dict[str, BuildUnit]:
+    """Parse the compile units out of build.ninja text.
+
+    Only `mwcc*` build statements are indexed. Units are keyed by source
+    path relative to src/. A statement without explicit inputs falls back to
+    the `# path/to/file.c: ...` comment configure.py writes above it.
+    """
+    units: dict[str, BuildUnit] = {}
+    content = content.replace("$\r\n", "").replace("$\n", "")
+
+    comment_source = None
+    current: BuildUnit | None = None
+    for line in content.split("\n"):
+        if current is not None and line.startswith("  "):
+            key, sep, value = line.strip().partition(" = ")
+            if sep and key == "mw_version":
+                current.mw_version = value.strip()
+            elif sep and key == "cflags":
+                current.cflags = value.strip()
+            continue
+        current = None
+
+        if line.startswith("# ") and ":" in line:
+            comment_source = line[2:].split(":", 1)[0].strip()
+            continue
+
+        if not line.startswith("build "):
+            continue
+        outputs, sep, rest = line[len("build "):].partition(": ")
+        fields = rest.split("|", 1)[0].split()
+        if not fields or not fields[0].startswith("mwcc"):
+            comment_source = None
+            continue
+
+        inputs = fields[1:]
+        source = _strip_src(inputs[0]) if inputs else comment_source
+        if source:
+            current = BuildUnit(
+                source=source,
+                object_path=outputs.split()[0] if outputs.split() else "",
+                rule=fields[0],
+            )
+            units[source] = current
+        comment_source = None
+
+    return units
+
+
+def _load_saved(melee_root: Path, stamp: tuple[int, int]) -> dict | None:
+    try:
+        with open(melee_root / BUILD_INDEX_FILE) as f:
+            saved = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+    if saved.get("version") != BUILD_INDEX_VERSION or saved.get("stamp") != list(stamp):
+        return None
+    try:
+        return {src: BuildUnit(**unit) for src, unit in saved["units"].items()}
+    except (KeyError, TypeError):
+        return None
+
+
+def _save(melee_root: Path, stamp: tuple[int, int], units: dict[str, BuildUnit]) -> None:
+    index_path = melee_root / BUILD_INDEX_FILE
+    if not index_path.parent.is_dir():
+        return
+    tmp_path = index_path.with_name(f"{index_path.name}.{os.getpid()}.tmp")
+    try:
+        tmp_path.write_text(json.dumps({
+            "version": BUILD_INDEX_VERSION,
+            "stamp": list(stamp),
+            "units": {src: asdict(unit) for src, unit in units.items()},
+        }))
+        os.replace(tmp_path, index_path)
+    except OSError:
+        tmp_path.unlink(missing_ok=True)
+
+
+def get_build_index(melee_root: Path) -> dict[str, BuildUnit]:
+    """Get the compile units for a melee checkout.
+
+    Returns:
+        Mapping of source path (relative to src/) to BuildUnit, or an empty
+        dict if build.ninja doesn't exist
+    """
+    melee_root = Path(melee_root)
+    try:
+        st = (melee_root / "build.ninja").stat()
+    except OSError:
+        return {}
+    stamp = (st.st_mtime_ns, st.st_size)
+
+    memo = _memo.get(melee_root)
+    if memo and memo[0] == stamp:
+        return memo[1]
+
+    units = _load_saved(melee_root, stamp)
+    if units is None:
+        units = parse_build_ninja((melee_root / "build.ninja").read_text(errors="replace"))
+        _save(melee_root, stamp, units)
+
+    _memo[melee_root] = (stamp, units)
+    return units
+
+
+def get_build_unit(melee_root: Path, source_file: str) -> BuildUnit | None:
+    """Look up one source file, given with or without the src/ prefix."""
+    return get_build_index(melee_root).get(_strip_src(source_file))
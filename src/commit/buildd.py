@@ -0,0 +1,414 @@
+"""Per-worktree build daemon.
+
+Many commands run ninja in the same worktree: scratch create (the ctx.c
+target), build validation, the commit workflow and the validate-commit hook.
+Concurrent ninja runs in one build directory fight over .ninja_log and the
+same outputs. The daemon owns ninja for its worktree:
+
+- builds run one at a time
+- identical requests that are still queued share a single run
+- a request for targets that last built successfully at the current tree
+  hash (see get_worktree_tree_hash) returns at once without spawning ninja,
+  unless anything has run ninja in the worktree since (see ninja_log_stamp)
+
+Clients talk to it over a unix socket with one JSON line each way.
+run_ninja() and run_ninja_async() fall back to running ninja directly when
+no daemon is up, so callers never depend on it. ensure_build_daemon() starts
+one and waits for it to answer; it exits on its own after
+BUILDD_IDLE_TIMEOUT seconds without requests.
+
+Set DECOMP_BUILD_DAEMON=0 to never start one.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BUILDD_IDLE_TIMEOUT = 30 * 60
+
+# Seconds ensure_build_daemon() waits for a new daemon to listen
+BUILDD_START_TIMEOUT = 5.0
+
+# ninja's log, in the build directory (melee) or next to build.ninja
+_NINJA_LOGS = ("build/.ninja_log", ".ninja_log")
+
+# Directory containing the `src` package, for launching the daemon
+_PROJECT_ROOT = Path(__file__).resolve().parents[2]
+
+_NO_WORK = "ninja: no work to do.\n"
+
+
+def is_enabled() -> bool:
+    return os.environ.get("DECOMP_BUILD_DAEMON", "1") != "0"
+
+
+def socket_path(melee_root: Path) -> Path:
+    """Get the daemon socket for a worktree.
+
+    Lives in the temp dir, since unix socket paths are limited to ~100 bytes.
+    """
+    key = hashlib.sha1(str(Path(melee_root).resolve()).encode()).hexdigest()[:16]
+    return Path(tempfile.gettempdir()) / f"decomp-buildd-{key}.sock"
+
+
+def get_worktree_tree_hash(worktree_path: Path) -> str | None:
+    """Hash the exact source state of a worktree with a single git call.
+
+    `git status --porcelain=v2` reports the HEAD commit, the index blob of
+    every staged change and every modified or untracked path. Hashing that
+    together with the contents of the changed paths identifies the whole
+    tree, without stat-ing files that match HEAD.
+
+    Returns:
+        Hex digest, or None if git fails
+    """
+    try:
+        result = subprocess.run(
+            ["git", "status", "--porcelain=v2", "-z", "--branch", "--untracked-files=all"],
+            cwd=worktree_path,
+            capture_output=True,
+        )
+    except FileNotFoundError:
+        return None
+    if result.returncode != 0:
+        return None
+
+    h = hashlib.sha1()
+    records = result.stdout.split(b"\0")
+    i = 0
+    while i < len(records):
+        record = records[i]
+        i += 1
+        if not record:
+            continue
+        h.update(record + b"\0")
+        kind = record[:1]
+        if kind == b"1":
+            path = record.split(b" ", 8)[8]
+        elif kind == b"2":
+            path = record.split(b" ", 9)[9]
+            h.update(records[i] + b"\0")  # Original path of the rename
+            i += 1
+        elif kind == b"u":
+            path = record.split(b" ", 10)[10]
+        elif kind == b"?":
+            path = record[2:]
+        else:
+            continue  # "# branch.*" headers are hashed as-is
+        try:
+            h.update(hashlib.sha1((worktree_path / os.fsdecode(path)).read_bytes()).digest())
+        except OSError:
+            h.update(b"<missing>")
+    return h.hexdigest()
+
+
+def ninja_log_stamp(melee_root: Path) -> str:
+    """Identify the last ninja run that did work in a worktree.
+
+    ninja appends to .ninja_log for every edge it runs, whether it was
+    started by the daemon or directly, so a changed stamp means outputs may
+    no longer match the tree they were last built from.
+    """
+    stamps = []
+    for name in _NINJA_LOGS:
+        try:
+            stat = (Path(melee_root) / name).stat()
+        except OSError:
+            continue
+        stamps.append(f"{stat.st_mtime_ns}.{stat.st_size}")
+    return ",".join(stamps)
+
+
+# =============================================================================
+# Daemon
+# =============================================================================
+
+
+class BuildDaemon:
+    """Serializes and deduplicates ninja runs for one worktree."""
+
+    def __init__(self, melee_root: Path):
+        self.melee_root = Path(melee_root)
+        self.last_request = time.monotonic()
+        self._lock = asyncio.Lock()
+        # Queued (not yet started) runs, shared by identical requests
+        self._queued: dict[tuple, asyncio.Future] = {}
+        # targets -> (tree hash, build state) of their last successful build
+        self._built: dict[tuple[str, ...], tuple[str, str]] = {}
+
+    def _tree_hash(self) -> str | None:
+        return get_worktree_tree_hash(self.melee_root)
+
+    def _build_state(self) -> str | None:
+        """build.ninja's mtime and the ninja log stamp."""
+        try:
+            ninja_mtime = (self.melee_root / "build.ninja").stat().st_mtime_ns
+        except OSError:
+            return None
+        return f"{ninja_mtime}:{ninja_log_stamp(self.melee_root)}"
+
+    async def build(self, targets: list[str], force: bool = False) -> tuple[int, str, str]:
+        """Build targets, joining an identical request that hasn't started yet."""
+        self.last_request = time.monotonic()
+        key = (tuple(targets), force)
+        future = self._queued.get(key)
+        if future is None:
+            future = asyncio.get_running_loop().create_future()
+            self._queued[key] = future
+            asyncio.create_task(self._run(key, future))
+        return await asyncio.shield(future)
+
+    async def _run(self, key: tuple, future: asyncio.Future) -> None:
+        targets, force = key
+        async with self._lock:
+            # Requests arriving from now on may follow new edits: queue a new run
+            self._queued.pop(key, None)
+            try:
+                # Hash sources before building: edits made during the build
+                # must not be recorded as built
+                tree_hash = await asyncio.to_thread(self._tree_hash)
+                unchanged = self._built.get(targets) == (tree_hash, self._build_state())
+                if not force and tree_hash is not None and unchanged:
+                    future.set_result((0, _NO_WORK, ""))
+                    return
+
+                proc = await asyncio.create_subprocess_exec(
+                    "ninja", *targets,
+                    cwd=self.melee_root,
+                    stdout=asyncio.subprocess.PIPE,
+                    stderr=asyncio.subprocess.PIPE,
+                )
+                stdout, stderr = await proc.communicate()
+                # Recorded after the build, since this run writes to .ninja_log too
+                build_state = self._build_state()
+                if proc.returncode == 0 and tree_hash is not None and build_state is not None:
+                    self._built[targets] = (tree_hash, build_state)
+                else:
+                    self._built.pop(targets, None)
+                future.set_result((
+                    proc.returncode,
+                    stdout.decode(errors="replace"),
+                    stderr.decode(errors="replace"),
+                ))
+            except Exception as e:
+                future.set_result((127, "", f"build daemon: {e}"))
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        line = await reader.readline()
+        if not line:
+            writer.close()  # Liveness probe
+            return
+        try:
+            request = json.loads(line)
+            returncode, stdout, stderr = await self.build(
+                list(request.get("targets", [])), bool(request.get("force", False))
+            )
+            response = {"returncode": returncode, "stdout": stdout, "stderr": stderr}
+        except (json.JSONDecodeError, AttributeError) as e:
+            response = {"returncode": 2, "stdout": "", "stderr": f"bad request: {e}"}
+        writer.write(json.dumps(response).encode() + b"\n")
+        try:
+            await writer.drain()
+        except ConnectionError:
+            pass  # Client gave up waiting
+        finally:
+            writer.close()
+
+    async def serve(self, idle_timeout: float = BUILDD_IDLE_TIMEOUT) -> None:
+        path = socket_path(self.melee_root)
+        server = await asyncio.start_unix_server(self.handle, path=str(path))
+        try:
+            while True:
+                await asyncio.sleep(min(60.0, idle_timeout))
+                idle = time.monotonic() - self.last_request
+                if idle >= idle_timeout and not self._queued and not self._lock.locked():
+                    break
+        finally:
+            server.close()
+            path.unlink(missing_ok=True)
+
+
+def _daemon_alive(path: Path) -> bool:
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(1)
+            sock.connect(str(path))
+        return True
+    except OSError:
+        return False
+
+
+def ensure_build_daemon(melee_root: Path, timeout: float = BUILDD_START_TIMEOUT) -> bool:
+    """Start the build daemon for a worktree unless one is running.
+
+    Waits up to timeout seconds for a new daemon to accept connections, so
+    builds requested right after this go through it.
+
+    Returns:
+        True if a daemon is running
+    """
+    if not is_enabled():
+        return False
+    melee_root = Path(melee_root).resolve()
+    path = socket_path(melee_root)
+    if _daemon_alive(path):
+        return True
+    try:
+        subprocess.Popen(
+            [sys.executable, "-m", "src.commit.buildd", str(melee_root)],
+            cwd=_PROJECT_ROOT,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            stdin=subprocess.DEVNULL,
+            start_new_session=True,
+        )
+    except OSError:
+        return False
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if path.exists() and _daemon_alive(path):
+            return True
+        time.sleep(0.05)
+    return False
+
+
+# =============================================================================
+# Clients
+# =============================================================================
+
+
+def request_build(
+    melee_root: Path,
+    targets: list[str] | tuple = (),
+    timeout: float | None = None,
+    force: bool = False,
+) -> tuple[int, str, str] | None:
+    """Ask the worktree's daemon to build targets.
+
+    Returns:
+        Tuple of (returncode, stdout, stderr), or None if no daemon answered
+
+    Raises:
+        subprocess.TimeoutExpired: If the build outlasts timeout
+    """
+    path = socket_path(melee_root)
+    if not path.exists():
+        return None
+    request = json.dumps({"targets": list(targets), "force": force}).encode() + b"\n"
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(5)
+            sock.connect(str(path))
+            sock.settimeout(timeout)
+            sock.sendall(request)
+            chunks = []
+            while not chunks or not chunks[-1].endswith(b"\n"):
+                chunk = sock.recv(65536)
+                if not chunk:
+                    break
+                chunks.append(chunk)
+    except TimeoutError:
+        raise subprocess.TimeoutExpired(["ninja", *targets], timeout)
+    except OSError:
+        return None
+    try:
+        response = json.loads(b"".join(chunks))
+    except json.JSONDecodeError:
+        return None
+    return response["returncode"], response["stdout"], response["stderr"]
+
+
+async def request_build_async(
+    melee_root: Path,
+    targets: list[str] | tuple = (),
+    force: bool = False,
+) -> tuple[int, str, str] | None:
+    """Async variant of request_build()."""
+    path = socket_path(melee_root)
+    if not path.exists():
+        return None
+    try:
+        reader, writer = await asyncio.open_unix_connection(str(path))
+    except OSError:
+        return None
+    try:
+        writer.write(json.dumps({"targets": list(targets), "force": force}).encode() + b"\n")
+        await writer.drain()
+        # The daemon closes the connection after its one line; full build
+        # logs are far over readline()'s 64 KiB limit
+        data = await reader.read()
+    except (OSError, ValueError):
+        return None
+    finally:
+        writer.close()
+    try:
+        response = json.loads(data)
+    except json.JSONDecodeError:
+        return None
+    return response["returncode"], response["stdout"], response["stderr"]
+
+
+def run_ninja(
+    melee_root: Path,
+    targets: list[str] | tuple = (),
+    timeout: float | None = None,
+) -> tuple[int, str, str]:
+    """Build targets through the daemon, or with ninja directly if none is up.
+
+    Raises:
+        FileNotFoundError: If ninja isn't installed (direct run only)
+        subprocess.TimeoutExpired: If the build outlasts timeout
+    """
+    result = request_build(melee_root, targets, timeout=timeout)
+    if result is not None:
+        return result
+    proc = subprocess.run(
+        ["ninja", *targets],
+        cwd=melee_root,
+        capture_output=True,
+        text=True,
+        timeout=timeout,
+    )
+    return proc.returncode, proc.stdout, proc.stderr
+
+
+async def run_ninja_async(
+    melee_root: Path,
+    targets: list[str] | tuple = (),
+) -> tuple[int, str, str]:
+    """Async variant of run_ninja()."""
+    result = await request_build_async(melee_root, targets)
+    if result is not None:
+        return result
+    proc = await asyncio.create_subprocess_exec(
+        "ninja", *targets,
+        cwd=melee_root,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+    )
+    stdout, stderr = await proc.communicate()
+    return proc.returncode, stdout.decode(errors="replace"), stderr.decode(errors="replace")
+
+
+def main() -> int:
+    if len(sys.argv) != 2:
+        print("Usage: python -m src.commit.buildd <melee_root>")
+        return 1
+    melee_root = Path(sys.argv[1]).resolve()
+    path = socket_path(melee_root)
+    if _daemon_alive(path):
+        return 0  # Another daemon won the race
+    path.unlink(missing_ok=True)
+    asyncio.run(BuildDaemon(melee_root).serve())
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,467 @@
+"""Content-addressed object cache shared by all melee worktrees.
+
+Every worktree under melee-worktrees/ (and every diff-remotes ref build)
+compiles the full project, even though nearly all translation units are
+byte-identical to main. install_object_cache() rewrites the MWCC rules in a
+worktree's build.ninja so each compile goes through this script, which works
+like ccache's direct mode:
+
+1. Hash the command line plus the contents of every file argument (the
+   compiler, wibo/sjiswrap and the source file).
+2. Look that hash up in a manifest listing the headers the source included
+   last time and their content hashes. If they all still match, copy the
+   cached object and depfile into place and replay the compiler output.
+3. Otherwise run the compiler, read the headers from the depfile it wrote,
+   and store the result.
+
+Build paths are relative to the worktree root, so a unit compiled in one
+worktree is a hit in all others. This file only uses the standard library
+because ninja runs it directly as a script.
+
+Set DECOMP_OBJECT_CACHE=0 to bypass the cache.
+"""
+
+import hashlib
+import json
+import os
+import random
+import re
+import shlex
+import shutil
+import subprocess
+import sys
+from pathlib import Path
+
+OBJECT_CACHE_DIR = Path(
+    os.environ.get("DECOMP_OBJECT_CACHE_DIR", Path.home() / ".config" / "decomp-me" / "object_cache")
+)
+OBJECT_CACHE_MAX_BYTES = int(os.environ.get("DECOMP_OBJECT_CACHE_MAX_MB", "2048")) * 1024 * 1024
+
+# Bump when the key layout changes so old entries are never reused
+CACHE_VERSION = "1"
+
+# Header sets remembered per command (older ones are dropped)
+MAX_MANIFEST_ENTRIES = 8
+
+# Fraction of stores that also trim the cache back under its size limit
+TRIM_PROBABILITY = 0.01
+
+_SCRIPT = Path(__file__).resolve()
+_RULE_RE = re.compile(r"^rule (mwcc\S*)$")
+_DRIVE_RE = re.compile(r"^[A-Za-z]:/")
+
+
+def is_enabled() -> bool:
+    return os.environ.get("DECOMP_OBJECT_CACHE", "1") != "0"
+
+
+def _file_digest(path: Path) -> str | None:
+    try:
+        return hashlib.sha1(path.read_bytes()).hexdigest()
+    except OSError:
+        return None
+
+
+def _shard(kind: str, key: str, suffix: str) -> Path:
+    return OBJECT_CACHE_DIR / kind / key[:2] / f"{key}{suffix}"
+
+
+def _write_atomic(path: Path, data: bytes) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+
+
+# =============================================================================
+# build.ninja integration
+# =============================================================================
+
+
+def install_object_cache(melee_root: Path) -> bool:
+    """Route a worktree's MWCC compiles through the object cache.
+
+    Rewrites the command of every `rule mwcc*` in build.ninja. ninja keys
+    its build log on the full command line, so existing log entries are
+    rehashed for the wrapped commands, and the generator rule (configure.py
+    rerun by ninja itself) reinstalls the wrapper before ninja reloads the
+    manifest. Safe to call repeatedly; call it after every configure run
+    made outside ninja.
+
+    Returns:
+        True if build.ninja now uses the cache
+    """
+    if not is_enabled():
+        return False
+
+    build_ninja = Path(melee_root) / "build.ninja"
+    try:
+        content = build_ninja.read_text()
+    except OSError:
+        return False
+
+    launcher = f"{shlex.quote(sys.executable)} {shlex.quote(str(_SCRIPT))}".replace("$", "$$")
+    lines = content.split("\n")
+
+    # Per rule: [name, index of its command line, regenerates build.ninja]
+    rules: list[list] = []
+    in_rule = False
+    for i, line in enumerate(lines):
+        if line.startswith("rule "):
+            rules.append([line[len("rule "):].strip(), None, False])
+            in_rule = True
+        elif in_rule and line.startswith("  command = "):
+            rules[-1][1] = i
+        elif in_rule and line.replace(" ", "") == "generator=1":
+            rules[-1][2] = True
+        elif line and not line.startswith(" "):
+            in_rule = False
+
+    installed = changed = False
+    for name, i, generator in rules:
+        if i is None or not (generator or _RULE_RE.match(f"rule {name}")):
+            continue
+        command = lines[i][len("  command = "):]
+        if str(_SCRIPT) not in command:
+            if generator:
+                lines[i] = f"  command = {command} && {launcher} --install"
+            else:
+                lines[i] = f"  command = {launcher} $out -- {command}"
+            changed = True
+        if not generator:
+            installed = True
+
+    if changed:
+        before = _ninja_commands(melee_root)
+        _write_atomic(build_ninja, "\n".join(lines).encode())
+        _migrate_ninja_log(melee_root, before, _ninja_commands(melee_root))
+    return installed
+
+
+# =============================================================================
+# .ninja_log migration
+# =============================================================================
+
+# Build logs are written to $builddir when build.ninja sets one
+_NINJA_LOGS = ("build/.ninja_log", ".ninja_log")
+
+_MASK64 = (1 << 64) - 1
+_RAPID_SECRET = (0x2D358DCCAA6C78A5, 0x8BB84B93962EACC9, 0x4B33A62ED433D4A3)
+
+
+def _murmur64(data: bytes) -> int:
+    """MurmurHash64A as used by ninja's build log up to v6."""
+    m, r = 0xC6A4A7935BD1E995, 47
+    h = (0xDECAFBADDECAFBAD ^ (len(data) * m)) & _MASK64
+    end = len(data) - len(data) % 8
+    for i in range(0, end, 8):
+        k = (int.from_bytes(data[i:i + 8], "little") * m) & _MASK64
+        k = ((k ^ (k >> r)) * m) & _MASK64
+        h = ((h ^ k) * m) & _MASK64
+    if end < len(data):
+        h = ((h ^ int.from_bytes(data[end:], "little")) * m) & _MASK64
+    h = ((h ^ (h >> r)) * m) & _MASK64
+    return h ^ (h >> r)
+
+
+def _rapid_mum(a: int, b: int) -> tuple[int, int]:
+    product = a * b
+    return product & _MASK64, product >> 64
+
+
+def _rapidhash(data: bytes) -> int:
+    """rapidhash as used by ninja's build log from v7 (ninja 1.13)."""
+    s0, s1, s2 = _RAPID_SECRET
+    n = len(data)
+
+    def r64(i: int) -> int:
+        return int.from_bytes(data[i:i + 8], "little")
+
+    def r32(i: int) -> int:
+        return int.from_bytes(data[i:i + 4], "little")
+
+    def mix(a: int, b: int) -> int:
+        lo, hi = _rapid_mum(a, b)
+        return lo ^ hi
+
+    seed = 0xBDD89AA982704029
+    seed ^= mix(seed ^ s0, s1) ^ n
+    if n <= 16:
+        if n >= 4:
+            delta = (n & 24) >> (n >> 3)
+            a = (r32(0) << 32) | r32(n - 4)
+            b = (r32(delta) << 32) | r32(n - 4 - delta)
+        elif n > 0:
+            a, b = (data[0] << 56) | (data[n >> 1] << 32) | data[n - 1], 0
+        else:
+            a = b = 0
+    else:
+        p, i = 0, n
+        if i > 48:
+            see1 = see2 = seed
+            while i >= 48:
+                seed = mix(r64(p) ^ s0, r64(p + 8) ^ seed)
+                see1 = mix(r64(p + 16) ^ s1, r64(p + 24) ^ see1)
+                see2 = mix(r64(p + 32) ^ s2, r64(p + 40) ^ see2)
+                p, i = p + 48, i - 48
+            seed ^= see1 ^ see2
+        if i > 16:
+            seed = mix(r64(p) ^ s2, r64(p + 8) ^ seed ^ s1)
+            if i > 32:
+                seed = mix(r64(p + 16) ^ s2, r64(p + 24) ^ seed)
+        a, b = r64(p + i - 16), r64(p + i - 8)
+    a, b = _rapid_mum(a ^ s1, b ^ seed)
+    return mix(a ^ s0 ^ n, b ^ s1)
+
+
+def _ninja_commands(melee_root: Path) -> dict[str, str]:
+    """Map each compiled output to its fully expanded command line."""
+    try:
+        result = subprocess.run(
+            ["ninja", "-t", "compdb"], cwd=melee_root, capture_output=True, text=True
+        )
+        entries = json.loads(result.stdout) if result.returncode == 0 else []
+    except (OSError, json.JSONDecodeError):
+        return {}
+    return {e["output"]: e["command"] for e in entries if "output" in e and "command" in e}
+
+
+def _migrate_ninja_log(melee_root: Path, before: dict[str, str], after: dict[str, str]) -> int:
+    """Carry ninja's build log over to rewritten commands.
+
+    ninja rebuilds any output whose logged command hash no longer matches,
+    so wrapping the compiles would otherwise recompile the whole project.
+    Entries are only updated if they were logged with the old command.
+
+    Returns:
+        Number of log entries updated
+    """
+    for name in _NINJA_LOGS:
+        log = Path(melee_root) / name
+        try:
+            lines = log.read_text().split("\n")
+        except OSError:
+            continue
+        match = re.match(r"# ninja log v(\d+)$", lines[0])
+        if not match or int(match.group(1)) < 5:
+            return 0
+        hash_command = _rapidhash if int(match.group(1)) >= 7 else _murmur64
+
+        updated = 0
+        for i, line in enumerate(lines[1:], 1):
+            fields = line.split("\t")
+            if len(fields) != 5:
+                continue
+            old, new = before.get(fields[3]), after.get(fields[3])
+            if old is None or new is None or old == new:
+                continue
+            if fields[4] == f"{hash_command(old.encode()):x}":
+                fields[4] = f"{hash_command(new.encode()):x}"
+                lines[i] = "\t".join(fields)
+                updated += 1
+        if updated:
+            _write_atomic(log, "\n".join(lines).encode())
+        return updated
+    return 0
+
+
+# =============================================================================
+# Cache lookup and storage
+# =============================================================================
+
+
+def _command_key(cmd: list[str], cwd: Path) -> str:
+    """Hash the command line and the contents of every file it names."""
+    h = hashlib.sha256(f"objcache-v{CACHE_VERSION}\0".encode())
+    for arg in cmd:
+        h.update(arg.encode() + b"\0")
+        path = cwd / arg
+        if path.is_file():
+            h.update((_file_digest(path) or "").encode() + b"\0")
+    return h.hexdigest()
+
+
+def _parse_depfile(text: str, cwd: Path) -> list[str] | None:
+    """Get the dependencies from a make-style depfile, relative to cwd.
+
+    Returns None if any dependency can't be located, in which case the
+    result must not be cached.
+    """
+    text = text.replace("\\\n", " ").replace("\r", "")
+    if ": " not in text and ":\n" not in text:
+        return None
+    # The target may be a Windows path containing a drive colon
+    sep = text.find(": ") if ": " in text else text.find(":\n")
+    deps = []
+    for dep in text[sep + 1:].split():
+        dep = dep.replace("\\", "/")
+        if _DRIVE_RE.match(dep):
+            dep = dep[2:]  # wibo maps drive letters onto /
+        path = Path(dep)
+        if path.is_absolute():
+            try:
+                dep = path.relative_to(cwd).as_posix()
+            except ValueError:
+                pass
+        if not (cwd / dep).is_file():
+            return None
+        deps.append(dep)
+    return deps
+
+
+def _load_manifest(key: str) -> list[dict]:
+    try:
+        return json.loads(_shard("manifests", key, ".json").read_text())
+    except (OSError, json.JSONDecodeError):
+        return []
+
+
+def lookup(key: str, out: Path, cwd: Path) -> tuple[bool, str, str]:
+    """Restore a cached object for this command if all its inputs match.
+
+    Args:
+        key: Command hash from _command_key(), taken before compiling
+        out: Object file to write
+        cwd: Directory the build paths are relative to
+
+    Returns:
+        Tuple of (hit, stdout, stderr) with the original compiler output
+    """
+    for entry in reversed(_load_manifest(key)):
+        if all(_file_digest(cwd / dep) == digest for dep, digest in entry["deps"].items()):
+            obj = _shard("objects", entry["result"], ".o")
+            if not obj.exists():
+                continue
+            out.parent.mkdir(parents=True, exist_ok=True)
+            shutil.copyfile(obj, out)
+            depfile = obj.with_suffix(".d")
+            if depfile.exists():
+                shutil.copyfile(depfile, out.with_suffix(".d"))
+            os.utime(obj)  # Keep recently used entries when trimming
+            try:
+                log = json.loads(obj.with_suffix(".log").read_text())
+            except (OSError, json.JSONDecodeError):
+                log = {}
+            return True, log.get("stdout", ""), log.get("stderr", "")
+    return False, "", ""
+
+
+def store(key: str, out: Path, cwd: Path, stdout: str = "", stderr: str = "") -> bool:
+    """Store a freshly compiled object under this command and its headers."""
+    depfile = out.with_suffix(".d")
+    try:
+        deps = _parse_depfile(depfile.read_text(errors="replace"), cwd)
+        obj_data = out.read_bytes()
+        dep_data = depfile.read_bytes()
+    except OSError:
+        return False
+    if deps is None:
+        return False
+
+    digests = {dep: _file_digest(cwd / dep) for dep in deps}
+    result = hashlib.sha256(
+        (key + json.dumps(digests, sort_keys=True)).encode()
+    ).hexdigest()
+
+    try:
+        obj = _shard("objects", result, ".o")
+        _write_atomic(obj.with_suffix(".d"), dep_data)
+        _write_atomic(obj.with_suffix(".log"), json.dumps({"stdout": stdout, "stderr": stderr}).encode())
+        _write_atomic(obj, obj_data)
+
+        manifest = [e for e in _load_manifest(key) if e["result"] != result]
+        manifest.append({"deps": digests, "result": result})
+        _write_atomic(
+            _shard("manifests", key, ".json"),
+            json.dumps(manifest[-MAX_MANIFEST_ENTRIES:]).encode(),
+        )
+    except OSError:
+        return False
+
+    if random.random() < TRIM_PROBABILITY:
+        trim_object_cache()
+    return True
+
+
+def trim_object_cache(max_bytes: int = OBJECT_CACHE_MAX_BYTES) -> int:
+    """Delete least recently used objects until the cache is under max_bytes.
+
+    Returns:
+        Number of objects removed
+    """
+    objects_dir = OBJECT_CACHE_DIR / "objects"
+    if not objects_dir.exists():
+        return 0
+
+    entries = []
+    total = 0
+    for obj in objects_dir.rglob("*.o"):
+        try:
+            st = obj.stat()
+        except OSError:
+            continue
+        size = st.st_size
+        for sibling in (obj.with_suffix(".d"), obj.with_suffix(".log")):
+            try:
+                size += sibling.stat().st_size
+            except OSError:
+                pass
+        entries.append((st.st_mtime, size, obj))
+        total += size
+
+    removed = 0
+    target = max_bytes * 0.8
+    for _, size, obj in sorted(entries, key=lambda e: e[0]):
+        if total <= target:
+            break
+        for path in (obj, obj.with_suffix(".d"), obj.with_suffix(".log")):
+            path.unlink(missing_ok=True)
+        total -= size
+        removed += 1
+    return removed
+
+
+# =============================================================================
+# Compiler wrapper entry point
+# =============================================================================
+
+
+def main(argv: list[str]) -> int:
+    """Run as `objcache.py <out> -- <compiler command...>`.
+
+    `objcache.py --install` rewraps build.ninja in the current directory; the
+    generator rule runs it after configure.py regenerates the manifest.
+    """
+    if argv == ["--install"]:
+        install_object_cache(Path.cwd())
+        return 0
+    if len(argv) < 3 or argv[1] != "--":
+        print("usage: objcache.py <out> -- <command...>", file=sys.stderr)
+        return 2
+
+    out, cmd = Path(argv[0]), argv[2:]
+    cwd = Path.cwd()
+    enabled = is_enabled()
+
+    if enabled:
+        # Hash before compiling so the output file isn't part of the key
+        key = _command_key(cmd, cwd)
+        try:
+            hit, stdout, stderr = lookup(key, out, cwd)
+        except OSError:
+            hit = False
+        if hit:
+            sys.stdout.write(stdout)
+            sys.stderr.write(stderr)
+            return 0
+
+    result = subprocess.run(cmd, capture_output=True, text=True)
+    sys.stdout.write(result.stdout)
+    sys.stderr.write(result.stderr)
+    if result.returncode == 0 and enabled:
+        store(key, out, cwd, result.stdout, result.stderr)
+    return result.returncode
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
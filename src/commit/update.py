@@ -4,6 +4,8 @@ import re
 from pathlib import Path
 from typing import Optional, Tuple
 
+from src.hooks.c_scanner import count_braces, match_brace
+
 
 class CodeValidationError(Exception):
     """Raised when code validation fails."""
@@ -32,8 +34,7 @@ def validate_function_code(code: str, function_name: str) -> Tuple[bool, str]:
         return False, "Code is empty"
 
     # Check for balanced braces
-    open_braces = code.count('{')
-    close_braces = code.count('}')
+    open_braces, close_braces = count_braces(code)
     if open_braces != close_braces:
         return False, f"Unbalanced braces: {open_braces} '{{' vs {close_braces} '}}'"
 
@@ -99,20 +100,7 @@ def _extract_function_from_code(code: str, function_name: str) -> Optional[str]:
     func_start = match.start()
 
     # Find the matching closing brace
-    brace_count = 0
-    func_end = None
-    in_function = False
-
-    for i in range(match.end() - 1, len(code)):
-        if code[i] == '{':
-            brace_count += 1
-            in_function = True
-        elif code[i] == '}':
-            brace_count -= 1
-            if in_function and brace_count == 0:
-                func_end = i + 1
-                break
-
+    func_end = match_brace(code, match.end() - 1)
     if func_end is None:
         return None
 
@@ -186,20 +174,7 @@ async def update_source_file(
             func_start = match.start()
 
             # Find the matching closing brace
-            brace_count = 0
-            func_end = None
-            in_function = False
-
-            for i in range(match.end() - 1, len(content)):
-                if content[i] == '{':
-                    brace_count += 1
-                    in_function = True
-                elif content[i] == '}':
-                    brace_count -= 1
-                    if in_function and brace_count == 0:
-                        func_end = i + 1
-                        break
-
+            func_end = match_brace(content, match.end() - 1)
             if func_end is None:
                 print(f"Error: Could not find closing brace for function '{function_name}'")
                 return False
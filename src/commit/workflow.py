@@ -8,6 +8,8 @@ import asyncio
 from pathlib import Path
 from typing import Optional
 
+from .build import REPORT_TARGET, compile_object, schedule_report_regeneration, update_report_units
+from .buildd import run_ninja_async
 from .update import update_source_file
 from .configure import update_configure_py, get_file_path_from_function, should_mark_as_matching
 from .format import format_files, verify_clang_format_available
@@ -18,13 +20,16 @@ from .diagnostics import analyze_commit_error
 class CommitWorkflow:
     """Manages the complete workflow for committing matched functions."""
 
-    def __init__(self, melee_root: Path):
+    def __init__(self, melee_root: Path, defer_report: bool = True):
         """Initialize the commit workflow.
 
         Args:
             melee_root: Path to the melee project root directory
+            defer_report: Regenerate report.json in a background worker instead
+                of blocking on the full build it requires
         """
         self.melee_root = Path(melee_root)
+        self.defer_report = defer_report
         self.files_changed: list[str] = []
 
     async def execute(
@@ -169,33 +174,15 @@ class CommitWorkflow:
             Tuple of (success, error_message, full_output).
             error_message is empty on success, full_output is for diagnostics.
         """
-        # Convert .c to .o for the object file target
-        obj_path = f"build/GALE01/src/{file_path}".replace('.c', '.o')
-
         try:
-            # First run configure.py to ensure build files are up to date
-            proc = await asyncio.create_subprocess_exec(
-                "python", "configure.py",
-                cwd=self.melee_root,
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE,
-            )
-            await proc.communicate()
-
-            # Now compile just the one object file
-            proc = await asyncio.create_subprocess_exec(
-                "ninja", obj_path,
-                cwd=self.melee_root,
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE,
-            )
-            stdout, stderr = await proc.communicate()
+            # Only the one object file - no full build
+            success, stdout, stderr = await compile_object(self.melee_root, file_path)
 
-            if proc.returncode == 0:
+            if success:
                 return True, "", ""
             else:
                 # Extract the actual error message from stderr
-                error_output = stderr.decode() if stderr else stdout.decode() if stdout else "Unknown error"
+                error_output = stderr or stdout or "Unknown error"
                 # Look for the actual compiler error
                 # MWCC format: "Error: ^^^^" marker followed by actual message on next line
                 lines = error_output.split('\n')
@@ -244,23 +231,44 @@ class CommitWorkflow:
             return False
 
     async def _regenerate_report(self) -> bool:
-        """Regenerate the progress report (report.json) via ninja."""
+        """Regenerate the progress report (report.json) via ninja.
+
+        With defer_report set, this only queues the background worker;
+        report.json depends on every object, so building it inline is the
+        slowest part of a commit.
+        """
+        if self.defer_report:
+            # Refresh just the changed units now so report.json reflects this
+            # commit before the full rebuild finishes
+            c_files = [f[len("src/"):] for f in self.files_changed if f.endswith(".c")]
+            if c_files:
+                try:
+                    deltas = await update_report_units(self.melee_root, c_files)
+                except OSError:
+                    deltas = None
+                if deltas:
+                    print(f"✓ Updated {len(deltas)} function(s) in cached report")
+
+            try:
+                if schedule_report_regeneration(self.melee_root):
+                    print("✓ Progress report regenerating in background\n")
+                else:
+                    print("✓ Progress report queued (background build already running)\n")
+                return True
+            except OSError as e:
+                print(f"⚠ Warning: Could not start background report build: {e}")
+                # Fall through to a synchronous build
+
         try:
-            proc = await asyncio.create_subprocess_exec(
-                "ninja", "build/GALE01/report.json",
-                cwd=self.melee_root,
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE,
-            )
-            stdout, stderr = await proc.communicate()
+            returncode, _, stderr = await run_ninja_async(self.melee_root, [REPORT_TARGET])
 
-            if proc.returncode == 0:
+            if returncode == 0:
                 print("✓ Progress report regenerated\n")
                 return True
             else:
-                print(f"⚠ Warning: Failed to regenerate report (exit {proc.returncode})")
+                print(f"⚠ Warning: Failed to regenerate report (exit {returncode})")
                 if stderr:
-                    print(f"  {stderr.decode().strip()}")
+                    print(f"  {stderr.strip()}")
                 return False
         except FileNotFoundError:
             print("⚠ Warning: ninja not found, skipping report regeneration")
@@ -31,6 +31,10 @@ DEFAULT_DB_PATH = DECOMP_CONFIG_DIR / "agent_state.db"
 # Thread-local storage for connections
 _local = threading.local()
 
+# Re-record an unchanged score at most this often, so match_history keeps a
+# periodic sample of activity without one row per compile
+MATCH_SAMPLE_INTERVAL = 15 * 60
+
 
 class StateDB:
     """SQLite database for agent state management.
@@ -180,6 +184,8 @@ class StateDB:
         function_name: str,
         agent_id: str,
         timeout_seconds: int = 3600,
+        source_file_path: str | None = None,
+        subdirectory_key: str | None = None,
     ) -> tuple[bool, str | None]:
         """Add a claim for a function.
 
@@ -187,6 +193,8 @@ class StateDB:
             function_name: Function to claim
             agent_id: Agent claiming the function
             timeout_seconds: Claim expiry in seconds (default 1 hour)
+            source_file_path: Source file containing the function
+            subdirectory_key: Subdirectory worktree key for the source file
 
         Returns:
             (success, error_message) tuple
@@ -217,10 +225,11 @@ class StateDB:
             # Add new claim
             conn.execute(
                 """
-                INSERT INTO claims (function_name, agent_id, claimed_at, expires_at)
-                VALUES (?, ?, ?, ?)
+                INSERT INTO claims (function_name, agent_id, claimed_at, expires_at,
+                                    source_file_path, subdirectory_key)
+                VALUES (?, ?, ?, ?, ?, ?)
                 """,
-                (function_name, agent_id, now, expires_at)
+                (function_name, agent_id, now, expires_at, source_file_path, subdirectory_key)
             )
 
             # Update function status
@@ -291,6 +300,55 @@ class StateDB:
 
         return True
 
+    def get_claim(self, function_name: str) -> dict | None:
+        """Get the active (non-expired) claim for a function, if any."""
+        with self.connection() as conn:
+            cursor = conn.execute(
+                "SELECT * FROM claims WHERE function_name = ? AND expires_at > ?",
+                (function_name, time.time())
+            )
+            row = cursor.fetchone()
+            return dict(row) if row else None
+
+    def get_claims(self, agent_id: str | None = None) -> list[dict]:
+        """Get active claims, optionally filtered to one agent.
+
+        Unlike get_active_claims(), this reads the claims table directly
+        without joining function data, for hot-path lookups.
+        """
+        query = "SELECT * FROM claims WHERE expires_at > ?"
+        params: list[Any] = [time.time()]
+        if agent_id:
+            query += " AND agent_id = ?"
+            params.append(agent_id)
+        query += " ORDER BY function_name"
+
+        with self.connection() as conn:
+            cursor = conn.execute(query, params)
+            return [dict(row) for row in cursor.fetchall()]
+
+    def renew_claim(
+        self,
+        function_name: str,
+        agent_id: str,
+        timeout_seconds: int = 3600,
+    ) -> bool:
+        """Extend an active claim owned by an agent.
+
+        Returns:
+            True if the claim was renewed, False if not claimed by this agent
+        """
+        now = time.time()
+        with self.connection() as conn:
+            cursor = conn.execute(
+                """
+                UPDATE claims SET expires_at = ?
+                WHERE function_name = ? AND agent_id = ? AND expires_at > ?
+                """,
+                (now + timeout_seconds, function_name, agent_id, now)
+            )
+            return cursor.rowcount > 0
+
     def get_active_claims(self) -> list[dict]:
         """Get all active (non-expired) claims."""
         with self.connection() as conn:
@@ -304,6 +362,304 @@ class StateDB:
             )
             return [dict(row) for row in cursor.fetchall()]
 
+    # =========================================================================
+    # Candidate Queue Operations
+    # =========================================================================
+
+    def replace_candidates(
+        self,
+        candidates: list[dict],
+        report_mtime: float | None = None,
+    ) -> int:
+        """Replace the precomputed candidate queue.
+
+        Args:
+            candidates: Dicts with function_name, source_file_path, subdirectory_key,
+                canonical_address, size_bytes, match_percent, object_status and
+                recommendation_score
+            report_mtime: mtime of the report.json the candidates were built from
+
+        Returns:
+            Number of candidates stored
+        """
+        now = time.time()
+        with self.transaction() as conn:
+            conn.execute("DELETE FROM function_candidates")
+            conn.executemany(
+                """
+                INSERT INTO function_candidates
+                    (function_name, source_file_path, subdirectory_key, canonical_address,
+                     size_bytes, match_percent, object_status, recommendation_score, refreshed_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(function_name) DO NOTHING
+                """,
+                [
+                    (
+                        c['function_name'],
+                        c['source_file_path'],
+                        c['subdirectory_key'],
+                        self._normalize_address(c.get('canonical_address')),
+                        c.get('size_bytes'),
+                        c.get('match_percent', 0.0),
+                        c.get('object_status'),
+                        c['recommendation_score'],
+                        now,
+                    )
+                    for c in candidates
+                ]
+            )
+            conn.execute(
+                """
+                INSERT INTO db_meta (key, value, updated_at) VALUES ('candidates_report_mtime', ?, ?)
+                ON CONFLICT(key) DO UPDATE SET value = excluded.value, updated_at = excluded.updated_at
+                """,
+                (str(report_mtime) if report_mtime is not None else None, now)
+            )
+
+        return len(candidates)
+
+    def get_candidate_count(self) -> int:
+        """Get the number of functions in the candidate queue."""
+        with self.connection() as conn:
+            cursor = conn.execute("SELECT COUNT(*) FROM function_candidates")
+            return cursor.fetchone()[0]
+
+    def claim_next_candidate(
+        self,
+        agent_id: str,
+        timeout_seconds: int = 3600,
+        lock_minutes: int = 30,
+        module: str | None = None,
+        matching_only: bool = False,
+        max_size: int | None = None,
+        exclude_subdirs: list[str] | None = None,
+    ) -> dict | None:
+        """Atomically select and claim the best available candidate.
+
+        Picks the highest recommendation_score candidate that has no active claim,
+        isn't already matched/committed/merged, and whose subdirectory is unlocked
+        (or locked by this agent). The claim, function status and subdirectory lock
+        are all written in the same transaction, so concurrent agents never race.
+
+        Args:
+            agent_id: Agent claiming the function
+            timeout_seconds: Claim expiry in seconds (default 1 hour)
+            lock_minutes: Subdirectory lock expiry in minutes
+            module: Only consider functions under this module (e.g., "ft", "lb")
+            matching_only: Only consider functions in Matching objects
+            max_size: Maximum function size in bytes
+            exclude_subdirs: Subdirectory keys to skip
+
+        Returns:
+            The claimed candidate as a dict, or None if nothing is available
+        """
+        now = time.time()
+        query = """
+            SELECT fc.* FROM function_candidates fc
+            LEFT JOIN claims c
+                ON c.function_name = fc.function_name AND c.expires_at > :now
+            LEFT JOIN functions f ON f.function_name = fc.function_name
+            LEFT JOIN subdirectory_allocations sa ON sa.subdirectory_key = fc.subdirectory_key
+            WHERE c.function_name IS NULL
+              AND COALESCE(f.status, 'unclaimed') NOT IN (
+                  'matched', 'committed', 'committed_needs_fix', 'in_review', 'merged'
+              )
+              AND (sa.locked_by_agent IS NULL
+                   OR sa.locked_by_agent = :agent_id
+                   OR (sa.lock_expires_at IS NOT NULL AND sa.lock_expires_at <= :now))
+        """
+        params: dict[str, Any] = {'now': now, 'agent_id': agent_id}
+
+        if module:
+            query += " AND LOWER(fc.source_file_path) LIKE :module"
+            params['module'] = f"%/{module.lower()}/%"
+        if matching_only:
+            query += " AND fc.object_status = 'Matching'"
+        if max_size is not None:
+            query += " AND fc.size_bytes <= :max_size"
+            params['max_size'] = max_size
+        for i, subdir in enumerate(exclude_subdirs or []):
+            query += f" AND fc.subdirectory_key != :exclude_{i}"
+            params[f'exclude_{i}'] = subdir
+
+        # Prefer subdirectories this agent already holds on equal scores
+        query += """
+            ORDER BY fc.recommendation_score DESC,
+                     (sa.locked_by_agent = :agent_id) DESC,
+                     fc.function_name
+            LIMIT 1
+        """
+
+        with self.transaction() as conn:
+            row = conn.execute(query, params).fetchone()
+            if not row:
+                return None
+
+            candidate = dict(row)
+            function_name = candidate['function_name']
+            subdir_key = candidate['subdirectory_key']
+            expires_at = now + timeout_seconds
+            lock_expires_at = now + (lock_minutes * 60)
+
+            # Drop any expired claim left behind for this function
+            conn.execute(
+                "DELETE FROM claims WHERE function_name = ?",
+                (function_name,)
+            )
+            conn.execute(
+                """
+                INSERT INTO claims (function_name, agent_id, claimed_at, expires_at,
+                                    source_file_path, subdirectory_key)
+                VALUES (?, ?, ?, ?, ?, ?)
+                """,
+                (function_name, agent_id, now, expires_at,
+                 candidate['source_file_path'], subdir_key)
+            )
+
+            conn.execute(
+                """
+                INSERT INTO functions (function_name, status, claimed_by_agent, claimed_at,
+                                       source_file_path, canonical_address, updated_at)
+                VALUES (?, 'claimed', ?, ?, ?, ?, ?)
+                ON CONFLICT(function_name) DO UPDATE SET
+                    status = 'claimed',
+                    claimed_by_agent = excluded.claimed_by_agent,
+                    claimed_at = excluded.claimed_at,
+                    source_file_path = COALESCE(source_file_path, excluded.source_file_path),
+                    canonical_address = COALESCE(canonical_address, excluded.canonical_address),
+                    updated_at = excluded.updated_at
+                """,
+                (function_name, agent_id, now, candidate['source_file_path'],
+                 candidate['canonical_address'], now)
+            )
+
+            conn.execute(
+                """
+                INSERT INTO subdirectory_allocations
+                    (subdirectory_key, worktree_path, branch_name,
+                     locked_by_agent, locked_at, lock_expires_at, updated_at)
+                VALUES (?, '', '', ?, ?, ?, ?)
+                ON CONFLICT(subdirectory_key) DO UPDATE SET
+                    locked_by_agent = excluded.locked_by_agent,
+                    locked_at = excluded.locked_at,
+                    lock_expires_at = excluded.lock_expires_at,
+                    updated_at = excluded.updated_at
+                """,
+                (subdir_key, agent_id, now, lock_expires_at, now)
+            )
+            conn.execute(
+                """
+                INSERT INTO agent_subdirectory_assignments (agent_id, subdirectory_key)
+                VALUES (?, ?)
+                ON CONFLICT DO NOTHING
+                """,
+                (agent_id, subdir_key)
+            )
+
+            self.log_audit(
+                'claim', function_name, 'created',
+                agent_id=agent_id,
+                new_value={'agent_id': agent_id, 'expires_at': expires_at},
+                metadata={
+                    'via': 'claim_next',
+                    'subdirectory_key': subdir_key,
+                    'recommendation_score': candidate['recommendation_score'],
+                }
+            )
+
+        candidate['expires_at'] = expires_at
+        return candidate
+
+    def get_prefetch_candidates(self, limit: int) -> list[dict]:
+        """Get the top of the candidate queue that still needs a prefetched scratch.
+
+        Looks at the `limit` best candidates that are unclaimed, unfinished and
+        have no local scratch, and returns those not prefetched yet.
+
+        Args:
+            limit: How far down the queue to look
+
+        Returns:
+            Candidate dicts, best first
+        """
+        with self.connection() as conn:
+            cursor = conn.execute(
+                """
+                SELECT top.* FROM (
+                    SELECT fc.* FROM function_candidates fc
+                    LEFT JOIN claims c
+                        ON c.function_name = fc.function_name AND c.expires_at > :now
+                    LEFT JOIN functions f ON f.function_name = fc.function_name
+                    WHERE c.function_name IS NULL
+                      AND f.local_scratch_slug IS NULL
+                      AND COALESCE(f.status, 'unclaimed') NOT IN (
+                          'matched', 'committed', 'committed_needs_fix', 'in_review', 'merged'
+                      )
+                    ORDER BY fc.recommendation_score DESC, fc.function_name
+                    LIMIT :limit
+                ) top
+                LEFT JOIN prefetched_scratches p ON p.function_name = top.function_name
+                WHERE p.function_name IS NULL
+                ORDER BY top.recommendation_score DESC, top.function_name
+                """,
+                {'now': time.time(), 'limit': limit}
+            )
+            return [dict(row) for row in cursor.fetchall()]
+
+    def add_prefetched_scratches(self, scratches: list[dict], base_url: str) -> int:
+        """Store scratches created ahead of time, ready to be taken.
+
+        Args:
+            scratches: Dicts with slug, function_name, claim_token and context_hash
+            base_url: Base URL of the decomp.me instance
+
+        Returns:
+            Number of scratches stored
+        """
+        with self.transaction() as conn:
+            conn.executemany(
+                """
+                INSERT INTO prefetched_scratches
+                    (function_name, slug, base_url, claim_token, context_hash)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(function_name) DO UPDATE SET
+                    slug = excluded.slug,
+                    base_url = excluded.base_url,
+                    claim_token = excluded.claim_token,
+                    context_hash = excluded.context_hash,
+                    created_at = unixepoch('now', 'subsec')
+                """,
+                [
+                    (s['function_name'], s['slug'], base_url, s.get('claim_token'), s.get('context_hash'))
+                    for s in scratches
+                ]
+            )
+        return len(scratches)
+
+    def take_prefetched_scratch(self, function_name: str, base_url: str) -> dict | None:
+        """Remove and return the prefetched scratch for a function, if any.
+
+        Taking is atomic, so two agents never get the same scratch.
+        """
+        with self.transaction() as conn:
+            row = conn.execute(
+                "SELECT * FROM prefetched_scratches WHERE function_name = ? AND base_url = ?",
+                (function_name, base_url)
+            ).fetchone()
+            if not row:
+                return None
+            conn.execute(
+                "DELETE FROM prefetched_scratches WHERE function_name = ?",
+                (function_name,)
+            )
+            return dict(row)
+
+    def get_prefetched_scratches(self) -> list[dict]:
+        """Get all prefetched scratches, oldest first."""
+        with self.connection() as conn:
+            cursor = conn.execute("SELECT * FROM prefetched_scratches ORDER BY created_at")
+            return [dict(row) for row in cursor.fetchall()]
+
     # =========================================================================
     # Function Operations
     # =========================================================================
@@ -395,15 +751,14 @@ class StateDB:
         Returns:
             Function record dict or None if not found
         """
-        # Normalize address format
-        normalized = self._normalize_address(address)
-        if not normalized:
+        addr_int = self._address_to_int(address)
+        if addr_int is None:
             return None
 
         with self.connection() as conn:
             cursor = conn.execute(
-                "SELECT * FROM functions WHERE canonical_address = ?",
-                (normalized,)
+                "SELECT * FROM functions WHERE address_int = ?",
+                (addr_int,)
             )
             row = cursor.fetchone()
             return dict(row) if row else None
@@ -445,6 +800,17 @@ class StateDB:
         except (ValueError, TypeError):
             return None
 
+    def _address_to_int(self, address: str | int | None) -> int | None:
+        """Convert an address in any accepted format to an integer.
+
+        Matches the address_int columns, which are derived from the
+        normalized canonical_address text.
+        """
+        normalized = self._normalize_address(address)
+        if normalized is None:
+            return None
+        return int(normalized, 16)
+
     def record_function_alias(
         self,
         canonical_address: str,
@@ -467,13 +833,13 @@ class StateDB:
         with self.connection() as conn:
             conn.execute(
                 """
-                INSERT INTO function_aliases (canonical_address, old_name, new_name, source)
-                VALUES (?, ?, ?, ?)
+                INSERT INTO function_aliases (canonical_address, old_name, new_name, source, renamed_at)
+                VALUES (?, ?, ?, ?, ?)
                 ON CONFLICT(canonical_address, old_name) DO UPDATE SET
                     new_name = COALESCE(excluded.new_name, new_name),
                     source = excluded.source
                 """,
-                (normalized, old_name, new_name, source)
+                (normalized, old_name, new_name, source, time.time())
             )
 
             self.log_audit(
@@ -495,8 +861,8 @@ class StateDB:
         Returns:
             List of alias records with old_name, new_name, renamed_at, source
         """
-        normalized = self._normalize_address(address)
-        if not normalized:
+        addr_int = self._address_to_int(address)
+        if addr_int is None:
             return []
 
         with self.connection() as conn:
@@ -504,10 +870,10 @@ class StateDB:
                 """
                 SELECT old_name, new_name, renamed_at, source
                 FROM function_aliases
-                WHERE canonical_address = ?
+                WHERE address_int = ?
                 ORDER BY renamed_at DESC
                 """,
-                (normalized,)
+                (addr_int,)
             )
             return [dict(row) for row in cursor.fetchall()]
 
@@ -559,25 +925,23 @@ class StateDB:
         if not address_map:
             return 0
 
-        updated = 0
         now = time.time()
+        rows = []
+        for func_name, address in address_map.items():
+            normalized = self._normalize_address(address)
+            if normalized:
+                rows.append((normalized, now, func_name, normalized))
 
         with self.transaction() as conn:
-            for func_name, address in address_map.items():
-                normalized = self._normalize_address(address)
-                if not normalized:
-                    continue
-
-                cursor = conn.execute(
-                    """
-                    UPDATE functions
-                    SET canonical_address = ?, updated_at = ?
-                    WHERE function_name = ? AND (canonical_address IS NULL OR canonical_address != ?)
-                    """,
-                    (normalized, now, func_name, normalized)
-                )
-                if cursor.rowcount > 0:
-                    updated += 1
+            cursor = conn.executemany(
+                """
+                UPDATE functions
+                SET canonical_address = ?, updated_at = ?
+                WHERE function_name = ? AND (canonical_address IS NULL OR canonical_address != ?)
+                """,
+                rows
+            )
+            updated = max(cursor.rowcount, 0)
 
             if updated > 0:
                 self.log_audit(
@@ -588,6 +952,84 @@ class StateDB:
 
         return updated
 
+    def detect_renames(
+        self,
+        report_addresses: dict[str, str | int | None],
+    ) -> list[tuple[str, str, str]]:
+        """Find renamed functions for a whole report in one query.
+
+        A report function is a rename when its name isn't tracked but a
+        tracked function (or a known alias of one) sits at the same address,
+        and that tracked name no longer appears in the report.
+
+        Args:
+            report_addresses: Dict mapping report function_name -> address
+
+        Returns:
+            List of (old_name, new_name, canonical_address) tuples
+        """
+        rows = []
+        for name, address in report_addresses.items():
+            rows.append((name, self._address_to_int(address)))
+        if not rows:
+            return []
+
+        with self.connection() as conn:
+            conn.execute(
+                """
+                CREATE TEMP TABLE IF NOT EXISTS report_functions (
+                    function_name TEXT PRIMARY KEY,
+                    address_int INTEGER
+                )
+                """
+            )
+            conn.execute("DELETE FROM temp.report_functions")
+            try:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO temp.report_functions VALUES (?, ?)",
+                    rows
+                )
+                conn.execute(
+                    "CREATE INDEX IF NOT EXISTS temp.idx_report_functions_address "
+                    "ON report_functions(address_int)"
+                )
+                cursor = conn.execute(
+                    """
+                    WITH unmatched AS (
+                        SELECT r.function_name, r.address_int
+                        FROM temp.report_functions r
+                        WHERE r.address_int IS NOT NULL
+                          AND NOT EXISTS (
+                              SELECT 1 FROM functions f WHERE f.function_name = r.function_name
+                          )
+                    ),
+                    candidates AS (
+                        -- Tracked function at the same address
+                        SELECT f.function_name AS old_name, u.function_name AS new_name,
+                               u.address_int
+                        FROM unmatched u
+                        JOIN functions f ON f.address_int = u.address_int
+                        UNION
+                        -- Tracked function known at this address through an alias
+                        SELECT f.function_name, u.function_name, u.address_int
+                        FROM unmatched u
+                        JOIN function_aliases a ON a.address_int = u.address_int
+                        JOIN functions f ON f.function_name IN (a.old_name, a.new_name)
+                    )
+                    SELECT old_name, new_name, address_int FROM candidates c
+                    WHERE NOT EXISTS (
+                        SELECT 1 FROM temp.report_functions r WHERE r.function_name = c.old_name
+                    )
+                    ORDER BY address_int, old_name
+                    """
+                )
+                return [
+                    (row['old_name'], row['new_name'], f"0x{row['address_int']:08X}")
+                    for row in cursor.fetchall()
+                ]
+            finally:
+                conn.execute("DELETE FROM temp.report_functions")
+
     def merge_function_records(
         self,
         old_name: str,
@@ -779,52 +1221,337 @@ class StateDB:
         max_score: int,
         worktree_path: str | None = None,
         branch: str | None = None,
-    ) -> None:
+        agent_id: str | None = None,
+        sample_interval: float = MATCH_SAMPLE_INTERVAL,
+    ) -> bool:
         """Record a match score for a scratch in history.
 
+        Every compile bumps the hourly rollup for the scratch and agent, but a
+        match_history point is only written when the score changes or the last
+        point is older than sample_interval.
+
         Args:
             scratch_slug: The scratch identifier
             score: Current diff score (0 = perfect match)
             max_score: Maximum possible score
             worktree_path: Path to the worktree where work was done
             branch: Git branch name where work was done
+            agent_id: Agent that compiled the scratch
+            sample_interval: Minimum seconds between points for an unchanged score
+
+        Returns:
+            True if a history point was written
         """
         match_percent = 100.0 if score == 0 else (
             (1.0 - score / max_score) * 100 if max_score > 0 else 0.0
         )
+        now = time.time()
+        hour_start = int(now // 3600) * 3600
 
-        with self.connection() as conn:
-            # Check if this is a duplicate of the last entry
+        with self.transaction() as conn:
             cursor = conn.execute(
                 """
-                SELECT score, max_score FROM match_history
+                SELECT score, max_score, timestamp FROM match_history
                 WHERE scratch_slug = ?
-                ORDER BY timestamp DESC LIMIT 1
+                ORDER BY id DESC LIMIT 1
                 """,
                 (scratch_slug,)
             )
             last = cursor.fetchone()
+            written = True
             if last and last['score'] == score and last['max_score'] == max_score:
-                return  # No change, skip
+                # Unchanged score - only keep a periodic sample
+                written = last['timestamp'] is None or now - last['timestamp'] >= sample_interval
+
+            if written:
+                conn.execute(
+                    """
+                    INSERT INTO match_history (scratch_slug, score, max_score, match_percent,
+                                               worktree_path, branch, timestamp)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                    """,
+                    (scratch_slug, score, max_score, match_percent, worktree_path, branch, now)
+                )
 
             conn.execute(
                 """
-                INSERT INTO match_history (scratch_slug, score, max_score, match_percent, worktree_path, branch)
-                VALUES (?, ?, ?, ?, ?, ?)
+                INSERT INTO match_history_rollups
+                    (scratch_slug, agent_id, hour_start, function_name, compiles,
+                     best_score, best_match_percent, last_score, first_at, last_at)
+                VALUES (?, ?, ?, (SELECT function_name FROM scratches WHERE slug = ?),
+                        1, ?, ?, ?, ?, ?)
+                ON CONFLICT(scratch_slug, agent_id, hour_start) DO UPDATE SET
+                    compiles = compiles + 1,
+                    best_score = MIN(COALESCE(best_score, excluded.best_score), excluded.best_score),
+                    best_match_percent = MAX(COALESCE(best_match_percent, excluded.best_match_percent),
+                                             excluded.best_match_percent),
+                    last_score = excluded.last_score,
+                    last_at = excluded.last_at
                 """,
-                (scratch_slug, score, max_score, match_percent, worktree_path, branch)
+                (scratch_slug, agent_id or '', hour_start, scratch_slug,
+                 score, match_percent, score, now, now)
             )
 
-            # Update scratch record
+            # Update scratch record, including the best score seen so far
             conn.execute(
                 """
                 UPDATE scratches SET score = ?, max_score = ?, match_percent = ?,
-                       last_compiled_at = unixepoch('now', 'subsec')
+                       best_score = MIN(COALESCE(best_score, ?), ?),
+                       best_match_percent = MAX(COALESCE(best_match_percent, ?), ?),
+                       last_compiled_at = ?
                 WHERE slug = ?
                 """,
-                (score, max_score, match_percent, scratch_slug)
+                (score, max_score, match_percent, score, score,
+                 match_percent, match_percent, now, scratch_slug)
+            )
+        return written
+
+    def get_best_match(self, scratch_slug: str) -> dict | None:
+        """Get the best score recorded for a scratch.
+
+        Returns:
+            Dict with best_score and best_match_percent, or None if the
+            scratch has no history
+        """
+        with self.connection() as conn:
+            cursor = conn.execute(
+                "SELECT best_score, best_match_percent FROM scratches WHERE slug = ?",
+                (scratch_slug,)
+            )
+            row = cursor.fetchone()
+            if row and row['best_score'] is not None:
+                return dict(row)
+
+            # Scratch not tracked in the scratches table - fall back to history
+            cursor = conn.execute(
+                """
+                SELECT MIN(score) as best_score, MAX(match_percent) as best_match_percent
+                FROM match_history WHERE scratch_slug = ?
+                """,
+                (scratch_slug,)
+            )
+            row = cursor.fetchone()
+            if row is None or row['best_score'] is None:
+                return None
+            return dict(row)
+
+    def get_match_rollups(
+        self,
+        scratch_slug: str | None = None,
+        function_name: str | None = None,
+        agent_id: str | None = None,
+        since: float | None = None,
+    ) -> list[dict]:
+        """Get hourly compile rollups, newest hour first.
+
+        Args:
+            scratch_slug: Filter by scratch
+            function_name: Filter by function
+            agent_id: Filter by agent
+            since: Only hours starting at or after this timestamp
+        """
+        query = "SELECT * FROM match_history_rollups WHERE 1=1"
+        params: list[Any] = []
+        if scratch_slug:
+            query += " AND scratch_slug = ?"
+            params.append(scratch_slug)
+        if function_name:
+            query += " AND function_name = ?"
+            params.append(function_name)
+        if agent_id:
+            query += " AND agent_id = ?"
+            params.append(agent_id)
+        if since is not None:
+            query += " AND hour_start >= ?"
+            params.append(int(since // 3600) * 3600)
+        query += " ORDER BY hour_start DESC, scratch_slug, agent_id"
+
+        with self.connection() as conn:
+            cursor = conn.execute(query, params)
+            return [dict(row) for row in cursor.fetchall()]
+
+    def downsample_match_history(self, older_than_seconds: float = 7 * 86400) -> int:
+        """Thin out old match_history points.
+
+        For points older than the cutoff, keeps each scratch's first and
+        latest point, every new best score, and the first point of each
+        hour. Compile counts are unaffected since they live in the rollups.
+
+        Returns:
+            Number of points deleted
+        """
+        cutoff = time.time() - older_than_seconds
+        with self.transaction() as conn:
+            cursor = conn.execute(
+                """
+                DELETE FROM match_history WHERE id IN (
+                    SELECT id FROM (
+                        SELECT id, score, timestamp,
+                            MIN(score) OVER (
+                                PARTITION BY scratch_slug ORDER BY id
+                                ROWS BETWEEN UNBOUNDED PRECEDING AND 1 PRECEDING
+                            ) AS prev_best,
+                            ROW_NUMBER() OVER (
+                                PARTITION BY scratch_slug, CAST(timestamp / 3600 AS INTEGER)
+                                ORDER BY id
+                            ) AS hour_rank,
+                            ROW_NUMBER() OVER (
+                                PARTITION BY scratch_slug ORDER BY id DESC
+                            ) AS recency_rank
+                        FROM match_history
+                    )
+                    WHERE timestamp < ?
+                      AND prev_best IS NOT NULL
+                      AND score >= prev_best
+                      AND hour_rank > 1
+                      AND recency_rank > 1
+                )
+                """,
+                (cutoff,)
+            )
+            deleted = cursor.rowcount
+            if deleted:
+                self.log_audit(
+                    'bulk_update', 'match_history', 'downsampled',
+                    metadata={'deleted': deleted, 'cutoff': cutoff},
+                )
+        return deleted
+
+    def get_match_history(self, scratch_slug: str, limit: int = 50) -> list[dict]:
+        """Get the most recent match history entries for a scratch.
+
+        Args:
+            scratch_slug: The scratch identifier
+            limit: Maximum entries to return
+
+        Returns:
+            Entries oldest-first with score, max_score, match_percent, timestamp
+        """
+        with self.connection() as conn:
+            cursor = conn.execute(
+                """
+                SELECT score, max_score, match_percent, timestamp FROM (
+                    SELECT id, score, max_score, match_percent, timestamp FROM match_history
+                    WHERE scratch_slug = ?
+                    ORDER BY timestamp DESC, id DESC LIMIT ?
+                ) ORDER BY timestamp ASC, id ASC
+                """,
+                (scratch_slug, limit)
+            )
+            return [dict(row) for row in cursor.fetchall()]
+
+    def set_scratch_token(self, slug: str, token: str, base_url: str = "") -> None:
+        """Store the claim token for a scratch.
+
+        Creates a placeholder local scratch row if the scratch isn't tracked yet;
+        a later upsert_scratch() fills in the real instance and base_url.
+        """
+        with self.connection() as conn:
+            conn.execute(
+                """
+                INSERT INTO scratches (slug, instance, base_url, claim_token)
+                VALUES (?, 'local', ?, ?)
+                ON CONFLICT(slug) DO UPDATE SET claim_token = excluded.claim_token
+                """,
+                (slug, base_url, token)
+            )
+
+    def get_scratch_token(self, slug: str) -> str | None:
+        """Get the stored claim token for a scratch."""
+        with self.connection() as conn:
+            cursor = conn.execute(
+                "SELECT claim_token FROM scratches WHERE slug = ?",
+                (slug,)
+            )
+            row = cursor.fetchone()
+            return row['claim_token'] if row else None
+
+    def get_scratch_context_hashes(self, slug: str) -> dict | None:
+        """Get the hashes of the context last uploaded to a scratch."""
+        with self.connection() as conn:
+            cursor = conn.execute(
+                "SELECT context_hash, context_slice_hash FROM scratches WHERE slug = ?",
+                (slug,)
+            )
+            row = cursor.fetchone()
+            return dict(row) if row and row['context_hash'] else None
+
+    def set_scratch_context_hashes(
+        self,
+        slug: str,
+        base_url: str,
+        context_hash: str,
+        slice_hash: str | None = None,
+    ) -> None:
+        """Record the context just uploaded to a scratch."""
+        with self.connection() as conn:
+            conn.execute(
+                """
+                INSERT INTO scratches (slug, instance, base_url, context_hash, context_slice_hash)
+                VALUES (?, 'local', ?, ?, ?)
+                ON CONFLICT(slug) DO UPDATE SET
+                    context_hash = excluded.context_hash,
+                    context_slice_hash = excluded.context_slice_hash
+                """,
+                (slug, base_url, context_hash, slice_hash)
+            )
+
+    def record_created_scratches(
+        self,
+        scratches: list[dict],
+        base_url: str,
+        agent_id: str | None = None,
+    ) -> int:
+        """Record a batch of newly created local scratches in one transaction.
+
+        Each function is pointed at its scratch and marked in_progress, as
+        `scratch create` does for a single function.
+
+        Args:
+            scratches: Dicts with slug, function_name and claim_token
+            base_url: Base URL of the decomp.me instance
+            agent_id: Agent performing the update (for audit)
+
+        Returns:
+            Number of scratches recorded
+        """
+        if not scratches:
+            return 0
+
+        now = time.time()
+        with self.transaction() as conn:
+            conn.executemany(
+                """
+                INSERT INTO scratches (slug, instance, base_url, function_name, claim_token)
+                VALUES (?, 'local', ?, ?, ?)
+                ON CONFLICT(slug) DO UPDATE SET
+                    instance = excluded.instance,
+                    base_url = excluded.base_url,
+                    function_name = excluded.function_name,
+                    claim_token = excluded.claim_token
+                """,
+                [(s['slug'], base_url, s['function_name'], s.get('claim_token')) for s in scratches]
+            )
+            conn.executemany(
+                """
+                INSERT INTO functions (function_name, local_scratch_slug, status, updated_at)
+                VALUES (?, ?, 'in_progress', ?)
+                ON CONFLICT(function_name) DO UPDATE SET
+                    local_scratch_slug = excluded.local_scratch_slug,
+                    status = excluded.status,
+                    updated_at = excluded.updated_at
+                """,
+                [(s['function_name'], s['slug'], now) for s in scratches]
             )
 
+            self.log_audit(
+                'bulk_update', 'scratches', 'created',
+                agent_id=agent_id,
+                metadata={'count': len(scratches), 'base_url': base_url}
+            )
+
+        return len(scratches)
+
     # =========================================================================
     # Branch Progress Operations
     # =========================================================================
@@ -1215,6 +1942,42 @@ class StateDB:
                 (subdirectory_key,)
             )
 
+    # =========================================================================
+    # Build Validation Operations
+    # =========================================================================
+
+    def get_build_validation(self, worktree_path: str) -> dict | None:
+        """Get the tree hash of a worktree's last successful build."""
+        with self.connection() as conn:
+            cursor = conn.execute(
+                "SELECT tree_hash, validated_at FROM build_validations WHERE worktree_path = ?",
+                (worktree_path,)
+            )
+            row = cursor.fetchone()
+            return dict(row) if row else None
+
+    def record_build_validation(self, worktree_path: str, tree_hash: str) -> None:
+        """Record that a worktree built successfully at tree_hash."""
+        with self.connection() as conn:
+            conn.execute(
+                """
+                INSERT INTO build_validations (worktree_path, tree_hash, validated_at)
+                VALUES (?, ?, ?)
+                ON CONFLICT(worktree_path) DO UPDATE SET
+                    tree_hash = excluded.tree_hash,
+                    validated_at = excluded.validated_at
+                """,
+                (worktree_path, tree_hash, time.time())
+            )
+
+    def clear_build_validation(self, worktree_path: str) -> None:
+        """Forget a worktree's validated build (e.g. after a failed build)."""
+        with self.connection() as conn:
+            conn.execute(
+                "DELETE FROM build_validations WHERE worktree_path = ?",
+                (worktree_path,)
+            )
+
     # =========================================================================
     # Sync State Operations
     # =========================================================================
@@ -1318,6 +2081,94 @@ class StateDB:
                 rows.append(entry)
             return rows
 
+    # =========================================================================
+    # Legacy JSON Import
+    # =========================================================================
+
+    def import_legacy_stores(
+        self,
+        claims: dict[str, dict] | None = None,
+        tokens: dict[str, str] | None = None,
+        match_history: dict[str, list[dict]] | None = None,
+        claim_timeout_seconds: int = 3600,
+    ) -> dict[str, int]:
+        """Import data from the legacy JSON side-stores in one transaction.
+
+        Args:
+            claims: decomp_claims.json contents ({function: {agent_id, timestamp, ...}})
+            tokens: scratch_tokens.json contents ({slug: token})
+            match_history: match_history*.json contents ({slug: [{score, max_score, timestamp}]})
+            claim_timeout_seconds: Claim lifetime used to compute expiry from timestamps
+
+        Returns:
+            Counts of imported claims, tokens and history entries
+        """
+        counts = {'claims': 0, 'tokens': 0, 'history': 0}
+        now = time.time()
+
+        with self.transaction() as conn:
+            for func_name, info in (claims or {}).items():
+                if not isinstance(info, dict):
+                    continue
+                claimed_at = info.get('timestamp', 0)
+                expires_at = claimed_at + claim_timeout_seconds
+                if expires_at <= now:
+                    continue
+                cursor = conn.execute(
+                    """
+                    INSERT INTO claims (function_name, agent_id, claimed_at, expires_at,
+                                        source_file_path, subdirectory_key)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                    ON CONFLICT(function_name) DO NOTHING
+                    """,
+                    (func_name, info.get('agent_id', 'unknown'), claimed_at, expires_at,
+                     info.get('source_file'), info.get('subdirectory'))
+                )
+                counts['claims'] += cursor.rowcount
+
+            for slug, token in (tokens or {}).items():
+                conn.execute(
+                    """
+                    INSERT INTO scratches (slug, instance, base_url, claim_token)
+                    VALUES (?, 'local', '', ?)
+                    ON CONFLICT(slug) DO UPDATE SET
+                        claim_token = COALESCE(claim_token, excluded.claim_token)
+                    """,
+                    (slug, token)
+                )
+                counts['tokens'] += 1
+
+            for slug, entries in (match_history or {}).items():
+                # Skip scratches the DB already tracks history for
+                cursor = conn.execute(
+                    "SELECT 1 FROM match_history WHERE scratch_slug = ? LIMIT 1",
+                    (slug,)
+                )
+                if cursor.fetchone():
+                    continue
+                rows = [
+                    (slug, e['score'], e['max_score'],
+                     e.get('match_pct', e.get('match_percent', 0.0)), e.get('timestamp', now))
+                    for e in entries
+                    if 'score' in e and 'max_score' in e
+                ]
+                conn.executemany(
+                    """
+                    INSERT INTO match_history (scratch_slug, score, max_score, match_percent, timestamp)
+                    VALUES (?, ?, ?, ?, ?)
+                    """,
+                    rows
+                )
+                counts['history'] += len(rows)
+
+            if any(counts.values()):
+                self.log_audit(
+                    'bulk_update', 'legacy_json', 'imported',
+                    metadata=counts
+                )
+
+        return counts
+
     # =========================================================================
     # Metadata
     # =========================================================================
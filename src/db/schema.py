@@ -1,8 +1,25 @@
 """SQLite schema for agent state management."""
 
-SCHEMA_VERSION = 8
+SCHEMA_VERSION = 15
 
-SCHEMA_SQL = """
+
+def _address_int_expr(column: str) -> str:
+    """SQL expression parsing a normalized "0x8000ABCD" address to an integer.
+
+    SQLite has no hex parsing function, so each digit is looked up
+    individually. Yields NULL for values not in normalized form.
+    """
+    digits = " + ".join(
+        f"(instr('0123456789ABCDEF', substr({column}, {i + 3}, 1)) - 1) * {16 ** (7 - i)}"
+        for i in range(8)
+    )
+    return (
+        f"CASE WHEN length({column}) = 10 AND substr({column}, 3) NOT GLOB '*[^0-9A-F]*' "
+        f"THEN {digits} END"
+    )
+
+
+SCHEMA_SQL = f"""
 -- Core function tracking
 CREATE TABLE IF NOT EXISTS functions (
     function_name TEXT PRIMARY KEY,
@@ -39,6 +56,7 @@ CREATE TABLE IF NOT EXISTS functions (
     source_file_path TEXT,
     -- Address tracking (stable identifier for renames)
     canonical_address TEXT,
+    address_int INTEGER GENERATED ALWAYS AS ({_address_int_expr('canonical_address')}) VIRTUAL,
     -- Metadata
     notes TEXT,
     created_at REAL DEFAULT (unixepoch('now', 'subsec')),
@@ -54,9 +72,13 @@ CREATE TABLE IF NOT EXISTS claims (
     function_name TEXT PRIMARY KEY,
     agent_id TEXT NOT NULL,
     claimed_at REAL NOT NULL,
-    expires_at REAL NOT NULL
+    expires_at REAL NOT NULL,
+    source_file_path TEXT,
+    subdirectory_key TEXT
 );
 
+CREATE INDEX IF NOT EXISTS idx_claims_agent ON claims(agent_id, expires_at);
+
 -- All scratches (local and production)
 CREATE TABLE IF NOT EXISTS scratches (
     slug TEXT PRIMARY KEY,
@@ -68,10 +90,14 @@ CREATE TABLE IF NOT EXISTS scratches (
     score INTEGER,
     max_score INTEGER,
     match_percent REAL,
+    best_score INTEGER,
+    best_match_percent REAL,
     source_code TEXT,
     created_at REAL,
     last_compiled_at REAL,
-    verified_at REAL
+    verified_at REAL,
+    context_hash TEXT,  -- Last context uploaded by update-context / --refresh-context
+    context_slice_hash TEXT  -- Hash of the part of it the scratch's code uses
 );
 
 CREATE INDEX IF NOT EXISTS idx_scratches_function ON scratches(function_name);
@@ -134,7 +160,8 @@ CREATE TABLE IF NOT EXISTS function_branch_progress (
 
 CREATE INDEX IF NOT EXISTS idx_branch_progress_function ON function_branch_progress(function_name);
 CREATE INDEX IF NOT EXISTS idx_branch_progress_branch ON function_branch_progress(branch);
-CREATE INDEX IF NOT EXISTS idx_branch_progress_match ON function_branch_progress(match_percent DESC);
+CREATE INDEX IF NOT EXISTS idx_branch_progress_match
+    ON function_branch_progress(match_percent DESC);
 
 -- Full audit trail
 CREATE TABLE IF NOT EXISTS audit_log (
@@ -168,6 +195,26 @@ CREATE TABLE IF NOT EXISTS match_history (
 CREATE INDEX IF NOT EXISTS idx_match_history_slug ON match_history(scratch_slug);
 CREATE INDEX IF NOT EXISTS idx_match_history_branch ON match_history(branch);
 
+-- Hourly compile rollups per scratch and agent
+-- match_history only keeps score changes and periodic samples; every compile
+-- is counted here instead
+CREATE TABLE IF NOT EXISTS match_history_rollups (
+    scratch_slug TEXT NOT NULL,
+    agent_id TEXT NOT NULL DEFAULT '',
+    hour_start INTEGER NOT NULL,
+    function_name TEXT,
+    compiles INTEGER NOT NULL DEFAULT 0,
+    best_score INTEGER,
+    best_match_percent REAL,
+    last_score INTEGER,
+    first_at REAL,
+    last_at REAL,
+    PRIMARY KEY (scratch_slug, agent_id, hour_start)
+);
+
+CREATE INDEX IF NOT EXISTS idx_rollups_function ON match_history_rollups(function_name, hour_start);
+CREATE INDEX IF NOT EXISTS idx_rollups_agent ON match_history_rollups(agent_id, hour_start);
+
 -- Local to production sync tracking
 CREATE TABLE IF NOT EXISTS sync_state (
     local_slug TEXT NOT NULL,
@@ -183,6 +230,7 @@ CREATE TABLE IF NOT EXISTS sync_state (
 CREATE TABLE IF NOT EXISTS function_aliases (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
     canonical_address TEXT NOT NULL,
+    address_int INTEGER GENERATED ALWAYS AS ({_address_int_expr('canonical_address')}) VIRTUAL,
     old_name TEXT NOT NULL,
     new_name TEXT,
     renamed_at REAL NOT NULL DEFAULT (unixepoch('now', 'subsec')),
@@ -194,6 +242,46 @@ CREATE INDEX IF NOT EXISTS idx_aliases_address ON function_aliases(canonical_add
 CREATE INDEX IF NOT EXISTS idx_aliases_old_name ON function_aliases(old_name);
 CREATE INDEX IF NOT EXISTS idx_functions_address ON functions(canonical_address);
 
+-- Covering indexes for integer address lookups and bulk rename detection
+CREATE INDEX IF NOT EXISTS idx_functions_address_int ON functions(address_int, function_name);
+CREATE INDEX IF NOT EXISTS idx_aliases_address_int
+    ON function_aliases(address_int, old_name, new_name);
+
+-- Precomputed work queue, refreshed from report.json
+-- Lets agents atomically claim the best available function in one transaction
+CREATE TABLE IF NOT EXISTS function_candidates (
+    function_name TEXT PRIMARY KEY,
+    source_file_path TEXT NOT NULL,
+    subdirectory_key TEXT NOT NULL,
+    canonical_address TEXT,
+    size_bytes INTEGER,
+    match_percent REAL DEFAULT 0.0,
+    object_status TEXT,
+    recommendation_score REAL NOT NULL,
+    refreshed_at REAL
+);
+
+CREATE INDEX IF NOT EXISTS idx_candidates_score ON function_candidates(recommendation_score DESC);
+CREATE INDEX IF NOT EXISTS idx_candidates_subdir ON function_candidates(subdirectory_key);
+
+-- Scratches created ahead of time for the top of the candidate queue,
+-- handed to the next agent that runs `scratch create` for the function
+CREATE TABLE IF NOT EXISTS prefetched_scratches (
+    function_name TEXT PRIMARY KEY,
+    slug TEXT NOT NULL,
+    base_url TEXT NOT NULL,
+    claim_token TEXT,
+    context_hash TEXT,  -- sha256 of the ctx file the scratch was created from
+    created_at REAL DEFAULT (unixepoch('now', 'subsec'))
+);
+
+-- Last successful build per worktree, keyed on a hash of the working tree
+CREATE TABLE IF NOT EXISTS build_validations (
+    worktree_path TEXT PRIMARY KEY,
+    tree_hash TEXT NOT NULL,
+    validated_at REAL NOT NULL
+);
+
 -- Database metadata
 CREATE TABLE IF NOT EXISTS db_meta (
     key TEXT PRIMARY KEY,
@@ -476,8 +564,10 @@ def get_migrations() -> dict[int, str]:
                 FOREIGN KEY (subdirectory_key) REFERENCES subdirectory_allocations(subdirectory_key)
             );
 
-            CREATE INDEX IF NOT EXISTS idx_agent_subdir_agent ON agent_subdirectory_assignments(agent_id);
-            CREATE INDEX IF NOT EXISTS idx_agent_subdir_key ON agent_subdirectory_assignments(subdirectory_key);
+            CREATE INDEX IF NOT EXISTS idx_agent_subdir_agent
+                ON agent_subdirectory_assignments(agent_id);
+            CREATE INDEX IF NOT EXISTS idx_agent_subdir_key
+                ON agent_subdirectory_assignments(subdirectory_key);
 
             -- Subdirectory status view
             CREATE VIEW IF NOT EXISTS v_subdirectory_status AS
@@ -517,9 +607,12 @@ def get_migrations() -> dict[int, str]:
                 PRIMARY KEY (function_name, branch)
             );
 
-            CREATE INDEX IF NOT EXISTS idx_branch_progress_function ON function_branch_progress(function_name);
-            CREATE INDEX IF NOT EXISTS idx_branch_progress_branch ON function_branch_progress(branch);
-            CREATE INDEX IF NOT EXISTS idx_branch_progress_match ON function_branch_progress(match_percent DESC);
+            CREATE INDEX IF NOT EXISTS idx_branch_progress_function
+                ON function_branch_progress(function_name);
+            CREATE INDEX IF NOT EXISTS idx_branch_progress_branch
+                ON function_branch_progress(branch);
+            CREATE INDEX IF NOT EXISTS idx_branch_progress_match
+                ON function_branch_progress(match_percent DESC);
 
             -- Branch progress summary view
             CREATE VIEW IF NOT EXISTS v_function_branch_progress AS
@@ -767,4 +860,112 @@ def get_migrations() -> dict[int, str]:
             -- Create index for branch-based queries
             CREATE INDEX IF NOT EXISTS idx_match_history_branch ON match_history(branch);
         """,
+        # Version 8 -> 9: Add precomputed candidate queue for atomic claim-next
+        8: """
+            CREATE TABLE IF NOT EXISTS function_candidates (
+                function_name TEXT PRIMARY KEY,
+                source_file_path TEXT NOT NULL,
+                subdirectory_key TEXT NOT NULL,
+                canonical_address TEXT,
+                size_bytes INTEGER,
+                match_percent REAL DEFAULT 0.0,
+                object_status TEXT,
+                recommendation_score REAL NOT NULL,
+                refreshed_at REAL
+            );
+
+            CREATE INDEX IF NOT EXISTS idx_candidates_score
+                ON function_candidates(recommendation_score DESC);
+            CREATE INDEX IF NOT EXISTS idx_candidates_subdir
+                ON function_candidates(subdirectory_key);
+        """,
+        # Version 9 -> 10: Store claim source files so claims no longer need a JSON side-store
+        9: """
+            ALTER TABLE claims ADD COLUMN source_file_path TEXT;
+            ALTER TABLE claims ADD COLUMN subdirectory_key TEXT;
+            CREATE INDEX IF NOT EXISTS idx_claims_agent ON claims(agent_id, expires_at);
+        """,
+        # Version 10 -> 11: Best-score columns and hourly match-history rollups
+        10: """
+            ALTER TABLE scratches ADD COLUMN best_score INTEGER;
+            ALTER TABLE scratches ADD COLUMN best_match_percent REAL;
+
+            CREATE TABLE IF NOT EXISTS match_history_rollups (
+                scratch_slug TEXT NOT NULL,
+                agent_id TEXT NOT NULL DEFAULT '',
+                hour_start INTEGER NOT NULL,
+                function_name TEXT,
+                compiles INTEGER NOT NULL DEFAULT 0,
+                best_score INTEGER,
+                best_match_percent REAL,
+                last_score INTEGER,
+                first_at REAL,
+                last_at REAL,
+                PRIMARY KEY (scratch_slug, agent_id, hour_start)
+            );
+
+            CREATE INDEX IF NOT EXISTS idx_rollups_function
+                ON match_history_rollups(function_name, hour_start);
+            CREATE INDEX IF NOT EXISTS idx_rollups_agent
+                ON match_history_rollups(agent_id, hour_start);
+
+            -- Backfill best scores from existing history
+            UPDATE scratches SET
+                best_score = (
+                    SELECT MIN(score) FROM match_history h
+                    WHERE h.scratch_slug = scratches.slug
+                ),
+                best_match_percent = (
+                    SELECT MAX(match_percent) FROM match_history h
+                    WHERE h.scratch_slug = scratches.slug
+                )
+            WHERE EXISTS (SELECT 1 FROM match_history h WHERE h.scratch_slug = scratches.slug);
+
+            -- Backfill rollups (agent unknown for historical points)
+            INSERT OR IGNORE INTO match_history_rollups
+                (scratch_slug, agent_id, hour_start, function_name, compiles,
+                 best_score, best_match_percent, first_at, last_at)
+            SELECT h.scratch_slug, '', CAST(h.timestamp / 3600 AS INTEGER) * 3600,
+                   (SELECT function_name FROM scratches s WHERE s.slug = h.scratch_slug),
+                   COUNT(*), MIN(h.score), MAX(h.match_percent), MIN(h.timestamp), MAX(h.timestamp)
+            FROM match_history h
+            WHERE h.timestamp IS NOT NULL
+            GROUP BY h.scratch_slug, CAST(h.timestamp / 3600 AS INTEGER);
+        """,
+        # Version 11 -> 12: Integer addresses with covering indexes for rename detection
+        11: f"""
+            ALTER TABLE functions ADD COLUMN address_int INTEGER
+                GENERATED ALWAYS AS ({_address_int_expr('canonical_address')}) VIRTUAL;
+            ALTER TABLE function_aliases ADD COLUMN address_int INTEGER
+                GENERATED ALWAYS AS ({_address_int_expr('canonical_address')}) VIRTUAL;
+
+            CREATE INDEX IF NOT EXISTS idx_functions_address_int
+                ON functions(address_int, function_name);
+            CREATE INDEX IF NOT EXISTS idx_aliases_address_int
+                ON function_aliases(address_int, old_name, new_name);
+        """,
+        # Version 12 -> 13: Tree-hash keyed build validation
+        12: """
+            CREATE TABLE IF NOT EXISTS build_validations (
+                worktree_path TEXT PRIMARY KEY,
+                tree_hash TEXT NOT NULL,
+                validated_at REAL NOT NULL
+            );
+        """,
+        # Version 13 -> 14: Remember uploaded contexts to skip unchanged refreshes
+        13: """
+            ALTER TABLE scratches ADD COLUMN context_hash TEXT;
+            ALTER TABLE scratches ADD COLUMN context_slice_hash TEXT;
+        """,
+        # Version 14 -> 15: Warm scratches prefetched for the candidate queue
+        14: """
+            CREATE TABLE IF NOT EXISTS prefetched_scratches (
+                function_name TEXT PRIMARY KEY,
+                slug TEXT NOT NULL,
+                base_url TEXT NOT NULL,
+                claim_token TEXT,
+                context_hash TEXT,
+                created_at REAL DEFAULT (unixepoch('now', 'subsec'))
+            );
+        """,
     }
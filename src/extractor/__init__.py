@@ -21,6 +21,7 @@ from .extractor import (
     FunctionExtractor,
     extract_unmatched_functions,
     extract_function,
+    extract_functions,
 )
 
 __all__ = [
@@ -47,6 +48,7 @@ __all__ = [
     "extract_asm_for_function",
     "extract_unmatched_functions",
     "extract_function",
+    "extract_functions",
 ]
 
 __version__ = "0.1.0"
@@ -2,7 +2,7 @@
 
 from pathlib import Path
 from typing import Optional
-from .models import FunctionInfo, ExtractionResult
+from .models import FunctionInfo, FunctionSymbol, ExtractionResult
 from .parser import ConfigureParser
 from .report import ReportParser
 from .symbols import SymbolParser
@@ -174,9 +174,59 @@ class FunctionExtractor:
         if not symbol:
             return None
 
-        # Find source file
         objects = self.configure_parser.parse_objects()
         object_map = {obj.file_path: obj for obj in objects}
+        return self._function_info(
+            symbol, object_map, self.report_parser.get_function_matches(),
+            include_asm, include_context,
+        )
+
+    def extract_functions(
+        self,
+        function_names: list[str],
+        include_asm: bool = True,
+        include_context: bool = True,
+    ) -> dict[str, Optional[FunctionInfo]]:
+        """
+        Extract information for many functions at once.
+
+        symbols.txt, configure.py and report.json are parsed once for the
+        whole batch instead of once per function.
+
+        Args:
+            function_names: Names of the functions
+            include_asm: Whether to include assembly code
+            include_context: Whether to include decompilation context
+
+        Returns:
+            Dictionary mapping each name to its FunctionInfo, or None if not found
+        """
+        symbols = self.symbol_parser.parse_symbols()
+        objects = self.configure_parser.parse_objects()
+        object_map = {obj.file_path: obj for obj in objects}
+        function_matches = self.report_parser.get_function_matches()
+
+        results = {}
+        for function_name in function_names:
+            symbol = symbols.get(function_name)
+            results[function_name] = (
+                self._function_info(symbol, object_map, function_matches, include_asm, include_context)
+                if symbol else None
+            )
+        return results
+
+    def _function_info(
+        self,
+        symbol: FunctionSymbol,
+        object_map: dict,
+        function_matches: dict,
+        include_asm: bool,
+        include_context: bool,
+    ) -> Optional[FunctionInfo]:
+        """Build a FunctionInfo from already-parsed project data."""
+        function_name = symbol.name
+
+        # Find source file
         source_file = self._find_source_file_for_function(function_name, object_map)
         if not source_file:
             return None
@@ -187,7 +237,6 @@ class FunctionExtractor:
             return None
 
         # Get match percentage
-        function_matches = self.report_parser.get_function_matches()
         match_data = function_matches.get(function_name)
         if match_data:
             current_match = match_data.fuzzy_match_percent / 100.0
@@ -337,3 +386,25 @@ async def extract_function(
     """
     extractor = FunctionExtractor(melee_root)
     return extractor.extract_function(function_name, include_asm, include_context)
+
+
+async def extract_functions(
+    melee_root: Path,
+    function_names: list[str],
+    include_asm: bool = True,
+    include_context: bool = True,
+) -> dict[str, Optional[FunctionInfo]]:
+    """
+    Async wrapper for extracting many functions with one extractor.
+
+    Args:
+        melee_root: Path to the melee project root directory
+        function_names: Names of the functions
+        include_asm: Whether to include assembly code
+        include_context: Whether to include decompilation context
+
+    Returns:
+        Dictionary mapping each name to its FunctionInfo, or None if not found
+    """
+    extractor = FunctionExtractor(melee_root)
+    return extractor.extract_functions(function_names, include_asm, include_context)
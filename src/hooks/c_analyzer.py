@@ -8,14 +8,23 @@ Detected patterns:
 - Lowercase hex literals (should be uppercase)
 - Missing F suffix on float literals
 - TRUE/FALSE instead of true/false
+
+Parsed trees are cached by content hash (see parse_source), so the hooks and
+context stripping share one parse of the same text. All detectors run in a
+single walk of the tree.
 """
 
+import bisect
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+from collections.abc import Callable, Iterator
 from dataclasses import dataclass
-from typing import Iterator
 
 try:
     import tree_sitter_c as tsc
-    from tree_sitter import Language, Parser, Node
+    from tree_sitter import Language, Node, Parser, Tree
 
     C_LANGUAGE = Language(tsc.language())
     TREE_SITTER_AVAILABLE = True
@@ -24,6 +33,14 @@ except ImportError:
     C_LANGUAGE = None
     Parser = None
     Node = None
+    Tree = None
+
+# Trees for a multi-MB context are large, so only a few are kept
+PARSE_CACHE_SIZE = 4
+
+# Reparse incrementally from the previous tree when at least this fraction
+# of the new source is an unchanged prefix or suffix of the old one
+INCREMENTAL_MIN_SHARED = 0.5
 
 
 @dataclass
@@ -45,25 +62,200 @@ def get_parser() -> "Parser | None":
     return parser
 
 
+# =============================================================================
+# Parse cache
+# =============================================================================
+
+_parse_lock = threading.Lock()
+_parse_cache: "OrderedDict[bytes, Tree]" = OrderedDict()
+# Edited copies of cached trees, waiting to be reparsed for the edited text
+_pending_edits: "OrderedDict[bytes, Tree]" = OrderedDict()
+# (source, tree) of the most recent parse, the base for incremental reparses
+_last_parse: "tuple[bytes, Tree] | None" = None
+
+
+def _point(source: bytes, offset: int) -> tuple[int, int]:
+    """Get the (row, byte column) of an offset."""
+    row = source.count(b"\n", 0, offset)
+    return row, offset - (source.rfind(b"\n", 0, offset) + 1)
+
+
+def _line_starts(source: bytes) -> list[int]:
+    return [0] + [m.end() for m in re.finditer(b"\n", source)]
+
+
+def _point_in(line_starts: list[int], offset: int) -> tuple[int, int]:
+    """_point() for many offsets of one source, via its _line_starts()."""
+    row = bisect.bisect_right(line_starts, offset) - 1
+    return row, offset - line_starts[row]
+
+
+def _advance(point: tuple[int, int], text: bytes) -> tuple[int, int]:
+    """Get the point after inserting text at point."""
+    newlines = text.count(b"\n")
+    if not newlines:
+        return point[0], point[1] + len(text)
+    return point[0] + newlines, len(text) - text.rfind(b"\n") - 1
+
+
+def _common_prefix_len(a: bytes, b: bytes) -> int:
+    n = min(len(a), len(b))
+    i = 0
+    while i < n:
+        j = min(i + 4096, n)
+        if a[i:j] != b[i:j]:
+            while a[i] == b[i]:
+                i += 1
+            return i
+        i = j
+    return n
+
+
+def _common_suffix_len(a: bytes, b: bytes, limit: int) -> int:
+    i = 0
+    while i < limit:
+        j = min(i + 4096, limit)
+        if a[len(a) - j : len(a) - i] != b[len(b) - j : len(b) - i]:
+            while a[len(a) - i - 1] == b[len(b) - i - 1]:
+                i += 1
+            return i
+        i = j
+    return limit
+
+
+def _edited_copy(old_source: bytes, old_tree: "Tree", source: bytes) -> "Tree | None":
+    """Turn the previous tree into a base for reparsing a similar source.
+
+    The change is described as one edit spanning everything between the
+    common prefix and suffix. Returns None if too little is shared for an
+    incremental reparse to pay off.
+    """
+    prefix = _common_prefix_len(old_source, source)
+    suffix = _common_suffix_len(old_source, source, min(len(old_source), len(source)) - prefix)
+    if prefix + suffix < INCREMENTAL_MIN_SHARED * len(source):
+        return None
+
+    old_end = len(old_source) - suffix
+    new_end = len(source) - suffix
+    start_point = _point(old_source, prefix)
+    tree = old_tree.copy()
+    tree.edit(
+        start_byte=prefix,
+        old_end_byte=old_end,
+        new_end_byte=new_end,
+        start_point=start_point,
+        old_end_point=_point(old_source, old_end),
+        new_end_point=_advance(start_point, source[prefix:new_end]),
+    )
+    return tree
+
+
+def parse_source(source_code: "str | bytes") -> "tuple[Tree | None, bytes]":
+    """Parse C source, reusing the tree from an earlier parse of the same text.
+
+    Text that differs from the last parsed source by a small edit, or that
+    was produced by a stripping function in this module, is reparsed
+    incrementally.
+
+    The returned tree is shared between callers and must not be edited.
+
+    Returns:
+        Tuple of (tree, source bytes); the tree is None without tree-sitter
+    """
+    global _last_parse
+
+    source = source_code.encode("utf-8") if isinstance(source_code, str) else source_code
+    if not TREE_SITTER_AVAILABLE:
+        return None, source
+
+    key = hashlib.sha1(source).digest()
+    with _parse_lock:
+        tree = _parse_cache.get(key)
+        if tree is not None:
+            _parse_cache.move_to_end(key)
+            return tree, source
+        base = _pending_edits.pop(key, None)
+        last = _last_parse
+
+    if base is None and last is not None:
+        base = _edited_copy(last[0], last[1], source)
+
+    parser = get_parser()
+    tree = parser.parse(source, base) if base is not None else parser.parse(source)
+
+    with _parse_lock:
+        _parse_cache[key] = tree
+        while len(_parse_cache) > PARSE_CACHE_SIZE:
+            _parse_cache.popitem(last=False)
+        _last_parse = (source, tree)
+    return tree, source
+
+
+def _remember_edits(
+    tree: "Tree",
+    source: bytes,
+    result: bytes,
+    replacements: list[tuple[int, int, bytes]],
+) -> None:
+    """Queue the edits that turned source into result for an incremental reparse.
+
+    Args:
+        replacements: (start, end, new bytes) spans of source, sorted by
+            descending start so each edit leaves earlier offsets valid
+    """
+    line_starts = _line_starts(source)
+    edited = tree.copy()
+    for start, end, new in replacements:
+        start_point = _point_in(line_starts, start)
+        edited.edit(
+            start_byte=start,
+            old_end_byte=end,
+            new_end_byte=start + len(new),
+            start_point=start_point,
+            old_end_point=_point_in(line_starts, end),
+            new_end_point=_advance(start_point, new),
+        )
+
+    with _parse_lock:
+        _pending_edits[hashlib.sha1(result).digest()] = edited
+        while len(_pending_edits) > PARSE_CACHE_SIZE:
+            _pending_edits.popitem(last=False)
+
+
+def clear_parse_cache() -> None:
+    """Drop all cached trees."""
+    global _last_parse
+    with _parse_lock:
+        _parse_cache.clear()
+        _pending_edits.clear()
+        _last_parse = None
+
+
+# =============================================================================
+# Tree helpers
+# =============================================================================
+
+
 def _get_node_text(node: "Node", source: bytes) -> str:
     """Extract the source text for a node."""
     return source[node.start_byte : node.end_byte].decode("utf-8")
 
 
-def _find_nodes_by_type(node: "Node", type_name: str) -> Iterator["Node"]:
-    """Recursively find all nodes of a given type."""
-    if node.type == type_name:
-        yield node
-    for child in node.children:
-        yield from _find_nodes_by_type(child, type_name)
-
+def _walk(node: "Node", prune: frozenset[str] = frozenset()) -> Iterator["Node"]:
+    """Yield node and its descendants in document order.
 
-def _find_nodes_by_types(node: "Node", type_names: set[str]) -> Iterator["Node"]:
-    """Recursively find all nodes matching any of the given types."""
-    if node.type in type_names:
-        yield node
-    for child in node.children:
-        yield from _find_nodes_by_types(child, type_names)
+    Does not descend into nodes whose type is in prune (they are still
+    yielded themselves).
+    """
+    cursor = node.walk()
+    while True:
+        current = cursor.node
+        yield current
+        if current.type not in prune and cursor.goto_first_child():
+            continue
+        while not cursor.goto_next_sibling():
+            if not cursor.goto_parent():
+                return
 
 
 def _is_pointer_arithmetic(node: "Node", source: bytes) -> bool:
@@ -112,122 +304,6 @@ def _is_pointer_arithmetic(node: "Node", source: bytes) -> bool:
     return False
 
 
-def detect_pointer_arithmetic(source_code: str) -> list[CodeIssue]:
-    """Detect pointer arithmetic used for struct field access.
-
-    Catches patterns like:
-    - *(f32*)((u8*)fp + 0x844)
-    - ((u8*)ptr + offset)->field
-    - *(type*)(base + offset)
-    - ((Type*)(ptr + 0x10))->member
-
-    These should use proper struct definitions or M2C_FIELD macro.
-    """
-    parser = get_parser()
-    if parser is None:
-        return []
-
-    issues = []
-    source_bytes = source_code.encode("utf-8")
-    tree = parser.parse(source_bytes)
-
-    # Find all pointer dereference expressions: *(expr)
-    for node in _find_nodes_by_type(tree.root_node, "pointer_expression"):
-        # Check if this is a dereference (starts with *)
-        if node.children and node.children[0].type == "*":
-            operand = node.child_by_field_name("argument")
-            if operand is None:
-                continue
-
-            # Check for cast + arithmetic pattern
-            # Pattern: *(type*)((type*)base + offset)
-            if operand.type == "cast_expression":
-                cast_value = operand.child_by_field_name("value")
-                if cast_value and _is_pointer_arithmetic_expr(cast_value, source_bytes):
-                    snippet = _get_node_text(node, source_bytes)
-                    issues.append(
-                        CodeIssue(
-                            message="Pointer arithmetic for struct field access",
-                            line=node.start_point[0] + 1,
-                            column=node.start_point[1] + 1,
-                            snippet=snippet,
-                            suggestion="Use proper struct definition or M2C_FIELD macro",
-                        )
-                    )
-
-            # Also check for parenthesized versions
-            elif operand.type == "parenthesized_expression":
-                inner = _unwrap_parens(operand)
-                if inner and inner.type == "cast_expression":
-                    cast_value = inner.child_by_field_name("value")
-                    if cast_value and _is_pointer_arithmetic_expr(cast_value, source_bytes):
-                        snippet = _get_node_text(node, source_bytes)
-                        issues.append(
-                            CodeIssue(
-                                message="Pointer arithmetic for struct field access",
-                                line=node.start_point[0] + 1,
-                                column=node.start_point[1] + 1,
-                                snippet=snippet,
-                                suggestion="Use proper struct definition or M2C_FIELD macro",
-                            )
-                        )
-
-    # Find field access via pointer arithmetic: ((type*)(base + offset))->field
-    for node in _find_nodes_by_type(tree.root_node, "field_expression"):
-        # Check if the base is a cast with pointer arithmetic
-        argument = node.child_by_field_name("argument")
-        if argument is None:
-            continue
-
-        base = _unwrap_parens(argument)
-        if base and base.type == "cast_expression":
-            cast_value = base.child_by_field_name("value")
-            if cast_value and _is_pointer_arithmetic_expr(cast_value, source_bytes):
-                snippet = _get_node_text(node, source_bytes)
-                issues.append(
-                    CodeIssue(
-                        message="Pointer arithmetic for struct field access",
-                        line=node.start_point[0] + 1,
-                        column=node.start_point[1] + 1,
-                        snippet=snippet,
-                        suggestion="Use proper struct definition or M2C_FIELD macro",
-                    )
-                )
-
-    # Find subscript access with pointer cast: ((u8*)ptr)[offset]
-    for node in _find_nodes_by_type(tree.root_node, "subscript_expression"):
-        argument = node.child_by_field_name("argument")
-        if argument is None:
-            continue
-
-        base = _unwrap_parens(argument)
-        if base and base.type == "cast_expression":
-            type_node = base.child_by_field_name("type")
-            if type_node:
-                type_text = _get_node_text(type_node, source_bytes)
-                # Check if casting to byte pointer (common pattern for offset access)
-                if any(t in type_text for t in ("u8*", "s8*", "char*", "uint8_t*")):
-                    index = node.child_by_field_name("index")
-                    if index:
-                        index_text = _get_node_text(index, source_bytes)
-                        # Flag if index looks like a struct offset (hex or large number)
-                        if "0x" in index_text.lower() or (
-                            index_text.isdigit() and int(index_text) > 32
-                        ):
-                            snippet = _get_node_text(node, source_bytes)
-                            issues.append(
-                                CodeIssue(
-                                    message="Array indexing with byte cast for struct access",
-                                    line=node.start_point[0] + 1,
-                                    column=node.start_point[1] + 1,
-                                    snippet=snippet,
-                                    suggestion="Use proper struct definition",
-                                )
-                            )
-
-    return issues
-
-
 def _unwrap_parens(node: "Node") -> "Node | None":
     """Unwrap parenthesized expressions to get the inner node."""
     while node and node.type == "parenthesized_expression":
@@ -250,117 +326,214 @@ def _is_pointer_arithmetic_expr(node: "Node", source: bytes) -> bool:
     return False
 
 
-def detect_lowercase_hex(source_code: str) -> list[CodeIssue]:
-    """Detect lowercase hex literals (should be uppercase)."""
-    parser = get_parser()
-    if parser is None:
-        return []
+# =============================================================================
+# Detectors
+#
+# Each check looks at one node and returns an issue or None. _run_detectors
+# dispatches every node of a single tree walk to the checks for its type.
+# =============================================================================
 
-    issues = []
-    source_bytes = source_code.encode("utf-8")
-    tree = parser.parse(source_bytes)
-
-    for node in _find_nodes_by_type(tree.root_node, "number_literal"):
-        text = _get_node_text(node, source_bytes)
-
-        # Check for hex literals
-        if text.lower().startswith("0x"):
-            hex_part = text[2:]
-            # Check if there are lowercase letters in hex digits
-            if any(c.islower() and c in "abcdef" for c in hex_part):
-                issues.append(
-                    CodeIssue(
-                        message="Lowercase hex literal",
-                        line=node.start_point[0] + 1,
-                        column=node.start_point[1] + 1,
-                        snippet=text,
-                        suggestion=f"Use uppercase: 0x{hex_part.upper()}",
-                    )
-                )
 
-    return issues
+def _pointer_arithmetic_issue(node: "Node", source: bytes) -> CodeIssue:
+    return CodeIssue(
+        message="Pointer arithmetic for struct field access",
+        line=node.start_point[0] + 1,
+        column=node.start_point[1] + 1,
+        snippet=_get_node_text(node, source),
+        suggestion="Use proper struct definition or M2C_FIELD macro",
+    )
 
 
-def detect_float_without_suffix(source_code: str) -> list[CodeIssue]:
-    """Detect float literals missing the F suffix."""
-    parser = get_parser()
-    if parser is None:
-        return []
+def _check_pointer_deref(node: "Node", source: bytes) -> CodeIssue | None:
+    """*(type*)((type*)base + offset), with or without extra parentheses."""
+    # Check if this is a dereference (starts with *)
+    if not node.children or node.children[0].type != "*":
+        return None
+    operand = node.child_by_field_name("argument")
+    if operand is None:
+        return None
 
-    issues = []
-    source_bytes = source_code.encode("utf-8")
-    tree = parser.parse(source_bytes)
-
-    for node in _find_nodes_by_type(tree.root_node, "number_literal"):
-        text = _get_node_text(node, source_bytes)
-
-        # Check for float literals (contains decimal point)
-        if "." in text and not text.lower().startswith("0x"):
-            # Check if it has F/f/L/l suffix
-            if not text[-1].lower() in ("f", "l"):
-                issues.append(
-                    CodeIssue(
-                        message="Float literal missing F suffix",
-                        line=node.start_point[0] + 1,
-                        column=node.start_point[1] + 1,
-                        snippet=text,
-                        suggestion=f"Use {text}F for f32",
-                    )
-                )
+    # Check for cast + arithmetic pattern
+    # Pattern: *(type*)((type*)base + offset)
+    if operand.type == "parenthesized_expression":
+        operand = _unwrap_parens(operand)
+    if operand and operand.type == "cast_expression":
+        cast_value = operand.child_by_field_name("value")
+        if cast_value and _is_pointer_arithmetic_expr(cast_value, source):
+            return _pointer_arithmetic_issue(node, source)
+    return None
 
-    return issues
 
+def _check_field_access(node: "Node", source: bytes) -> CodeIssue | None:
+    """((type*)(base + offset))->field"""
+    argument = node.child_by_field_name("argument")
+    if argument is None:
+        return None
+
+    base = _unwrap_parens(argument)
+    if base and base.type == "cast_expression":
+        cast_value = base.child_by_field_name("value")
+        if cast_value and _is_pointer_arithmetic_expr(cast_value, source):
+            return _pointer_arithmetic_issue(node, source)
+    return None
 
-def detect_uppercase_bool(source_code: str) -> list[CodeIssue]:
-    """Detect TRUE/FALSE (should be true/false)."""
-    parser = get_parser()
-    if parser is None:
-        return []
 
-    issues = []
-    source_bytes = source_code.encode("utf-8")
-    tree = parser.parse(source_bytes)
+def _check_byte_subscript(node: "Node", source: bytes) -> CodeIssue | None:
+    """((u8*)ptr)[offset]"""
+    argument = node.child_by_field_name("argument")
+    if argument is None:
+        return None
 
-    # Tree-sitter parses TRUE as 'true' node type and FALSE as 'false' node type
-    # We need to check the actual text to see if it's uppercase
-    for node in _find_nodes_by_types(tree.root_node, {"true", "false"}):
-        text = _get_node_text(node, source_bytes)
-
-        if text == "TRUE":
-            issues.append(
-                CodeIssue(
-                    message="Use lowercase boolean",
-                    line=node.start_point[0] + 1,
-                    column=node.start_point[1] + 1,
-                    snippet=text,
-                    suggestion="Use 'true' instead of 'TRUE'",
-                )
+    base = _unwrap_parens(argument)
+    if not base or base.type != "cast_expression":
+        return None
+    type_node = base.child_by_field_name("type")
+    if not type_node:
+        return None
+
+    type_text = _get_node_text(type_node, source)
+    # Check if casting to byte pointer (common pattern for offset access)
+    if not any(t in type_text for t in ("u8*", "s8*", "char*", "uint8_t*")):
+        return None
+    index = node.child_by_field_name("index")
+    if not index:
+        return None
+
+    index_text = _get_node_text(index, source)
+    # Flag if index looks like a struct offset (hex or large number)
+    if "0x" in index_text.lower() or (index_text.isdigit() and int(index_text) > 32):
+        return CodeIssue(
+            message="Array indexing with byte cast for struct access",
+            line=node.start_point[0] + 1,
+            column=node.start_point[1] + 1,
+            snippet=_get_node_text(node, source),
+            suggestion="Use proper struct definition",
+        )
+    return None
+
+
+def _check_lowercase_hex(node: "Node", source: bytes) -> CodeIssue | None:
+    text = _get_node_text(node, source)
+
+    # Check for hex literals
+    if text.lower().startswith("0x"):
+        hex_part = text[2:]
+        # Check if there are lowercase letters in hex digits
+        if any(c.islower() and c in "abcdef" for c in hex_part):
+            return CodeIssue(
+                message="Lowercase hex literal",
+                line=node.start_point[0] + 1,
+                column=node.start_point[1] + 1,
+                snippet=text,
+                suggestion=f"Use uppercase: 0x{hex_part.upper()}",
             )
-        elif text == "FALSE":
-            issues.append(
-                CodeIssue(
-                    message="Use lowercase boolean",
-                    line=node.start_point[0] + 1,
-                    column=node.start_point[1] + 1,
-                    snippet=text,
-                    suggestion="Use 'false' instead of 'FALSE'",
-                )
+    return None
+
+
+def _check_float_suffix(node: "Node", source: bytes) -> CodeIssue | None:
+    text = _get_node_text(node, source)
+
+    # Check for float literals (contains decimal point) without F/f/L/l suffix
+    if "." in text and not text.lower().startswith("0x"):
+        if not text[-1].lower() in ("f", "l"):
+            return CodeIssue(
+                message="Float literal missing F suffix",
+                line=node.start_point[0] + 1,
+                column=node.start_point[1] + 1,
+                snippet=text,
+                suggestion=f"Use {text}F for f32",
             )
+    return None
 
-    return issues
+
+def _check_uppercase_bool(node: "Node", source: bytes) -> CodeIssue | None:
+    # Tree-sitter parses TRUE as 'true' node type and FALSE as 'false' node type
+    # We need to check the actual text to see if it's uppercase
+    text = _get_node_text(node, source)
+    if text in ("TRUE", "FALSE"):
+        return CodeIssue(
+            message="Use lowercase boolean",
+            line=node.start_point[0] + 1,
+            column=node.start_point[1] + 1,
+            snippet=text,
+            suggestion=f"Use '{text.lower()}' instead of '{text}'",
+        )
+    return None
+
+
+_Check = Callable[["Node", bytes], "CodeIssue | None"]
+
+# Detector name -> (node type, check) pairs. Issues are reported grouped by
+# check, in this order.
+_DETECTORS: dict[str, list[tuple[str, _Check]]] = {
+    "pointer_arithmetic": [
+        ("pointer_expression", _check_pointer_deref),
+        ("field_expression", _check_field_access),
+        ("subscript_expression", _check_byte_subscript),
+    ],
+    "lowercase_hex": [("number_literal", _check_lowercase_hex)],
+    "float_suffix": [("number_literal", _check_float_suffix)],
+    "uppercase_bool": [("true", _check_uppercase_bool), ("false", _check_uppercase_bool)],
+}
+
+
+def _run_detectors(source_code: str, detectors: list[str]) -> list[CodeIssue]:
+    """Run the named detectors over source_code in one walk of its tree."""
+    tree, source = parse_source(source_code)
+    if tree is None:
+        return []
+
+    checks_by_type: dict[str, list[_Check]] = {}
+    found: dict[_Check, list[CodeIssue]] = {}
+    for name in detectors:
+        for node_type, check in _DETECTORS[name]:
+            checks_by_type.setdefault(node_type, []).append(check)
+            found.setdefault(check, [])
+
+    for node in _walk(tree.root_node):
+        for check in checks_by_type.get(node.type, ()):
+            issue = check(node, source)
+            if issue is not None:
+                found[check].append(issue)
+
+    return [issue for issues in found.values() for issue in issues]
+
+
+def detect_pointer_arithmetic(source_code: str) -> list[CodeIssue]:
+    """Detect pointer arithmetic used for struct field access.
+
+    Catches patterns like:
+    - *(f32*)((u8*)fp + 0x844)
+    - ((u8*)ptr + offset)->field
+    - *(type*)(base + offset)
+    - ((Type*)(ptr + 0x10))->member
+
+    These should use proper struct definitions or M2C_FIELD macro.
+    """
+    return _run_detectors(source_code, ["pointer_arithmetic"])
+
+
+def detect_lowercase_hex(source_code: str) -> list[CodeIssue]:
+    """Detect lowercase hex literals (should be uppercase)."""
+    return _run_detectors(source_code, ["lowercase_hex"])
+
+
+def detect_float_without_suffix(source_code: str) -> list[CodeIssue]:
+    """Detect float literals missing the F suffix."""
+    return _run_detectors(source_code, ["float_suffix"])
+
+
+def detect_uppercase_bool(source_code: str) -> list[CodeIssue]:
+    """Detect TRUE/FALSE (should be true/false)."""
+    return _run_detectors(source_code, ["uppercase_bool"])
 
 
 def analyze_c_code(source_code: str) -> list[CodeIssue]:
-    """Run all C code analyses and return combined issues."""
+    """Run all C code analyses in a single pass and return combined issues."""
     if not TREE_SITTER_AVAILABLE:
         return []
 
-    issues = []
-    issues.extend(detect_pointer_arithmetic(source_code))
-    issues.extend(detect_lowercase_hex(source_code))
-    issues.extend(detect_float_without_suffix(source_code))
-    issues.extend(detect_uppercase_bool(source_code))
-    return issues
+    return _run_detectors(source_code, list(_DETECTORS))
 
 
 def strip_function_bodies(
@@ -384,77 +557,102 @@ def strip_function_bodies(
     Returns:
         Tuple of (processed source, number of functions stripped)
     """
-    if not TREE_SITTER_AVAILABLE:
-        return source_code, 0
+    keep_functions = keep_functions or set()
 
-    if keep_functions is None:
-        keep_functions = set()
+    def strip_body(name: str, node: "Node", source: bytes) -> str | None:
+        if name in keep_functions:
+            return None
+        return function_prototype(node, source)
 
-    parser = get_parser()
-    if parser is None:
-        return source_code, 0
+    result, counts = rewrite_function_definitions(source_code, [strip_body])
+    return result, counts[0]
 
-    source_bytes = source_code.encode("utf-8")
-    tree = parser.parse(source_bytes)
 
-    # Collect all function definitions to strip
-    # Each entry: (start_byte, end_byte, replacement_text)
-    replacements: list[tuple[int, int, str]] = []
-    stripped_count = 0
+def function_prototype(
+    node: "Node",
+    source: bytes,
+    comment: str = "/* body stripped: auto-inline prevention */",
+) -> str | None:
+    """Turn a function definition node into a bodiless declaration.
 
-    for node in _find_nodes_by_type(tree.root_node, "function_definition"):
-        # Get the function name from the declarator
-        declarator = node.child_by_field_name("declarator")
-        if declarator is None:
-            continue
+    Returns:
+        The declaration, or None if the definition has no body
+    """
+    body = node.child_by_field_name("body")
+    if body is None:
+        return None
 
-        # Navigate to find the actual function name
-        func_name = _extract_function_name(declarator, source_bytes)
-        if func_name is None:
-            continue
+    # Everything before the body, with the body replaced by ";"
+    func_decl = source[node.start_byte : body.start_byte].decode("utf-8").rstrip()
 
-        # Skip if this function should be kept
-        if func_name in keep_functions:
-            continue
+    # Remove 'inline' and 'static' keywords from declaration
+    # - inline: invalid without body in C89
+    # - static: MWCC expects a body after static declarations
+    func_decl = re.sub(r'\bstatic\s+', '', func_decl)
+    func_decl = re.sub(r'\binline\s+', '', func_decl)
+
+    # Add semicolon and comment (match regex version format)
+    return f"{func_decl};  {comment}"
 
-        # Get the body (compound_statement)
-        body = node.child_by_field_name("body")
-        if body is None:
-            continue
 
-        # Build the declaration by taking everything before the body
-        # and replacing the body with ";"
-        decl_end = body.start_byte
-        declaration_text = source_bytes[:decl_end].decode("utf-8")
+def rewrite_function_definitions(
+    source_code: str,
+    rewriters: list[Callable[[str, "Node", bytes], str | None]],
+) -> tuple[str, list[int]]:
+    """Rewrite function definitions in a single walk of the source's tree.
 
-        # Extract just this function's declaration part
-        func_start = node.start_byte
-        func_decl = source_bytes[func_start:decl_end].decode("utf-8").rstrip()
+    Each rewriter is called as rewriter(name, node, source) for every named
+    function definition and returns replacement text, or None to pass. The
+    first rewriter that returns text wins; later ones don't see that
+    definition.
 
-        # Remove 'inline' and 'static' keywords from declaration
-        # - inline: invalid without body in C89
-        # - static: MWCC expects a body after static declarations
-        import re
-        func_decl = re.sub(r'\bstatic\s+', '', func_decl)
-        func_decl = re.sub(r'\binline\s+', '', func_decl)
+    Returns:
+        Tuple of (processed source, number of definitions each rewriter replaced)
+    """
+    counts = [0] * len(rewriters)
+    if not TREE_SITTER_AVAILABLE or not rewriters:
+        return source_code, counts
 
-        # Add semicolon and comment (match regex version format)
-        replacement = func_decl + ";  /* body stripped: auto-inline prevention */"
+    tree, source_bytes = parse_source(source_code)
+    if tree is None:
+        return source_code, counts
 
-        replacements.append((node.start_byte, node.end_byte, replacement))
-        stripped_count += 1
+    # Each entry: (start_byte, end_byte, replacement_bytes)
+    replacements: list[tuple[int, int, bytes]] = []
+    for node in _iter_function_definitions(tree):
+        declarator = node.child_by_field_name("declarator")
+        if declarator is None:
+            continue
+        name = _extract_function_name(declarator, source_bytes)
+        if name is None:
+            continue
+        for i, rewriter in enumerate(rewriters):
+            replacement = rewriter(name, node, source_bytes)
+            if replacement is not None:
+                replacements.append((node.start_byte, node.end_byte, replacement.encode("utf-8")))
+                counts[i] += 1
+                break
 
     if not replacements:
-        return source_code, 0
+        return source_code, counts
 
     # Apply replacements in reverse order to maintain byte offsets
-    replacements.sort(key=lambda x: x[0], reverse=True)
-
+    replacements.reverse()
     result_bytes = bytearray(source_bytes)
     for start, end, replacement in replacements:
-        result_bytes[start:end] = replacement.encode("utf-8")
+        result_bytes[start:end] = replacement
+
+    # The rewritten context is often parsed again (slicing, further stripping)
+    _remember_edits(tree, source_bytes, bytes(result_bytes), replacements)
+
+    return result_bytes.decode("utf-8"), counts
 
-    return result_bytes.decode("utf-8"), stripped_count
+
+def _iter_function_definitions(tree: "Tree") -> Iterator["Node"]:
+    """Yield every function definition, without walking into their bodies."""
+    for node in _walk(tree.root_node, prune=frozenset({"function_definition"})):
+        if node.type == "function_definition":
+            yield node
 
 
 def _extract_function_name(declarator: "Node", source: bytes) -> str | None:
@@ -514,39 +712,207 @@ def strip_target_function(source_code: str, func_name: str) -> str:
     Returns:
         Source with function definition removed
     """
-    if not TREE_SITTER_AVAILABLE:
-        return source_code
+    replacement = f"// {func_name} definition stripped"  # Matches the regex version
 
-    parser = get_parser()
-    if parser is None:
-        return source_code
+    def strip_target(name: str, node: "Node", source: bytes) -> str | None:
+        return replacement if name == func_name else None
 
-    source_bytes = source_code.encode("utf-8")
-    tree = parser.parse(source_bytes)
+    return rewrite_function_definitions(source_code, [strip_target])[0]
 
-    # Find the specific function definition
-    for node in _find_nodes_by_type(tree.root_node, "function_definition"):
+
+# =============================================================================
+# Context slicing
+# =============================================================================
+
+_IDENTIFIER_RE = re.compile(r"\b[A-Za-z_]\w*\b")
+
+_CONDITIONALS = frozenset({
+    "preproc_if", "preproc_ifdef", "preproc_else", "preproc_elif", "preproc_elifdef",
+})
+_TAG_SPECIFIERS = frozenset({"struct_specifier", "union_specifier", "enum_specifier"})
+
+
+def _declarator_name(declarator: "Node", source: bytes) -> str | None:
+    """Get the name a (possibly nested) declarator declares."""
+    node = declarator
+    while node is not None:
+        if node.type in ("identifier", "type_identifier"):
+            return _get_node_text(node, source)
+        inner = node.child_by_field_name("declarator")
+        if inner is None:
+            inner = next(
+                (c for c in node.named_children
+                 if c.type.endswith("declarator") or c.type in ("identifier", "type_identifier")),
+                None,
+            )
+        node = inner
+    return None
+
+
+def _declared_names(node: "Node", source: bytes) -> set[str] | None:
+    """Get the names a top-level context item defines.
+
+    Struct/union/enum tags share the namespace of ordinary identifiers here,
+    which can only make a slice larger, never incomplete.
+
+    Returns:
+        Set of names, or None if the item isn't a recognised definition
+        (such items are always kept)
+    """
+    if node.type in ("preproc_def", "preproc_function_def"):
+        name = node.child_by_field_name("name")
+        return {_get_node_text(name, source)} if name else None
+
+    if node.type == "function_definition":
         declarator = node.child_by_field_name("declarator")
-        if declarator is None:
-            continue
+        name = _extract_function_name(declarator, source) if declarator else None
+        return {name} if name else None
+
+    names: set[str] = set()
+    if node.type in ("declaration", "type_definition"):
+        for declarator in node.children_by_field_name("declarator"):
+            name = _declarator_name(declarator, source)
+            if name:
+                names.add(name)
+        spec = node.child_by_field_name("type")
+    elif node.type in _TAG_SPECIFIERS:
+        spec = node
+    else:
+        return None
 
-        name = _extract_function_name(declarator, source_bytes)
-        if name != func_name:
+    if spec is not None and spec.type in _TAG_SPECIFIERS:
+        tag = spec.child_by_field_name("name")
+        if tag is not None:
+            names.add(_get_node_text(tag, source))
+        for child in _walk(spec):
+            if child.type == "enumerator":
+                name = child.child_by_field_name("name")
+                if name is not None:
+                    names.add(_get_node_text(name, source))
+    return names or None
+
+
+def _referenced_names(node: "Node", source: bytes) -> set[str]:
+    """Get the identifiers used anywhere in a node, including macro bodies."""
+    names = set()
+    for child in _walk(node):
+        if child.type in ("identifier", "type_identifier"):
+            names.add(_get_node_text(child, source))
+        elif child.type in ("preproc_arg", "ERROR"):
+            names.update(_IDENTIFIER_RE.findall(_get_node_text(child, source)))
+    return names
+
+
+def _conditional_parts(node: "Node") -> tuple[int, list["Node"], "Node | None"]:
+    """Split a preprocessor conditional into (header end, items, alternative)."""
+    header = node.child_by_field_name("name") or node.child_by_field_name("condition")
+    header_end = header.end_byte if header is not None else node.children[0].end_byte
+    alternative = node.child_by_field_name("alternative")
+    items = [
+        c for c in node.children
+        if c.start_byte >= header_end
+        and (c.is_named or c.type == ";")
+        and (alternative is None or c.id != alternative.id)
+    ]
+    return header_end, items, alternative
+
+
+def _group_items(children: list["Node"]) -> list[tuple[int, int, "Node"]]:
+    """Pair `struct X {...}` specifiers with the `;` that follows them."""
+    items: list[tuple[int, int, Node]] = []
+    for child in children:
+        if child.type == ";":
+            if items and items[-1][2].type in _TAG_SPECIFIERS:
+                start, _, node = items[-1]
+                items[-1] = (start, child.end_byte, node)
             continue
+        items.append((child.start_byte, child.end_byte, child))
+    return items
 
-        # Found the function - replace with a comment
-        # Use // comment format to match regex version
-        replacement = f"// {func_name} definition stripped"
 
-        result = (
-            source_bytes[: node.start_byte].decode("utf-8")
-            + replacement
-            + source_bytes[node.end_byte :].decode("utf-8")
-        )
-        return result
+def slice_context(source_code: str, roots: set[str]) -> tuple[str, int, int]:
+    """Reduce a context to the declarations that roots transitively need.
 
-    # Function not found, return unchanged
-    return source_code
+    Every top-level item (macro, typedef, struct/union/enum, prototype,
+    extern, inline function) that defines a needed name is kept, along with
+    the items its own identifiers refer to. Items that don't define a name
+    (pragmas, unparseable text) are always kept. Preprocessor conditionals
+    are kept around any item inside them, and the names in their conditions
+    count as used. Kept items stay in their original order; comments and
+    blank lines between them are dropped.
+
+    Args:
+        source_code: Full context
+        roots: Identifiers the code compiled against the context uses
+
+    Returns:
+        Tuple of (sliced context, items kept, total items). Without
+        tree-sitter the context is returned unchanged.
+    """
+    tree, source = parse_source(source_code)
+    if tree is None:
+        return source_code, 0, 0
+
+    # Flatten to items, each knowing the names in its enclosing conditions
+    items: list[tuple[int, int, Node, set[str] | None, set[str]]] = []
+
+    def collect(children: list["Node"], cond_names: set[str]) -> None:
+        for start, end, node in _group_items(children):
+            if node.type in _CONDITIONALS:
+                header_end, body, alternative = _conditional_parts(node)
+                names = set(cond_names)
+                for child in node.children:
+                    if child.end_byte <= header_end:
+                        names |= _referenced_names(child, source)
+                collect(body, names)
+                if alternative is not None:
+                    collect([alternative], names)
+            else:
+                items.append((start, end, node, _declared_names(node, source),
+                              _referenced_names(node, source) | cond_names))
+
+    collect(tree.root_node.children, set())
+
+    defined_by: dict[str, list[int]] = {}
+    for i, (_, _, _, names, _) in enumerate(items):
+        for name in names or ():
+            defined_by.setdefault(name, []).append(i)
+
+    keep: set[int] = set()
+    pending = [i for i, item in enumerate(items) if item[3] is None]
+    seen: set[str] = set()
+    queue = list(roots)
+    while queue or pending:
+        while pending:
+            i = pending.pop()
+            if i not in keep:
+                keep.add(i)
+                queue.extend(items[i][4])
+        if queue:
+            name = queue.pop()
+            if name not in seen:
+                seen.add(name)
+                pending.extend(defined_by.get(name, ()))
+
+    kept_spans = {(items[i][0], items[i][1]) for i in keep}
+
+    def emit(children: list["Node"]) -> str:
+        out = []
+        for start, end, node in _group_items(children):
+            if node.type in _CONDITIONALS:
+                header_end, body, alternative = _conditional_parts(node)
+                inner = emit(body)
+                alt = emit([alternative]) if alternative is not None else ""
+                if inner or alt:
+                    out.append(source[node.start_byte:header_end].decode("utf-8").rstrip() + "\n")
+                    out.append(inner + alt)
+                    if node.type in ("preproc_if", "preproc_ifdef"):
+                        out.append("#endif\n")
+            elif (start, end) in kept_spans:
+                out.append(source[start:end].decode("utf-8").rstrip("\n") + "\n")
+        return "".join(out)
+
+    return emit(tree.root_node.children), len(keep), len(items)
 
 
 def analyze_diff_additions(diff: str) -> list[CodeIssue]:
@@ -566,8 +932,6 @@ def analyze_diff_additions(diff: str) -> list[CodeIssue]:
     for line in diff.split("\n"):
         if line.startswith("@@"):
             # Parse hunk header for new file line number
-            import re
-
             match = re.search(r"\+(\d+)", line)
             if match:
                 current_new_line = int(match.group(1)) - 1
@@ -0,0 +1,179 @@
+"""Lexical scanner for C text.
+
+A lighter tool than the tree-sitter analyzer: one compiled regex picks out
+comments, string and character literals, preprocessor lines and the
+punctuation that matters for finding blocks ({, }, ;). Everything else is
+skipped by the regex engine instead of a Python loop, which keeps
+brace matching and function finding fast on multi-MB contexts.
+
+Used by the text-based context strippers (the fallbacks when tree-sitter
+is unavailable) and by the source updater.
+"""
+
+import re
+from dataclasses import dataclass
+
+# Comments, literals and directives are matched whole so the braces inside
+# them are skipped. A flat alternation (no named groups) is several times
+# faster; tokens are told apart by their first character.
+_LITERALS = (
+    r"//[^\n]*"
+    r"|/\*.*?(?:\*/|\Z)"
+    r"""|"(?:\\.|[^"\\\n])*(?:"|$)"""
+    r"|'(?:\\.|[^'\\\n])*(?:'|$)"
+    r"|\#(?:\\\n|[^\n])*"
+)
+
+# Top level: braces and the ; that ends a declaration
+_LEXEME_RE = re.compile(_LITERALS + r"|[{};]", re.MULTILINE | re.DOTALL)
+
+# Inside a block only braces matter
+_BRACE_RE = re.compile(_LITERALS + r"|[{}]", re.MULTILINE | re.DOTALL)
+
+_COMMENT_RE = re.compile(r"//[^\n]*|/\*.*?(?:\*/|\Z)", re.DOTALL)
+
+_NAME_BEFORE_PARAMS_RE = re.compile(r"([A-Za-z_]\w*)\s*$")
+
+_NOT_FUNCTIONS = frozenset({"if", "for", "while", "switch", "return", "sizeof", "__attribute__"})
+
+
+@dataclass(frozen=True)
+class FunctionSpan:
+    """A top-level function definition, as offsets into the scanned text."""
+    name: str
+    start: int  # First character of the declaration
+    body_start: int  # The opening {
+    end: int  # Just past the closing }
+
+
+def count_braces(text: str) -> tuple[int, int]:
+    """Count opening and closing braces outside comments, literals and directives.
+
+    Returns:
+        Tuple of (open_count, close_count)
+    """
+    if "{" not in text and "}" not in text:
+        return 0, 0
+    opens = closes = 0
+    for match in _BRACE_RE.finditer(text):
+        char = text[match.start()]
+        if char == "{":
+            opens += 1
+        elif char == "}":
+            closes += 1
+    return opens, closes
+
+
+def match_brace(text: str, open_pos: int) -> int | None:
+    """Find the end of the block opened by the { at open_pos.
+
+    Returns:
+        Offset just past the matching }, or None if the block is unclosed
+    """
+    depth = 0
+    for match in _BRACE_RE.finditer(text, open_pos):
+        char = text[match.start()]
+        if char == "{":
+            depth += 1
+        elif char == "}":
+            depth -= 1
+            if depth == 0:
+                return match.end()
+    return None
+
+
+def _params_start(header: str) -> int | None:
+    """Find the ( that opens the trailing parenthesized group of header."""
+    depth = 0
+    for i in range(len(header) - 1, -1, -1):
+        char = header[i]
+        if char == ")":
+            depth += 1
+        elif char == "(":
+            depth -= 1
+            if depth == 0:
+                return i
+    return None
+
+
+def _function_name(header: str) -> str | None:
+    """Get the function name from the text before a block, if it is a definition.
+
+    A definition header ends with the parameter list: `... name(params)`.
+    Struct, union and enum bodies and initializers (`= {`) don't.
+    """
+    if "/" in header:
+        header = _COMMENT_RE.sub(" ", header)
+    header = header.rstrip()
+    if not header.endswith(")"):
+        return None
+    paren = _params_start(header)
+    if paren is None:
+        return None
+    match = _NAME_BEFORE_PARAMS_RE.search(header, 0, paren)
+    if match is None or match.group(1) in _NOT_FUNCTIONS:
+        return None
+    if not header[: match.start()].strip():
+        return None  # A bare call-like macro, no return type
+    return match.group(1)
+
+
+def definition_at(text: str, pos: int) -> FunctionSpan | None:
+    """Get the function definition whose declaration starts at pos, if any.
+
+    Cheaper than function_spans() when the caller already knows where
+    candidates start (e.g. lines beginning with `inline`).
+    """
+    for match in _LEXEME_RE.finditer(text, pos):
+        char = text[match.start()]
+        if char == ";" or char == "}":
+            return None
+        if char != "{":
+            continue
+        end = match_brace(text, match.start())
+        if end is None:
+            return None
+        header = text[pos : match.start()]
+        name = _function_name(header)
+        if name is None:
+            return None
+        return FunctionSpan(name, pos + len(header) - len(header.lstrip()), match.start(), end)
+    return None
+
+
+def function_spans(text: str) -> list[FunctionSpan]:
+    """Find every top-level function definition in one pass over text.
+
+    Comments and preprocessor lines directly before a definition are not
+    part of its span. An unclosed block ends the scan.
+    """
+    spans = []
+    stmt_start = 0  # Where the current top-level declaration begins
+    pos = 0
+    while True:
+        match = _LEXEME_RE.search(text, pos)
+        if match is None:
+            return spans
+        pos = match.end()
+        char = text[match.start()]
+        if char == "{":
+            end = match_brace(text, match.start())
+            if end is None:
+                return spans
+            header = text[stmt_start : match.start()]
+            name = _function_name(header)
+            if name is not None:
+                start = stmt_start + len(header) - len(header.lstrip())
+                spans.append(FunctionSpan(name, start, match.start(), end))
+            stmt_start = pos = end
+        elif char == ";" or char == "}":
+            stmt_start = pos  # A stray } ends a declaration too
+        elif char != '"' and char != "'" and not text[stmt_start : match.start()].strip():
+            stmt_start = pos  # Leading comment or directive
+
+
+def line_bounds(text: str, start: int, end: int) -> tuple[int, int]:
+    """Widen [start, end) to whole lines (the end excludes the final newline)."""
+    line_start = text.rfind("\n", 0, start) + 1
+    line_end = text.find("\n", end)
+    return line_start, len(text) if line_end < 0 else line_end
@@ -15,12 +15,16 @@ Usage:
 """
 
 import argparse
+import copy
+import hashlib
 import json
 import os
 import re
 import signal
 import subprocess
 import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Optional
 
@@ -38,7 +42,9 @@ def _timeout_handler(signum, frame):
     print("    - Check for hung processes: ps aux | grep ninja")
     print("    - Increase timeout: --timeout 600")
     print("    - Skip slow checks: --skip-regressions")
-    sys.exit(124)  # Standard timeout exit code
+    sys.stdout.flush()
+    # sys.exit would wait for the check pool's threads (and a hung clang)
+    os._exit(124)  # Standard timeout exit code
 
 # Try to import tree-sitter based analyzer for better detection
 try:
@@ -94,6 +100,29 @@ def get_slug_mapping() -> dict[str, str]:
 SYMBOLS_FILE = MELEE_ROOT / "config" / "GALE01" / "symbols.txt"
 COMPILE_COMMANDS = MELEE_ROOT / "compile_commands.json"
 
+# Per-file check results, keyed by the file's HEAD and staged blob ids
+RESULT_CACHE_FILE = "build/.validate_cache.json"
+RESULT_CACHE_VERSION = 1
+MAX_RESULT_CACHE_ENTRIES = 2000
+
+# The checks' own code, so editing a check invalidates its cached results
+CHECKER_SOURCES = (Path(__file__), Path(__file__).with_name("c_analyzer.py"))
+_checker_digest: str | None = None
+
+
+def get_checker_digest() -> str:
+    """Hash the sources of the checks (computed once per process)."""
+    global _checker_digest
+    if _checker_digest is None:
+        h = hashlib.sha1()
+        for path in CHECKER_SOURCES:
+            try:
+                h.update(path.read_bytes())
+            except OSError:
+                h.update(b"<missing>")
+        _checker_digest = h.hexdigest()[:16]
+    return _checker_digest
+
 
 class ValidationError:
     """A validation error or warning."""
@@ -155,6 +184,25 @@ class CommitValidator:
         self.worktree_path = Path(worktree_path) if worktree_path else None
         self.errors: list[ValidationError] = []
         self.warnings: list[ValidationError] = []
+        # Staged state, fetched once and shared by every check (see _load_staged)
+        self._staged_lock = threading.Lock()
+        self._staged_files: Optional[list[str]] = None
+        self._staged_blobs: dict[str, tuple[str, str]] = {}
+        self._staged_diffs: dict[str, str] = {}
+        self._staged_contents: dict[str, Optional[str]] = {}
+        self._result_cache: Optional[dict[str, list[dict]]] = None
+        self._result_cache_used: set[str] = set()
+
+    def _fork(self) -> "CommitValidator":
+        """Copy for running one check in a worker thread.
+
+        The copy collects its own errors and warnings but shares the staged
+        state and result cache.
+        """
+        check = copy.copy(self)
+        check.errors = []
+        check.warnings = []
+        return check
 
     def validate_worktree_directory(self) -> None:
         """Check that cwd matches the expected worktree for staged files.
@@ -230,50 +278,174 @@ class CommitValidator:
                     f"Consider using the worktree to keep changes isolated."
                 ))
 
+    def _git_path(self, file_path: str) -> str:
+        """Strip the 'melee/' prefix _get_staged_files adds in a worktree."""
+        if self.worktree_path and file_path.startswith("melee/"):
+            return file_path[6:]
+        return file_path
+
+    def _load_staged(self) -> None:
+        """Fetch the staged file list, blob ids and diffs with two git calls.
+
+        Checks used to run `git diff --cached` once per file each; now every
+        check reads this snapshot.
+        """
+        with self._staged_lock:
+            if self._staged_files is not None:
+                return
+
+            git_cwd = self.worktree_path if self.worktree_path else PROJECT_ROOT
+            prefix = "melee/" if self.worktree_path else ""
+
+            try:
+                raw = subprocess.run(
+                    ["git", "diff", "--cached", "--raw", "-z", "--no-renames", "--no-abbrev"],
+                    capture_output=True, text=True, check=True,
+                    cwd=git_cwd
+                ).stdout
+            except subprocess.CalledProcessError:
+                self._staged_files = []
+                return
+
+            # ":<old mode> <new mode> <old blob> <new blob> <status>\0<path>\0"
+            files = []
+            fields = raw.split("\0")
+            for meta, path in zip(fields[::2], fields[1::2]):
+                parts = meta.split()
+                if len(parts) < 4:
+                    continue
+                # If running from a worktree, paths are relative to worktree root (e.g., src/melee/...)
+                # Prefix with 'melee/' for consistency with parent repo path expectations
+                files.append(prefix + path)
+                self._staged_blobs[prefix + path] = (parts[2], parts[3])
+
+            try:
+                patch = subprocess.run(
+                    ["git", "diff", "--cached", "--no-renames"],
+                    capture_output=True, text=True, check=True,
+                    cwd=git_cwd
+                ).stdout
+            except subprocess.CalledProcessError:
+                patch = ""
+
+            # Split into per-file sections on "diff --git a/<path> b/<path>"
+            current = None
+            for line in patch.splitlines(keepends=True):
+                if line.startswith("diff --git a/"):
+                    rest = line[len("diff --git "):].rstrip("\n")
+                    current = prefix + rest[2:2 + (len(rest) - 5) // 2]
+                    self._staged_diffs[current] = ""
+                if current is not None:
+                    self._staged_diffs[current] += line
+
+            self._staged_files = files
+
     def _get_staged_files(self) -> list[str]:
         """Get list of staged files.
 
         Returns paths prefixed with 'melee/' for consistency with parent repo expectations,
         even when running from a worktree where paths are relative to worktree root.
         """
-        # Determine which directory to run git commands in
-        git_cwd = self.worktree_path if self.worktree_path else PROJECT_ROOT
+        self._load_staged()
+        return list(self._staged_files)
+
+    def _get_staged_diff(self, file_path: str) -> str:
+        """Get the staged diff for a file."""
+        self._load_staged()
+        if file_path in self._staged_diffs:
+            return self._staged_diffs[file_path]
+        if file_path in self._staged_blobs:
+            return ""  # Staged, but git printed no patch (e.g. mode change)
 
+        git_cwd = self.worktree_path if self.worktree_path else PROJECT_ROOT
         try:
             result = subprocess.run(
-                ["git", "diff", "--cached", "--name-only"],
+                ["git", "diff", "--cached", self._git_path(file_path)],
                 capture_output=True, text=True, check=True,
                 cwd=git_cwd
             )
-            files = result.stdout.strip().split("\n") if result.stdout.strip() else []
-
-            # If running from a worktree, paths are relative to worktree root (e.g., src/melee/...)
-            # Prefix with 'melee/' for consistency with parent repo path expectations
-            if self.worktree_path:
-                files = [f"melee/{f}" for f in files]
-
-            return files
+            return result.stdout
         except subprocess.CalledProcessError:
-            return []
-
-    def _get_staged_diff(self, file_path: str) -> str:
-        """Get the staged diff for a file."""
-        git_cwd = self.worktree_path if self.worktree_path else PROJECT_ROOT
+            return ""
 
-        # If running from worktree, strip the 'melee/' prefix we added in _get_staged_files
-        actual_path = file_path
-        if self.worktree_path and file_path.startswith("melee/"):
-            actual_path = file_path[6:]  # Remove 'melee/' prefix
+    def _get_staged_content(self, file_path: str) -> Optional[str]:
+        """Get a file's content from the index, or None if it isn't there."""
+        if file_path in self._staged_contents:
+            return self._staged_contents[file_path]
 
+        git_cwd = self.worktree_path if self.worktree_path else PROJECT_ROOT
         try:
             result = subprocess.run(
-                ["git", "diff", "--cached", actual_path],
+                ["git", "show", f":{self._git_path(file_path)}"],
                 capture_output=True, text=True, check=True,
                 cwd=git_cwd
             )
-            return result.stdout
+            content = result.stdout
         except subprocess.CalledProcessError:
-            return ""
+            content = None
+        self._staged_contents[file_path] = content
+        return content
+
+    def _load_result_cache(self) -> dict[str, list[dict]]:
+        with self._staged_lock:
+            if self._result_cache is None:
+                try:
+                    with open(self.melee_root / RESULT_CACHE_FILE) as f:
+                        saved = json.load(f)
+                    if saved.get("version") != RESULT_CACHE_VERSION:
+                        raise ValueError
+                    self._result_cache = saved["results"]
+                except (OSError, ValueError, KeyError, TypeError):
+                    self._result_cache = {}
+        return self._result_cache
+
+    def _save_result_cache(self) -> None:
+        if not self._result_cache_used:
+            return
+        cache_path = self.melee_root / RESULT_CACHE_FILE
+        if not cache_path.parent.is_dir():
+            return
+
+        # Keep this run's entries, then the most recent older ones
+        results = self._load_result_cache()
+        kept = {k: v for k, v in results.items() if k not in self._result_cache_used}
+        kept.update((k, results[k]) for k in self._result_cache_used if k in results)
+        kept = dict(list(kept.items())[-MAX_RESULT_CACHE_ENTRIES:])
+
+        tmp_path = cache_path.with_name(f"{cache_path.name}.{os.getpid()}.tmp")
+        try:
+            tmp_path.write_text(json.dumps({"version": RESULT_CACHE_VERSION, "results": kept}))
+            os.replace(tmp_path, cache_path)
+        except OSError:
+            tmp_path.unlink(missing_ok=True)
+
+    def _run_cached(self, check: str, file_path: str, func) -> None:
+        """Run a per-file check, reusing its errors if the file is unchanged.
+
+        Only for checks that depend on nothing but the file's staged diff or
+        content: the key is the file's HEAD and staged blob ids, plus a hash
+        of the checker sources.
+        """
+        self._load_staged()
+        blobs = self._staged_blobs.get(file_path)
+        if blobs is None:
+            func(file_path)
+            return
+
+        key = (
+            f"{check}:{get_checker_digest()}:{int(TREE_SITTER_AVAILABLE)}:"
+            f"{file_path}:{blobs[0]}:{blobs[1]}"
+        )
+        results = self._load_result_cache()
+        self._result_cache_used.add(key)
+        cached = results.get(key)
+        if cached is not None:
+            self.errors.extend(ValidationError(**e) for e in cached)
+            return
+
+        errors_before = len(self.errors)
+        func(file_path)
+        results[key] = [vars(e) for e in self.errors[errors_before:]]
 
     def _load_compile_commands(self) -> dict[str, list[str]]:
         """Load compile_commands.json and return file -> args mapping."""
@@ -350,6 +522,7 @@ class CommitValidator:
             ))
             return
 
+        clang_commands = []
         for c_file in c_files:
             # Get the path relative to melee/ for display, and src/ path for compile_commands
             if c_file.startswith("melee/"):
@@ -383,15 +556,21 @@ class CommitValidator:
 
             # Add the source file
             clang_args.append(str(MELEE_ROOT / src_path))
+            clang_commands.append(clang_args)
 
-            # Run clang
-            result = subprocess.run(
+        def run_clang(clang_args: list[str]) -> subprocess.CompletedProcess:
+            return subprocess.run(
                 clang_args,
                 capture_output=True,
                 text=True,
                 cwd=MELEE_ROOT
             )
 
+        # One clang per file, run side by side
+        with ThreadPoolExecutor(max_workers=os.cpu_count() or 4) as pool:
+            clang_results = list(pool.map(run_clang, clang_commands))
+
+        for result in clang_results:
             # Parse errors from stderr
             if result.returncode != 0:
                 for line in result.stderr.split("\n"):
@@ -465,23 +644,26 @@ class CommitValidator:
             return
 
         for c_file in code_files:
-            diff = self._get_staged_diff(c_file)
-            if not diff:
-                continue
+            self._run_cached("coding-style", c_file, self._validate_coding_style_file)
 
-            # Use tree-sitter based analysis when available
-            if TREE_SITTER_AVAILABLE and analyze_diff_additions is not None:
-                issues = analyze_diff_additions(diff)
-                for issue in issues:
-                    self.errors.append(ValidationError(
-                        f"{issue.message}: {issue.snippet}" +
-                        (f" ({issue.suggestion})" if issue.suggestion else ""),
-                        c_file,
-                        issue.line
-                    ))
-            else:
-                # Fallback to regex-based detection
-                self._validate_coding_style_regex(c_file, diff)
+    def _validate_coding_style_file(self, c_file: str) -> None:
+        diff = self._get_staged_diff(c_file)
+        if not diff:
+            return
+
+        # Use tree-sitter based analysis when available
+        if TREE_SITTER_AVAILABLE and analyze_diff_additions is not None:
+            issues = analyze_diff_additions(diff)
+            for issue in issues:
+                self.errors.append(ValidationError(
+                    f"{issue.message}: {issue.snippet}" +
+                    (f" ({issue.suggestion})" if issue.suggestion else ""),
+                    c_file,
+                    issue.line
+                ))
+        else:
+            # Fallback to regex-based detection
+            self._validate_coding_style_regex(c_file, diff)
 
     def _validate_coding_style_regex(self, c_file: str, diff: str) -> None:
         """Regex-based coding style validation (fallback when tree-sitter unavailable)."""
@@ -646,37 +828,27 @@ class CommitValidator:
     def validate_conflict_markers(self) -> None:
         """Check for merge conflict markers in staged files."""
         staged_files = self._get_staged_files()
-        git_cwd = self.worktree_path if self.worktree_path else PROJECT_ROOT
 
         # Check C and header files
         code_files = [f for f in staged_files if f.endswith((".c", ".h"))]
 
         for code_file in code_files:
-            # Strip melee/ prefix if running from worktree
-            actual_path = code_file
-            if self.worktree_path and code_file.startswith("melee/"):
-                actual_path = code_file[6:]
+            self._run_cached("conflict-markers", code_file, self._validate_conflict_markers_file)
 
-            # Get the staged content
-            try:
-                result = subprocess.run(
-                    ["git", "show", f":{actual_path}"],
-                    capture_output=True, text=True, check=True,
-                    cwd=git_cwd
-                )
-                content = result.stdout
-            except subprocess.CalledProcessError:
-                continue
+    def _validate_conflict_markers_file(self, code_file: str) -> None:
+        content = self._get_staged_content(code_file)
+        if content is None:
+            return
 
-            # Check for conflict markers
-            markers = ["<<<<<<<", "=======", ">>>>>>>"]
-            for i, line in enumerate(content.split("\n"), 1):
-                for marker in markers:
-                    if line.strip().startswith(marker):
-                        self.errors.append(ValidationError(
-                            f"Merge conflict marker found: {marker}",
-                            code_file, i
-                        ))
+        # Check for conflict markers
+        markers = ["<<<<<<<", "=======", ">>>>>>>"]
+        for i, line in enumerate(content.split("\n"), 1):
+            for marker in markers:
+                if line.strip().startswith(marker):
+                    self.errors.append(ValidationError(
+                        f"Merge conflict marker found: {marker}",
+                        code_file, i
+                    ))
 
     def validate_header_signatures(self) -> None:
         """Check that header declarations match implementations.
@@ -685,7 +857,6 @@ class CommitValidator:
         has a concrete signature, which causes CI failures with -requireprotos.
         """
         staged_files = self._get_staged_files()
-        git_cwd = self.worktree_path if self.worktree_path else PROJECT_ROOT
 
         # Find staged C files
         c_files = [f for f in staged_files if f.endswith(".c") and "melee/src/" in f]
@@ -694,20 +865,9 @@ class CommitValidator:
             return
 
         for c_file in c_files:
-            # Strip melee/ prefix if running from worktree
-            actual_path = c_file
-            if self.worktree_path and c_file.startswith("melee/"):
-                actual_path = c_file[6:]
-
             # Get the staged content
-            try:
-                result = subprocess.run(
-                    ["git", "show", f":{actual_path}"],
-                    capture_output=True, text=True, check=True,
-                    cwd=git_cwd
-                )
-                c_content = result.stdout
-            except subprocess.CalledProcessError:
+            c_content = self._get_staged_content(c_file)
+            if c_content is None:
                 continue
 
             # Find function implementations (non-static, at start of line)
@@ -737,20 +897,11 @@ class CommitValidator:
 
             # Find the corresponding header file
             header_file = c_file.replace(".c", ".h")
-            actual_header_path = header_file
-            if self.worktree_path and header_file.startswith("melee/"):
-                actual_header_path = header_file[6:]
+            actual_header_path = self._git_path(header_file)
 
             # Get header content (try staged first, then working tree)
-            header_content = None
-            try:
-                result = subprocess.run(
-                    ["git", "show", f":{actual_header_path}"],
-                    capture_output=True, text=True, check=True,
-                    cwd=git_cwd
-                )
-                header_content = result.stdout
-            except subprocess.CalledProcessError:
+            header_content = self._get_staged_content(header_file)
+            if header_content is None:
                 # Try reading from working tree
                 if self.worktree_path:
                     header_path = self.worktree_path / actual_header_path
@@ -801,34 +952,37 @@ class CommitValidator:
             return
 
         for c_file in c_files:
-            diff = self._get_staged_diff(c_file)
-            if not diff:
+            self._run_cached("extern-declarations", c_file, self._validate_extern_declarations_file)
+
+    def _validate_extern_declarations_file(self, c_file: str) -> None:
+        diff = self._get_staged_diff(c_file)
+        if not diff:
+            return
+
+        line_num = 0
+        for line in diff.split("\n"):
+            if line.startswith("@@"):
+                match = re.search(r'\+(\d+)', line)
+                if match:
+                    line_num = int(match.group(1)) - 1
                 continue
 
-            line_num = 0
-            for line in diff.split("\n"):
-                if line.startswith("@@"):
-                    match = re.search(r'\+(\d+)', line)
-                    if match:
-                        line_num = int(match.group(1)) - 1
-                    continue
+            if line.startswith("+") and not line.startswith("+++"):
+                line_num += 1
+                content = line[1:].strip()
 
-                if line.startswith("+") and not line.startswith("+++"):
-                    line_num += 1
-                    content = line[1:].strip()
-
-                    # Check for new extern declarations at file scope
-                    # Pattern: extern Type symbol_name; (not in function)
-                    if re.match(r'^extern\s+(?:static\s+)?\w+[\w\s\*]*\s+\w+\s*[;\[]', content):
-                        # Skip if it's a function declaration (has parentheses)
-                        if '(' not in content:
-                            self.errors.append(ValidationError(
-                                "New extern declaration - include proper header instead",
-                                c_file, line_num
-                            ))
+                # Check for new extern declarations at file scope
+                # Pattern: extern Type symbol_name; (not in function)
+                if re.match(r'^extern\s+(?:static\s+)?\w+[\w\s\*]*\s+\w+\s*[;\[]', content):
+                    # Skip if it's a function declaration (has parentheses)
+                    if '(' not in content:
+                        self.errors.append(ValidationError(
+                            "New extern declaration - include proper header instead",
+                            c_file, line_num
+                        ))
 
-                elif not line.startswith("-"):
-                    line_num += 1
+            elif not line.startswith("-"):
+                line_num += 1
 
     def validate_symbol_renames(self) -> None:
         """Check for suspicious symbol renames (descriptive name -> address name).
@@ -849,40 +1003,43 @@ class CommitValidator:
             return
 
         for code_file in code_files:
-            diff = self._get_staged_diff(code_file)
-            if not diff:
-                continue
+            self._run_cached("symbol-renames", code_file, self._validate_symbol_renames_file)
 
-            # Collect all descriptive names from removed lines and added lines
-            removed_descriptive = set()
-            added_descriptive = set()
-            added_address = set()
+    def _validate_symbol_renames_file(self, code_file: str) -> None:
+        diff = self._get_staged_diff(code_file)
+        if not diff:
+            return
 
-            for line in diff.split("\n"):
-                if line.startswith("-") and not line.startswith("---"):
-                    # Look for descriptive symbol names being removed
-                    names = re.findall(r'\b([A-Z][a-zA-Z0-9_]*(?:Table|State|Data|Info|List|Array)[a-zA-Z0-9_]*)\b', line)
-                    removed_descriptive.update(names)
-
-                elif line.startswith("+") and not line.startswith("+++"):
-                    # Track descriptive names on added lines (to exclude reformatting)
-                    names = re.findall(r'\b([A-Z][a-zA-Z0-9_]*(?:Table|State|Data|Info|List|Array)[a-zA-Z0-9_]*)\b', line)
-                    added_descriptive.update(names)
-                    # Look for address-based names being added
-                    addr_names = re.findall(r'\b((?:fn|it|ft|gr|lb|gm|if|mp|vi)_[0-9A-Fa-f]{8})\b', line)
-                    added_address.update(addr_names)
-
-            # Only flag if descriptive names were ACTUALLY removed (not just reformatted)
-            # A name is "actually removed" if it's on a removed line but NOT on any added line
-            actually_removed = removed_descriptive - added_descriptive
-
-            # Only error if we actually removed descriptive names AND added address-based names
-            if actually_removed and added_address:
-                self.errors.append(ValidationError(
-                    f"Bad rename: removed descriptive names {list(actually_removed)[:3]}, "
-                    f"added address-based names {list(added_address)[:3]} - keep descriptive names",
-                    code_file
-                ))
+        # Collect all descriptive names from removed lines and added lines
+        removed_descriptive = set()
+        added_descriptive = set()
+        added_address = set()
+
+        for line in diff.split("\n"):
+            if line.startswith("-") and not line.startswith("---"):
+                # Look for descriptive symbol names being removed
+                names = re.findall(r'\b([A-Z][a-zA-Z0-9_]*(?:Table|State|Data|Info|List|Array)[a-zA-Z0-9_]*)\b', line)
+                removed_descriptive.update(names)
+
+            elif line.startswith("+") and not line.startswith("+++"):
+                # Track descriptive names on added lines (to exclude reformatting)
+                names = re.findall(r'\b([A-Z][a-zA-Z0-9_]*(?:Table|State|Data|Info|List|Array)[a-zA-Z0-9_]*)\b', line)
+                added_descriptive.update(names)
+                # Look for address-based names being added
+                addr_names = re.findall(r'\b((?:fn|it|ft|gr|lb|gm|if|mp|vi)_[0-9A-Fa-f]{8})\b', line)
+                added_address.update(addr_names)
+
+        # Only flag if descriptive names were ACTUALLY removed (not just reformatted)
+        # A name is "actually removed" if it's on a removed line but NOT on any added line
+        actually_removed = removed_descriptive - added_descriptive
+
+        # Only error if we actually removed descriptive names AND added address-based names
+        if actually_removed and added_address:
+            self.errors.append(ValidationError(
+                f"Bad rename: removed descriptive names {list(actually_removed)[:3]}, "
+                f"added address-based names {list(added_address)[:3]} - keep descriptive names",
+                code_file
+            ))
 
     def validate_local_urls_in_commits(self) -> None:
         """Check for local decomp.me URLs in pending commit messages.
@@ -971,8 +1128,9 @@ class CommitValidator:
     def validate_match_regressions(self) -> None:
         """Check for match percentage regressions after building.
 
-        Compares the current report.json against a rebuild with staged changes
-        to detect any functions that regressed in match percentage.
+        Compares the report as of HEAD (see load_report_baseline) against a
+        rebuild with staged changes to detect any functions that regressed in
+        match percentage.
         """
         staged_files = self._get_staged_files()
 
@@ -983,21 +1141,31 @@ class CommitValidator:
             return
 
         report_file = self.melee_root / "build" / "GALE01" / "report.json"
-
-        # Load current report (pre-build state)
         if not report_file.exists():
             self.warnings.append(ValidationError(
                 "No report.json found - run 'ninja' first to enable regression detection"
             ))
             return
 
+        # Compare against the report as of HEAD, not report.json itself: the
+        # build below (or a failed earlier attempt at this commit) rewrites it
         try:
-            with open(report_file) as f:
-                old_report = json.load(f)
-        except (json.JSONDecodeError, IOError) as e:
-            self.warnings.append(ValidationError(
-                f"Failed to load report.json: {e}"
-            ))
+            from src.commit.build import load_report_baseline
+            old_report = load_report_baseline(self.melee_root)
+        except ImportError:
+            old_report = None
+        if old_report is None:
+            try:
+                with open(report_file) as f:
+                    old_report = json.load(f)
+            except (json.JSONDecodeError, IOError) as e:
+                self.warnings.append(ValidationError(
+                    f"Failed to load report.json: {e}"
+                ))
+                return
+
+        # Fast path: only .c files changed, so only their units need re-diffing
+        if self._check_regressions_incremental(melee_changes, old_report):
             return
 
         # Build mapping of function -> match percentage
@@ -1009,16 +1177,12 @@ class CommitValidator:
                 if name and match_pct is not None:
                     old_matches[name] = match_pct
 
-        # Run ninja to rebuild with staged changes
+        # Run ninja to rebuild with staged changes (via the worktree's build
+        # daemon when one is running, so concurrent builds don't collide)
+        from src.commit.buildd import run_ninja
         try:
-            result = subprocess.run(
-                ["ninja"],
-                capture_output=True,
-                text=True,
-                cwd=self.melee_root,
-                timeout=300  # 5 minute timeout
-            )
-            if result.returncode != 0:
+            returncode, _, _ = run_ninja(self.melee_root, timeout=300)  # 5 minute timeout
+            if returncode != 0:
                 self.warnings.append(ValidationError(
                     "Build failed - cannot check for regressions"
                 ))
@@ -1062,6 +1226,45 @@ class CommitValidator:
                                 f"{name}: {old_pct:.1f}% → {new_display}"
                             )
 
+        self._report_regressions(regressions)
+
+    def _check_regressions_incremental(self, melee_changes: list[str], old_report: dict) -> bool:
+        """Check regressions by re-diffing only the units of changed .c files.
+
+        Header or symbols.txt changes can affect any unit, so those fall back
+        to the full build. report.json is left alone.
+
+        Returns:
+            True if the check ran, False if the caller should do a full build
+        """
+        if not all(f.startswith("melee/src/") and f.endswith(".c") for f in melee_changes):
+            return False
+
+        try:
+            import asyncio
+            from src.commit.build import diff_report_units
+        except ImportError:
+            return False
+
+        # "melee/src/melee/lb/lbcommand.c" -> "melee/lb/lbcommand.c"
+        file_paths = [f[len("melee/src/"):] for f in melee_changes]
+        try:
+            deltas = asyncio.run(diff_report_units(self.melee_root, file_paths, old_report))
+        except OSError:
+            return False
+        if deltas is None:
+            return False
+
+        # Functions missing from the new object count as unmatched
+        regressions = [
+            f"{name}: {old_pct:.1f}% → {f'{new_pct:.1f}%' if new_pct is not None else 'missing'}"
+            for name, (old_pct, new_pct) in sorted(deltas.items())
+            if old_pct > 0 and (new_pct is None or new_pct < old_pct)
+        ]
+        self._report_regressions(regressions)
+        return True
+
+    def _report_regressions(self, regressions: list[str]) -> None:
         if regressions:
             for reg in regressions[:5]:  # Limit to first 5
                 self.errors.append(ValidationError(
@@ -1072,68 +1275,88 @@ class CommitValidator:
                     f"... and {len(regressions) - 5} more regressions"
                 ))
 
-    def run(self, skip_regressions: bool = False) -> tuple[list[ValidationError], list[ValidationError], list[CheckResult]]:
+    def run(
+        self,
+        skip_regressions: bool = False,
+        jobs: Optional[int] = None,
+    ) -> tuple[list[ValidationError], list[ValidationError], list[CheckResult]]:
         """Run all validations.
 
+        The independent checks run concurrently; clang-format (which
+        re-stages files) and the regression build run after them.
+
         Args:
             skip_regressions: If True, skip the build and regression check.
                              By default, runs ninja and checks for match regressions.
+            jobs: Number of checks to run at once (default: CPU count)
 
         Returns:
             Tuple of (errors, warnings, check_results)
         """
-        check_results = []
+        # Load shared state up front so every fork sees the same objects
         staged_files = self._get_staged_files()
+        self._load_result_cache()
         c_files = [f for f in staged_files if f.endswith(".c") and "melee/" in f]
         h_files = [f for f in staged_files if f.endswith(".h") and "melee/" in f]
         code_files = c_files + h_files  # Both C and header files
         melee_changes = [f for f in staged_files if f.startswith("melee/")]
 
-        def run_check(name: str, method, condition: bool = True, skip_reason: str = ""):
-            """Run a check and record its result."""
+        def run_check(name: str, method_name: str, condition: bool = True, skip_reason: str = ""):
+            """Run a check on its own fork and return (result, errors, warnings)."""
             if not condition:
-                check_results.append(CheckResult(name, "n/a", detail=skip_reason))
-                return
+                return CheckResult(name, "n/a", detail=skip_reason), [], []
 
-            errors_before = len(self.errors)
-            method()
-            errors_after = len(self.errors)
-            new_errors = errors_after - errors_before
+            check = self._fork()
+            getattr(check, method_name)()
 
-            if new_errors > 0:
-                check_results.append(CheckResult(name, "failed", errors=new_errors))
-            else:
-                check_results.append(CheckResult(name, "passed"))
+            if check.errors:
+                return CheckResult(name, "failed", errors=len(check.errors)), check.errors, check.warnings
+            return CheckResult(name, "passed"), check.errors, check.warnings
 
         # Run checks with appropriate conditions
-        run_check("Worktree directory", self.validate_worktree_directory,
-                  bool(c_files), "no C files")
-        run_check("Forbidden files", self.validate_forbidden_files)
-        run_check("Conflict markers", self.validate_conflict_markers,
-                  bool(code_files), "no C/H files")
-        run_check("Header signatures", self.validate_header_signatures,
-                  bool(c_files), "no C files")
-        run_check("Implicit declarations", self.validate_implicit_declarations,
-                  bool(c_files), "no C files")
-        run_check("Symbols.txt", self.validate_symbols_txt,
-                  bool(c_files), "no C files")
-        run_check("Coding style", self.validate_coding_style,
-                  bool(code_files), "no C/H files")
-        run_check("Extern declarations", self.validate_extern_declarations,
-                  bool(c_files), "no C files")
-        run_check("Symbol renames", self.validate_symbol_renames,
-                  bool(code_files), "no C/H files")
-        run_check("Local URLs", self.validate_local_urls_in_commits,
-                  bool(melee_changes), "no melee changes")
-        run_check("clang-format", self.validate_clang_format,
-                  bool(code_files), "no C/H files")
+        independent_checks = [
+            ("Worktree directory", "validate_worktree_directory",
+             bool(c_files), "no C files"),
+            ("Forbidden files", "validate_forbidden_files"),
+            ("Conflict markers", "validate_conflict_markers",
+             bool(code_files), "no C/H files"),
+            ("Header signatures", "validate_header_signatures",
+             bool(c_files), "no C files"),
+            ("Implicit declarations", "validate_implicit_declarations",
+             bool(c_files), "no C files"),
+            ("Symbols.txt", "validate_symbols_txt",
+             bool(c_files), "no C files"),
+            ("Coding style", "validate_coding_style",
+             bool(code_files), "no C/H files"),
+            ("Extern declarations", "validate_extern_declarations",
+             bool(c_files), "no C files"),
+            ("Symbol renames", "validate_symbol_renames",
+             bool(code_files), "no C/H files"),
+            ("Local URLs", "validate_local_urls_in_commits",
+             bool(melee_changes), "no melee changes"),
+        ]
+        workers = jobs or min(len(independent_checks), os.cpu_count() or 4)
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            futures = [pool.submit(run_check, *check) for check in independent_checks]
+            outcomes = [future.result() for future in futures]
+
+        outcomes.append(run_check("clang-format", "validate_clang_format",
+                                  bool(code_files), "no C/H files"))
 
         if skip_regressions:
-            check_results.append(CheckResult("Match regressions", "skipped", detail="--skip-regressions"))
+            outcomes.append((CheckResult("Match regressions", "skipped", detail="--skip-regressions"), [], []))
         else:
-            run_check("Match regressions", self.validate_match_regressions,
-                      bool(melee_changes), "no melee changes")
+            outcomes.append(run_check("Match regressions", "validate_match_regressions",
+                                      bool(melee_changes), "no melee changes"))
 
+        # Merge in check order so output doesn't depend on scheduling
+        check_results = []
+        for result, errors, warnings in outcomes:
+            check_results.append(result)
+            self.errors.extend(errors)
+            self.warnings.extend(warnings)
+
+        self._save_result_cache()
         return self.errors, self.warnings, check_results
 
 
@@ -1149,6 +1372,8 @@ def main():
                         help="Path to the git worktree (for running git commands in correct context)")
     parser.add_argument("--timeout", type=int, default=DEFAULT_VALIDATION_TIMEOUT,
                         help=f"Timeout in seconds (default: {DEFAULT_VALIDATION_TIMEOUT})")
+    parser.add_argument("--jobs", "-j", type=int, default=None,
+                        help="Number of checks to run at once (default: CPU count)")
     args = parser.parse_args()
 
     # Set up timeout signal handler (Unix only)
@@ -1163,7 +1388,9 @@ def main():
         melee_root = MELEE_ROOT
 
     validator = CommitValidator(melee_root=melee_root, worktree_path=args.worktree)
-    errors, warnings, check_results = validator.run(skip_regressions=args.skip_regressions)
+    errors, warnings, check_results = validator.run(
+        skip_regressions=args.skip_regressions, jobs=args.jobs
+    )
 
     # Print check results (unless quiet mode)
     if not args.quiet:
@@ -0,0 +1,17 @@
+.fn lbFn, global
+/* 8000C2A0 00008EA0  7C 08 02 A6 */	mflr r0
+/* 8000C2A4 00008EA4  90 01 00 04 */	stw r0, 0x4(r1)
+/* 8000C2A8 00008EA8  94 21 FF E8 */	stwu r1, -0x18(r1)
+/* 8000C2AC 00008EAC  93 E1 00 14 */	stw r31, 0x14(r1)
+/* 8000C2B0 00008EB0  7C 7F 1B 78 */	mr r31, r3
+/* 8000C2B4 00008EB4  4B FF F0 4D */	bl helper
+/* 8000C2B8 00008EB8  C0 1F 00 10 */	lfs f0, 0x10(r31)
+/* 8000C2BC 00008EBC  C0 42 84 A0 */	lfs f2, "@123"@sda21(r2)
+/* 8000C2C0 00008EC0  EC 00 00 B2 */	fmuls f0, f0, f2
+/* 8000C2C4 00008EC4  EC 20 08 2A */	fadds f1, f0, f1
+/* 8000C2C8 00008EC8  80 01 00 1C */	lwz r0, 0x1c(r1)
+/* 8000C2CC 00008ECC  83 E1 00 14 */	lwz r31, 0x14(r1)
+/* 8000C2D0 00008ED0  38 21 00 18 */	addi r1, r1, 0x18
+/* 8000C2D4 00008ED4  7C 08 03 A6 */	mtlr r0
+/* 8000C2D8 00008ED8  4E 80 00 20 */	blr
+.endfn lbFn
@@ -295,6 +295,20 @@ class TestScratchCommands:
         assert "--melee-root" in result.stdout
         assert "--api-url" in result.stdout
 
+    def test_scratch_create_batch_help(self):
+        """Test scratch create-batch command help output."""
+        result = runner.invoke(app, ["scratch", "create-batch", "--help"])
+        assert result.exit_code == 0
+        assert "--jobs" in result.stdout
+        assert "--file" in result.stdout
+
+    def test_scratch_prefetch_help(self):
+        """Test scratch prefetch command help output."""
+        result = runner.invoke(app, ["scratch", "prefetch", "--help"])
+        assert result.exit_code == 0
+        assert "--count" in result.stdout
+        assert "--watch" in result.stdout
+
     def test_scratch_compile_help(self):
         """Test scratch compile command help output."""
         result = runner.invoke(app, ["scratch", "compile", "--help"])
@@ -308,6 +322,76 @@ class TestScratchCommands:
         assert "Update a scratch's source code" in result.stdout
 
 
+class TestPermuteCommands:
+    """Test the permute command group."""
+
+    def test_permute_run_help(self):
+        """Test permute run command help output."""
+        result = runner.invoke(app, ["permute", "run", "--help"])
+        assert result.exit_code == 0
+        assert "--budget" in result.stdout
+        assert "--jobs" in result.stdout
+        assert "--push" in result.stdout
+
+    def test_permute_prepare_help(self):
+        """Test permute prepare command help output."""
+        result = runner.invoke(app, ["permute", "prepare", "--help"])
+        assert result.exit_code == 0
+        assert "--dir" in result.stdout
+
+    def test_push_keeps_only_better_scores(self, tmp_path):
+        """A pushed candidate decomp.me scores worse is replaced by the previous source."""
+        from types import SimpleNamespace
+        from src.cli import permute
+        from src.client import Candidate, CompilationResult, DiffOutput
+
+        original = "#define ONE 1\ns32 fn(void) { return ONE; }\n"
+        candidates = [
+            Candidate(50, tmp_path / "output-50-1", "s32 fn(void) { return 2; }\n"),
+            Candidate(10, tmp_path / "output-10-1", "s32 fn(void) { return 3; }\n"),
+        ]
+
+        class FakePermuter:
+            def __init__(self, *args, **kwargs):
+                pass
+
+            async def improvements(self, best_score, time_budget):
+                for candidate in candidates:
+                    yield candidate
+
+        def scored(score):
+            diff = DiffOutput(arch_str="ppc", current_score=score, max_score=200)
+            return CompilationResult(success=True, compiler_output="", diff_output=diff)
+
+        client = MagicMock()
+        client.__aenter__ = AsyncMock(return_value=client)
+        client.__aexit__ = AsyncMock(return_value=None)
+        client.get_scratch = AsyncMock(
+            return_value=SimpleNamespace(source_code=original, score=100, max_score=200)
+        )
+        local = SimpleNamespace(function_name="fn", target_asm="", source_code=original)
+        push = AsyncMock(side_effect=[scored(40), scored(60), scored(40)])
+
+        with patch("src.client.DecompMeAPIClient", return_value=client), \
+             patch("src.client.Permuter", FakePermuter), \
+             patch.object(permute, "_prepare", AsyncMock(return_value=local)), \
+             patch.object(permute, "_push_candidate", push), \
+             patch.object(permute, "record_match_score"), \
+             patch.object(permute, "format_match_history", return_value=""):
+            result = runner.invoke(app, [
+                "permute", "run", "abc12", "--push", "--dir", str(tmp_path), "--api-url", "http://x",
+            ])
+
+        assert result.exit_code == 0, result.stdout
+        kept = "#define ONE 1\ns32 fn(void) { return 2; }\n"
+        assert [c.args[2] for c in push.call_args_list] == [
+            kept,
+            "#define ONE 1\ns32 fn(void) { return 3; }\n",
+            kept,  # Scored 60 on decomp.me: put back
+        ]
+        assert "restored the previous" in " ".join(result.stdout.split())
+
+
 class TestCommitCommands:
     """Test the commit command group."""
 
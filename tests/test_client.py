@@ -7,6 +7,7 @@ Run with: pytest tests/test_client.py -v
 
 import pytest
 
+from src.cli._common import detect_local_api_url
 from src.client import (
     CompileRequest,
     DecompMeAPIClient,
@@ -16,8 +17,6 @@ from src.client import (
     ScratchManager,
     ScratchUpdate,
 )
-from src.cli._common import detect_local_api_url
-
 
 # Simple test assembly for a function that returns 0
 TEST_ASM = """
@@ -384,6 +383,526 @@ class TestModels:
         assert req.compiler is None
 
 
+class TestSharedContext:
+    """Test context registration against a mocked backend (no server needed)."""
+
+    @pytest.fixture
+    def make_client(self, monkeypatch):
+        import httpx
+
+        from src.client import api
+
+        monkeypatch.setattr(api, "_shared_context_support", {})
+        monkeypatch.setattr(api, "_registered_contexts", set())
+        monkeypatch.delenv("DECOMP_SHARED_CONTEXT", raising=False)
+
+        def make(handler):
+            client = DecompMeAPIClient("http://backend.test")
+            client._client = httpx.AsyncClient(
+                base_url="http://backend.test", transport=httpx.MockTransport(handler)
+            )
+            return client
+
+        return make
+
+    @pytest.mark.asyncio
+    async def test_context_uploaded_once(self, make_client):
+        """A new context is uploaded once, then referenced by hash."""
+        import hashlib
+
+        import httpx
+
+        requests = []
+        stored = set()
+
+        def handler(request):
+            requests.append((request.method, request.url.path))
+            if request.url.path == "/api/context" and request.method == "GET":
+                return httpx.Response(200, json={})
+            if request.method == "HEAD":
+                found = request.url.path.rsplit("/", 1)[1] in stored
+                return httpx.Response(200 if found else 404)
+            stored.add(hashlib.sha256(b"int x;").hexdigest())
+            return httpx.Response(201, json={})
+
+        async with make_client(handler) as client:
+            first = await client.register_context("int x;")
+            second = await client.register_context("int x;")
+
+        assert first == second == hashlib.sha256(b"int x;").hexdigest()
+        assert [method for method, _ in requests] == ["GET", "HEAD", "POST"]
+
+    @pytest.mark.asyncio
+    async def test_unsupported_instance(self, make_client):
+        """Instances without the endpoint get no hash and no upload."""
+        import httpx
+
+        requests = []
+
+        def handler(request):
+            requests.append(request.method)
+            return httpx.Response(404)
+
+        async with make_client(handler) as client:
+            assert await client.register_context("int x;") is None
+            assert await client.register_context("int y;") is None
+
+        assert requests == ["GET"]
+
+    @pytest.mark.asyncio
+    async def test_scratch_fields_fall_back_to_inline(self):
+        """A failed upload sends the context inline instead."""
+        from unittest.mock import AsyncMock, MagicMock
+
+        import httpx
+
+        from src.cli.scratch import _context_fields
+
+        client = MagicMock()
+        client.register_context = AsyncMock(side_effect=DecompMeAPIError("API request failed: 500"))
+        assert await _context_fields(client, "int x;") == {"context": "int x;"}
+
+        # Upload timeouts and dropped connections aren't wrapped in DecompMeAPIError
+        client.register_context = AsyncMock(side_effect=httpx.ReadTimeout("timed out"))
+        assert await _context_fields(client, "int x;") == {"context": "int x;"}
+
+        client.register_context = AsyncMock(return_value="abc123")
+        assert await _context_fields(client, "int x;") == {"context_hash": "abc123"}
+
+
+OBJDUMP = """
+code.o:     file format elf32-powerpc
+
+Disassembly of section .text:
+
+00000000 <helper>:
+   0:\t4e 80 00 20 \tblr
+
+00000004 <fn>:
+   4:\t7c 08 02 a6 \tmflr    r0
+   8:\t3c 60 00 00 \tlis     r3,0
+\t\t\t8: R_PPC_ADDR16_HA\tlbl_80400000
+   c:\t80 6d 00 00 \tlwz     r3,0(r13)
+\t\t\tc: R_PPC_EMB_SDA21\tlbl_804D0000
+  10:\t48 00 00 01 \tbl      10 <fn+0xc>
+\t\t\t10: R_PPC_REL24\thelper
+  14:\t41 82 00 08 \tbeq     1c <fn+0x18>
+  18:\t90 01 00 08 \tstw     r0,8(r1)
+  1c:\t4e 80 00 20 \tblr
+"""
+
+TARGET_ASM = """.fn fn, global
+/* 80003104 00000004  7C 08 02 A6 */\tmflr r0
+/* 80003108 00000008  3C 60 80 40 */\tlis r3, lbl_80400000@ha
+/* 8000310C 0000000C  80 6D 80 00 */\tlwz r3, lbl_804D0000@sda21(r13)
+/* 80003110 00000010  4B FF FF F1 */\tbl helper
+/* 80003114 00000014  41 82 00 08 */\tbeq .L_8000311C
+/* 80003118 00000018  90 01 00 08 */\tstw r0, 0x8(r1)
+.L_8000311C:
+/* 8000311C 0000001C  4E 80 00 20 */\tblr
+.endfn fn
+"""
+
+
+class TestAsmDiff:
+    """Tests for scoring objdump output like decomp.me."""
+
+    def test_parse_folds_relocations_and_local_branches(self):
+        from src.client.asmdiff import parse_objdump
+
+        insns = parse_objdump(OBJDUMP, "fn")
+
+        assert [insn.text for insn in insns] == [
+            "mflr r0",
+            "lis r3,lbl_80400000@ha",
+            "lwz r3,lbl_804D0000@sda21(r13)",
+            "bl helper",
+            "beq .+0x18",
+            "stw r0,8(r1)",
+            "blr",
+        ]
+        assert insns[0].offset == 0
+        assert parse_objdump(OBJDUMP, "missing") is None
+
+    def test_identical_is_perfect(self):
+        from src.client.asmdiff import diff_instructions, parse_objdump
+
+        insns = parse_objdump(OBJDUMP, "fn")
+        diff = diff_instructions(insns, parse_objdump(OBJDUMP, "fn"))
+
+        assert diff.score == 0
+        assert diff.max_score == 700
+        assert diff.to_diff_output().current_score == 0
+
+    def test_penalties(self):
+        from dataclasses import replace
+
+        from src.client.asmdiff import (
+            PENALTY_DELETION,
+            PENALTY_REGALLOC,
+            PENALTY_REORDERING,
+            diff_instructions,
+            parse_objdump,
+        )
+
+        target = parse_objdump(OBJDUMP, "fn")
+
+        regalloc = [replace(insn) for insn in target]
+        regalloc[0].args = "r4"
+        regalloc[5].args = "r0,12(r1)"  # 4 bytes of stack difference
+        assert diff_instructions(target, regalloc).score == PENALTY_REGALLOC + 4
+
+        assert diff_instructions(target, target[:-1]).score == PENALTY_DELETION
+
+        rotated = target[1:] + target[:1]
+        assert diff_instructions(target, rotated).score == PENALTY_REORDERING
+
+    def test_target_asm_matches_objdump(self):
+        from src.client.asmdiff import diff_instructions, parse_objdump, parse_target_asm
+
+        target = parse_target_asm(TARGET_ASM)
+
+        expected = [insn.text for insn in parse_objdump(OBJDUMP, "fn")]
+        assert [insn.text for insn in target] == expected
+        assert diff_instructions(target, parse_objdump(OBJDUMP, "fn")).score == 0
+        assert parse_target_asm(".fn fn, global\n.endfn fn") is None
+
+    def test_normalizes_dtk_spellings(self):
+        from src.client.asmdiff import _normalize
+
+        assert _normalize("subi", "r3, r3, 0x1") == ("addi", "r3,r3,-1")
+        assert _normalize("lis", "r3, 0x8000") == ("lis", "r3,-32768")
+        assert _normalize("crclr", "4*cr1+eq") == ("crclr", "6")
+        assert _normalize("lwz", 'r3, "@123"@sda21(r13)') == ("lwz", "r3,@123@sda21(r13)")
+
+    def test_scorer_reuses_target(self):
+        from src.client.asmdiff import AsmScorer, diff_instructions, parse_objdump
+
+        target = parse_objdump(OBJDUMP, "fn")
+        scorer = AsmScorer(target)
+        candidates = [target, target[:-1], target[1:] + target[:1], list(reversed(target))]
+
+        for candidate in candidates:
+            assert scorer.score(candidate) == diff_instructions(target, candidate).score
+        assert scorer.diff(target).max_score == 700
+
+    def test_rescores_diff_output(self):
+        from src.client.asmdiff import diff_instructions, parse_diff_output, parse_objdump
+
+        target = parse_objdump(OBJDUMP, "fn")
+        current = target[1:] + target[:1]
+        diff = diff_instructions(target, current).to_diff_output()
+
+        base, cur = parse_diff_output(diff)
+
+        assert [insn.text for insn in base] == [insn.text for insn in target]
+        assert diff_instructions(base, cur).score == diff.current_score
+
+    def test_sameline_follows_asm_differ(self):
+        """Operand penalties follow asm-differ's score_diff_lines."""
+        from src.client.asmdiff import PENALTY_REGALLOC, _sameline_penalty
+
+        # off(reg) is two fields
+        assert _sameline_penalty("lwz r3,8(r4)", "lwz r3,8(r5)") == PENALTY_REGALLOC
+        assert _sameline_penalty("lwz r3,8(r4)", "lwz r3,12(r5)") == 2 * PENALTY_REGALLOC
+        # Extra operands each cost a regalloc penalty
+        assert _sameline_penalty("add r3,r3,r4", "add r3,r4") == 2 * PENALTY_REGALLOC
+        assert _sameline_penalty("blr", "blr 1") == PENALTY_REGALLOC
+        # A stack offset replaces the last field's comparison
+        assert _sameline_penalty("stw r0,8(r1)", "stw r4,16(r1)") == 8 + PENALTY_REGALLOC
+
+    def test_score_follows_asm_differ(self):
+        """A candidate's score adds up the way asm-differ scores it.
+
+        lbFn.s is the function's dtk assembly and lbFn.objdump the
+        `objdump -dr` of a candidate mwcc object with a larger frame and a
+        different float register. The @123 float literal is an
+        R_PPC_EMB_SDA21 reference.
+        """
+        from pathlib import Path
+
+        from src.client.asmdiff import (
+            PENALTY_DELETION,
+            PENALTY_REGALLOC,
+            PENALTY_STACKDIFF,
+            AsmScorer,
+            parse_objdump,
+            parse_target_asm,
+        )
+
+        fixtures = Path(__file__).parent / "fixtures" / "asmdiff"
+        target = parse_target_asm((fixtures / "lbFn.s").read_text())
+        current = parse_objdump((fixtures / "lbFn.objdump").read_text(), "lbFn")
+
+        diff = AsmScorer(target).diff(current)
+
+        # stwu, stw r31 and both lwz restores move 8 bytes on the stack; lfs
+        # and fmuls use f3 for f2; addi r1 has a different immediate
+        assert diff.score == 4 * 8 * PENALTY_STACKDIFF + 3 * PENALTY_REGALLOC
+        assert diff.max_score == len(target) * PENALTY_DELETION
+        assert "lfs f3,@123@sda21(r2)" in [insn.text for insn in current]
+
+    def test_score_matches_decomp_me(self):
+        """Rescoring a captured /compile response gives decomp.me's score.
+
+        Responses are captured from a decomp.me instance with
+        scripts/capture_compile_response.py.
+        """
+        import json
+        from pathlib import Path
+
+        from src.client import CompilationResult
+        from src.client.asmdiff import diff_instructions, parse_diff_output
+
+        captures = sorted((Path(__file__).parent / "fixtures" / "asmdiff").glob("*.compile.json"))
+        if not captures:
+            pytest.skip("no captured /compile responses")
+
+        for capture in captures:
+            response = CompilationResult.model_validate(json.loads(capture.read_text()))
+            base, cur = parse_diff_output(response.diff_output)
+            diff = diff_instructions(base, cur)
+            assert diff.score == response.diff_output.current_score, capture.name
+            assert diff.max_score == response.diff_output.max_score, capture.name
+
+
+class TestToolchain:
+    """Tests for reading the local toolchain from permuter_settings.toml."""
+
+    def test_from_settings(self):
+        from src.client import Toolchain
+
+        toolchain = Toolchain.from_settings()
+
+        assert toolchain.uses_wine
+        assert toolchain.compiler[-1].endswith("GC/1.2.5n/mwcceppc.exe")
+        assert "-O4,p" in toolchain.compiler_flags
+        assert "-c" not in toolchain.compiler_flags
+        assert toolchain.compiler_paths[:2] == ["-i", "src"]
+        assert "-DVERSION_GALE01" in toolchain.compiler_paths
+        assert toolchain.objdump[-1] == "broadway"
+
+    def test_compile_command_overrides(self):
+        from pathlib import Path
+
+        from src.client import Toolchain
+
+        toolchain = Toolchain.from_settings()
+        command = toolchain.compile_command(
+            Path("code.c"), Path("code.o"), mw_version="GC/1.3.2", flags="-O4,p -inline auto"
+        )
+
+        assert command[1].endswith("GC/1.3.2/mwcceppc.exe")
+        assert command[2:6] == ["-proc", "gekko", "-O4,p", "-inline"]
+        assert "-Cpp_exceptions" not in command
+        assert command[-4:] == ["-c", "-o", "code.o", "code.c"]
+
+
+class TestLocalCompiler:
+    """Tests for the local compile pool, with the toolchain faked."""
+
+    def _compiler(self, tmp_path, compile_returncode=0):
+        from pathlib import Path
+
+        from src.client import LocalCompiler, Toolchain
+
+        toolchain = Toolchain(
+            compiler=["mwcceppc"], compiler_flags=[], compiler_paths=[],
+            assembler=["as"], objdump=["objdump"],
+        )
+        compiler = LocalCompiler(tmp_path, toolchain=toolchain, workers=2)
+        calls = []
+
+        async def run(args, cwd):
+            calls.append(args[0])
+            if args[0] in ("as", "mwcceppc"):
+                if args[0] == "mwcceppc" and compile_returncode:
+                    return compile_returncode, "", "error: undefined identifier"
+                Path(args[args.index("-o") + 1]).write_bytes(b"")
+                return 0, "", ""
+            return 0, OBJDUMP, ""
+
+        compiler._run = run
+        return compiler, calls
+
+    @pytest.mark.asyncio
+    async def test_compile_scores_against_target(self, tmp_path):
+        compiler, calls = self._compiler(tmp_path)
+
+        async with compiler:
+            result = await compiler.compile("void fn(void) {}", "", "fn", ".fn fn, global")
+            await compiler.compile("void fn(void) {}", "", "fn", ".fn fn, global")
+
+        assert result.success
+        assert result.is_perfect
+        assert result.max_score == 700
+        assert calls.count("as") == 1  # Target assembled once
+        assert calls.count("mwcceppc") == 2
+
+    @pytest.mark.asyncio
+    async def test_dtk_target_is_not_assembled(self, tmp_path):
+        compiler, calls = self._compiler(tmp_path)
+
+        async with compiler:
+            result = await compiler.compile("void fn(void) {}", "", "fn", TARGET_ASM)
+
+        assert result.is_perfect
+        assert "as" not in calls
+
+    @pytest.mark.asyncio
+    async def test_compile_error(self, tmp_path):
+        compiler, _ = self._compiler(tmp_path, compile_returncode=1)
+
+        async with compiler:
+            result = await compiler.compile("void fn(void) { x; }", "", "fn", ".fn fn, global")
+
+        assert not result.success
+        assert "undefined identifier" in result.compiler_output
+        assert result.score == -1
+
+    @pytest.mark.asyncio
+    async def test_backend_applies_overrides(self, tmp_path):
+        from unittest.mock import AsyncMock
+
+        from src.client import CompileRequest, LocalCompileBackend, LocalScratch
+
+        compiler = AsyncMock()
+        backend = LocalCompileBackend(compiler)
+        backend.register("abc", LocalScratch("fn", ".fn fn, global", "old code", "ctx", "-O4,p"))
+
+        await backend.compile_scratch("abc", CompileRequest(source_code="new code"))
+
+        kwargs = compiler.compile.await_args.kwargs
+        assert kwargs["source_code"] == "new code"
+        assert kwargs["context"] == "ctx"
+        assert kwargs["compiler_flags"] == "-O4,p"
+
+    @pytest.mark.asyncio
+    async def test_manager_uses_backend(self):
+        from unittest.mock import AsyncMock, MagicMock
+
+        from src.client import CompilationResult
+
+        client = MagicMock()
+        backend = MagicMock()
+        backend.compile_scratch = AsyncMock(
+            return_value=CompilationResult(success=False, compiler_output="")
+        )
+        manager = ScratchManager(client, compile_backend=backend)
+
+        await manager.batch_compile(MagicMock(slug="abc"), ["a", "b"])
+
+        assert backend.compile_scratch.await_count == 2
+        client.compile_scratch.assert_not_called()
+
+
+class TestPermuter:
+    """Tests for preparing and running decomp-permuter."""
+
+    FAKE_PERMUTER = """
+import os, sys, time
+directory = sys.argv[1]
+for score, n in ((300, 1), (500, 2), (120, 3), (0, 4)):
+    out = os.path.join(directory, f"output-{score}-{n}")
+    os.makedirs(out)
+    with open(os.path.join(out, "source.c"), "w") as f:
+        f.write(f"int fn(void) {{ return {score}; }}\\n")
+    time.sleep(0.05)
+time.sleep(30)
+"""
+
+    @pytest.mark.asyncio
+    async def test_prepare_dir(self, tmp_path):
+        import sys
+        import tomllib
+
+        from src.client import LocalScratch, Toolchain, prepare_permuter_dir
+
+        toolchain = Toolchain(
+            compiler=["mwcceppc"], compiler_flags=["-O4,p"], compiler_paths=["-i", "src"],
+            assembler=[sys.executable, "-c", "import sys; open(sys.argv[2], 'wb').close()"],
+            objdump=["objdump", "-dr"],
+        )
+        scratch = LocalScratch(
+            "fn", ".fn fn, global", "int fn(void) { return 0; }", "typedef int s32;"
+        )
+        directory = tmp_path / "fn"
+        (directory / "output-5-1").mkdir(parents=True)
+
+        await prepare_permuter_dir(directory, scratch, tmp_path, toolchain)
+
+        assert "int fn(void)" in (directory / "base.c").read_text()
+        assert (directory / "target.o").exists()
+        assert not (directory / "output-5-1").exists()
+        script = (directory / "compile.sh").read_text()
+        assert 'mwcceppc -O4,p -i src -c -o "$OUTPUT" "$INPUT"' in script
+        assert f"cd {tmp_path.resolve()}" in script
+        settings = tomllib.loads((directory / "settings.toml").read_text())
+        assert settings == {
+            "func_name": "fn", "compiler_type": "mwcc", "objdump_command": "objdump -dr"
+        }
+
+    @pytest.mark.asyncio
+    async def test_improvements_stop_on_perfect(self, tmp_path):
+        import time
+
+        from src.client import Permuter
+
+        (tmp_path / "permuter.py").write_text(self.FAKE_PERMUTER)
+        directory = tmp_path / "fn"
+        directory.mkdir()
+        permuter = Permuter(directory, jobs=1, permuter_dir=tmp_path, poll_interval=0.02)
+
+        start = time.monotonic()
+        scores = [c.score async for c in permuter.improvements(best_score=400, time_budget=20)]
+
+        assert scores[-1] == 0
+        assert scores == sorted(scores, reverse=True)
+        assert 500 not in scores and len(set(scores)) == len(scores)
+        assert time.monotonic() - start < 10  # Didn't wait out the fake's sleep
+
+    @pytest.mark.asyncio
+    async def test_improvements_time_budget(self, tmp_path):
+        from src.client import Permuter
+
+        (tmp_path / "permuter.py").write_text("import time; time.sleep(30)")
+        directory = tmp_path / "fn"
+        directory.mkdir()
+        permuter = Permuter(directory, permuter_dir=tmp_path, poll_interval=0.02)
+
+        assert [c async for c in permuter.improvements(time_budget=0.2)] == []
+
+    @pytest.mark.asyncio
+    async def test_missing_permuter(self, tmp_path):
+        from src.client import Permuter, PermuterError
+
+        with pytest.raises(PermuterError, match="DECOMP_PERMUTER_DIR"):
+            async for _ in Permuter(tmp_path, permuter_dir=tmp_path / "nope").improvements():
+                pass
+
+    def test_apply_candidate(self):
+        """Only the permuted function is replaced; the rest of the scratch stays."""
+        from src.client.permuter import apply_candidate
+
+        original = (
+            "#define ONE 1\n"
+            "static s32 helper(void) { return ONE; }\n"
+            "s32 fn(void) { return 0; }\n"
+        )
+        candidate = (
+            "typedef int s32;\n"
+            "static s32 helper(void) { return 1; }\n"
+            "s32 fn(void) {\n    return helper() + 1;\n}\n"
+        )
+
+        assert apply_candidate(candidate, original, "fn") == (
+            "#define ONE 1\n"
+            "static s32 helper(void) { return ONE; }\n"
+            "s32 fn(void) {\n    return helper() + 1;\n}\n"
+        )
+        assert apply_candidate(candidate, original, "missing") == original
+
+
 @pytest.mark.asyncio
 async def test_context_manager():
     """Test using client as async context manager."""
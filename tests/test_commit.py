@@ -4,17 +4,15 @@ These tests use temporary files and mock git operations to test the commit workf
 Run with: pytest tests/test_commit.py -v
 """
 
-import pytest
-import tempfile
-import shutil
-from pathlib import Path
 from unittest.mock import AsyncMock, MagicMock, patch
 
+import pytest
+
 from src.commit import (
     CommitWorkflow,
-    update_source_file,
-    update_configure_py,
     format_files,
+    update_configure_py,
+    update_source_file,
     verify_clang_format_available,
 )
 
@@ -344,6 +342,793 @@ class TestCommitWorkflow:
         assert len(workflow.files_changed) == 0
 
 
+class TestFastCompile:
+    """Test single-object compile checks and deferred report builds."""
+
+    @pytest.fixture
+    def built_root(self, temp_melee_root):
+        """A melee root with an up-to-date build.ninja."""
+        import os
+        (temp_melee_root / "build.ninja").write_text("")
+        configure_py = temp_melee_root / "configure.py"
+        os.utime(configure_py, (1, 1))
+        return temp_melee_root
+
+    def test_object_path(self):
+        from src.commit.build import get_object_path
+        assert get_object_path("melee/lb/lbcommand.c") == "build/GALE01/src/melee/lb/lbcommand.o"
+
+    def test_needs_configure(self, built_root):
+        from src.commit.build import needs_configure
+        assert needs_configure(built_root) is False
+        (built_root / "build.ninja").unlink()
+        assert needs_configure(built_root) is True
+
+    @pytest.mark.asyncio
+    async def test_compile_skips_configure(self, built_root):
+        """An up-to-date build.ninja means just one ninja run per check."""
+        from src.commit import build
+
+        ninja = AsyncMock(return_value=(0, "", ""))
+        with patch.object(build, "run_ninja_async", ninja):
+            ok, _, _ = await build.compile_object(built_root, "melee/lb/lbcommand.c")
+            assert ok
+            ok, _, _ = await build.compile_object(built_root, "melee/lb/lbcommand.c")
+            assert ok
+
+        # ninja decides what is up to date, so it is asked every time
+        assert [c.args for c in ninja.call_args_list] == [
+            (built_root, ["build/GALE01/src/melee/lb/lbcommand.o"])
+        ] * 2
+
+    @pytest.mark.asyncio
+    async def test_failed_compile(self, built_root):
+        from src.commit import build
+
+        ninja = AsyncMock(return_value=(1, "", "Error: syntax error"))
+        with patch.object(build, "run_ninja_async", ninja):
+            ok, _, stderr = await build.compile_object(built_root, "melee/lb/lbcommand.c")
+
+        assert not ok
+        assert "syntax error" in stderr
+
+    @pytest.mark.asyncio
+    async def test_failed_configure_stops_build(self, built_root):
+        """A failing configure.py must not fall through to a stale build.ninja."""
+        from src.commit import build
+
+        (built_root / "build.ninja").unlink()
+        calls = []
+
+        async def fake_run(cmd, cwd):
+            calls.append(cmd)
+            return 1, "", "Traceback: boom"
+
+        with patch.object(build, "_run", fake_run):
+            ok, _, stderr = await build.compile_objects(built_root, ["melee/lb/lbcommand.c"])
+
+        assert not ok
+        assert "configure.py failed" in stderr and "boom" in stderr
+        assert len(calls) == 1
+
+    def test_report_request_joins_running_worker(self, temp_melee_root):
+        """A running worker picks up new requests instead of spawning another."""
+        import os
+
+        from src.commit import build
+
+        pid_file = temp_melee_root / build.REPORT_PID_FILE
+        pid_file.parent.mkdir(parents=True, exist_ok=True)
+        pid_file.write_text(str(os.getpid()))
+
+        with patch.object(build.subprocess, "Popen") as mock_popen:
+            started = build.schedule_report_regeneration(temp_melee_root)
+
+        assert started is False
+        mock_popen.assert_not_called()
+        assert (temp_melee_root / build.REPORT_REQUEST_FILE).exists()
+
+    def test_concurrent_requests_start_one_worker(self, temp_melee_root):
+        """Simultaneous requests can't both find no worker and spawn one each."""
+        import os
+        import time
+        from concurrent.futures import ThreadPoolExecutor
+
+        from src.commit import build
+
+        def slow_popen(*args, **kwargs):
+            time.sleep(0.05)  # Widen the gap between the check and the pid file
+            return MagicMock(pid=os.getpid())
+
+        with patch.object(build.subprocess, "Popen", side_effect=slow_popen) as mock_popen:
+            with ThreadPoolExecutor(max_workers=4) as pool:
+                started = list(pool.map(
+                    lambda _: build.schedule_report_regeneration(temp_melee_root), range(4)
+                ))
+
+        assert started.count(True) == 1
+        assert mock_popen.call_count == 1
+
+
+class TestObjectCache:
+    """Test the shared content-addressed object cache."""
+
+    COMPILER = """
+import os
+import sys
+from pathlib import Path
+src, out = sys.argv[1], Path(sys.argv[2])
+out.parent.mkdir(parents=True, exist_ok=True)
+out.write_text(Path(src).read_text() + Path("include/a.h").read_text())
+out.with_suffix(".d").write_text(f"{out}: {src} \\\\\\n  include/a.h\\n")
+with open(os.environ["CC_COUNTER"], "a") as f:
+    f.write("x")
+print("compiled")
+"""
+
+    @pytest.fixture
+    def cache_dir(self, tmp_path, monkeypatch):
+        from src.commit import objcache
+        monkeypatch.setattr(objcache, "OBJECT_CACHE_DIR", tmp_path / "cache")
+        monkeypatch.delenv("DECOMP_OBJECT_CACHE", raising=False)
+        return tmp_path / "cache"
+
+    def _worktree(self, root):
+        (root / "src").mkdir(parents=True)
+        (root / "include").mkdir()
+        (root / "src" / "a.c").write_text("int a;\n")
+        (root / "include" / "a.h").write_text("// header\n")
+        (root / "cc.py").write_text(self.COMPILER)
+        return root
+
+    def _compile(self, root, counter, monkeypatch, capsys):
+        import sys
+
+        from src.commit import objcache
+        monkeypatch.chdir(root)
+        monkeypatch.setenv("CC_COUNTER", str(counter))
+        rc = objcache.main(["build/a.o", "--", sys.executable, "cc.py", "src/a.c", "build/a.o"])
+        assert rc == 0
+        assert "compiled" in capsys.readouterr().out
+        return (root / "build" / "a.o").read_text()
+
+    def test_install_wraps_mwcc_rules_once(self, temp_melee_root, cache_dir):
+        from src.commit.objcache import install_object_cache
+        build_ninja = temp_melee_root / "build.ninja"
+        build_ninja.write_text(
+            "rule mwcc\n  command = $wrapper $mwcc $cflags -c $in -o $basedir\n"
+            "rule mwcc_sjis\n  command = $wrapper $sjiswrap $mwcc $cflags -c $in -o $basedir\n"
+            "rule link\n  command = $ld $in -o $out\n"
+        )
+
+        assert install_object_cache(temp_melee_root) is True
+        patched = build_ninja.read_text()
+        assert install_object_cache(temp_melee_root) is True
+        assert build_ninja.read_text() == patched
+
+        commands = [line for line in patched.splitlines() if "command" in line]
+        assert all("objcache.py $out -- $wrapper" in c for c in commands[:2])
+        assert commands[2] == "  command = $ld $in -o $out"
+
+    def test_install_rewraps_after_regeneration(self, temp_melee_root, cache_dir):
+        """ninja rerunning configure.py must not drop the wrapper."""
+        from src.commit.objcache import install_object_cache
+        build_ninja = temp_melee_root / "build.ninja"
+        build_ninja.write_text(
+            "rule configure\n  command = $python configure.py $configure_args\n  generator = 1\n"
+            "rule mwcc\n  command = $mwcc -c $in -o $basedir\n"
+        )
+
+        assert install_object_cache(temp_melee_root) is True
+        configure = build_ninja.read_text().splitlines()[1]
+        assert configure.startswith("  command = $python configure.py $configure_args && ")
+        assert configure.endswith("objcache.py --install")
+
+    def test_ninja_log_follows_wrapped_commands(self, temp_melee_root, cache_dir):
+        """Log entries for the old commands are rehashed for the new ones."""
+        from src.commit import objcache
+        log = temp_melee_root / "build" / ".ninja_log"
+        log.parent.mkdir(exist_ok=True)
+        log.write_text(
+            "# ninja log v7\n"
+            "0\t2\t1\tbuild/a.o\t1c020bce4b293b74\n"
+            "0\t2\t1\tbuild/b.o\t1234\n"
+        )
+
+        updated = objcache._migrate_ninja_log(
+            temp_melee_root,
+            {"build/a.o": "cp a.c build/a.o", "build/b.o": "cp b.c build/b.o"},
+            {"build/a.o": "wrap cp a.c build/a.o", "build/b.o": "wrap cp b.c build/b.o"},
+        )
+
+        assert updated == 1
+        new_hash = f"{objcache._rapidhash(b'wrap cp a.c build/a.o'):x}"
+        assert log.read_text().splitlines()[1] == f"0\t2\t1\tbuild/a.o\t{new_hash}"
+        # Stale entries stay stale
+        assert log.read_text().splitlines()[2].endswith("\t1234")
+
+    def test_shared_across_worktrees(self, tmp_path, cache_dir, monkeypatch, capsys):
+        """Identical units compile once; a header change misses."""
+        counter = tmp_path / "counter"
+        first = self._worktree(tmp_path / "wt1")
+        second = self._worktree(tmp_path / "wt2")
+
+        obj = self._compile(first, counter, monkeypatch, capsys)
+        assert self._compile(second, counter, monkeypatch, capsys) == obj
+        assert counter.read_text() == "x"
+        assert (second / "build" / "a.d").exists()
+
+        (second / "include" / "a.h").write_text("// changed\n")
+        assert "changed" in self._compile(second, counter, monkeypatch, capsys)
+        assert counter.read_text() == "xx"
+
+    def test_trim_removes_oldest(self, tmp_path, cache_dir, monkeypatch, capsys):
+        from src.commit import objcache
+        counter = tmp_path / "counter"
+        self._compile(self._worktree(tmp_path / "wt1"), counter, monkeypatch, capsys)
+
+        assert objcache.trim_object_cache(max_bytes=0) == 1
+        assert not list((cache_dir / "objects").rglob("*.o"))
+
+
+class TestBuildIndex:
+    """Test the cached build.ninja unit index."""
+
+    NINJA = """
+rule mwcc_sjis
+  command = $wrapper $mwcc $cflags -c $in -o $basedir
+
+# melee/lb/lbcollision.c: lb (Library) (linked False)
+build build/GALE01/src/melee/lb/lbcollision.o: mwcc_sjis $
+    src/melee/lb/lbcollision.c | build/tools/sjiswrap.exe
+  mw_version = GC/1.2.5n
+  cflags = -O4,p -nodefaults
+
+# melee/ft/fighter.c: ft (Library) (linked True)
+build build/GALE01/src/melee/ft/fighter.o: mwcc src/melee/ft/fighter.c
+  mw_version = GC/1.2.5
+
+build build/GALE01/main.elf: link build/GALE01/src/melee/ft/fighter.o
+"""
+
+    @pytest.fixture
+    def ninja_root(self, temp_melee_root):
+        from src.commit import build_index
+        build_index._memo.clear()
+        (temp_melee_root / "build").mkdir()
+        (temp_melee_root / "build.ninja").write_text(self.NINJA)
+        return temp_melee_root
+
+    def test_parses_units(self, ninja_root):
+        from src.commit.build_index import get_build_index, get_build_unit
+
+        index = get_build_index(ninja_root)
+
+        assert set(index) == {"melee/lb/lbcollision.c", "melee/ft/fighter.c"}
+        unit = get_build_unit(ninja_root, "src/melee/lb/lbcollision.c")
+        assert unit.object_path == "build/GALE01/src/melee/lb/lbcollision.o"
+        assert unit.rule == "mwcc_sjis"
+        assert unit.mw_version == "GC/1.2.5n"
+        assert unit.cflags == "-O4,p -nodefaults"
+
+    def test_saved_index_reused_until_build_ninja_changes(self, ninja_root):
+        import os
+
+        from src.commit import build_index
+
+        build_index.get_build_index(ninja_root)
+        assert (ninja_root / build_index.BUILD_INDEX_FILE).exists()
+
+        # A new process loads the saved index without parsing
+        build_index._memo.clear()
+        with patch.object(build_index, "parse_build_ninja", side_effect=AssertionError):
+            assert "melee/ft/fighter.c" in build_index.get_build_index(ninja_root)
+
+        build_ninja = ninja_root / "build.ninja"
+        build_ninja.write_text(self.NINJA.replace("GC/1.2.5\n", "GC/1.3.2\n"))
+        os.utime(build_ninja, ns=(0, build_ninja.stat().st_mtime_ns + 1))
+        assert build_index.get_build_unit(ninja_root, "melee/ft/fighter.c").mw_version == "GC/1.3.2"
+
+
+class TestBuildDaemon:
+    """Test the per-worktree build daemon."""
+
+    @pytest.fixture
+    def fake_ninja(self, tmp_path, monkeypatch):
+        """Put a ninja on PATH that records each invocation."""
+        import os
+        bin_dir = tmp_path / "bin"
+        bin_dir.mkdir()
+        counter = tmp_path / "ninja_calls"
+        ninja = bin_dir / "ninja"
+        ninja.write_text(f'#!/bin/sh\necho "$@" >> {counter}\necho built\n')
+        ninja.chmod(0o755)
+        monkeypatch.setenv("PATH", f"{bin_dir}{os.pathsep}{os.environ['PATH']}")
+        return counter
+
+    @pytest.mark.asyncio
+    async def test_merges_queued_requests_and_skips_unchanged(self, temp_melee_root, fake_ninja):
+        import asyncio
+
+        from src.commit.buildd import BuildDaemon
+
+        daemon = BuildDaemon(temp_melee_root)
+        daemon._tree_hash = lambda: "tree-1"
+        daemon._build_state = lambda: "ninja-1"
+
+        # Requests queued behind a running build share one run
+        await daemon._lock.acquire()
+        pending = [asyncio.create_task(daemon.build(["build/ctx.c"])) for _ in range(3)]
+        await asyncio.sleep(0)
+        daemon._lock.release()
+        results = await asyncio.gather(*pending)
+
+        assert all(r == (0, "built\n", "") for r in results)
+        assert fake_ninja.read_text().splitlines() == ["build/ctx.c"]
+
+        # Same tree: answered without running ninja
+        returncode, stdout, _ = await daemon.build(["build/ctx.c"])
+        assert returncode == 0 and "no work to do" in stdout
+        assert len(fake_ninja.read_text().splitlines()) == 1
+
+        # Tree changed: ninja runs again
+        daemon._tree_hash = lambda: "tree-2"
+        await daemon.build(["build/ctx.c"])
+        assert len(fake_ninja.read_text().splitlines()) == 2
+
+    @pytest.mark.asyncio
+    async def test_ninja_run_elsewhere_invalidates(self, temp_melee_root, fake_ninja):
+        """A build the daemon didn't run (A -> B -> A edits, direct ninja) is noticed."""
+        import os
+
+        from src.commit.buildd import BuildDaemon
+
+        (temp_melee_root / "build.ninja").write_text("")
+        ninja_log = temp_melee_root / "build" / ".ninja_log"
+        ninja_log.parent.mkdir()
+        ninja_log.write_text("# ninja log v5\n")
+        daemon = BuildDaemon(temp_melee_root)
+        daemon._tree_hash = lambda: "tree-a"
+
+        await daemon.build(["build/ctx.c"])
+        _, stdout, _ = await daemon.build(["build/ctx.c"])
+        assert "no work to do" in stdout
+
+        # Tree B was built outside the daemon, then edits went back to A
+        with open(ninja_log, "a") as log:
+            log.write("1\t2\t3\tbuild/ctx.c\tdeadbeef\n")
+        os.utime(ninja_log, ns=(0, ninja_log.stat().st_mtime_ns + 1))
+        _, stdout, _ = await daemon.build(["build/ctx.c"])
+        assert stdout == "built\n"
+        assert len(fake_ninja.read_text().splitlines()) == 2
+
+    @pytest.mark.asyncio
+    async def test_socket_round_trip(self, temp_melee_root, fake_ninja):
+        import asyncio
+
+        from src.commit import buildd
+
+        daemon = buildd.BuildDaemon(temp_melee_root)
+        server = asyncio.create_task(daemon.serve())
+        try:
+            for _ in range(50):
+                if buildd.socket_path(temp_melee_root).exists():
+                    break
+                await asyncio.sleep(0.01)
+            result = await buildd.request_build_async(temp_melee_root, ["all"])
+        finally:
+            server.cancel()
+            await asyncio.gather(server, return_exceptions=True)
+
+        assert result == (0, "built\n", "")
+        assert not buildd.socket_path(temp_melee_root).exists()
+
+    @pytest.mark.asyncio
+    async def test_large_build_output(self, temp_melee_root, fake_ninja):
+        """Responses over asyncio's 64 KiB line limit come through whole."""
+        import asyncio
+
+        from src.commit import buildd
+
+        ninja = fake_ninja.parent / "bin" / "ninja"
+        ninja.write_text('#!/bin/sh\nhead -c 200000 /dev/zero | tr "\\0" x\n')
+        daemon = buildd.BuildDaemon(temp_melee_root)
+        server = asyncio.create_task(daemon.serve())
+        try:
+            for _ in range(50):
+                if buildd.socket_path(temp_melee_root).exists():
+                    break
+                await asyncio.sleep(0.01)
+            result = await buildd.request_build_async(temp_melee_root, ["all"])
+        finally:
+            server.cancel()
+            await asyncio.gather(server, return_exceptions=True)
+
+        assert result is not None
+        assert result[0] == 0 and len(result[1]) == 200000
+
+    def test_falls_back_without_daemon(self, temp_melee_root, fake_ninja):
+        from src.commit.buildd import run_ninja
+        assert run_ninja(temp_melee_root, ["all"]) == (0, "built\n", "")
+
+
+class TestIncrementalReport:
+    """Test per-unit report updates."""
+
+    @pytest.fixture
+    def report_root(self, temp_melee_root):
+        import json
+        report_path = temp_melee_root / "build" / "GALE01" / "report.json"
+        report_path.parent.mkdir(parents=True)
+        report_path.write_text(json.dumps({"units": [
+            {"name": "main/melee/lb/lbcommand", "functions": [
+                {"name": "TestFunction", "fuzzy_match_percent": 50.0},
+                {"name": "AnotherFunction", "fuzzy_match_percent": 100.0},
+            ]},
+            {"name": "main/melee/lb/lbother", "functions": [
+                {"name": "Untouched", "fuzzy_match_percent": 10.0},
+            ]},
+        ]}))
+        return temp_melee_root
+
+    def test_symbol_match_percents(self):
+        from src.commit.build import _symbol_match_percents
+        diff = {
+            "left": {"symbols": [{"symbol": {"name": "fn"}, "match_percent": 100.0}]},
+            "right": {"symbols": [
+                {"symbol": {"name": "fn"}, "match_percent": 87.5},
+                {"symbol": {"name": "lbl_data"}},
+            ]},
+        }
+        assert _symbol_match_percents(diff) == {"fn": 87.5}
+
+    @pytest.mark.asyncio
+    async def test_update_merges_changed_unit_only(self, report_root):
+        """Only the changed unit is diffed and merged; mtime is preserved."""
+        import json
+        import os
+
+        from src.commit import build
+
+        report_path = report_root / build.REPORT_TARGET
+        os.utime(report_path, (1000, 1000))
+        diffed = []
+
+        async def fake_compile(root, file_path):
+            return True, "", ""
+
+        async def fake_diff(root, unit_name):
+            diffed.append(unit_name)
+            return {"TestFunction": 100.0, "AnotherFunction": 90.0}
+
+        with patch.object(build, "compile_object", fake_compile), \
+             patch.object(build, "diff_unit", fake_diff):
+            deltas = await build.update_report_units(report_root, ["melee/lb/lbcommand.c"])
+
+        assert diffed == ["main/melee/lb/lbcommand"]
+        assert deltas == {
+            "TestFunction": (50.0, 100.0),
+            "AnotherFunction": (100.0, 90.0),
+        }
+        report = json.loads(report_path.read_text())
+        funcs = {
+            f["name"]: f["fuzzy_match_percent"] for u in report["units"] for f in u["functions"]
+        }
+        assert funcs == {"TestFunction": 100.0, "AnotherFunction": 90.0, "Untouched": 10.0}
+        # ninja must still see the report as stale
+        assert report_path.stat().st_mtime == 1000
+
+    @pytest.mark.asyncio
+    async def test_update_falls_back_without_objdiff(self, report_root):
+        """No objdiff-cli means the caller must do a full build."""
+        from src.commit import build
+
+        async def fake_compile(root, file_path):
+            return True, "", ""
+
+        with patch.object(build, "compile_object", fake_compile):
+            deltas = await build.update_report_units(report_root, ["melee/lb/lbcommand.c"])
+
+        assert deltas is None
+
+
+class TestBatchCommit:
+    """Test committing many matches on one build."""
+
+    def _matches(self):
+        from src.commit import PendingMatch
+        return [
+            PendingMatch("TestFunction", "void TestFunction(void) {\n    return;\n}",
+                         "http://x/scratch/a", file_path="melee/lb/lbcommand.c"),
+            PendingMatch("AnotherFunction", "void AnotherFunction(int x) {\n    BAD;\n}",
+                         "http://x/scratch/b", file_path="melee/lb/lbcommand.c"),
+        ]
+
+    def _workflow(self, root):
+        from src.commit import BatchCommitWorkflow
+        workflow = BatchCommitWorkflow(root)
+        workflow._create_git_commit = AsyncMock(return_value=True)
+        workflow._regenerate_report = AsyncMock(return_value=True)
+        return workflow
+
+    @pytest.mark.asyncio
+    async def test_single_build_when_batch_compiles(self, temp_melee_root):
+        from src.commit import batch
+
+        compile_objects = AsyncMock(return_value=(True, "", ""))
+        compile_object = AsyncMock(return_value=(True, "", ""))
+        workflow = self._workflow(temp_melee_root)
+
+        with patch.object(batch, "compile_objects", compile_objects), \
+             patch.object(batch, "compile_object", compile_object), \
+             patch.object(batch, "verify_clang_format_available", AsyncMock(return_value=False)), \
+             patch.object(batch, "should_mark_as_matching", AsyncMock(return_value=(False, ""))):
+            result = await workflow.execute_batch(self._matches())
+
+        assert result.committed == ["TestFunction", "AnotherFunction"]
+        assert result.failed == {}
+        compile_objects.assert_awaited_once_with(temp_melee_root, ["melee/lb/lbcommand.c"])
+        compile_object.assert_not_awaited()
+        assert workflow._create_git_commit.await_count == 2
+        workflow._regenerate_report.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_bisect_drops_broken_function(self, temp_melee_root):
+        """A failing batch build is narrowed down to the function that breaks it."""
+        from src.commit import batch
+
+        source = temp_melee_root / "src" / "melee" / "lb" / "lbcommand.c"
+
+        async def fake_compile(root, file_path):
+            return "BAD" not in source.read_text(), "", ""
+
+        workflow = self._workflow(temp_melee_root)
+
+        with patch.object(batch, "compile_objects", AsyncMock(return_value=(False, "", ""))), \
+             patch.object(batch, "compile_object", fake_compile), \
+             patch.object(batch, "verify_clang_format_available", AsyncMock(return_value=False)), \
+             patch.object(batch, "should_mark_as_matching", AsyncMock(return_value=(False, ""))):
+            result = await workflow.execute_batch(self._matches())
+
+        assert result.committed == ["TestFunction"]
+        assert result.failed == {"AnotherFunction": "does not compile"}
+        content = source.read_text()
+        assert "// TODO: Implement this" not in content
+        assert "BAD" not in content
+        assert "if (x > 0)" in content
+
+    @pytest.mark.asyncio
+    async def test_error_restores_files(self, temp_melee_root):
+        """A failure partway through a real run puts the sources back."""
+        from src.commit import batch
+
+        source = temp_melee_root / "src" / "melee" / "lb" / "lbcommand.c"
+        original = source.read_text()
+        workflow = self._workflow(temp_melee_root)
+
+        crash = AsyncMock(side_effect=RuntimeError("ninja crashed"))
+        with patch.object(batch, "compile_objects", crash):
+            with pytest.raises(RuntimeError, match="ninja crashed"):
+                await workflow.execute_batch(self._matches())
+
+        assert source.read_text() == original
+
+    @pytest.mark.asyncio
+    async def test_error_keeps_committed_functions(self, temp_melee_root):
+        """Files go back to their last committed state, not past it."""
+        from src.commit import batch
+
+        source = temp_melee_root / "src" / "melee" / "lb" / "lbcommand.c"
+        workflow = self._workflow(temp_melee_root)
+        workflow._create_git_commit = AsyncMock(side_effect=[True, RuntimeError("git crashed")])
+
+        with patch.object(batch, "compile_objects", AsyncMock(return_value=(True, "", ""))), \
+             patch.object(batch, "verify_clang_format_available", AsyncMock(return_value=False)), \
+             patch.object(batch, "should_mark_as_matching", AsyncMock(return_value=(False, ""))):
+            with pytest.raises(RuntimeError, match="git crashed"):
+                await workflow.execute_batch(self._matches())
+
+        content = source.read_text()
+        assert "// TODO: Implement this" not in content  # First function was committed
+        assert "if (x > 0)" in content  # Second was not
+
+    @pytest.mark.asyncio
+    async def test_failed_commit_is_rolled_back(self, temp_melee_root):
+        """A function whose commit fails doesn't ride along in the next one."""
+        from src.commit import batch
+
+        source = temp_melee_root / "src" / "melee" / "lb" / "lbcommand.c"
+        matches = self._matches()
+        matches[1].source_code = "void AnotherFunction(int x) {\n    return;\n}"
+        committed = []
+
+        async def commit(function_name, scratch_url, match_percent):
+            committed.append(source.read_text())
+            return function_name != "TestFunction"
+
+        workflow = self._workflow(temp_melee_root)
+        workflow._create_git_commit = AsyncMock(side_effect=commit)
+
+        with patch.object(batch, "compile_objects", AsyncMock(return_value=(True, "", ""))), \
+             patch.object(batch, "verify_clang_format_available", AsyncMock(return_value=False)), \
+             patch.object(batch, "should_mark_as_matching", AsyncMock(return_value=(False, ""))):
+            result = await workflow.execute_batch(matches)
+
+        assert result.committed == ["AnotherFunction"]
+        assert result.failed == {"TestFunction": "git commit failed"}
+        assert "// TODO: Implement this" not in committed[0]
+        # The second commit only carries its own function
+        assert "// TODO: Implement this" in committed[1]
+        assert "if (x > 0)" not in committed[1]
+
+    @pytest.mark.asyncio
+    async def test_dry_run_restores_files(self, temp_melee_root):
+        from src.commit import batch
+
+        source = temp_melee_root / "src" / "melee" / "lb" / "lbcommand.c"
+        original = source.read_text()
+        workflow = self._workflow(temp_melee_root)
+
+        with patch.object(batch, "compile_objects", AsyncMock(return_value=(True, "", ""))):
+            result = await workflow.execute_batch(self._matches(), dry_run=True)
+
+        assert result.committed == ["TestFunction", "AnotherFunction"]
+        assert source.read_text() == original
+        workflow._create_git_commit.assert_not_awaited()
+
+
+
+class TestCommitValidator:
+    """Test the pre-commit hook's shared staged state and result cache."""
+
+    @pytest.fixture
+    def staged_repo(self, tmp_path):
+        import subprocess
+
+        def git(*args):
+            subprocess.run(["git", *args], cwd=tmp_path, check=True, capture_output=True)
+
+        git("init", "-q")
+        git("config", "user.email", "test@example.com")
+        git("config", "user.name", "Test")
+        src = tmp_path / "src" / "melee" / "lb"
+        src.mkdir(parents=True)
+        (tmp_path / "build").mkdir()
+        (src / "a.c").write_text("void a(void) {}\n")
+        (src / "b.c").write_text("void b(void) {}\n")
+        git("add", "-A")
+        git("commit", "-qm", "init")
+
+        (src / "a.c").write_text("void a(void) {\n    int x = TRUE;\n}\n")
+        (src / "b.c").write_text("void b(void) {\n    int y = 0;\n}\n")
+        git("add", "-A")
+        return tmp_path, git
+
+    def _validator(self, root):
+        from src.hooks.validate_commit import CommitValidator
+        return CommitValidator(melee_root=root, worktree_path=str(root))
+
+    def test_staged_diffs_split_per_file(self, staged_repo):
+        root, _ = staged_repo
+        validator = self._validator(root)
+
+        assert validator._get_staged_files() == [
+            "melee/src/melee/lb/a.c", "melee/src/melee/lb/b.c",
+        ]
+        diff = validator._get_staged_diff("melee/src/melee/lb/a.c")
+        assert diff.startswith("diff --git a/src/melee/lb/a.c b/src/melee/lb/a.c")
+        assert "+    int x = TRUE;" in diff
+        assert "b.c" not in diff
+
+    def test_unchanged_files_reuse_cached_results(self, staged_repo):
+        """A second run only rechecks the file whose staged blob changed."""
+        from src.hooks.validate_commit import CommitValidator
+
+        root, git = staged_repo
+        first = self._validator(root)
+        first.validate_coding_style()
+        first._save_result_cache()
+        assert len(first.errors) == 1
+        assert first.errors[0].file == "melee/src/melee/lb/a.c"
+
+        (root / "src" / "melee" / "lb" / "b.c").write_text("void b(void) {\n    int y = 1;\n}\n")
+        git("add", "-A")
+
+        checked = []
+        original = CommitValidator._validate_coding_style_file
+
+        def spy(self, c_file):
+            checked.append(c_file)
+            original(self, c_file)
+
+        second = self._validator(root)
+        with patch.object(CommitValidator, "_validate_coding_style_file", spy):
+            second.validate_coding_style()
+
+        assert checked == ["melee/src/melee/lb/b.c"]
+        assert [(e.file, e.line) for e in second.errors] == [(e.file, e.line) for e in first.errors]
+
+    def test_checker_change_invalidates_cached_results(self, staged_repo):
+        """Editing a check's code reruns it on files whose blobs didn't change."""
+        from src.hooks import validate_commit
+        from src.hooks.validate_commit import CommitValidator
+
+        root, _ = staged_repo
+        first = self._validator(root)
+        first.validate_coding_style()
+        first._save_result_cache()
+
+        checked = []
+        original = CommitValidator._validate_coding_style_file
+
+        def spy(self, c_file):
+            checked.append(c_file)
+            original(self, c_file)
+
+        second = self._validator(root)
+        with patch.object(validate_commit, "_checker_digest", "edited"), \
+             patch.object(CommitValidator, "_validate_coding_style_file", spy):
+            second.validate_coding_style()
+
+        assert sorted(checked) == ["melee/src/melee/lb/a.c", "melee/src/melee/lb/b.c"]
+
+    def test_run_merges_results_in_check_order(self, staged_repo):
+        root, _ = staged_repo
+        validator = self._validator(root)
+
+        with patch.object(type(validator), "validate_clang_format"), \
+             patch.object(type(validator), "validate_implicit_declarations"), \
+             patch.object(type(validator), "validate_worktree_directory"):
+            errors, _, results = validator.run(skip_regressions=True, jobs=4)
+
+        names = [r.name for r in results]
+        assert names[0] == "Worktree directory"
+        assert names[-2:] == ["clang-format", "Match regressions"]
+        status = {r.name: r.status for r in results}
+        assert status["Coding style"] == "failed"
+        assert status["Conflict markers"] == "passed"
+        assert [e.file for e in errors] == ["melee/src/melee/lb/a.c"]
+        assert (root / "build" / ".validate_cache.json").exists()
+
+    def test_regression_baseline_survives_retries(self, staged_repo):
+        """A retried commit is compared with HEAD's report, not the patched one."""
+        import asyncio
+        import json
+
+        from src.commit import build
+
+        root, _ = staged_repo
+        report_path = root / build.REPORT_TARGET
+        report_path.parent.mkdir(parents=True)
+        report_path.write_text(json.dumps({"units": [
+            {"name": "main/melee/lb/a", "functions": [{"name": "a", "fuzzy_match_percent": 80.0}]},
+            {"name": "main/melee/lb/b", "functions": [{"name": "b", "fuzzy_match_percent": 30.0}]},
+        ]}))
+        original = report_path.read_bytes()
+
+        async def fake_compile(root, file_path):
+            return True, "", ""
+
+        async def fake_diff(root, unit_name):
+            return {"main/melee/lb/a": {"a": 50.0}, "main/melee/lb/b": {}}[unit_name]
+
+        def check():
+            validator = self._validator(root)
+            validator.validate_match_regressions()
+            return sorted(e.message for e in validator.errors)
+
+        expected = ["Match regression: a: 80.0% → 50.0%", "Match regression: b: 30.0% → missing"]
+        with patch.object(build, "compile_object", fake_compile), \
+             patch.object(build, "diff_unit", fake_diff):
+            assert check() == expected
+            assert report_path.read_bytes() == original
+
+            # The commit workflow patches report.json; the retry still fails
+            asyncio.run(build.update_report_units(root, ["melee/lb/a.c"]))
+            func = json.loads(report_path.read_text())["units"][0]["functions"][0]
+            assert func["fuzzy_match_percent"] == 50.0
+            assert check() == expected
+
 class TestIntegration:
     """Integration tests combining multiple commit operations."""
 
@@ -604,6 +1389,19 @@ class TestFunctionExtraction:
 
         assert result is None
 
+    def test_braces_in_strings_and_comments(self, extract_function):
+        """Braces in literals and comments shouldn't end the function early."""
+        code = """void my_func(void) {
+    OSReport("}"); /* } */
+    // }
+    return;
+}
+void after(void) {}"""
+        result = extract_function(code, "my_func")
+
+        assert result is not None
+        assert result.endswith("return;\n}")
+
 
 class TestUndefinedIdentifierExtraction:
     """Tests for extract_undefined_identifiers - finds undefined symbols in errors."""
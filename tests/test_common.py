@@ -471,75 +471,211 @@ class TestSourceFileFromClaim:
         from src.cli._common import get_source_file_from_claim
         return get_source_file_from_claim
 
-    def test_returns_none_when_no_claims_file(self, get_source_file_from_claim, tmp_path, monkeypatch):
-        """Should return None if claims file doesn't exist."""
-        # Ensure claims file doesn't exist
-        import os
-        if os.path.exists("/tmp/decomp_claims.json"):
-            os.remove("/tmp/decomp_claims.json")
-
+    @pytest.fixture
+    def db(self, tmp_path):
+        from unittest.mock import patch
+        from src.db import StateDB, reset_db
+
+        reset_db()
+        test_db = StateDB(tmp_path / "state.db")
+        with patch("src.db.get_db", return_value=test_db):
+            yield test_db
+        test_db.close()
+        reset_db()
+
+    def test_returns_none_when_no_claims(self, get_source_file_from_claim, db):
+        """Should return None if nothing is claimed."""
         result = get_source_file_from_claim("some_func")
 
         assert result is None
 
-    def test_returns_source_file_for_claimed_function(self, get_source_file_from_claim, tmp_path):
+    def test_returns_source_file_for_claimed_function(self, get_source_file_from_claim, db):
         """Should return source file from valid claim."""
-        import json
+        db.add_claim("my_func", "agent-1", source_file_path="melee/lb/lbcollision.c")
+
+        result = get_source_file_from_claim("my_func")
+        assert result == "melee/lb/lbcollision.c"
+
+    def test_returns_none_for_expired_claim(self, get_source_file_from_claim, db):
+        """Should return None if claim has expired."""
         import time
 
-        claims = {
-            "my_func": {
-                "source_file": "melee/lb/lbcollision.c",
-                "timestamp": time.time(),  # Fresh claim
-            }
-        }
+        db.add_claim("old_func", "agent-1", timeout_seconds=0,
+                     source_file_path="melee/lb/lbcollision.c")
+        time.sleep(0.01)
 
-        claims_file = Path("/tmp/decomp_claims.json")
-        claims_file.write_text(json.dumps(claims))
+        result = get_source_file_from_claim("old_func")
+        assert result is None  # Expired
 
-        try:
-            result = get_source_file_from_claim("my_func")
-            assert result == "melee/lb/lbcollision.c"
-        finally:
-            claims_file.unlink(missing_ok=True)
+    def test_returns_none_for_unclaimed_function(self, get_source_file_from_claim, db):
+        """Should return None if function isn't claimed."""
+        db.add_claim("other_func", "agent-1", source_file_path="melee/ft/fighter.c")
 
-    def test_returns_none_for_expired_claim(self, get_source_file_from_claim):
-        """Should return None if claim has expired."""
-        import json
+        result = get_source_file_from_claim("not_claimed_func")
+        assert result is None
 
-        claims = {
-            "old_func": {
-                "source_file": "melee/lb/lbcollision.c",
-                "timestamp": 0,  # Very old timestamp
-            }
-        }
+    def test_falls_back_to_function_record(self, get_source_file_from_claim, db):
+        """Should use the function's recorded source file when unclaimed."""
+        db.upsert_function("tracked_func", source_file_path="melee/gr/ground.c")
 
-        claims_file = Path("/tmp/decomp_claims.json")
-        claims_file.write_text(json.dumps(claims))
+        result = get_source_file_from_claim("tracked_func")
+        assert result == "melee/gr/ground.c"
 
-        try:
-            result = get_source_file_from_claim("old_func")
-            assert result is None  # Expired
-        finally:
-            claims_file.unlink(missing_ok=True)
 
-    def test_returns_none_for_unclaimed_function(self, get_source_file_from_claim):
-        """Should return None if function isn't in claims."""
+class TestWorktreeBuildProvisioning:
+    """Tests for provision_worktree_build - seeding a worktree from main's build."""
+
+    @pytest.fixture
+    def repos(self, tmp_path):
+        """A main checkout with a build and a fresh worktree of it."""
+        import os
+        import subprocess
+
+        main = tmp_path / "melee"
+        (main / "src").mkdir(parents=True)
+        (main / "src" / "a.c").write_text("int a;\n")
+        (main / "src" / "b.c").write_text("int b;\n")
+        git = ["git", "-c", "user.name=t", "-c", "user.email=t@t"]
+        subprocess.run(["git", "init", "-q"], cwd=main, check=True)
+        subprocess.run(["git", "add", "."], cwd=main, check=True)
+        subprocess.run([*git, "commit", "-qm", "init"], cwd=main, check=True)
+
+        (main / "build.ninja").write_text("")
+        (main / "build" / "GALE01").mkdir(parents=True)
+        (main / "build" / "GALE01" / "a.o").write_bytes(b"obj")
+        (main / "build" / "GALE01" / ".report_worker.pid").write_text("1")
+        for name in ("a.c", "b.c"):
+            os.utime(main / "src" / name, (1000, 1000))
+        (main / "src" / "b.c").write_text("int b = 1;\n")  # Dirty in main
+
+        worktree = tmp_path / "wt"
+        subprocess.run(["git", "worktree", "add", "-q", "--detach", str(worktree)], cwd=main, check=True)
+        return main, worktree
+
+    def test_clones_build_and_aligns_mtimes(self, repos):
+        from src.cli._common import provision_worktree_build
+        main, worktree = repos
+
+        assert provision_worktree_build(worktree, source_root=main) is True
+
+        assert (worktree / "build" / "GALE01" / "a.o").read_bytes() == b"obj"
+        assert (worktree / "build.ninja").exists()
+        assert not (worktree / "build" / "GALE01" / ".report_worker.pid").exists()
+        # Unchanged source takes main's mtime, so its cloned object is current
+        assert (worktree / "src" / "a.c").stat().st_mtime == 1000
+        # Source that differs from main keeps its checkout mtime
+        assert (worktree / "src" / "b.c").stat().st_mtime != (main / "src" / "b.c").stat().st_mtime
+
+    def test_compile_commands_point_at_worktree(self, repos):
         import json
-        import time
 
-        claims = {
-            "other_func": {
-                "source_file": "melee/ft/fighter.c",
-                "timestamp": time.time(),
-            }
-        }
+        from src.cli._common import provision_worktree_build
+        main, worktree = repos
+        main_root = str(main.resolve())
+        (main / "compile_commands.json").write_text(json.dumps([{
+            "directory": main_root,
+            "file": f"{main_root}/src/a.c",
+            "arguments": ["mwcceppc.exe", f"-I{main_root}/include", "src/a.c"],
+        }]))
+
+        assert provision_worktree_build(worktree, source_root=main) is True
+
+        wt_root = str(worktree.resolve())
+        assert json.loads((worktree / "compile_commands.json").read_text()) == [{
+            "directory": wt_root,
+            "file": f"{wt_root}/src/a.c",
+            "arguments": ["mwcceppc.exe", f"-I{wt_root}/include", "src/a.c"],
+        }]
+
+    def test_no_main_build(self, repos):
+        from src.cli._common import provision_worktree_build
+        main, worktree = repos
+        (main / "build.ninja").unlink()
+
+        assert provision_worktree_build(worktree, source_root=main) is False
+        assert not (worktree / "build").exists()
+
+    @pytest.mark.skipif(not __import__("shutil").which("ninja"), reason="ninja not installed")
+    def test_cloned_build_is_up_to_date(self, tmp_path, monkeypatch):
+        """Wrapping main's compiles in the object cache keeps its ninja log valid."""
+        import subprocess
+
+        from src.cli._common import provision_worktree_build
+        monkeypatch.setenv("DECOMP_OBJECT_CACHE_DIR", str(tmp_path / "cache"))
+
+        main = tmp_path / "melee"
+        (main / "src").mkdir(parents=True)
+        (main / "src" / "a.c").write_text("int a;\n")
+        (main / "build.ninja").write_text(
+            "builddir = build\n"
+            "rule mwcc\n  command = cp $in $out\n"
+            "build build/a.o: mwcc src/a.c\n"
+        )
+        (main / ".gitignore").write_text("build/\nbuild.ninja\n")
+        git = ["git", "-c", "user.name=t", "-c", "user.email=t@t"]
+        subprocess.run(["git", "init", "-q"], cwd=main, check=True)
+        subprocess.run(["git", "add", "."], cwd=main, check=True)
+        subprocess.run([*git, "commit", "-qm", "init"], cwd=main, check=True)
+
+        # Main was built before the object cache was installed
+        subprocess.run(["ninja"], cwd=main, check=True, capture_output=True)
+
+        worktree = tmp_path / "wt"
+        subprocess.run(
+            ["git", "worktree", "add", "-q", "--detach", str(worktree)], cwd=main, check=True
+        )
+        assert provision_worktree_build(worktree, source_root=main) is True
 
-        claims_file = Path("/tmp/decomp_claims.json")
-        claims_file.write_text(json.dumps(claims))
+        assert "objcache.py" in (worktree / "build.ninja").read_text()
+        for root in (main, worktree):
+            result = subprocess.run(["ninja", "-n"], cwd=root, capture_output=True, text=True)
+            assert "no work to do" in result.stdout
 
-        try:
-            result = get_source_file_from_claim("not_claimed_func")
-            assert result is None
-        finally:
-            claims_file.unlink(missing_ok=True)
+
+class TestWorktreeTreeHash:
+    """Tests for get_worktree_tree_hash - keys the build validation cache."""
+
+    @pytest.fixture
+    def repo(self, tmp_path):
+        import subprocess
+        (tmp_path / "src").mkdir()
+        (tmp_path / "src" / "a.c").write_text("int a;\n")
+        subprocess.run(["git", "init", "-q"], cwd=tmp_path, check=True)
+        subprocess.run(["git", "add", "."], cwd=tmp_path, check=True)
+        subprocess.run(
+            ["git", "-c", "user.name=t", "-c", "user.email=t@t", "commit", "-qm", "init"],
+            cwd=tmp_path, check=True,
+        )
+        return tmp_path
+
+    @pytest.fixture
+    def tree_hash(self):
+        from src.cli.worktree_utils import get_worktree_tree_hash
+        return get_worktree_tree_hash
+
+    def test_stable_for_unchanged_tree(self, repo, tree_hash):
+        assert tree_hash(repo) == tree_hash(repo)
+
+    def test_tracks_edits_anywhere(self, repo, tree_hash):
+        clean = tree_hash(repo)
+        source = repo / "src" / "a.c"
+
+        source.write_text("int a = 1;\n")
+        first_edit = tree_hash(repo)
+        assert first_edit != clean
+
+        # Different content at the same dirty path is a different tree
+        source.write_text("int a = 2;\n")
+        assert tree_hash(repo) not in (clean, first_edit)
+
+        source.write_text("int a;\n")
+        assert tree_hash(repo) == clean
+
+    def test_tracks_untracked_files(self, repo, tree_hash):
+        clean = tree_hash(repo)
+        (repo / "include").mkdir()
+        (repo / "include" / "new.h").write_text("// new\n")
+        assert tree_hash(repo) != clean
+
+    def test_not_a_repo(self, tmp_path, tree_hash):
+        assert tree_hash(tmp_path) is None
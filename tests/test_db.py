@@ -104,6 +104,139 @@ class TestClaims:
         assert "func2" in func_names
 
 
+
+    def test_claim_stores_source_file(self, db):
+        """Claims should remember their source file and subdirectory."""
+        db.add_claim("my_func", "agent-1", source_file_path="melee/lb/lbcollision.c",
+                     subdirectory_key="lb")
+
+        claim = db.get_claim("my_func")
+        assert claim["source_file_path"] == "melee/lb/lbcollision.c"
+        assert claim["subdirectory_key"] == "lb"
+
+    def test_get_claims_filters_by_agent(self, db):
+        """get_claims should return only the requested agent's claims."""
+        db.add_claim("func1", "agent-1")
+        db.add_claim("func2", "agent-2")
+
+        claims = db.get_claims("agent-1")
+        assert [c["function_name"] for c in claims] == ["func1"]
+        assert len(db.get_claims()) == 2
+
+    def test_renew_claim_only_by_owner(self, db):
+        """Only the owning agent should be able to renew a claim."""
+        db.add_claim("my_func", "agent-1", timeout_seconds=60)
+        before = db.get_claim("my_func")["expires_at"]
+
+        assert db.renew_claim("my_func", "agent-2", timeout_seconds=3600) is False
+        assert db.renew_claim("my_func", "agent-1", timeout_seconds=3600) is True
+        assert db.get_claim("my_func")["expires_at"] > before
+
+class TestClaimNext:
+    """Tests for atomic claim-next-best-candidate.
+
+    Agents pick work from a precomputed candidate queue in one transaction,
+    so two agents asking at once always get different functions.
+    """
+
+    @staticmethod
+    def _candidate(name, score, subdir="lb", **extra):
+        return {
+            "function_name": name,
+            "source_file_path": f"melee/{subdir}/{name}.c",
+            "subdirectory_key": subdir,
+            "canonical_address": "0x80003100",
+            "size_bytes": 100,
+            "match_percent": 0.0,
+            "object_status": "NonMatching",
+            "recommendation_score": score,
+            **extra,
+        }
+
+    def test_claims_highest_score(self, db):
+        """The best-scoring candidate should be claimed first."""
+        db.replace_candidates([
+            self._candidate("low", 50),
+            self._candidate("high", 150),
+        ])
+
+        claimed = db.claim_next_candidate("agent-1")
+
+        assert claimed["function_name"] == "high"
+        func = db.get_function("high")
+        assert func["status"] == "claimed"
+        assert func["claimed_by_agent"] == "agent-1"
+
+    def test_successive_claims_get_different_functions(self, db):
+        """A claimed candidate should not be handed out again."""
+        db.replace_candidates([
+            self._candidate("a", 150, subdir="lb"),
+            self._candidate("b", 100, subdir="gr"),
+        ])
+
+        first = db.claim_next_candidate("agent-1")
+        second = db.claim_next_candidate("agent-2")
+
+        assert first["function_name"] == "a"
+        assert second["function_name"] == "b"
+        assert db.claim_next_candidate("agent-3") is None
+
+    def test_skips_subdirectory_locked_by_other_agent(self, db):
+        """Candidates in another agent's subdirectory should be skipped."""
+        db.replace_candidates([
+            self._candidate("locked", 150, subdir="lb"),
+            self._candidate("free", 100, subdir="gr"),
+        ])
+        db.lock_subdirectory("lb", "agent-1")
+
+        claimed = db.claim_next_candidate("agent-2")
+        assert claimed["function_name"] == "free"
+
+        # The lock holder can still take work from its own subdirectory
+        claimed = db.claim_next_candidate("agent-1")
+        assert claimed["function_name"] == "locked"
+
+    def test_claim_locks_subdirectory(self, db):
+        """Claiming should lock the candidate's subdirectory for the agent."""
+        db.replace_candidates([self._candidate("func", 100, subdir="ft-chara-ftFox")])
+
+        db.claim_next_candidate("agent-1")
+
+        lock = db.get_subdirectory_lock("ft-chara-ftFox")
+        assert lock["locked_by_agent"] == "agent-1"
+
+    def test_skips_finished_functions(self, db):
+        """Matched or merged functions should not be handed out."""
+        db.replace_candidates([
+            self._candidate("done", 150),
+            self._candidate("todo", 100, subdir="gr"),
+        ])
+        db.upsert_function("done", status="merged")
+
+        claimed = db.claim_next_candidate("agent-1")
+        assert claimed["function_name"] == "todo"
+
+    def test_filters(self, db):
+        """Module, size and exclusion filters should narrow the queue."""
+        db.replace_candidates([
+            self._candidate("big", 200, subdir="lb", size_bytes=2000),
+            self._candidate("excluded", 150, subdir="gr"),
+            self._candidate("fine", 100, subdir="it"),
+        ])
+
+        claimed = db.claim_next_candidate("agent-1", max_size=500, exclude_subdirs=["gr"])
+        assert claimed["function_name"] == "fine"
+
+        assert db.claim_next_candidate("agent-1", module="mn") is None
+
+    def test_replace_candidates_records_report_mtime(self, db):
+        """The queue should remember which report.json it was built from."""
+        count = db.replace_candidates([self._candidate("func", 100)], report_mtime=123.5)
+
+        assert count == 1
+        assert db.get_candidate_count() == 1
+        assert db.get_meta("candidates_report_mtime") == "123.5"
+
 class TestFunctionState:
     """Tests for function state tracking.
 
@@ -234,6 +367,100 @@ class TestSubdirectoryLocking:
         assert set(agent1_dirs) == {"lb", "gr"}
 
 
+class TestBuildValidation:
+    """Tests for tree-hash keyed build validation records."""
+
+    def test_record_and_get(self, db):
+        assert db.get_build_validation("/wt/dir-lb") is None
+
+        db.record_build_validation("/wt/dir-lb", "abc")
+        db.record_build_validation("/wt/dir-lb", "def")
+
+        validation = db.get_build_validation("/wt/dir-lb")
+        assert validation["tree_hash"] == "def"
+        assert validation["validated_at"] is not None
+
+    def test_clear(self, db):
+        db.record_build_validation("/wt/dir-lb", "abc")
+        db.clear_build_validation("/wt/dir-lb")
+        assert db.get_build_validation("/wt/dir-lb") is None
+
+
+class TestScratchContextHashes:
+    """Tests for remembering the context last uploaded to a scratch."""
+
+    def test_set_and_get(self, db):
+        assert db.get_scratch_context_hashes("abc") is None
+
+        db.set_scratch_context_hashes("abc", "http://localhost", "full1", "slice1")
+        db.set_scratch_context_hashes("abc", "http://localhost", "full2")
+
+        assert db.get_scratch_context_hashes("abc") == {
+            "context_hash": "full2",
+            "context_slice_hash": None,
+        }
+
+
+class TestCreatedScratches:
+    """Tests for recording a batch of new scratches at once."""
+
+    def test_records_scratches_and_functions(self, db):
+        db.upsert_function("fn_b", status="unclaimed", match_percent=40.0)
+
+        count = db.record_created_scratches([
+            {"slug": "aaa", "function_name": "fn_a", "claim_token": "tok_a"},
+            {"slug": "bbb", "function_name": "fn_b", "claim_token": None},
+        ], "http://localhost:8000")
+
+        assert count == 2
+        assert db.get_scratch_token("aaa") == "tok_a"
+        fn_a = db.get_function("fn_a")
+        assert fn_a["local_scratch_slug"] == "aaa"
+        assert fn_a["status"] == "in_progress"
+        fn_b = db.get_function("fn_b")
+        assert fn_b["local_scratch_slug"] == "bbb"
+        assert fn_b["match_percent"] == 40.0  # Untouched
+
+    def test_empty_batch(self, db):
+        assert db.record_created_scratches([], "http://localhost:8000") == 0
+
+
+class TestPrefetchedScratches:
+    """Tests for scratches created ahead of the candidate queue."""
+
+    def _candidates(self, db):
+        db.replace_candidates([
+            {
+                "function_name": name,
+                "source_file_path": "melee/ft/ft.c",
+                "subdirectory_key": "ft",
+                "recommendation_score": score,
+            }
+            for name, score in [("fn_a", 30), ("fn_b", 20), ("fn_c", 10)]
+        ])
+
+    def test_prefetch_candidates_skip_claimed_and_prefetched(self, db):
+        self._candidates(db)
+        db.add_claim("fn_a", "agent-1")
+        db.add_prefetched_scratches([{"slug": "bbb", "function_name": "fn_b"}], "http://x")
+
+        # fn_a is claimed, so the top 2 available are fn_b (prefetched) and fn_c
+        assert [c["function_name"] for c in db.get_prefetch_candidates(2)] == ["fn_c"]
+
+    def test_take_is_one_shot(self, db):
+        db.add_prefetched_scratches(
+            [{"slug": "aaa", "function_name": "fn_a", "claim_token": "tok", "context_hash": "h"}],
+            "http://x",
+        )
+
+        assert db.take_prefetched_scratch("fn_a", "http://other") is None
+        taken = db.take_prefetched_scratch("fn_a", "http://x")
+        assert taken["slug"] == "aaa"
+        assert taken["claim_token"] == "tok"
+        assert db.take_prefetched_scratch("fn_a", "http://x") is None
+        assert db.get_prefetched_scratches() == []
+
+
 class TestMatchScoring:
     """Tests for match score tracking.
 
@@ -347,6 +574,66 @@ class TestMatchScoring:
 
         assert branches == ["subdirs/lb", "subdirs/lb", "subdirs/ef"]
 
+    def test_unchanged_score_sampled_periodically(self, db):
+        """Unchanged scores are re-recorded once the sample interval passes."""
+        db.upsert_scratch("ABC123", "local", "http://localhost:8000")
+
+        assert db.record_match_score("ABC123", 50, 100) is True
+        assert db.record_match_score("ABC123", 50, 100) is False
+        assert db.record_match_score("ABC123", 50, 100, sample_interval=0) is True
+
+        assert len(db.get_match_history("ABC123")) == 2
+
+    def test_rollups_count_every_compile(self, db):
+        """Rollups count compiles even when no history point is written."""
+        db.upsert_scratch("ABC123", "local", "http://localhost:8000", function_name="lbColl_Foo")
+
+        db.record_match_score("ABC123", 50, 100, agent_id="agent-a")
+        db.record_match_score("ABC123", 50, 100, agent_id="agent-a")
+        db.record_match_score("ABC123", 20, 100, agent_id="agent-a")
+        db.record_match_score("ABC123", 30, 100, agent_id="agent-b")
+
+        rollups = {r["agent_id"]: r for r in db.get_match_rollups(function_name="lbColl_Foo")}
+        assert rollups["agent-a"]["compiles"] == 3
+        assert rollups["agent-a"]["best_score"] == 20
+        assert rollups["agent-a"]["last_score"] == 20
+        assert rollups["agent-b"]["compiles"] == 1
+
+    def test_best_match_survives_regression(self, db):
+        """Best score stays at the best value after a worse compile."""
+        db.upsert_scratch("ABC123", "local", "http://localhost:8000")
+
+        db.record_match_score("ABC123", 40, 100)
+        db.record_match_score("ABC123", 10, 100)
+        db.record_match_score("ABC123", 60, 100)
+
+        best = db.get_best_match("ABC123")
+        assert best["best_score"] == 10
+        assert best["best_match_percent"] == pytest.approx(90.0)
+        assert db.get_best_match("missing") is None
+
+    def test_downsample_keeps_improvements(self, db):
+        """Downsampling drops old redundant points but keeps new bests."""
+        db.upsert_scratch("ABC123", "local", "http://localhost:8000")
+        base = 1_700_000_000.0  # Well past any cutoff
+        # Same hour: first point, a regression, an improvement, another regression
+        points = [(50, 0), (70, 60), (30, 120), (60, 180), (55, 240)]
+        with db.connection() as conn:
+            for score, offset in points:
+                conn.execute(
+                    """
+                    INSERT INTO match_history (scratch_slug, score, max_score, match_percent, timestamp)
+                    VALUES (?, ?, 100, ?, ?)
+                    """,
+                    ("ABC123", score, 100.0 - score, base + offset),
+                )
+
+        deleted = db.downsample_match_history(older_than_seconds=3600)
+
+        remaining = [e["score"] for e in db.get_match_history("ABC123")]
+        assert deleted == 2
+        assert remaining == [50, 30, 55]
+
 
 class TestAuditLog:
     """Tests for audit logging.
@@ -543,6 +830,85 @@ class TestAddressTracking:
         assert len(aliases) >= 1
         assert any(a["old_name"] == "old_func" for a in aliases)
 
+    def test_address_int_column_derived(self, db):
+        """address_int should mirror the normalized canonical_address."""
+        db.upsert_function("my_func", canonical_address="0x8000ABCD")
+
+        func = db.get_function("my_func")
+        assert func["address_int"] == 0x8000ABCD
+
+    def test_detect_renames_by_address(self, db):
+        """Untracked report names at a tracked address are renames."""
+        db.upsert_function("fn_80003100", canonical_address="0x80003100")
+        db.upsert_function("kept_func", canonical_address="0x80003200")
+
+        renames = db.detect_renames({
+            "RealName": "0x80003100",
+            "kept_func": "0x80003200",
+            "brand_new": "0x80009999",
+        })
+
+        assert renames == [("fn_80003100", "RealName", "0x80003100")]
+
+    def test_detect_renames_ignores_names_still_in_report(self, db):
+        """A tracked name still present in the report isn't renamed away."""
+        db.upsert_function("fn_a", canonical_address="0x80003100")
+
+        renames = db.detect_renames({
+            "fn_a": "0x80003200",
+            "fn_b": "0x80003100",
+        })
+
+        assert renames == []
+
+    def test_detect_renames_through_alias(self, db):
+        """A tracked function without an address is found via its aliases."""
+        db.upsert_function("name_v2")
+        db.record_function_alias("0x80003100", "name_v1", "name_v2")
+
+        renames = db.detect_renames({"name_v3": 2147496192})
+
+        assert renames == [("name_v2", "name_v3", "0x80003100")]
+
+
+
+class TestLegacyImport:
+    """Tests for importing the old JSON side-stores into the database."""
+
+    def test_imports_active_claims_only(self, db):
+        """Expired JSON claims should be dropped during import."""
+        counts = db.import_legacy_stores(
+            claims={
+                "fresh": {"agent_id": "agent-1", "timestamp": time.time(),
+                          "source_file": "melee/lb/lb.c", "subdirectory": "lb"},
+                "stale": {"agent_id": "agent-2", "timestamp": 0},
+            },
+            claim_timeout_seconds=3600,
+        )
+
+        assert counts["claims"] == 1
+        claim = db.get_claim("fresh")
+        assert claim["agent_id"] == "agent-1"
+        assert claim["subdirectory_key"] == "lb"
+        assert db.get_claim("stale") is None
+
+    def test_imports_tokens(self, db):
+        """Tokens should be attached to scratch records."""
+        db.import_legacy_stores(tokens={"abc12": "token-1"})
+
+        assert db.get_scratch_token("abc12") == "token-1"
+
+    def test_imports_match_history(self, db):
+        """History entries should be importable and queryable in order."""
+        db.import_legacy_stores(match_history={
+            "abc12": [
+                {"score": 50, "max_score": 100, "match_pct": 50.0, "timestamp": 1.0},
+                {"score": 0, "max_score": 100, "match_pct": 100.0, "timestamp": 2.0},
+            ],
+        })
+
+        history = db.get_match_history("abc12")
+        assert [h["score"] for h in history] == [50, 0]
 
 class TestSchemaMigration:
     """Tests for schema migrations."""
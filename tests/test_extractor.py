@@ -383,6 +383,20 @@ class TestFunctionExtractor:
         func_info = extractor.extract_function("NonExistentFunction")
         assert func_info is None
 
+    def test_extract_functions_matches_single_extraction(self, melee_root):
+        """Test batch extraction agrees with one-at-a-time extraction."""
+        extractor = FunctionExtractor(melee_root)
+        names = list(SymbolParser(melee_root).parse_symbols())[:5] + ["NonExistentFunction"]
+
+        results = extractor.extract_functions(names, include_asm=False, include_context=False)
+
+        assert list(results) == names
+        assert results["NonExistentFunction"] is None
+        for name in names:
+            assert results[name] == extractor.extract_function(
+                name, include_asm=False, include_context=False
+            )
+
     def test_find_source_file_for_function(self, melee_root):
         """Test finding source file using splits.txt."""
         extractor = FunctionExtractor(melee_root)
@@ -0,0 +1,73 @@
+"""Tests for crash-safe JSON storage helpers."""
+
+import json
+import os
+
+import pytest
+
+from src.cli.utils import json_storage
+from src.cli.utils.json_storage import (
+    COMPACT_THRESHOLD,
+    delete_json_key_atomic,
+    load_json_safe,
+    save_json_atomic,
+    update_json_atomic,
+)
+
+
+class TestAtomicWrites:
+    """Writes replace the file in one step and leave no temp files."""
+
+    def test_roundtrip(self, tmp_path):
+        path = tmp_path / "data.json"
+        save_json_atomic(path, {"a": 1, "b": {"c": 2}})
+        assert load_json_safe(path) == {"a": 1, "b": {"c": 2}}
+
+    def test_no_temp_files_left(self, tmp_path):
+        path = tmp_path / "data.json"
+        save_json_atomic(path, {"a": 1})
+        update_json_atomic(path, "b", 2)
+        assert delete_json_key_atomic(path, "a") is True
+        leftovers = [p.name for p in tmp_path.iterdir() if p.name.endswith(".tmp")]
+        assert leftovers == []
+        assert load_json_safe(path) == {"b": 2}
+
+    def test_failed_write_keeps_previous_contents(self, tmp_path, monkeypatch):
+        """A crash mid-write must not truncate the existing file."""
+        path = tmp_path / "data.json"
+        save_json_atomic(path, {"keep": True})
+
+        def boom(*args, **kwargs):
+            raise OSError("disk full")
+
+        monkeypatch.setattr(json_storage.os, "fsync", boom)
+        with pytest.raises(OSError):
+            save_json_atomic(path, {"keep": False})
+
+        assert json.loads(path.read_text()) == {"keep": True}
+        assert not [p for p in tmp_path.iterdir() if p.name.endswith(".tmp")]
+
+    def test_preserves_file_mode(self, tmp_path):
+        path = tmp_path / "data.json"
+        save_json_atomic(path, {"a": 1})
+        os.chmod(path, 0o640)
+        save_json_atomic(path, {"a": 2})
+        assert os.stat(path).st_mode & 0o777 == 0o640
+
+    def test_large_files_written_compact(self, tmp_path):
+        small = tmp_path / "small.json"
+        large = tmp_path / "large.json"
+        save_json_atomic(small, {"a": 1})
+        save_json_atomic(large, {str(i): i for i in range(COMPACT_THRESHOLD + 1)})
+        assert "\n" in small.read_text()
+        assert "\n" not in large.read_text()
+
+
+class TestLoad:
+    """Reads never raise on missing or damaged files."""
+
+    def test_missing_and_corrupt_files(self, tmp_path):
+        path = tmp_path / "data.json"
+        assert load_json_safe(path) == {}
+        path.write_text('{"a": ')
+        assert load_json_safe(path) == {}
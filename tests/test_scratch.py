@@ -91,19 +91,43 @@ class TestDiffOutputParsing:
         assert base_norm == curr_norm
 
 
-class TestScratchTokenPaths:
-    """Tests verifying scratch token file path construction.
+class TestScratchTokenStorage:
+    """Tests verifying scratch token storage.
 
     Token storage is critical for maintaining scratch ownership.
+    Tokens live in the state database, keyed by scratch slug.
     """
 
-    def test_tokens_file_in_config_dir(self):
-        """Tokens should be stored in the decomp config directory."""
-        from src.cli.scratch import DECOMP_SCRATCH_TOKENS_FILE
+    @pytest.fixture
+    def db(self, tmp_path):
+        from unittest.mock import patch
+        from src.db import StateDB, reset_db
+
+        reset_db()
+        test_db = StateDB(tmp_path / "state.db")
+        test_db.set_meta("legacy_json_migrated", "1")
+        with patch("src.db.get_db", return_value=test_db):
+            yield test_db
+        test_db.close()
+        reset_db()
+
+    def test_token_round_trip(self, db):
+        """Saved tokens should be readable by slug."""
+        from src.cli.scratch import _get_scratch_token, _save_scratch_token
+
+        _save_scratch_token("abc12", "secret-token")
+
+        assert _get_scratch_token("abc12") == "secret-token"
+        assert _get_scratch_token("missing") is None
 
-        # Should be in a config directory, not cwd
-        assert "decomp" in str(DECOMP_SCRATCH_TOKENS_FILE).lower() or \
-               ".config" in str(DECOMP_SCRATCH_TOKENS_FILE)
+    def test_token_survives_scratch_upsert(self, db):
+        """Upserting the scratch record should keep its token."""
+        from src.cli.scratch import _get_scratch_token, _save_scratch_token
+
+        _save_scratch_token("abc12", "secret-token")
+        db.upsert_scratch("abc12", "local", "http://localhost:8000", function_name="my_func")
+
+        assert _get_scratch_token("abc12") == "secret-token"
 
 
 class TestScratchCreateValidation:
@@ -289,6 +313,87 @@ void other_func(void);
         assert "void other_func" in result
 
 
+class TestPrepareContext:
+    """Tests for prepare_context - the single-pass context pipeline.
+
+    Target stripping and body stripping share one parse; the m2c version is
+    derived from the stripped text, and results are cached by context hash.
+    """
+
+    CONTEXT = """#define COUNT 4
+typedef struct Foo { int x; } Foo;
+static inline int helper(int a) { return a + COUNT; }
+void target_func(Foo* f);
+void target_func(Foo* f) { f->x = helper(1); }
+_Static_assert(sizeof(Foo) == 4, "size");
+"""
+
+    @pytest.fixture(autouse=True)
+    def _fresh_cache(self):
+        from src.cli import context
+        context._memory_cache.clear()
+        yield
+        context._memory_cache.clear()
+
+    def test_stages_share_one_pass(self):
+        """Body stripping wins over target stripping for the same definition."""
+        from src.cli.context import StripFunctionBodies, StripTargetFunction, prepare_context
+        from src.hooks.c_analyzer import TREE_SITTER_AVAILABLE
+
+        if not TREE_SITTER_AVAILABLE:
+            pytest.skip("tree-sitter not available")
+
+        prepared = prepare_context(
+            self.CONTEXT, [StripFunctionBodies(), StripTargetFunction("target_func")], m2c=False
+        )
+        assert "return a + COUNT" not in prepared.mwcc
+        assert "f->x = helper(1)" not in prepared.mwcc
+        assert "struct Foo { int x; }" in prepared.mwcc
+        assert prepared.stripped == {"bodies": 2}
+        assert prepared.m2c is None
+
+    def test_m2c_variant_derived_from_mwcc(self):
+        """The m2c version is the stripped text, preprocessed."""
+        from src.cli.context import StripTargetFunction, prepare_context
+
+        prepared = prepare_context(self.CONTEXT, [StripTargetFunction("target_func")])
+        assert "// target_func definition stripped" in prepared.mwcc
+        assert "#define COUNT" in prepared.mwcc
+        assert "// target_func definition stripped" not in prepared.m2c  # gcc -E drops comments
+        assert "void target_func(Foo* f);" in prepared.m2c
+        assert "removed for m2c" in prepared.m2c
+
+    def test_target_without_definition_is_skipped(self):
+        """A prototype alone doesn't make the result depend on the function."""
+        from src.cli.context import StripTargetFunction
+
+        assert not StripTargetFunction("target_func").applies("void target_func(Foo* f);\n")
+        assert StripTargetFunction("target_func").applies(self.CONTEXT)
+
+    def test_results_are_cached(self):
+        """Preparing the same context twice runs gcc -E once."""
+        from unittest.mock import patch
+
+        from src.cli import context
+
+        with patch.object(context, "preprocess_for_m2c", side_effect=lambda c: c) as preprocess:
+            first = context.prepare_context(self.CONTEXT)
+            second = context.prepare_context(self.CONTEXT)
+        assert first is second
+        preprocess.assert_called_once()
+
+    def test_strip_static_asserts_keeps_line_count(self):
+        """Commented-out statements keep the surrounding lines in place."""
+        from src.cli.context import strip_static_asserts
+
+        context = 'int a;\n  _Static_assert((1 == 1), "("\n"x" ") failed");\nint b;\n'
+        result = strip_static_asserts(context)
+        assert result.count("\n") == context.count("\n")
+        assert result.splitlines()[0] == "int a;"
+        assert result.splitlines()[3] == "int b;"
+        assert "_Static_assert" not in result.replace("/* _Static_assert removed", "")
+
+
 class TestSlugExtraction:
     """Tests for slug extraction from URLs.
 
@@ -434,3 +539,331 @@ void bar(void) {
         # Other functions should remain
         assert "void bar(void)" in result
         assert "foo();" in result  # Call to foo should remain
+
+
+class TestSliceContext:
+    """Tests for cutting a scratch context down to what the code uses."""
+
+    CONTEXT = """#ifndef FT_H
+#define FT_H
+#define FT_FLAG 0x10
+#define UNUSED_MACRO 4
+typedef struct Vec3 { float x, y, z; } Vec3;
+typedef struct Fighter {
+    Vec3 pos;
+    int flags;
+} Fighter;
+typedef struct Item { int kind; } Item;
+void ftCommon_Update(Fighter* fp);
+void itUnused(Item* ip);
+#ifdef MWERKS_GEKKO
+int gekko_only;
+#else
+int portable_only;
+#endif
+#endif
+"""
+
+    @pytest.fixture(autouse=True)
+    def _require_tree_sitter(self):
+        from src.hooks.c_analyzer import TREE_SITTER_AVAILABLE
+        if not TREE_SITTER_AVAILABLE:
+            pytest.skip("tree-sitter not installed")
+
+    def test_keeps_transitive_dependencies_only(self):
+        from src.cli.scratch import SLICED_CONTEXT_HEADER, _slice_context
+
+        code = "void fn(Fighter* fp) {\n    fp->flags |= FT_FLAG;\n    ftCommon_Update(fp);\n}\n"
+        sliced = _slice_context(self.CONTEXT, code, "fn")
+
+        assert sliced.startswith(SLICED_CONTEXT_HEADER)
+        assert "typedef struct Fighter" in sliced
+        assert "typedef struct Vec3" in sliced  # Needed by Fighter
+        assert "#define FT_FLAG 0x10" in sliced
+        assert "void ftCommon_Update(Fighter* fp);" in sliced
+        assert "Item" not in sliced
+        assert "UNUSED_MACRO" not in sliced
+        assert "gekko_only" not in sliced
+        assert sliced.rstrip().endswith("#endif")
+
+    def test_keeps_conditionals_around_kept_items(self):
+        from src.cli.scratch import _slice_context
+
+        sliced = _slice_context(self.CONTEXT, "void fn(void) { portable_only = 1; }", "fn")
+
+        assert "#ifdef MWERKS_GEKKO\n#else\nint portable_only;\n#endif" in sliced
+
+    def test_nothing_to_remove(self):
+        from src.cli.scratch import _slice_context
+
+        context = "typedef int s32;\nvoid fn(s32 x);\n"
+        assert _slice_context(context, "void fn(s32 x) {}", "fn") is None
+
+    @pytest.mark.asyncio
+    async def test_compile_failure_restores_full_context(self):
+        from pathlib import Path
+        from unittest.mock import AsyncMock, MagicMock, patch
+        from src.cli import scratch as scratch_module
+
+        client = MagicMock()
+        scratch = MagicMock(context=scratch_module.SLICED_CONTEXT_HEADER + " */\n")
+        scratch.name = "fn"
+        client.get_scratch = AsyncMock(return_value=scratch)
+        client.update_scratch = AsyncMock()
+        client.compile_scratch = AsyncMock(return_value=MagicMock(success=True))
+        client.register_context = AsyncMock(return_value=None)  # No shared contexts
+
+        build_fresh_context = AsyncMock(return_value=(self.CONTEXT, Path("ft.ctx")))
+        with patch.object(scratch_module, "_find_source_file", AsyncMock(return_value="melee/ft/ft.c")), \
+             patch.object(scratch_module, "_build_fresh_context", build_fresh_context):
+            result = await scratch_module._compile_with_full_context(client, "abc", Path("."))
+
+        assert result.success
+        build_fresh_context.assert_awaited_once_with("fn", "melee/ft/ft.c", Path("."))
+        assert client.update_scratch.await_args.args[1].context == self.CONTEXT
+
+    @pytest.mark.asyncio
+    async def test_full_context_is_not_rebuilt(self):
+        from pathlib import Path
+        from unittest.mock import AsyncMock, MagicMock
+        from src.cli import scratch as scratch_module
+
+        client = MagicMock()
+        client.get_scratch = AsyncMock(return_value=MagicMock(context=self.CONTEXT))
+        client.update_scratch = AsyncMock()
+
+        assert await scratch_module._compile_with_full_context(client, "abc", Path(".")) is None
+        client.update_scratch.assert_not_awaited()
+
+
+class TestContextRefresh:
+    """Tests for skipping context uploads that wouldn't change anything."""
+
+    CONTEXT = TestSliceContext.CONTEXT
+    CODE = "void fn(Fighter* fp) { fp->flags |= FT_FLAG; }"
+
+    @pytest.fixture
+    def db(self, tmp_path):
+        from unittest.mock import patch
+        from src.db import StateDB, reset_db
+
+        reset_db()
+        db = StateDB(tmp_path / "state.db")
+        with patch("src.db.get_db", return_value=db):
+            yield db
+        db.close()
+        reset_db()
+
+    def test_first_upload_is_needed(self, db):
+        from src.cli.scratch import _check_context_refresh
+
+        reason, (context_hash, _) = _check_context_refresh("abc", self.CONTEXT, self.CODE, "fn")
+        assert reason is None
+        assert len(context_hash) == 64
+
+    def test_unchanged_context_is_skipped(self, db):
+        from src.cli.scratch import _check_context_refresh, _record_context_upload
+
+        _, hashes = _check_context_refresh("abc", self.CONTEXT, self.CODE, "fn")
+        _record_context_upload("abc", "http://localhost", hashes)
+
+        reason, _ = _check_context_refresh("abc", self.CONTEXT, self.CODE, "fn")
+        assert reason == "context unchanged"
+
+    def test_unrelated_change_is_skipped(self, db):
+        from src.cli.scratch import _check_context_refresh, _record_context_upload
+        from src.hooks.c_analyzer import TREE_SITTER_AVAILABLE
+
+        if not TREE_SITTER_AVAILABLE:
+            pytest.skip("tree-sitter not installed")
+
+        _, hashes = _check_context_refresh("abc", self.CONTEXT, self.CODE, "fn")
+        _record_context_upload("abc", "http://localhost", hashes)
+
+        unrelated = self.CONTEXT.replace("int kind;", "int kind, flags;")
+        reason, _ = _check_context_refresh("abc", unrelated, self.CODE, "fn")
+        assert reason == "no declarations the function uses changed"
+
+        related = self.CONTEXT.replace("int flags;", "unsigned int flags;")
+        reason, _ = _check_context_refresh("abc", related, self.CODE, "fn")
+        assert reason is None
+
+
+class TestCreateBatch:
+    """Tests for creating many scratches in one command."""
+
+    @pytest.fixture
+    def project(self, tmp_path):
+        from src.extractor.models import FunctionInfo
+
+        ctx_path = tmp_path / "ft.ctx"
+        ctx_path.write_text("typedef int s32;\nvoid fn_a(s32 x);\nvoid fn_b(s32 x);\n")
+
+        def func(name):
+            return FunctionInfo(
+                name=name, file_path="melee/ft/ft.c", address="0x80000000",
+                size_bytes=4, current_match=0.0, asm="blr", object_status="NonMatching",
+            )
+
+        return ctx_path, {"fn_a": func("fn_a"), "fn_b": func("fn_b"), "fn_x": None}
+
+    def test_creates_each_function_sharing_one_context(self, project):
+        from unittest.mock import AsyncMock, MagicMock, patch
+        from typer.testing import CliRunner
+        from src.cli import app
+        from src.cli import scratch as scratch_module
+
+        ctx_path, funcs = project
+        client = MagicMock()
+        client.__aenter__ = AsyncMock(return_value=client)
+        client.__aexit__ = AsyncMock(return_value=None)
+
+        create_scratch = AsyncMock(
+            side_effect=lambda client, func, *args, **kwargs: MagicMock(slug=f"slug_{func.name}", claim_token="tok")
+        )
+        build = MagicMock()
+        record = MagicMock(return_value=True)
+        with patch("src.extractor.extract_functions", AsyncMock(return_value=funcs)), \
+             patch("src.client.DecompMeAPIClient", return_value=client), \
+             patch.object(scratch_module, "_get_context_file", return_value=ctx_path), \
+             patch.object(scratch_module, "_build_context_files", build), \
+             patch.object(scratch_module, "get_compiler_for_source", return_value="mwcc_247_92") as compiler, \
+             patch.object(scratch_module, "_create_scratch", create_scratch), \
+             patch("src.cli._common.db_record_created_scratches", record):
+            result = CliRunner().invoke(
+                app, ["scratch", "create-batch", "fn_a", "fn_b", "fn_x", "--api-url", "http://x"]
+            )
+
+        assert result.exit_code == 1  # fn_x was not found
+        assert "fn_x" in result.stdout
+        build.assert_called_once_with([ctx_path], scratch_module.DEFAULT_MELEE_ROOT)
+        compiler.assert_called_once()
+        assert create_scratch.await_count == 2
+        created, base_url = record.call_args.args
+        assert base_url == "http://x"
+        assert sorted(row["slug"] for row in created) == ["slug_fn_a", "slug_fn_b"]
+
+
+class TestPrefetchWatch:
+    """Tests for `scratch prefetch --watch`."""
+
+    def test_failed_functions_not_retried(self):
+        from unittest.mock import AsyncMock, MagicMock, patch
+        from typer.testing import CliRunner
+        from src.cli import app
+        from src.cli import scratch as scratch_module
+
+        db = MagicMock()
+        db.get_prefetch_candidates.side_effect = lambda limit: [
+            {"function_name": name} for name in ["fn_bad", "fn_a", "fn_b"][:limit]
+        ]
+        extract = AsyncMock(side_effect=lambda root, names, **kwargs: {
+            name: None if name == "fn_bad" else MagicMock(asm="blr") for name in names
+        })
+        create = MagicMock(side_effect=lambda funcs, *args, **kwargs: [
+            {"function_name": name, "slug": name} for name in funcs
+        ])
+
+        with patch("src.db.get_db", return_value=db), \
+             patch("src.extractor.extract_functions", extract), \
+             patch("src.cli.claim._refresh_candidates"), \
+             patch.object(scratch_module, "_create_scratches", create), \
+             patch("time.sleep", side_effect=[None, SystemExit(0)]):
+            CliRunner().invoke(app, ["scratch", "prefetch", "-n", "2", "--watch", "--api-url", "http://x"])
+
+        assert [call.args[1] for call in extract.await_args_list] == [
+            ["fn_bad", "fn_a"],
+            ["fn_a", "fn_b"],  # fn_bad is skipped and the next one looked at
+        ]
+
+
+class TestTakePrefetchedScratch:
+    """Tests for handing a prefetched scratch to `scratch create`."""
+
+    @pytest.fixture
+    def db(self, tmp_path):
+        from unittest.mock import patch
+        from src.db import StateDB, reset_db
+
+        reset_db()
+        db = StateDB(tmp_path / "state.db")
+        with patch("src.db.get_db", return_value=db):
+            yield db
+        db.close()
+        reset_db()
+
+    def _prefetch(self, db, context):
+        import hashlib
+
+        db.add_prefetched_scratches([{
+            "slug": "aaa",
+            "function_name": "fn",
+            "claim_token": "tok",
+            "context_hash": hashlib.sha256(context.encode()).hexdigest(),
+        }], "http://x")
+
+    def test_current_scratch_is_taken(self, db):
+        from src.cli.scratch import _take_prefetched_scratch
+
+        self._prefetch(db, "typedef int s32;\n")
+
+        assert _take_prefetched_scratch("fn", "http://x", "typedef int s32;\n")["slug"] == "aaa"
+        assert _take_prefetched_scratch("fn", "http://x", "typedef int s32;\n") is None
+
+    @pytest.mark.asyncio
+    async def test_prefetch_leaves_claim_to_taker(self):
+        """The prefetcher never claims, so the token still works for the agent."""
+        from unittest.mock import AsyncMock, MagicMock
+        from src.cli.context import prepare_context
+        from src.cli.scratch import _create_scratch
+
+        client = MagicMock()
+        client.create_scratch = AsyncMock(return_value=MagicMock(slug="aaa", claim_token="tok"))
+        client.claim_scratch = AsyncMock()
+        client.update_scratch = AsyncMock()
+        client.register_context = AsyncMock(return_value="ctxhash")
+        func = MagicMock(asm="blr")
+        func.name = "fn"
+
+        await _create_scratch(
+            client, func, prepare_context("typedef int s32;\n", [], m2c=True),
+            "mwcc_247_92", True, True, note=lambda message: None, claim=False,
+        )
+
+        client.claim_scratch.assert_not_awaited()
+        client.update_scratch.assert_not_awaited()
+
+    def test_taker_claims_and_sets_context(self):
+        from unittest.mock import AsyncMock, MagicMock, patch
+        from src.cli import scratch as scratch_module
+        from src.cli.context import prepare_context
+
+        client = MagicMock()
+        client.__aenter__ = AsyncMock(return_value=client)
+        client.__aexit__ = AsyncMock(return_value=None)
+        client.claim_scratch = AsyncMock()
+        client.get_scratch = AsyncMock(return_value=MagicMock(slug="aaa", source_code=""))
+        finish = AsyncMock()
+        prefetched = {"slug": "aaa", "function_name": "fn", "claim_token": "tok"}
+        prepared = prepare_context("typedef int s32;\n", [], m2c=True)
+
+        with patch("src.client.DecompMeAPIClient", return_value=client), \
+             patch.object(scratch_module, "_finish_scratch_context", finish):
+            taken = scratch_module._hand_over_prefetched(prefetched, "http://x", prepared, True)
+
+        assert taken == prefetched
+        client.claim_scratch.assert_awaited_once_with("aaa", "tok")
+        assert finish.await_args.args[2:4] == ("fn", prepared)
+
+        # A token that can't be claimed means a fresh scratch instead
+        client.claim_scratch = AsyncMock(side_effect=RuntimeError("403"))
+        with patch("src.client.DecompMeAPIClient", return_value=client):
+            assert scratch_module._hand_over_prefetched(prefetched, "http://x", prepared, True) is None
+
+    def test_stale_scratch_is_dropped(self, db):
+        from src.cli.scratch import _take_prefetched_scratch
+
+        self._prefetch(db, "typedef int s32;\n")
+
+        assert _take_prefetched_scratch("fn", "http://x", "typedef long s32;\n") is None
+        assert db.get_prefetched_scratches() == []
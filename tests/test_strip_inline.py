@@ -8,6 +8,8 @@ removes inline function bodies while preserving:
 """
 
 import pytest
+from unittest.mock import patch
+
 from src.cli.extract import _count_braces, _strip_inline_functions, _strip_target_function, _strip_all_function_bodies
 
 
@@ -71,6 +73,70 @@ class TestCountBraces:
         line = "        // HSD_JObjSetMtxDirtySub(jobj); } };"
         assert _count_braces(line) == (0, 0)
 
+    def test_block_comment_braces_ignored(self):
+        """Braces inside /* */ comments are not counted."""
+        assert _count_braces("{ /* } */") == (1, 0)
+        assert _count_braces("/* { */ x = 1; /* } */") == (0, 0)
+
+    def test_url_in_string_is_not_a_comment(self):
+        """A // inside a string doesn't hide the braces after it."""
+        assert _count_braces('s = "http://x"; {') == (1, 0)
+
+
+class TestCScanner:
+    """Tests for the regex-based scanner behind the text strippers."""
+
+    CODE = """#define OPEN {
+/* helper { */
+static inline int helper(int a) // {
+{
+    if (a) { return "}"[0]; }
+    return 0;
+}
+typedef struct Foo { int x; } Foo;
+int table[] = { 1, 2 };
+void proto(void);
+s32 multi(s32 a,
+          s32 b)
+{
+    return a + b;
+}
+"""
+
+    def test_function_spans(self):
+        """Only function definitions are reported, with their full extent."""
+        from src.hooks.c_scanner import function_spans
+
+        spans = function_spans(self.CODE)
+        assert [span.name for span in spans] == ["helper", "multi"]
+        helper = spans[0]
+        assert self.CODE[helper.start:].startswith("static inline int helper")
+        assert self.CODE[helper.end - 1] == "}"
+        assert self.CODE[helper.start:helper.end].endswith("return 0;\n}")
+
+    def test_match_brace_skips_literals(self):
+        """Braces in strings and comments don't close the block."""
+        from src.hooks.c_scanner import match_brace
+
+        code = 'f() { x = "}"; /* } */ }; rest'
+        assert code[:match_brace(code, code.index("{"))] == 'f() { x = "}"; /* } */ }'
+        assert match_brace("{ {", 0) is None
+
+    def test_definition_at(self):
+        """Prototypes and struct bodies aren't definitions."""
+        from src.hooks.c_scanner import definition_at
+
+        assert definition_at(self.CODE, self.CODE.index("void proto")) is None
+        assert definition_at(self.CODE, self.CODE.index("typedef struct")) is None
+        assert definition_at(self.CODE, self.CODE.index("s32 multi")).name == "multi"
+
+    def test_target_fallback_matches_whole_name(self):
+        """Without tree-sitter, stripping `fn` leaves `fn2` alone."""
+        code = "void fn2(void) {\n}\nvoid fn(void) {\n    fn2();\n}\n"
+        with patch("src.cli.extract.TREE_SITTER_AVAILABLE", False):
+            result = _strip_target_function(code, "fn")
+        assert result == "void fn2(void) {\n}\n// fn definition stripped\n"
+
 
 class TestStripInlineFunctions:
     """Tests for the _strip_inline_functions function."""
@@ -658,6 +724,94 @@ void baz() { return; }"""
         assert "int sum" not in result
 
 
+
+class TestParseCache:
+    """Tests for the tree-sitter parse cache shared by stripping and the hooks."""
+
+    @pytest.fixture(autouse=True)
+    def _require_tree_sitter(self):
+        from src.hooks import c_analyzer
+        if not c_analyzer.TREE_SITTER_AVAILABLE:
+            pytest.skip("tree-sitter not installed")
+        c_analyzer.clear_parse_cache()
+        yield
+        c_analyzer.clear_parse_cache()
+
+    def test_same_source_parsed_once(self):
+        from src.hooks import c_analyzer
+
+        code = "void foo(int x) { return; }"
+        tree, _ = c_analyzer.parse_source(code)
+        again, _ = c_analyzer.parse_source(code)
+        assert again is tree
+
+    def test_stripped_context_reparsed_incrementally(self):
+        """Stripping queues its edits, so the next parse matches a full parse."""
+        from src.hooks import c_analyzer
+
+        code = """struct Foo { int a; };
+static inline int get(struct Foo* f) {
+    return f->a;
+}
+void target(void) { get(0); }
+void other(int x) {
+    x = 1;
+}
+"""
+        stripped, count = _strip_all_function_bodies(code, keep_functions={"target"})
+        assert count == 2
+        assert len(c_analyzer._pending_edits) == 1
+
+        tree, source = c_analyzer.parse_source(stripped)
+        full = c_analyzer.get_parser().parse(source)
+        assert str(tree.root_node) == str(full.root_node)
+        assert not c_analyzer._pending_edits
+
+        result = _strip_target_function(stripped, "target")
+        assert "// target definition stripped" in result
+        assert "int get(struct Foo* f);" in result
+
+    def test_small_edit_reparsed_incrementally(self):
+        from src.hooks import c_analyzer
+
+        code = "void foo(void) {\n    int x = 1;\n}\n\nvoid bar(void) {\n}\n"
+        c_analyzer.parse_source(code)
+        edited = code.replace("int x = 1;", "int x = 0x1;\n    int y;")
+
+        bases = []
+        original = c_analyzer._edited_copy
+
+        def spy(*args):
+            bases.append(original(*args))
+            return bases[-1]
+
+        with patch.object(c_analyzer, "_edited_copy", spy):
+            tree, source = c_analyzer.parse_source(edited)
+
+        assert len(bases) == 1 and bases[0] is not None
+        full = c_analyzer.get_parser().parse(source)
+        assert str(tree.root_node) == str(full.root_node)
+
+    def test_analyze_runs_all_detectors_in_one_walk(self):
+        from src.hooks import c_analyzer
+
+        code = """void f(void) {
+    float a = 1.5;
+    int b = TRUE;
+    int c = 0xabc;
+    *(f32*)((u8*)fp + 0x844) = 1.0F;
+}"""
+        with patch.object(c_analyzer, "_walk", wraps=c_analyzer._walk) as walk:
+            issues = c_analyzer.analyze_c_code(code)
+
+        assert walk.call_count == 1
+        assert [i.message for i in issues] == [
+            "Pointer arithmetic for struct field access",
+            "Lowercase hex literal",
+            "Float literal missing F suffix",
+            "Use lowercase boolean",
+        ]
+
 class TestStructBodyPreservation:
     """Tests for preserving struct/union bodies while stripping function bodies.
 